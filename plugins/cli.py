@@ -0,0 +1,626 @@
+"""
+Headless commands for analysis and export of generated coils, usable without KiCad.
+Run from the folder containing the plugin folder:
+	python -m plugins.cli <command> --help
+"""
+
+import sys
+import math
+import argparse
+
+def run_field(args):
+	from .lib import board
+	from .lib import segments
+	from .lib import biotsavart
+
+	import numpy as np
+
+	layout = board.read(args.layout)
+	if not layout.placements:
+		raise SystemExit("No coils found in " + args.layout)
+
+	coil_segments = segments.get_layout_segments(layout, args.chord_tolerance)
+	starts = np.concatenate([s for (s, _) in coil_segments])
+	ends = np.concatenate([e for (_, e) in coil_segments])
+
+	if args.points:
+		points = np.loadtxt(args.points, delimiter = ",", ndmin = 2)[:, :3]
+		shape = None
+	else:
+		(x_range, y_range) = biotsavart.get_bounds(coil_segments, args.margin)
+		if args.x_range:
+			x_range = args.x_range
+		if args.y_range:
+			y_range = args.y_range
+
+		(points, shape) = biotsavart.get_plane_grid(x_range, y_range, args.z, args.resolution)
+
+	print(f"{len(layout.placements)} coils, {len(starts)} segments, {len(points)} field points", file = sys.stderr)
+
+	magnitude = biotsavart.write_csv(args.csv, starts, ends, points, args.current)
+
+	if args.png:
+		if shape is None:
+			raise SystemExit("Heat maps need a grid, --png can not be combined with --points")
+
+		biotsavart.write_heatmap(args.png, magnitude, shape, not args.linear)
+
+def run_mutual(args):
+	import csv
+	import time
+
+	from .lib import board
+	from .lib import mutual
+
+	layout = board.read(args.layout)
+	if not layout.placements:
+		raise SystemExit("No coils found in " + args.layout)
+
+	start = time.perf_counter()
+	(matrix, computed) = mutual.get_matrix(layout, args.chord_tolerance, args.workers)
+
+	count = len(layout.placements)
+	print(f"{count} coils, {computed} of {count * (count - 1) // 2} pairs computed in {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+	if args.coupling:
+		matrix = mutual.get_coupling(matrix)
+
+	labels = [p.reference or p.spec["name"] + "_" + str(i) for (i, p) in enumerate(layout.placements)]
+
+	with open(args.csv, "w", newline = "") as file:
+		writer = csv.writer(file)
+		writer.writerow([""] + labels)
+
+		for (label, row) in zip(labels, matrix.tolist()):
+			writer.writerow([label] + row)
+
+def run_acr(args):
+	import csv
+	import json
+	import time
+
+	from .lib import spec as coilspec
+	from .lib import resistance
+
+	import numpy as np
+
+	specs = coilspec.load(args.specs)
+	if not specs:
+		raise SystemExit("No coils found in " + args.specs)
+
+	with open(args.specs, "r") as file:
+		data = json.load(file)
+	stackup_data = data.get("stackup") if isinstance(data, dict) else None
+
+	if args.log:
+		frequencies = np.geomspace(args.start, args.stop, args.points)
+	else:
+		frequencies = np.linspace(args.start, args.stop, args.points)
+
+	start = time.perf_counter()
+	result = resistance.sweep(specs, frequencies, stackup_data)
+	print(f"{len(specs)} coils, {len(frequencies)} frequencies computed in {time.perf_counter() - start:.2f} s", file = sys.stderr)
+	if not result["feasible"].all():
+		print(f"{int((~result['feasible']).sum())} coils are not feasible, their turns do not fit, written as nan", file = sys.stderr)
+
+	with open(args.csv, "w", newline = "") as file:
+		writer = csv.writer(file)
+		writer.writerow(["name", "frequency_Hz", "inductance_H", "dc_resistance_Ohm", "resistance_Ohm", "q"])
+
+		for (i, spec) in enumerate(specs):
+			rows = zip(frequencies.tolist(), result["resistance"][i].tolist(), result["q"][i].tolist())
+			writer.writerows([spec["name"], f, result["inductance"][i], result["dc"][i], r, q] for (f, r, q) in rows)
+
+def run_srf(args):
+	import csv
+	import json
+
+	from .lib import spec as coilspec
+	from .lib import capacitance
+
+	specs = coilspec.load(args.specs)
+	if not specs:
+		raise SystemExit("No coils found in " + args.specs)
+
+	with open(args.specs, "r") as file:
+		data = json.load(file)
+	stackup_data = data.get("stackup") if isinstance(data, dict) else None
+
+	result = capacitance.estimate(specs, stackup_data, args.copper_layers)
+	if not result["feasible"].all():
+		print(f"{int((~result['feasible']).sum())} coils are not feasible, their turns do not fit, written as nan", file = sys.stderr)
+
+	with open(args.csv, "w", newline = "") as file:
+		writer = csv.writer(file)
+		writer.writerow(["name", "inductance_H", "turn_capacitance_F", "layer_capacitance_F", "capacitance_F", "srf_Hz"])
+
+		columns = [result[key].tolist() for key in ["inductance", "turn", "layer", "equivalent", "srf"]]
+		writer.writerows([spec["name"]] + list(values) for (spec, values) in zip(specs, zip(*columns)))
+
+def run_fasthenry(args):
+	import json
+	import time
+
+	from .lib import spec as coilspec
+	from .lib import fasthenry
+
+	specs = coilspec.load(args.specs)
+	if not specs:
+		raise SystemExit("No coils found in " + args.specs)
+
+	with open(args.specs, "r") as file:
+		data = json.load(file)
+	stackup_data = data.get("stackup") if isinstance(data, dict) else None
+
+	frequencies = (args.fmin, args.fmax, args.ndec)
+	start = time.perf_counter()
+
+	if len(specs) == 1 and args.output.endswith(".inp"):
+		(nodes, edges) = fasthenry.write_spec(args.output, specs[0], stackup_data, args.chord_tolerance, frequencies, args.filaments, args.copper_layers)
+		written = [(args.output, nodes, edges)]
+	else:
+		written = fasthenry.write_batch(specs, args.output, stackup_data, args.chord_tolerance, frequencies, args.filaments, args.copper_layers, args.workers)
+
+	for (path, nodes, edges) in written:
+		print(f"{path}: {nodes} nodes, {edges} segments", file = sys.stderr)
+	print(f"{len(written)} files written in {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+def run_outline(args):
+	import os
+	import time
+
+	from .lib import spec as coilspec
+	from .lib import drawing
+
+	specs = coilspec.load(args.specs)
+	if not specs:
+		raise SystemExit("No coils found in " + args.specs)
+
+	start = time.perf_counter()
+	items = drawing.get_drawings(specs, args.chord_tolerance, args.copper_layers)
+
+	if args.split:
+		extension = os.path.splitext(args.output)[1].lower()
+		paths = drawing.write_files(os.path.splitext(args.output)[0], items, extension if extension in (".svg", ".dxf") else ".svg", args.polylines)
+	else:
+		drawing.write(args.output, items, args.polylines, args.columns)
+		paths = [args.output]
+
+	unique = len(set(id(d) for (_, d) in items))
+	print(f"{len(items)} coils ({unique} distinct) in {len(paths)} files, {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+def run_mesh(args):
+	import json
+	import time
+
+	from .lib import spec as coilspec
+	from .lib import mesh
+
+	specs = coilspec.load(args.specs)
+	if not specs:
+		raise SystemExit("No coils found in " + args.specs)
+
+	with open(args.specs, "r") as file:
+		data = json.load(file)
+	stackup_data = data.get("stackup") if isinstance(data, dict) else None
+
+	start = time.perf_counter()
+
+	if len(specs) == 1 and args.output.endswith(".wrl"):
+		footprint_path = args.output[:-4] + ".kicad_mod" if args.footprints else None
+		(vertices, faces) = mesh.write_spec(args.output, specs[0], stackup_data, args.chord_tolerance, args.copper_layers, footprint_path, args.model_uri)
+		written = [(args.output, vertices, faces)]
+	else:
+		written = mesh.write_batch(specs, args.output, stackup_data, args.chord_tolerance, args.copper_layers, args.footprints, args.model_uri, args.workers)
+
+	for (path, vertices, faces) in written:
+		print(f"{path}: {vertices} vertices, {faces} triangles", file = sys.stderr)
+	print(f"{len(written)} models written in {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+def run_gerber(args):
+	import time
+
+	from .lib import spec as coilspec
+	from .lib import gerber
+
+	specs = coilspec.load(args.specs)
+	if not specs:
+		raise SystemExit("No coils found in " + args.specs)
+
+	start = time.perf_counter()
+	paths = gerber.write_batch(specs, args.output, args.name, args.split, args.columns, args.margin, args.copper_layers, args.workers)
+
+	print(f"{len(specs)} coils in {len(paths)} files, {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+def run_panel(args):
+	import json
+	import time
+
+	from .lib import spec as coilspec
+	from .lib import panel
+
+	specs = coilspec.load(args.specs)
+	if not specs:
+		raise SystemExit("No coils found in " + args.specs)
+
+	with open(args.specs, "r") as file:
+		data = json.load(file)
+	stackup_data = data.get("stackup") if isinstance(data, dict) else None
+
+	start = time.perf_counter()
+	try:
+		summary = panel.build(specs, args.output, args.size, args.clearance, args.edge_clearance, stackup_data, args.copper_layers, args.workers)
+	except ValueError as error:
+		raise SystemExit(str(error))
+
+	print(f"{summary['coils']} coils on a {summary['size'][0]:g} x {summary['size'][1]:g} mm board, {summary['generated']} footprints generated, {summary['reused']} from the library, {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+def run_catalog(args):
+	import os
+	import json
+	import time
+
+	from .lib import catalog
+
+	if args.rebuild or not os.path.exists(args.catalog):
+		start = time.perf_counter()
+		rows = catalog.build(args.catalog, args.copper_layers, {"board_thickness": args.board_thickness})
+		print(f"{rows} designs written to {args.catalog} in {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+	if args.inductance is None:
+		return
+
+	start = time.perf_counter()
+	matches = catalog.Catalog(args.catalog).find(args.inductance * 1e-6, args.max_diameter, args.layers, args.count)
+	print(f"{len(matches)} designs found in {(time.perf_counter() - start) * 1e3:.2f} ms", file = sys.stderr)
+
+	for match in matches:
+		print(f"{match['layer_count']} layers {match['turns_count']:>3} turns {match['outer_diameter']:5.1f} mm {match['trace_width']:g}/{match['trace_spacing']:g} mm: {match['inductance'] * 1e6:9.3f} uH ({match['error'] * 100:+.2f} %) {match['resistance']:8.3f} Ohm {match['srf'] * 1e-6:9.1f} MHz")
+
+	if args.json:
+		with open(args.json, "w") as file:
+			json.dump(matches, file, indent = 4)
+
+def run_tolerance(args):
+	import json
+	import time
+
+	from .lib import spec as coilspec
+	from .lib import tolerance
+
+	specs = coilspec.load(args.specs)
+	if not specs:
+		raise SystemExit("No coils found in " + args.specs)
+
+	with open(args.specs, "r") as file:
+		data = json.load(file)
+	if not isinstance(data, dict):
+		data = {}
+
+	start = time.perf_counter()
+	records = []
+	for spec in specs:
+		summary = tolerance.get_summary(tolerance.analyze(spec, data.get("tolerances"), data.get("rules"), args.samples, data.get("stackup"), args.copper_layers, args.seed))
+		(inductance, resistance) = (summary["inductance"], summary["resistance"])
+
+		print(f"{spec['name']} {coilspec.to_string(spec)}: yield {summary['yield'] * 100:.2f} %, L {inductance['nominal'] * 1e6:.4g} uH (P5 {inductance['percentiles']['5'] * 1e6:.4g}, P95 {inductance['percentiles']['95'] * 1e6:.4g}), R {resistance['nominal']:.4g} Ohm (P5 {resistance['percentiles']['5']:.4g}, P95 {resistance['percentiles']['95']:.4g})")
+		for (name, passed) in summary["check_yield"].items():
+			if passed < 1:
+				print(f"\t{name:<14} {passed * 100:.2f} % pass")
+
+		summary["name"] = spec["name"]
+		summary["spec"] = coilspec.to_string(spec)
+		records.append(summary)
+
+	print(f"{len(specs)} coils with {args.samples} samples each in {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+	if args.json:
+		with open(args.json, "w") as file:
+			json.dump(records, file, indent = 4)
+
+def run_spice(args):
+	import os
+	import json
+	import time
+
+	from .lib import spec as coilspec
+	from .lib import library
+	from .lib import spice
+
+	# a library folder yields the specs of its footprints, named like them
+	if os.path.isdir(args.specs):
+		coils = library.Library(args.specs)
+		coils.refresh()
+		specs = coils.get_specs()
+		data = None
+	else:
+		specs = coilspec.load(args.specs)
+		with open(args.specs, "r") as file:
+			data = json.load(file)
+
+	if not specs:
+		raise SystemExit("No coils found in " + args.specs)
+
+	stackup_data = data.get("stackup") if isinstance(data, dict) else None
+	if args.board_thickness is not None:
+		stackup_data = dict(stackup_data or {}, board_thickness = args.board_thickness)
+
+	shaped = [spec["name"] for spec in specs if coilspec.get_shape(spec) is not None]
+	if shaped:
+		print("Estimates assume circular coils: " + ", ".join(shaped), file = sys.stderr)
+
+	start = time.perf_counter()
+	names = spice.write(args.output, specs, stackup_data, args.copper_layers)
+	print(f"{sum(name is not None for name in names)} subcircuits written in {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+	skipped = [spec["name"] for (spec, name) in zip(specs, names) if name is None]
+	if skipped:
+		print("Not feasible, the turns do not fit: " + ", ".join(skipped), file = sys.stderr)
+
+def run_serve(args):
+	from .lib import service
+
+	try:
+		service.check_address(service.get_address(args.address), args.allow_remote)
+	except ValueError as e:
+		raise SystemExit(str(e) + ", see --allow-remote")
+
+	print(f"Serving on {args.address} with {args.workers or 'all'} workers", file = sys.stderr)
+	service.serve(args.address, args.workers, args.queue_size, args.batch_size, args.allow_remote)
+
+def run_submit(args):
+	import os
+	import time
+
+	from .lib import spec as coilspec
+	from .lib import service
+
+	specs = coilspec.load(args.specs)
+	if not specs:
+		raise SystemExit("No coils found in " + args.specs)
+
+	os.makedirs(args.output, exist_ok = True)
+	start = time.perf_counter()
+
+	with service.Client(args.address) as client:
+		results = client.batch([("generate", {"spec": spec, "copper_layer_count": args.copper_layers}) for spec in specs])
+
+	failed = 0
+	for (name, result) in zip(coilspec.get_file_names(specs, ".kicad_mod"), results):
+		if isinstance(result, service.ServiceError):
+			print(f"{name}: {result}", file = sys.stderr)
+			failed += 1
+			continue
+
+		with open(os.path.join(args.output, name), "w") as file:
+			file.write(result["footprint"])
+
+	print(f"{len(specs) - failed} footprints written, {failed} failed, {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+	if failed:
+		raise SystemExit(1)
+
+def run_metrics(args):
+	import json
+	import time
+
+	from .lib import spec as coilspec
+	from .lib import coilgenerator
+
+	specs = coilspec.load(args.specs)
+	if not specs:
+		raise SystemExit("No coils found in " + args.specs)
+
+	layer_names = coilgenerator.get_layer_names(max([2, args.copper_layers or 0] + [spec["layer_count"] for spec in specs]))
+
+	start = time.perf_counter()
+	records = []
+	for spec in specs:
+		record = coilspec.generate_metrics(spec, layer_names).to_dict()
+		record["name"] = spec["name"]
+		record["spec"] = coilspec.to_string(spec)
+		records.append(record)
+
+	print(f"{len(specs)} coils measured in {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+	with open(args.json, "w") as file:
+		json.dump(records, file, indent = 4)
+
+def run_clearance(args):
+	import json
+	import time
+
+	from .lib import board
+	from .lib import clearance
+
+	start = time.perf_counter()
+	index = clearance.read_index(args.board, args.cell_size, args.chord_tolerance)
+	print(f"{len(index.items)} copper items of {args.board} indexed in {time.perf_counter() - start:.2f} s", file = sys.stderr)
+
+	layout = board.read(args.coils)
+	if not layout.placements:
+		raise SystemExit("No coils found in " + args.coils)
+
+	placements = layout.placements
+	if args.array:
+		(columns, rows) = (int(args.array[0]), int(args.array[1]))
+		placements = [copy for p in placements for copy in clearance.get_array(p, columns, rows, args.array[2], args.array[3])]
+
+	start = time.perf_counter()
+	conflicts = index.check(placements, args.clearance, set(args.exclude or []))
+	print(f"{len(placements)} coils checked in {time.perf_counter() - start:.3f} s", file = sys.stderr)
+
+	for (number, (placement, placement_conflicts)) in enumerate(zip(placements, conflicts)):
+		name = placement.reference or placement.spec["name"] + "_" + str(number)
+
+		if not placement_conflicts:
+			print(f"{name}: ok")
+			continue
+
+		print(f"{name}: {len(placement_conflicts)} conflicts")
+		for conflict in placement_conflicts:
+			print(f"\t{conflict.layer:<8} {conflict.kind:<9} {conflict.reference or '-':<12} gap {conflict.gap:8.3f} mm at ({conflict.x:.3f}, {conflict.y:.3f})")
+
+	if args.json:
+		with open(args.json, "w") as file:
+			json.dump([[conflict.to_dict() for conflict in placement_conflicts] for placement_conflicts in conflicts], file, indent = 4)
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(prog = "python -m plugins.cli", description = "Headless coil analysis and export")
+	commands = parser.add_subparsers(dest = "command", required = True)
+
+	field = commands.add_parser("field", help = "magnetic field of placed coils (Biot-Savart)")
+	field.add_argument("layout", help = ".kicad_pcb or JSON layout with placed coils")
+	field.add_argument("--csv", required = True, help = "output CSV with the field per point")
+	field.add_argument("--png", help = "output heat map of the field magnitude")
+	field.add_argument("--points", help = "CSV with x,y,z field points (mm) instead of a grid")
+	field.add_argument("--z", type = float, default = 0.5, help = "height of the grid plane, top copper is at 0 (mm)")
+	field.add_argument("--x-range", type = float, nargs = 2, help = "grid x extent (mm), defaults to the coils' bounds")
+	field.add_argument("--y-range", type = float, nargs = 2, help = "grid y extent (mm), defaults to the coils' bounds")
+	field.add_argument("--margin", type = float, default = 2.0, help = "grid margin around the coils (mm)")
+	field.add_argument("--resolution", type = float, default = 0.25, help = "grid spacing (mm)")
+	field.add_argument("--current", type = float, default = 1.0, help = "coil current (A)")
+	field.add_argument("--chord-tolerance", type = float, default = 0.01, help = "maximum arc discretization error (mm)")
+	field.add_argument("--linear", action = "store_true", help = "linear instead of logarithmic heat map colors")
+	field.set_defaults(run = run_field)
+
+	mutual = commands.add_parser("mutual", help = "mutual inductance matrix of placed coils (Neumann)")
+	mutual.add_argument("layout", help = ".kicad_pcb or JSON layout with placed coils")
+	mutual.add_argument("--csv", required = True, help = "output CSV with the inductance matrix (H)")
+	mutual.add_argument("--coupling", action = "store_true", help = "write coupling coefficients instead of inductances")
+	mutual.add_argument("--workers", type = int, help = "worker processes, defaults to all CPUs")
+	mutual.add_argument("--chord-tolerance", type = float, default = 0.01, help = "maximum arc discretization error (mm)")
+	mutual.set_defaults(run = run_mutual)
+
+	acr = commands.add_parser("acr", help = "AC resistance and quality factor of coil specs over frequency")
+	acr.add_argument("specs", help = "JSON file with a spec, a sweep, or a list of them, optionally with a stackup")
+	acr.add_argument("--csv", required = True, help = "output CSV with resistance and Q per coil and frequency")
+	acr.add_argument("--start", type = float, default = 1e6, help = "first frequency (Hz)")
+	acr.add_argument("--stop", type = float, default = 20e6, help = "last frequency (Hz)")
+	acr.add_argument("--points", type = int, default = 100, help = "number of frequencies")
+	acr.add_argument("--log", action = "store_true", help = "logarithmically instead of linearly spaced frequencies")
+	acr.set_defaults(run = run_acr)
+
+	srf = commands.add_parser("srf", help = "self capacitance and self resonant frequency of coil specs")
+	srf.add_argument("specs", help = "JSON file with a spec, a sweep, or a list of them, optionally with a stackup")
+	srf.add_argument("--csv", required = True, help = "output CSV with capacitances and resonant frequency per coil")
+	srf.add_argument("--copper-layers", type = int, help = "copper layers of the board, defaults to the layers of the largest coil")
+	srf.set_defaults(run = run_srf)
+
+	fasthenry = commands.add_parser("fasthenry", help = "FastHenry input files of coil specs")
+	fasthenry.add_argument("specs", help = "JSON file with a spec, a sweep, or a list of them, optionally with a stackup")
+	fasthenry.add_argument("output", help = "output .inp file for a single spec, otherwise a folder with one file per spec")
+	fasthenry.add_argument("--chord-tolerance", type = float, default = 0.01, help = "maximum arc discretization error (mm)")
+	fasthenry.add_argument("--fmin", type = float, default = 1e6, help = "lowest frequency (Hz)")
+	fasthenry.add_argument("--fmax", type = float, default = 20e6, help = "highest frequency (Hz)")
+	fasthenry.add_argument("--ndec", type = float, default = 1, help = "frequencies per decade")
+	fasthenry.add_argument("--filaments", type = int, nargs = 2, default = (1, 1), metavar = ("WIDTH", "HEIGHT"), help = "filaments per segment across width and height")
+	fasthenry.add_argument("--copper-layers", type = int, help = "copper layers of the board, defaults to the layers of the largest coil")
+	fasthenry.add_argument("--workers", type = int, help = "worker processes for sweeps, defaults to all CPUs")
+	fasthenry.set_defaults(run = run_fasthenry)
+
+	outline = commands.add_parser("outline", help = "SVG or DXF drawings of coil specs")
+	outline.add_argument("specs", help = "JSON file with a spec, a sweep, or a list of them")
+	outline.add_argument("output", help = "output .svg or .dxf file, a sweep is drawn as grid of coils on one sheet")
+	outline.add_argument("--split", action = "store_true", help = "one file per spec, written to a folder named like the output without extension")
+	outline.add_argument("--polylines", action = "store_true", help = "DXF traces as polylines of the trace width instead of center line arcs")
+	outline.add_argument("--columns", type = int, help = "coils per row of a sheet, defaults to a square grid")
+	outline.add_argument("--chord-tolerance", type = float, default = 0.01, help = "maximum arc discretization error of SVG paths and DXF polylines (mm)")
+	outline.add_argument("--copper-layers", type = int, help = "copper layers of the board, defaults to the layers of the largest coil")
+	outline.set_defaults(run = run_outline)
+
+	mesh = commands.add_parser("mesh", help = "3D VRML copper models of coil specs")
+	mesh.add_argument("specs", help = "JSON file with a spec, a sweep, or a list of them, optionally with a stackup")
+	mesh.add_argument("output", help = "output .wrl file for a single spec, otherwise a folder with one model per spec")
+	mesh.add_argument("--footprints", action = "store_true", help = "also write each footprint, referencing its model")
+	mesh.add_argument("--model-uri", help = "model path written to the footprints, a folder for sweeps, e.g. ${KIPRJMOD}/pcb_coils. Defaults to the absolute path")
+	mesh.add_argument("--chord-tolerance", type = float, default = 0.01, help = "maximum arc discretization error (mm)")
+	mesh.add_argument("--copper-layers", type = int, help = "copper layers of the board, defaults to the layers of the largest coil")
+	mesh.add_argument("--workers", type = int, help = "worker processes for sweeps, defaults to all CPUs")
+	mesh.set_defaults(run = run_mesh)
+
+	gerber = commands.add_parser("gerber", help = "Gerber and Excellon files of coil test coupons")
+	gerber.add_argument("specs", help = "JSON file with a spec, a sweep, or a list of them")
+	gerber.add_argument("output", help = "output folder")
+	gerber.add_argument("--name", default = "coupon", help = "file name prefix of the coupon")
+	gerber.add_argument("--split", action = "store_true", help = "one coupon per spec, named after the spec")
+	gerber.add_argument("--columns", type = int, help = "coils per row of a coupon, defaults to a square grid")
+	gerber.add_argument("--margin", type = float, default = 3.0, help = "space between the coils and the board outline (mm)")
+	gerber.add_argument("--copper-layers", type = int, help = "copper layers of the board, defaults to the layers of the largest coil")
+	gerber.add_argument("--workers", type = int, help = "worker processes for --split, defaults to all CPUs")
+	gerber.set_defaults(run = run_gerber)
+
+	build = commands.add_parser("panel", help = "characterization board with all coils of a sweep packed onto it")
+	build.add_argument("specs", help = "JSON file with a spec, a sweep, or a list of them, optionally with a stackup")
+	build.add_argument("output", help = "output .kicad_pcb file, the footprints are stored in pcb_coils next to it")
+	build.add_argument("--size", type = float, nargs = 2, metavar = ("WIDTH", "HEIGHT"), help = "board outline (mm), defaults to a board just large enough")
+	build.add_argument("--clearance", type = float, default = 1.0, help = "space between the bounding boxes of two coils (mm)")
+	build.add_argument("--edge-clearance", type = float, default = 1.0, help = "space between the coils and the board outline (mm)")
+	build.add_argument("--copper-layers", type = int, help = "copper layers of the board, defaults to the layers of the largest coil")
+	build.add_argument("--workers", type = int, help = "worker processes for generation, defaults to all CPUs")
+	build.set_defaults(run = run_panel)
+
+	catalog = commands.add_parser("catalog", help = "precomputed catalog of coil designs, looked up by target inductance")
+	catalog.add_argument("catalog", help = "catalog file, built first if it does not exist")
+	catalog.add_argument("--rebuild", action = "store_true", help = "build the catalog even if the file exists")
+	catalog.add_argument("--copper-layers", type = int, default = 4, help = "copper layers of the board the catalog is built for")
+	catalog.add_argument("--board-thickness", type = float, default = 1.6, help = "board thickness of the stackup the catalog is built for (mm)")
+	catalog.add_argument("--inductance", type = float, help = "target inductance (uH)")
+	catalog.add_argument("--max-diameter", type = float, default = math.inf, help = "largest outer diameter (mm)")
+	catalog.add_argument("--layers", type = int, help = "layer count of the designs, defaults to all")
+	catalog.add_argument("--count", type = int, default = 10, help = "number of designs")
+	catalog.add_argument("--json", help = "output JSON with the specs and estimates of the designs")
+	catalog.set_defaults(run = run_catalog)
+
+	variation = commands.add_parser("tolerance", help = "Monte Carlo yield and spread of coil specs under manufacturing tolerances")
+	variation.add_argument("specs", help = "JSON file with a spec, a sweep, or a list of them, optionally with a stackup, tolerances and rules")
+	variation.add_argument("--samples", type = int, default = 100000, help = "perturbed variants per spec")
+	variation.add_argument("--seed", type = int, help = "seed of the random generator, for repeatable results")
+	variation.add_argument("--copper-layers", type = int, help = "copper layers of the board, defaults to the layers of each coil")
+	variation.add_argument("--json", help = "output JSON with yield, yield per check and the distributions of inductance and resistance")
+	variation.set_defaults(run = run_tolerance)
+
+	spice = commands.add_parser("spice", help = "SPICE subcircuits of coil specs or of a coil library")
+	spice.add_argument("specs", help = "JSON file with a spec, a sweep, or a list of them, optionally with a stackup, or a coil library folder")
+	spice.add_argument("output", help = "output SPICE library file with one subcircuit per coil")
+	spice.add_argument("--copper-layers", type = int, help = "copper layers of the board, defaults to the layers of the largest coil")
+	spice.add_argument("--board-thickness", type = float, help = "board thickness of the stackup (mm), replaces the one in the JSON file")
+	spice.set_defaults(run = run_spice)
+
+	serve = commands.add_parser("serve", help = "local JSON-RPC generation service with a warm worker pool")
+	serve.add_argument("--address", default = "127.0.0.1:8765", help = "Unix socket path or localhost host:port")
+	serve.add_argument("--workers", type = int, help = "worker processes, defaults to all CPUs")
+	serve.add_argument("--queue-size", type = int, default = 1024, help = "requests waiting for a worker before connections are no longer read")
+	serve.add_argument("--batch-size", type = int, default = 32, help = "requests handed to a worker at once")
+	serve.add_argument("--allow-remote", action = "store_true", help = "serve TCP on hosts that are not loopback addresses, the service has no authentication")
+	serve.set_defaults(run = run_serve)
+
+	submit = commands.add_parser("submit", help = "generate footprints of coil specs through a running service")
+	submit.add_argument("specs", help = "JSON file with a spec, a sweep, or a list of them")
+	submit.add_argument("output", help = "folder for the generated .kicad_mod files")
+	submit.add_argument("--address", default = "127.0.0.1:8765", help = "address of the service")
+	submit.add_argument("--copper-layers", type = int, help = "copper layers of the board, defaults to the layers of each coil")
+	submit.set_defaults(run = run_submit)
+
+	metrics = commands.add_parser("metrics", help = "geometry metrics of coil specs without generating footprints")
+	metrics.add_argument("specs", help = "JSON file with a spec, a sweep, or a list of them")
+	metrics.add_argument("--json", required = True, help = "output JSON with trace lengths, bounds, counts, pads and clearances per coil")
+	metrics.add_argument("--copper-layers", type = int, help = "copper layers of the board, defaults to the layers of the largest coil")
+	metrics.set_defaults(run = run_metrics)
+
+	check = commands.add_parser("clearance", help = "clearance of coils to the copper of a board, before they are placed")
+	check.add_argument("board", help = ".kicad_pcb file with the existing copper")
+	check.add_argument("coils", help = "JSON layout with the coils and their intended positions")
+	check.add_argument("--array", type = float, nargs = 4, metavar = ("COLUMNS", "ROWS", "PITCH_X", "PITCH_Y"), help = "repeat every coil on a grid, starting at its position (mm)")
+	check.add_argument("--clearance", type = float, default = 0.2, help = "minimum gap between copper (mm)")
+	check.add_argument("--exclude", nargs = "+", help = "references of footprints or net names of zones to ignore")
+	check.add_argument("--json", help = "output JSON with the conflicts per coil")
+	check.add_argument("--cell-size", type = float, default = 2.0, help = "grid cell size of the board index (mm)")
+	check.add_argument("--chord-tolerance", type = float, default = 0.01, help = "maximum arc discretization error (mm)")
+	check.set_defaults(run = run_clearance)
+
+	args = parser.parse_args(argv)
+	args.run(args)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,914 @@
+import os
+import logging
+import json
+import math
+import threading
+
+import wx # type: ignore
+import pcbnew # type: ignore
+
+from .lib import menu
+from .lib import coilgenerator
+from .lib import library as coillibrary
+from .lib import limits
+from .lib import spec as coilspec
+from .preview import CoilPreview
+
+try:
+	from .lib import capacitance
+	from .lib import catalog as coilcatalog
+	from .lib import tolerance
+except ImportError:
+	# numpy is not part of every KiCad installation, the electrical estimates, the catalog and the tolerance analysis are hidden without it
+	capacitance = None
+	coilcatalog = None
+	tolerance = None
+
+# the dialog of the running pcbnew session, see show()
+_instance = None
+
+def show(pcbnew_frame):
+	"""
+	Shows the coil dialog. It is built on the first run and only hidden afterwards, a later run keeps the form values,
+	the preview and the library and only takes over the current board
+	Args:
+		pcbnew_frame: Window focused when the plugin was run, footprints are pasted into it
+
+	Returns:
+		CoilGeneratorUI: The dialog
+	"""
+	global _instance
+
+	# wx windows are falsy once destroyed, the dialog goes along with its pcbnew frame
+	if not _instance or _instance.IsBeingDeleted():
+		_instance = CoilGeneratorUI(pcbnew_frame)
+	elif not _instance.is_generating:
+		_instance.refresh_board(pcbnew_frame)
+
+	if not _instance.is_generating:
+		_instance.Show()
+		_instance.Raise()
+
+	return _instance
+
+# WX GUI form that show coil settings
+class CoilGeneratorUI(wx.Frame):
+	def __init__(self, pcbnew_frame):
+		super(CoilGeneratorUI, self).__init__()
+
+		self.width_label = 120
+		self.width_content = 180
+		self.width_limit = 80
+		self.padding = 5
+		self.limit_labels = {}
+		self.is_generating = False
+		self._library = None
+		self._catalog = None
+		self.catalog_matches = []
+
+		self.path_footprint_folder_name = "/pcb_coils/"
+		self._set_board()
+
+		self._init_logger()
+		self.logger = logging.getLogger(__name__)
+		self.logger.log(logging.DEBUG, "Running Coil Generator")
+
+		self._pcbnew_frame = pcbnew_frame
+
+		wx.Dialog.__init__(
+			self,
+			wx.GetTopLevelParent(pcbnew_frame) if pcbnew_frame else None,
+			id = wx.ID_ANY,
+			title = u"Coil Generator",
+			pos = wx.DefaultPosition,
+			size = wx.DefaultSize,
+			style = wx.DEFAULT_DIALOG_STYLE
+		)
+
+		self.sizer_box = wx.BoxSizer(wx.VERTICAL)
+
+		# self.app = wx.PySimpleApp()
+		icon = wx.Icon(os.path.join(os.path.dirname(__file__), 'icon.png'))
+		self.SetIcon(icon)
+		self.SetBackgroundColour(wx.LIGHT_GREY)
+
+		self._prepare_defaults_from_cached_settings(menu.structure)
+
+		for entry in menu.structure:
+			if entry["type"] == "choices" or entry["type"] == "choices_from_board":
+
+				# if choice structure values are sourced from board variables, some fields need to be dynamically generated before applying general choice handling
+				if entry["type"] == "choices_from_board":
+					self._set_board_choices(entry)
+
+				entry["wx_elem"] = self._make_choices(entry["label"], entry["choices"], entry["default"], entry["unit"])
+				self.Bind(wx.EVT_CHOICE, self._on_choice_change, entry["wx_elem"])
+				self.logger.log(logging.DEBUG, "[UI] Adding Choices")
+
+			if entry["type"] == "checkbox":
+				entry["wx_elem"] = self._make_checkbox(entry["label"], entry["default"], entry["unit"])
+				self.Bind(wx.EVT_CHECKBOX, self._on_value_change, entry["wx_elem"])
+				self.logger.log(logging.DEBUG, "[UI] Adding Checkbox")
+
+			if entry["type"] == "slider":
+				entry["wx_elem"] = self._make_slider(entry["label"], entry["min"], entry["max"], entry["default"], entry["unit"])
+				self.Bind(wx.EVT_SCROLL, self._on_value_change, entry["wx_elem"])
+				self.logger.log(logging.DEBUG, "[UI] Adding Slider")
+
+			if entry["type"] == "text":
+				entry["wx_elem"] = self._make_textbox(entry["label"], entry["default"], entry["unit"])
+				self.Bind(wx.EVT_TEXT, self._on_value_change, entry["wx_elem"])
+				self.logger.log(logging.DEBUG, "[UI] Adding Textfield")
+
+			self.logger.log(logging.DEBUG, entry)
+
+		if coilcatalog is not None:
+			self.elem_target = self._make_textbox("target inductance", "", "µH")
+			self.Bind(wx.EVT_TEXT, self._on_target_change, self.elem_target)
+
+			self.elem_max_diameter = self._make_textbox("max. diameter", self._parse_data("outer_diameter"), "mm")
+			self.Bind(wx.EVT_TEXT, self._on_target_change, self.elem_max_diameter)
+
+			self.elem_matches = self._make_choices("catalog matches", [], -1)
+			self.Bind(wx.EVT_CHOICE, self._on_match_choice, self.elem_matches)
+			self.logger.log(logging.DEBUG, "[UI] Adding Catalog")
+
+		self.Bind(wx.EVT_CHAR_HOOK, self._on_key_up)
+		self.Bind(wx.EVT_CLOSE, self._on_close)
+
+		self.notes = self._make_label(label="")
+		self.notes.SetForegroundColour((255, 0, 0, 255))
+		self.logger.log(logging.DEBUG, "[UI] Adding Label")
+
+		self.estimates = self._make_label(label="")
+		self.tolerances = self._make_label(label="")
+
+		self.preview = CoilPreview(self)
+		self.sizer_box.Add(self.preview, 0, wx.ALL, self.padding)
+
+		self.elem_button_generate = wx.Button(self, label="Generate Coil")
+		self.elem_button_generate.Bind(wx.EVT_BUTTON, self._on_generate_button_klick)
+
+		self.elem_button_save = wx.Button(self, label="Save as Project Footprint")
+		self.elem_button_save.Bind(wx.EVT_BUTTON, self._on_save_button_klick)
+
+		self.elem_button_tolerance = wx.Button(self, label="Tolerance Analysis")
+		self.elem_button_tolerance.Bind(wx.EVT_BUTTON, self._on_tolerance_button_klick)
+
+
+		self.sizer_box.Add(self.elem_button_generate, 0, wx.ALL, self.padding)
+		self.sizer_box.Add(self.elem_button_save, 0, wx.ALL, self.padding)
+
+		if tolerance is not None:
+			self.sizer_box.Add(self.elem_button_tolerance, 0, wx.ALL, self.padding)
+		else:
+			self.elem_button_tolerance.Hide()
+
+		self.SetSizer(self.sizer_box)
+		self.Layout()
+		self.sizer_box.Fit(self)
+		self.Centre(wx.BOTH)
+
+		self.update_coil_generation_notes()
+
+	def _get_board_key(self):
+		# everything of the board that the form, its limits and its estimates depend on
+		return (self.board.GetFileName(), self.board.GetCopperLayerCount(), self.board.GetDesignSettings().GetBoardThickness())
+
+	def _set_board(self):
+		self.board = pcbnew.GetBoard()
+		self.path_project = os.path.dirname(self.board.GetFileName())
+		self.path_footprint_folder = self.path_project + self.path_footprint_folder_name
+		self.path_fp_lib_table = self.path_project + "/fp-lib-table"
+
+	def _set_board_choices(self, entry):
+		if entry["choices_source"] == "COPPER_LAYER_COUNT":
+			entry["choices_data"] = list(range(1, self.board.GetCopperLayerCount() + 1))
+			entry["choices"] = [str(e) for e in entry["choices_data"]]
+
+	def refresh_board(self, pcbnew_frame):
+		"""
+		Takes over the board of a new plugin run: project paths and the choices sourced from the board. Form values,
+		the preview and the library are kept
+		"""
+		self._pcbnew_frame = pcbnew_frame
+		board_key = self._get_board_key()
+		self._set_board()
+
+		if self._get_board_key() == board_key:
+			return
+
+		for entry in menu.structure:
+			if entry["type"] != "choices_from_board":
+				continue
+
+			previous_count = len(entry["choices"])
+			self._set_board_choices(entry)
+
+			if len(entry["choices"]) != previous_count:
+				# keeps the selection, unless the board has fewer choices now
+				selection = entry["wx_elem"].GetSelection()
+				entry["wx_elem"].SetItems(entry["choices"])
+				entry["wx_elem"].SetSelection(max(0, min(selection, len(entry["choices"]) - 1)))
+
+		self.logger.log(logging.DEBUG, "Reopened for " + self.board.GetFileName())
+		self.update_coil_generation_notes()
+
+	def _get_library(self):
+		# kept across runs, a refresh then only reads footprints that changed in the meantime
+		if self._library is None or self._library.folder != self.path_footprint_folder:
+			self._library = coillibrary.Library(self.path_footprint_folder)
+
+		return self._library
+
+	def _get_catalog(self):
+		# one catalog per board stackup, built on the first lookup and kept in the dynamic folder
+		copper_layer_count = self.board.GetCopperLayerCount()
+		board_thickness = round(pcbnew.ToMM(self.board.GetDesignSettings().GetBoardThickness()), 4)
+		path = os.path.join(os.path.dirname(__file__), "dynamic", coilcatalog.get_file_name(copper_layer_count, board_thickness))
+
+		if self._catalog is None or self._catalog.path != path:
+			if not os.path.exists(path):
+				self.logger.log(logging.INFO, "Building coil catalog " + path)
+				coilcatalog.build(path, copper_layer_count, {"board_thickness": board_thickness})
+
+			self._catalog = coilcatalog.Catalog(path)
+
+		return self._catalog
+
+	def _on_close(self, event):
+		# hidden instead of destroyed, so the next run shows it right away
+		if event.CanVeto():
+			event.Veto()
+			self.Hide()
+		else:
+			event.Skip()
+
+	def _on_choice_change(self, event):
+		identifier = ""
+
+		for entry in menu.structure:
+			if entry["wx_elem"] == event.GetEventObject():
+				identifier = entry["id"]
+
+		self.update_coil_generation_notes()
+		self._update_cached_setting(identifier, event.GetEventObject().GetSelection())
+
+		# matches have the layer count of the form
+		if identifier == "layer_count" and coilcatalog is not None:
+			self.update_catalog_matches()
+
+	def _on_value_change(self, event):
+		identifier = ""
+
+		for entry in menu.structure:
+			if entry["wx_elem"] == event.GetEventObject():
+				identifier = entry["id"]
+
+		self.update_coil_generation_notes()
+		self._update_cached_setting(identifier, event.GetEventObject().GetValue())
+
+	def _on_target_change(self, event):
+		self.update_catalog_matches()
+
+	def _on_match_choice(self, event):
+		selection = self.elem_matches.GetSelection()
+		if not 0 <= selection < len(self.catalog_matches):
+			return
+
+		match = self.catalog_matches[selection]
+
+		# fields are changed without events, the notes are updated once afterwards
+		for entry in menu.structure:
+			if entry["id"] not in match:
+				continue
+
+			if entry["type"] == "choices_from_board" and match[entry["id"]] in entry["choices_data"]:
+				entry["wx_elem"].SetSelection(entry["choices_data"].index(match[entry["id"]]))
+				self._update_cached_setting(entry["id"], entry["wx_elem"].GetSelection())
+			elif entry["type"] == "text":
+				entry["wx_elem"].ChangeValue(format(match[entry["id"]], "g"))
+				self._update_cached_setting(entry["id"], entry["wx_elem"].GetValue())
+
+		self.update_coil_generation_notes()
+
+	def _make_choices(self, label, choices, default = 0, unit = None):
+		elem_label = wx.StaticText(self, label=label)
+		elem_choices = wx.Choice(self, choices=choices)
+
+		elem_choices.SetSelection(default)
+
+		self._add_content(
+			elem_label,
+			elem_choices,
+			unit
+		)
+
+		return elem_choices
+
+	def _make_checkbox(self, label, default = 0, unit = None):
+		elem_label = wx.StaticText(self, label=label)
+		elem_check = wx.CheckBox(self)
+
+		elem_check.SetValue(default)
+
+		self._add_content(
+			elem_label,
+			elem_check,
+			unit
+		)
+
+		return elem_check
+
+	def _make_slider(self, label, min, max, default = 0, unit = None):
+		elem_label = wx.StaticText(self, label=label)
+		elem_slider = wx.Slider(self, value = 50, minValue = min, maxValue = max, style = wx.SL_HORIZONTAL | wx.SL_LABELS)
+
+		elem_slider.SetValue(default)
+
+		self._add_content(
+			elem_label,
+			elem_slider,
+			unit
+		)
+
+		return elem_slider
+
+	def _make_label(self, label):
+		elem_label = wx.StaticText(self, label=label)
+		self.sizer_box.Add(elem_label, 0, wx.ALL, self.padding)
+
+		return elem_label
+
+	def _make_textbox(self, label, default = 0, unit = None):
+		elem_label = wx.StaticText(self, label=label)
+		elem_text = wx.TextCtrl(self)
+
+		elem_text.SetValue(str(default))
+
+		self._add_content(
+			elem_label,
+			elem_text,
+			unit
+		)
+
+		return elem_text
+
+	def _add_content(self, elem_label, elem_content, unit):
+		elem_label.SetMinSize((self.width_label, -1))
+		elem_content.SetMinSize((self.width_content, -1))
+
+		sizer = wx.BoxSizer(wx.HORIZONTAL)
+		sizer.Add(elem_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.padding)
+		sizer.Add(elem_content, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.padding)
+
+		if unit:
+			unit_label = wx.StaticText(self, label=unit)
+
+			# decrease the content box size:
+			elem_content.SetMinSize((self.width_content - unit_label.GetSize().GetWidth() - 2 * self.padding, -1))
+
+			sizer.Add(unit_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.padding)
+
+		# feasible bound of the value, see update_coil_limits()
+		limit_label = wx.StaticText(self, label="")
+		limit_label.SetMinSize((self.width_limit, -1))
+		sizer.Add(limit_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, self.padding)
+		self.limit_labels[elem_content] = limit_label
+
+		self.sizer_box.Add(sizer, 0, wx.ALL, self.padding)
+
+	def _parse_data(self, identifier):
+		self.logger.log(logging.INFO, "Finding value for: " + identifier)
+		for entry in menu.structure:
+			if entry["id"] != identifier:
+				continue
+
+			self.logger.log(logging.INFO, "Located element, extracting data...")
+
+			val = None
+
+			if entry["type"] == "choices" or entry["type"] == "choices_from_board":
+				val = entry["choices_data"][entry["wx_elem"].GetSelection()]
+			elif entry["type"] == "checkbox":
+				val = entry["wx_elem"].GetValue()
+			elif entry["type"] == "slider":
+				val = entry["wx_elem"].GetValue()
+			elif entry["type"] == "text":
+				val = entry["wx_elem"].GetValue()
+
+			self.logger.log(logging.INFO, "Raw data: " + str(val))
+
+			if entry["datatype"] == "float":
+				return float(val)
+			elif entry["datatype"] == "int":
+				return int(val)
+			elif entry["datatype"] == "bool":
+				return bool(val)
+			else:
+				return str(val)
+
+	def _update_cached_setting(self, identifier, value):
+		cache_file = os.path.join(os.path.dirname(__file__), "dynamic/lastconfig.json")
+
+		with open(cache_file, "r") as file:
+			data = json.load(file)
+
+		data[identifier] = value
+
+		with open(cache_file, "w") as file:
+			json.dump(data, file, indent=4)
+
+	def _prepare_defaults_from_cached_settings(self, menu_array):
+		cache_file = os.path.join(os.path.dirname(__file__), "dynamic/lastconfig.json")
+
+		with open(cache_file, "r") as file:
+			data = json.load(file)
+
+		for entry in menu_array:
+			try:
+				id = entry["id"]
+				thisdefault = data[id]
+				entry["default"] = thisdefault
+			except KeyError:
+				continue
+
+	def _handle_coil_generation(self, on_done):
+		"""
+		Generates the coil in a worker thread while a progress dialog keeps KiCad responsive.
+		Form values are read on the UI thread before the worker is started.
+		Args:
+			on_done: Callback receiving the generated template, called on the UI thread
+		"""
+		if self.is_generating:
+			return
+
+		self.logger.log(logging.INFO, "Generating coil ...")
+		layer_names = coilgenerator.get_layer_names(pcbnew.GetBoard().GetCopperLayerCount())
+
+		layer_count = self._parse_data("layer_count")
+		turns_count = self._parse_data("turns_count")
+		parameters = (
+			layer_count,
+			self._parse_data("turn_direction"),
+			turns_count,
+			self._parse_data("trace_width"),
+			self._parse_data("trace_spacing"),
+			self._parse_data("via_outer"),
+			self._parse_data("via_drill"),
+			self._parse_data("outer_diameter"),
+			self._parse_data("name"),
+			layer_names
+		)
+		shape = self._get_shape()
+
+		self.Hide()
+		self.is_generating = True
+
+		progress_dialog = wx.ProgressDialog(
+			"Coil Generator",
+			"Generating coil ...",
+			maximum = coilgenerator.get_progress_steps(layer_count, turns_count),
+			parent = self._pcbnew_frame,
+			style = wx.PD_APP_MODAL | wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME
+		)
+		cancel_event = threading.Event()
+		posted_percent = -1
+
+		def progress(done_steps, total_steps):
+			nonlocal posted_percent
+
+			# runs in the worker thread, the dialog itself must only be touched on the UI thread. Only whole percents
+			# are posted, so coils with many turns do not flood the UI queue
+			percent = done_steps * 100 // total_steps
+			if percent != posted_percent:
+				posted_percent = percent
+				wx.CallAfter(self._on_generation_progress, progress_dialog, done_steps, total_steps, cancel_event)
+
+			return not cancel_event.is_set()
+
+		def worker():
+			try:
+				template = coilgenerator.generate(*parameters, progress = progress, shape = shape)
+			except coilgenerator.GenerationCancelled:
+				wx.CallAfter(self._on_generation_finished, progress_dialog, None, None, "")
+			except Exception as e:
+				self.logger.log(logging.ERROR, "Coil generation failed: " + repr(e))
+				wx.CallAfter(self._on_generation_finished, progress_dialog, None, None, "ERROR: Coil generation failed")
+			else:
+				wx.CallAfter(self._on_generation_finished, progress_dialog, on_done, template, "")
+
+		threading.Thread(target = worker, daemon = True).start()
+
+	def _on_generation_progress(self, progress_dialog, done_steps, total_steps, cancel_event):
+		if cancel_event.is_set():
+			return
+
+		(keep_going, _) = progress_dialog.Update(done_steps, "Generating coil ... " + str(done_steps * 100 // total_steps) + " %")
+
+		if not keep_going:
+			self.logger.log(logging.INFO, "Coil generation cancelled")
+			cancel_event.set()
+
+	def _on_generation_finished(self, progress_dialog, on_done, template, message):
+		progress_dialog.Destroy()
+		self.is_generating = False
+
+		# cancelled or failed generations bring the form back, so values can be adjusted
+		if template is None:
+			self.notes.SetLabel(message)
+			self.Show()
+
+			return
+
+		self.logger.log(logging.INFO, "Done.")
+
+		on_done(template)
+	
+	def _register_library(self):
+		"""
+		Makes sure the project's fp-lib-table holds the coil library. The table is edited as an S-expression and only
+		written if the entry is missing or stale, so this runs on every save
+		Returns:
+			bool: True if the table was written
+		"""
+		written = coillibrary.add_to_lib_table(self.path_fp_lib_table, uri = "${KIPRJMOD}" + self.path_footprint_folder_name)
+
+		if written:
+			self.logger.log(logging.INFO, "Added coil library to " + self.path_fp_lib_table)
+
+		return written
+
+	def _reload_footprint_library(self):
+		"""
+		Lets the running KiCad use a saved footprint. KiCad rescans a library folder whose files changed, so a known
+		library shows the new footprint right away. A library that was added to the table after KiCad loaded it is
+		not known yet: it is added to the project table KiCad holds where pcbnew offers it, otherwise the user is
+		told to reload the table. The board is not touched
+		"""
+		get_libraries = getattr(pcbnew, "GetFootprintLibraries", None)
+
+		if get_libraries is not None and coillibrary.LIBRARY_NAME not in list(get_libraries()):
+			self._reload_lib_tables()
+
+			if coillibrary.LIBRARY_NAME not in list(get_libraries()):
+				self.logger.log(logging.INFO, "Coil library not loaded by KiCad yet")
+				wx.MessageBox(
+					"The coil was saved to the '" + coillibrary.LIBRARY_NAME + "' library, which KiCad has not loaded yet. "
+					"Reopen the project or the footprint library table (Preferences > Manage Footprint Libraries) to place it.",
+					"Coil Generator",
+					wx.OK | wx.ICON_INFORMATION
+				)
+
+		pcbnew.Refresh()
+
+	def _reload_lib_tables(self):
+		"""
+		Adds the coil library to KiCad's project footprint library table in memory, if the running pcbnew exposes it.
+		The table file is loaded into a new table first, the table KiCad uses only receives the coil library's row
+		once that load succeeded. The global table is not touched, a save never changes it
+		Returns:
+			bool: True if the coil library was added
+		"""
+		table_class = getattr(pcbnew, "FP_LIB_TABLE", None)
+		get_project = getattr(pcbnew.GetBoard(), "GetProject", None)
+
+		if table_class is None or get_project is None:
+			return False
+
+		try:
+			loaded_table = table_class()
+			loaded_table.Load(self.path_fp_lib_table)
+
+			row = loaded_table.FindRow(coillibrary.LIBRARY_NAME)
+			if row is None:
+				raise LookupError(coillibrary.LIBRARY_NAME + " not in " + self.path_fp_lib_table)
+
+			get_project().PcbFootprintLibs().InsertRow(row.clone(), True)
+		except Exception as e:
+			self.logger.log(logging.WARNING, "Coil library not added to KiCad's footprint library table: " + repr(e))
+
+			return False
+
+		self.logger.log(logging.INFO, "Added coil library to KiCad's footprint library table")
+
+		return True
+
+	def _on_save_button_klick(self, event):
+		spec = dict((entry["id"], self._parse_data(entry["id"])) for entry in menu.structure)
+		layer_names = coilgenerator.get_layer_names(pcbnew.GetBoard().GetCopperLayerCount())
+		file_name = get_safe_name(spec["name"]) + coillibrary.FOOTPRINT_EXTENSION
+
+		library = self._get_library()
+		library.refresh()
+		design_hash = coillibrary.get_spec_hash(spec, layer_names)
+
+		# an identical coil is neither generated nor written again
+		existing = library.find(design_hash)
+		if existing is not None:
+			self.logger.log(logging.INFO, "Coil already stored as " + existing)
+			self.notes.SetLabel("Coil already stored as " + library.get_entry(existing)["name"])
+
+			return
+
+		collision = library.get_collision(file_name, design_hash)
+		if collision is not None:
+			self.logger.log(logging.INFO, "Footprint name already used by a different coil: " + file_name)
+			self.notes.SetLabel("ERROR: Name '" + collision["name"] + "' is already used by a different coil")
+
+			return
+
+		self._handle_coil_generation(lambda template: self._save_footprint(template, library, file_name, spec, layer_names))
+
+	def _save_footprint(self, template, library, file_name, spec, layer_names):
+		# the table entry is checked on every save, a library removed from the table by hand comes back
+		self._register_library()
+
+		library.add(file_name, template, spec, layer_names)
+		self._reload_footprint_library()
+
+	def _on_tolerance_button_klick(self, event):
+		self.update_coil_tolerances()
+
+	def _on_generate_button_klick(self, event):
+		self._handle_coil_generation(self._paste_footprint)
+
+	def _paste_footprint(self, template):
+		# copy the generated footprint into clipboard
+		clipboard = wx.Clipboard.Get()
+		if clipboard.Open():
+			self.logger.log(logging.DEBUG, "Adding to clipboard")
+
+			clipboard.SetData(wx.TextDataObject(template))
+			clipboard.Close()
+		else:                    
+			self.logger.log(logging.DEBUG, "Clipboard error")
+
+			return
+		
+		# paste generated footprint into the pcbview
+		try:
+			evt_esc = wx.KeyEvent(wx.wxEVT_CHAR_HOOK)
+			evt_esc.SetKeyCode(wx.WXK_ESCAPE)
+			evt_esc.SetControlDown(True)
+
+			wx.PostEvent(self._pcbnew_frame, evt_esc)
+
+			evt_paste = wx.KeyEvent(wx.wxEVT_CHAR_HOOK)
+			evt_paste.SetKeyCode(ord('V'))
+			evt_paste.SetControlDown(True)
+		
+			wx.PostEvent(self._pcbnew_frame, evt_paste)
+
+			self.logger.log(logging.INFO, "Using wx.KeyEvent for select and paste")
+		except:
+			# Likely on Linux with old wx python support :(
+			keyinput = wx.UIActionSimulator()
+			self._pcbnew_frame.Raise()
+			self._pcbnew_frame.SetFocus()
+
+			wx.MilliSleep(100)
+			wx.Yield()
+
+			# Press and release CTRL + V
+			keyinput.Char(ord("V"), wx.MOD_CONTROL)
+
+			self.logger.log(logging.INFO, "Using wx.UIActionSimulator for paste")
+
+			wx.MilliSleep(100)
+
+	def _on_key_up(self, event):
+		key_code = event.GetKeyCode()
+		modifiers = event.GetModifiers()
+
+		if key_code == wx.WXK_ESCAPE:
+			self.Close()
+
+			return
+		elif key_code == key_code == wx.WXK_RETURN and modifiers == wx.MOD_CONTROL:
+			self._on_generate_button_klick(event)
+
+			return
+
+		event.Skip()
+
+	def _init_logger(self):
+		root = logging.getLogger()
+		root.handlers.clear()
+		root.setLevel(logging.DEBUG)
+
+		log_file = os.path.join(os.path.dirname(__file__), "dynamic/coilgenerator.log")
+
+		handler = logging.FileHandler(log_file)
+		handler.setLevel(logging.DEBUG)
+
+		formatter = logging.Formatter(
+			"%(asctime)s %(name)s %(lineno)d:%(message)s", datefmt="%m-%d %H:%M:%S"
+		)
+
+		handler.setFormatter(formatter)
+
+		root.addHandler(handler)
+
+	def update_coil_generation_notes(self):
+		"""
+		Checks if a coil is generatable and places notes on form / generation errors.
+		To be called on form value changes
+		"""
+		# a previous analysis belongs to the previous values
+		self.tolerances.SetLabel("")
+
+		try:
+			self.elem_button_generate.Enable()
+			self.elem_button_save.Enable()
+			self.elem_button_tolerance.Enable()
+
+			# limits, estimates and tolerances are closed forms for circular coils
+			shape = self._get_shape()
+			if shape is None:
+				self.update_coil_limits()
+			else:
+				self.clear_coil_limits()
+				self.elem_button_tolerance.Disable()
+
+			if self._parse_data("via_outer") < self._parse_data("via_drill"):
+				self.notes.SetLabel("WARNING: Via drill is greater than outer diameter")
+				self.preview.clear()
+			elif not self.estimate_is_coil_generatable(
+				self._parse_data("outer_diameter"),
+				self._parse_data("turns_count"),
+				self._parse_data("trace_width"),
+				self._parse_data("trace_spacing"),
+				self._parse_data("via_outer"),
+				self._parse_data("layer_count"),
+				shape
+				):
+				self.notes.SetLabel("WARNING: This coil MAY not be generatable.")
+				self.preview.clear()
+			else:
+				self.notes.SetLabel("")
+				self.preview.set_coil(
+					self._parse_data("layer_count"),
+					self._parse_data("turn_direction"),
+					self._parse_data("turns_count"),
+					self._parse_data("trace_width"),
+					self._parse_data("trace_spacing"),
+					self._parse_data("via_outer"),
+					self._parse_data("via_drill"),
+					self._parse_data("outer_diameter"),
+					shape
+				)
+
+				if shape is None:
+					self.update_coil_estimates()
+					return
+
+			self.estimates.SetLabel("")
+		except:
+			self.notes.SetLabel("One or more entries contain invalid values")
+			self.estimates.SetLabel("")
+			self.preview.clear()
+			self.clear_coil_limits()
+			self.elem_button_generate.Disable()
+			self.elem_button_save.Disable()
+			self.elem_button_tolerance.Disable()
+
+	def update_coil_limits(self):
+		"""
+		Shows next to each field the largest or smallest value that still passes estimate_is_coil_generatable()
+		with all other values held fixed. Values beyond their limit are marked
+		"""
+		values = dict((identifier, self._parse_data(identifier)) for identifier in ("layer_count", "turns_count", "trace_width", "trace_spacing", "via_outer", "outer_diameter"))
+
+		coil_limits = limits.get_limits(
+			values["layer_count"],
+			values["turns_count"],
+			values["trace_width"],
+			values["trace_spacing"],
+			values["via_outer"],
+			values["outer_diameter"]
+		)
+
+		# layers are limited by the board as well
+		(kind, layer_limit) = coil_limits["layer_count"]
+		coil_limits["layer_count"] = (kind, min(layer_limit, self.board.GetCopperLayerCount()))
+
+		for entry in menu.structure:
+			if entry["id"] not in coil_limits:
+				continue
+
+			(kind, limit) = coil_limits[entry["id"]]
+			label = self.limit_labels[entry["wx_elem"]]
+
+			if limit <= 0:
+				label.SetLabel("no fit")
+			elif entry["datatype"] == "int":
+				label.SetLabel(kind + " " + str(limit))
+			elif kind == "max":
+				# rounded towards the feasible side
+				label.SetLabel(kind + " " + format(math.floor(limit * 1000) / 1000, "g"))
+			else:
+				label.SetLabel(kind + " " + format(math.ceil(limit * 1000) / 1000, "g"))
+
+			exceeded = limit <= 0 or (values[entry["id"]] > limit if kind == "max" else values[entry["id"]] < limit)
+			label.SetForegroundColour((255, 0, 0, 255) if exceeded else (96, 96, 96, 255))
+
+	def update_catalog_matches(self):
+		"""
+		Lists the catalog designs closest to the target inductance, with the layer count of the form and at most the
+		given diameter. Nothing is generated, the catalog holds precomputed estimates
+		"""
+		try:
+			target = float(self.elem_target.GetValue()) * 1e-6
+			max_diameter = float(self.elem_max_diameter.GetValue())
+			layer_count = self._parse_data("layer_count")
+		except ValueError:
+			target = 0
+
+		if not target > 0:
+			self.catalog_matches = []
+		else:
+			self.catalog_matches = self._get_catalog().find(target, max_diameter, layer_count)
+
+		self.elem_matches.SetItems([
+			"{:.3g} µH ({:+.1%}), {} turns, {:g}/{:g} mm, Ø {:g} mm, {:.3g} Ω".format(
+				match["inductance"] * 1e6,
+				match["error"],
+				match["turns_count"],
+				match["trace_width"],
+				match["trace_spacing"],
+				match["outer_diameter"],
+				match["resistance"]
+			) for match in self.catalog_matches
+		])
+		self.elem_matches.SetSelection(-1)
+
+	def clear_coil_limits(self):
+		for label in self.limit_labels.values():
+			label.SetLabel("")
+
+	def update_coil_estimates(self):
+		"""
+		Shows inductance, self capacitance and self resonant frequency of the current coil.
+		Estimates are based on a board stackup with evenly spread dielectrics
+		"""
+		if capacitance is None:
+			return
+
+		spec = dict((entry["id"], self._parse_data(entry["id"])) for entry in menu.structure)
+		stackup_data = {"board_thickness": pcbnew.ToMM(self.board.GetDesignSettings().GetBoardThickness())}
+
+		result = capacitance.estimate([spec], stackup_data, self.board.GetCopperLayerCount())
+
+		if not result["feasible"][0] or not result["equivalent"][0] > 0 or not result["inductance"][0] > 0:
+			self.estimates.SetLabel("")
+			return
+
+		self.estimates.SetLabel("L ≈ {:.3g} µH, C ≈ {:.3g} pF, SRF ≈ {:.3g} MHz".format(
+			result["inductance"][0] * 1e6,
+			result["equivalent"][0] * 1e12,
+			result["srf"][0] * 1e-6
+		))
+
+	def update_coil_tolerances(self):
+		"""
+		Shows yield and spread of inductance and resistance of the current coil under manufacturing tolerances,
+		see tolerance.analyze(). Takes about a second
+		"""
+		if tolerance is None:
+			return
+
+		spec = dict((entry["id"], self._parse_data(entry["id"])) for entry in menu.structure)
+		stackup_data = {"board_thickness": pcbnew.ToMM(self.board.GetDesignSettings().GetBoardThickness())}
+
+		try:
+			summary = tolerance.get_summary(tolerance.analyze(spec, stackup_data = stackup_data, copper_layer_count = self.board.GetCopperLayerCount()))
+		except ValueError as e:
+			self.tolerances.SetLabel(str(e))
+			return
+
+		(inductance, resistance) = (summary["inductance"]["percentiles"], summary["resistance"]["percentiles"])
+
+		self.tolerances.SetLabel("Yield {:.1%}, L {:.3g} to {:.3g} µH, R {:.3g} to {:.3g} Ω (5th to 95th percentile)".format(
+			summary["yield"],
+			inductance["5"] * 1e6,
+			inductance["95"] * 1e6,
+			resistance["5"],
+			resistance["95"]
+		))
+
+	def estimate_is_coil_generatable(self, outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter, layer_count, shape = None):
+		"""
+		Checks if a coil is generatable, see coilgenerator.estimate_is_coil_generatable()
+		"""
+		return coilgenerator.estimate_is_coil_generatable(outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter, layer_count, shape)
+
+	def _get_shape(self):
+		"""
+		Returns:
+			dict: Shape parameters of the form, None for circular coils, see spec.get_shape()
+		"""
+		return coilspec.get_shape(dict((key, self._parse_data(key)) for key in coilspec.SHAPE_KEYS))
+
+def get_safe_name(name, keepcharacters = (' ','.','_')):
+    return "".join(c for c in name if c.isalnum() or c in keepcharacters).rstrip()
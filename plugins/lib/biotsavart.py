@@ -0,0 +1,207 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Magnetic field of straight current segments (Biot-Savart law), evaluated with numpy broadcasting over blocks of
+# field points and segments, so memory stays bounded for any problem size.
+
+import csv
+import zlib
+import struct
+
+import numpy as np
+
+MU_0 = 4e-7 * np.pi
+MAX_PAIRS = 1 << 16 # field point / segment pairs evaluated at once, the temporaries of a block take about 6 MB
+SINGULAR_LIMIT = 1e-12
+
+
+def get_field(starts: np.ndarray, ends: np.ndarray, points: np.ndarray, current: float = 1.0, max_pairs: int = MAX_PAIRS) -> np.ndarray:
+	"""
+	Exact field of finite straight segments, each carrying current from start to end.
+	Points on the line of a segment get no contribution from that segment
+	Args:
+		starts: (S, 3) segment start points (mm)
+		ends: (S, 3) segment end points (mm)
+		points: (P, 3) field points (mm)
+		current: Current through all segments (A)
+		max_pairs: Number of point / segment pairs evaluated per block
+
+	Returns:
+		np.ndarray: (P, 3) magnetic flux density (T)
+	"""
+	field = np.zeros((len(points), 3))
+
+	if len(starts) == 0:
+		return field
+
+	(vertices, valid) = _get_polylines(starts, ends)
+
+	vertex_block = max(2, min(len(vertices), max_pairs // 16))
+	point_block = max(1, max_pairs // vertex_block)
+
+	for p in range(0, len(points), point_block):
+		block_points = points[p:p + point_block]
+
+		# neighboring vertex blocks overlap by one vertex, so no segment is lost
+		for v in range(0, len(vertices) - 1, vertex_block - 1):
+			field[p:p + point_block] += _get_block_field(block_points, vertices[v:v + vertex_block], valid[v:v + vertex_block - 1])
+
+	# positions are given in mm, the field scales with 1 / length
+	return field * (MU_0 * current / (4 * np.pi) * 1e3)
+
+
+def _get_polylines(starts, ends):
+	"""
+	Joins consecutive segments into polylines, so the distance to every shared vertex is only computed once
+	Returns:
+		(np.ndarray, np.ndarray): ((V, 3) vertices, (V - 1,) whether vertex i and i + 1 form one of the given segments)
+	"""
+	breaks = np.flatnonzero(np.any(starts[1:] != ends[:-1], axis = 1)) + 1
+	run_starts = np.concatenate(([0], breaks))
+	run_ends = np.concatenate((breaks, [len(starts)]))
+
+	vertices = []
+	valid = []
+	for (a, b) in zip(run_starts, run_ends):
+		if valid:
+			# gap between two polylines
+			valid.append([False])
+		vertices.extend((starts[a:b], ends[b - 1:b]))
+		valid.append(np.ones(b - a, dtype = bool))
+
+	return (np.concatenate(vertices), np.concatenate(valid))
+
+
+def _get_block_field(points, vertices, valid):
+	"""
+	Field of one block without constant factors, using B ~ (r1 x r2)(|r1| + |r2|) / (|r1||r2| (|r1||r2| + r1 . r2))
+	"""
+	rx = points[:, 0, None] - vertices[None, :, 0]
+	ry = points[:, 1, None] - vertices[None, :, 1]
+	rz = points[:, 2, None] - vertices[None, :, 2]
+	r = np.sqrt(rx * rx + ry * ry + rz * rz)
+
+	(r1x, r1y, r1z, r1) = (rx[:, :-1], ry[:, :-1], rz[:, :-1], r[:, :-1])
+	(r2x, r2y, r2z, r2) = (rx[:, 1:], ry[:, 1:], rz[:, 1:], r[:, 1:])
+
+	r1r2 = r1 * r2
+	denominator = r1r2 * (r1r2 + r1x * r2x + r1y * r2y + r1z * r2z)
+	factor = np.divide(r1 + r2, denominator, out = np.zeros_like(denominator), where = (np.abs(denominator) > SINGULAR_LIMIT) & valid[None, :])
+
+	return np.column_stack((
+		np.einsum("ij,ij->i", r1y * r2z - r1z * r2y, factor),
+		np.einsum("ij,ij->i", r1z * r2x - r1x * r2z, factor),
+		np.einsum("ij,ij->i", r1x * r2y - r1y * r2x, factor)
+	))
+
+
+def get_plane_grid(x_range: tuple[float, float], y_range: tuple[float, float], z: float, resolution: float) -> tuple[np.ndarray, tuple[int, int]]:
+	"""
+	Field points on a horizontal plane
+	Args:
+		x_range: (min, max) x extent of the plane (mm)
+		y_range: (min, max) y extent of the plane (mm)
+		z: Height of the plane, the top copper layer is at z = 0 (mm)
+		resolution: Distance between grid points (mm)
+
+	Returns:
+		(np.ndarray, (int, int)): ((rows * columns, 3) field points, (rows, columns))
+	"""
+	xs = np.arange(x_range[0], x_range[1] + resolution / 2, resolution)
+	ys = np.arange(y_range[0], y_range[1] + resolution / 2, resolution)
+	(grid_x, grid_y) = np.meshgrid(xs, ys)
+
+	points = np.column_stack((grid_x.ravel(), grid_y.ravel(), np.full(grid_x.size, z)))
+
+	return (points, grid_x.shape)
+
+
+def get_bounds(segments: list[tuple[np.ndarray, np.ndarray]], margin: float) -> tuple[tuple[float, float], tuple[float, float]]:
+	"""
+	Returns:
+		((float, float), (float, float)): x and y range covering all segments plus margin (mm)
+	"""
+	points = np.concatenate([starts for (starts, _) in segments] + [ends for (_, ends) in segments])
+
+	return (
+		(points[:, 0].min() - margin, points[:, 0].max() + margin),
+		(points[:, 1].min() - margin, points[:, 1].max() + margin)
+	)
+
+
+def write_csv(path: str, starts: np.ndarray, ends: np.ndarray, points: np.ndarray, current: float = 1.0, max_pairs: int = MAX_PAIRS) -> np.ndarray:
+	"""
+	Evaluates the field block by block and streams every block to a CSV file
+	Returns:
+		np.ndarray: (P,) field magnitude (T), for further processing like heat maps
+	"""
+	magnitude = np.empty(len(points))
+	block = max(1, max_pairs // max(len(starts), 1)) * 64
+
+	with open(path, "w", newline = "") as file:
+		writer = csv.writer(file)
+		writer.writerow(["x_mm", "y_mm", "z_mm", "bx_T", "by_T", "bz_T", "b_T"])
+
+		for p in range(0, len(points), block):
+			field = get_field(starts, ends, points[p:p + block], current, max_pairs)
+			magnitude[p:p + block] = np.linalg.norm(field, axis = 1)
+
+			writer.writerows(np.column_stack((points[p:p + block], field, magnitude[p:p + block])).tolist())
+
+	return magnitude
+
+
+def write_heatmap(path: str, magnitude: np.ndarray, shape: tuple[int, int], logarithmic: bool = True):
+	"""
+	Writes a field magnitude grid as PNG heat map, dark blue for weak and yellow for strong fields.
+	Row 0 is the smallest y, which is the top of the board in KiCad, so the image shows the board as KiCad does
+	Args:
+		path: Target PNG file
+		magnitude: Field magnitude per grid point
+		shape: (rows, columns) of the grid
+		logarithmic: Scale colors by the logarithm of the magnitude
+	"""
+	values = magnitude.reshape(shape)
+	if logarithmic:
+		values = np.log10(np.maximum(values, 1e-15))
+
+	finite = values[np.isfinite(values)]
+	(low, high) = (finite.min(), finite.max()) if finite.size else (0, 1)
+	scaled = np.clip((values - low) / max(high - low, 1e-30), 0, 1)
+
+	# three stop colormap: dark blue, teal, yellow
+	stops = np.array([[0.05, 0.03, 0.35], [0.13, 0.57, 0.55], [0.99, 0.91, 0.14]])
+	position = scaled * (len(stops) - 1)
+	index = np.minimum(position.astype(int), len(stops) - 2)
+	fraction = (position - index)[..., None]
+	rgb = ((stops[index] * (1 - fraction) + stops[index + 1] * fraction) * 255).astype(np.uint8)
+
+	_write_png(path, rgb)
+
+
+def _write_png(path, rgb):
+	(height, width, _) = rgb.shape
+	raw = b"".join(b"\x00" + rgb[row].tobytes() for row in range(height))
+
+	def chunk(kind, data):
+		return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+	with open(path, "wb") as file:
+		file.write(b"\x89PNG\r\n\x1a\n")
+		file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+		file.write(chunk(b"IDAT", zlib.compress(raw, 6)))
+		file.write(chunk(b"IEND", b""))
@@ -0,0 +1,174 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Coils placed on a board, read either from a JSON layout file or from a .kicad_pcb file. Coils in board files are
+# recognized by the CoilSpec property every generated footprint carries.
+
+import json
+import math
+
+from . import spec as coilspec
+from . import sexpr
+from . import stackup as coilstackup
+
+COIL_SPEC_PROPERTY = "CoilSpec"
+
+
+class Placement:
+	"""
+	A coil placed on a board. Position in mm, rotation in degree as KiCad shows it
+	"""
+
+	def __init__(self, spec: dict, x: float = 0, y: float = 0, rotation: float = 0, flipped: bool = False, reference: str = ""):
+		self.spec = spec
+		self.x = x
+		self.y = y
+		self.rotation = rotation
+		self.flipped = flipped
+		self.reference = reference
+
+	def to_board(self, x, y):
+		"""
+		Transforms footprint coordinates to board coordinates, the same way KiCad does.
+		Works on floats and on numpy arrays
+		"""
+		if self.flipped:
+			x = -x
+
+		angle = math.radians(self.rotation)
+		(cos, sin) = (math.cos(angle), math.sin(angle))
+
+		return (self.x + x * cos + y * sin, self.y - x * sin + y * cos)
+
+	def to_board_layer(self, index: int, copper_layer_count: int) -> int:
+		"""
+		Maps a footprint copper layer index to the board, flipped footprints have their layer order reversed
+		"""
+		if self.flipped:
+			return copper_layer_count - 1 - index
+
+		return index
+
+
+class Layout:
+	"""
+	Coils placed on a board, together with the board's stackup
+	"""
+
+	def __init__(self, placements: list[Placement], copper_layer_count: int, stackup: coilstackup.Stackup):
+		self.placements = placements
+		self.copper_layer_count = copper_layer_count
+		self.stackup = stackup
+
+
+def read(path: str) -> Layout:
+	"""
+	Reads placed coils from a .kicad_pcb file or a JSON layout file.
+	JSON layout files look like:
+	{"copper_layer_count": 4, "stackup": {...}, "coils": [{<spec keys>, "x": 0, "y": 0, "rotation": 0, "flipped": false, "reference": "L1"}]}
+	"""
+	if path.endswith(".kicad_pcb"):
+		with open(path, "r") as file:
+			return from_kicad_pcb(file.read())
+
+	with open(path, "r") as file:
+		return from_dict(json.load(file))
+
+
+def from_dict(data) -> Layout:
+	if isinstance(data, list):
+		data = {"coils": data}
+
+	placements = []
+	for entry in data["coils"]:
+		placements.append(Placement(
+			coilspec.normalize(entry),
+			float(entry.get("x", 0)),
+			float(entry.get("y", 0)),
+			float(entry.get("rotation", 0)),
+			bool(entry.get("flipped", False)),
+			str(entry.get("reference", ""))
+		))
+
+	copper_layer_count = data.get("copper_layer_count")
+	if copper_layer_count is None:
+		copper_layer_count = max([2] + [p.spec["layer_count"] for p in placements])
+
+	return Layout(placements, copper_layer_count, coilstackup.from_dict(data.get("stackup"), copper_layer_count))
+
+
+def from_kicad_pcb(text: str) -> Layout:
+	board = sexpr.parse(text)
+
+	copper_layers = [layer for layer in sexpr.find(board, "layers")[1:] if isinstance(layer, list) and layer[1].endswith(".Cu")]
+	copper_layer_count = len(copper_layers)
+
+	placements = []
+	for footprint in sexpr.find_all(board, "footprint"):
+		properties = dict((p[1], p[2]) for p in sexpr.find_all(footprint, "property") if len(p) > 2)
+
+		if COIL_SPEC_PROPERTY not in properties:
+			continue
+
+		at = sexpr.find(footprint, "at")
+		placements.append(Placement(
+			coilspec.from_string(properties[COIL_SPEC_PROPERTY], properties.get("Value", footprint[1])),
+			float(at[1]),
+			float(at[2]),
+			float(at[3]) if len(at) > 3 else 0,
+			sexpr.get_value(footprint, "layer") == "B.Cu",
+			properties.get("Reference", "")
+		))
+
+	return Layout(placements, copper_layer_count, read_stackup(board, copper_layer_count))
+
+
+def read_stackup(board: list, copper_layer_count: int) -> coilstackup.Stackup:
+	"""
+	Reads the physical stackup of a parsed .kicad_pcb, falls back to an evenly spread stackup with the board thickness
+	"""
+	thickness = float(sexpr.get_value(sexpr.find(board, "general") or [], "thickness", coilstackup.BOARD_THICKNESS))
+
+	setup = sexpr.find(board, "setup") or []
+	layers = sexpr.find_all(sexpr.find(setup, "stackup") or [], "layer")
+
+	copper_thickness = coilstackup.COPPER_THICKNESS
+	dielectric_thickness = []
+	epsilon_r = []
+	pending = None
+
+	for layer in layers:
+		layer_type = sexpr.get_value(layer, "type", "")
+
+		if layer_type == "copper":
+			copper_thickness = float(sexpr.get_value(layer, "thickness", copper_thickness))
+
+			if pending is not None:
+				dielectric_thickness.append(pending[0])
+				epsilon_r.append(pending[0] / pending[1])
+
+			pending = (0.0, 0.0)
+		elif pending is not None and layer_type in ("core", "prepreg"):
+			# multiple dielectrics between two copper layers are combined like capacitors in series
+			layer_thickness = float(sexpr.get_value(layer, "thickness", 0))
+			layer_epsilon_r = float(sexpr.get_value(layer, "epsilon_r", coilstackup.EPSILON_R))
+			pending = (pending[0] + layer_thickness, pending[1] + layer_thickness / layer_epsilon_r)
+
+	if len(dielectric_thickness) != copper_layer_count - 1:
+		return coilstackup.Stackup(copper_layer_count, thickness)
+
+	return coilstackup.Stackup(copper_layer_count, thickness, copper_thickness, dielectric_thickness, epsilon_r)
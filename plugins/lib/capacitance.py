@@ -0,0 +1,183 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Self capacitance and self resonant frequency of coils, estimated from their parameters.
+# Adjacent layers hold mirrored spirals (see coilgenerator.generate_coil_spiral), so every concentric half turn of
+# one layer faces an offset half turn of the next one. Their overlap is a parallel plate capacitor with fringing
+# (Palmer). Adjacent turns of one layer form coplanar strips. Both are combined into one equivalent capacitance by
+# the energy stored at a voltage that rises linearly along the coil (Zolfaghari et al., "Stacked inductors and
+# transformers in CMOS technology", 2001). All functions broadcast over numpy arrays of designs.
+
+import numpy as np
+
+from . import inductance
+from . import spec as coilspec
+from . import stackup as coilstackup
+
+EPSILON_0 = 8.8541878128e-12 # (F/m)
+
+
+def get_overlap_width(trace_width, trace_spacing):
+	"""
+	Mean width in which the traces of two adjacent, mirrored spiral layers overlap.
+	The radial offset of the facing half turns is pitch / 2 * (1 + cos(angle)), traces overlap where it is below
+	the trace width, with the turn inside or outside
+	Returns:
+		float: Overlap width (mm)
+	"""
+	pitch = trace_width + trace_spacing
+	edge = np.arccos(np.clip(2 * trace_width / pitch - 1, -1, 1))
+
+	return 2 / np.pi * ((trace_width - pitch / 2) * (np.pi - edge) + pitch / 2 * np.sin(edge))
+
+
+def get_layer_length(turns_per_layer, trace_width, trace_spacing, outer_diameter):
+	"""
+	Returns:
+		float: Trace length of one spiral layer (mm)
+	"""
+	(inner, outer) = inductance.get_spiral_radii(turns_per_layer, trace_width, trace_spacing, outer_diameter)
+
+	return turns_per_layer * np.pi * (inner + outer)
+
+
+def get_gap_length(turns_per_layer, trace_width, trace_spacing, outer_diameter):
+	"""
+	Returns:
+		float: Length of the gaps between adjacent turns of one spiral layer (mm)
+	"""
+	(inner, _) = inductance.get_spiral_radii(turns_per_layer, trace_width, trace_spacing, outer_diameter)
+	gaps = np.maximum(turns_per_layer - 1, 0)
+
+	return 2 * np.pi * gaps * (inner + (trace_width + trace_spacing) * gaps / 2)
+
+
+def get_plate_factor(width, distance):
+	"""
+	Palmer's fringing correction of a parallel plate capacitor of given plate width, the logarithm is clipped at
+	zero where plates are much narrower than their distance
+	"""
+	return 1 + distance / (np.pi * width) * (1 + np.log(np.maximum(2 * np.pi * width / distance, 1)))
+
+
+def get_turn_capacitance_per_length(trace_width, trace_spacing, copper_thickness = coilstackup.COPPER_THICKNESS):
+	"""
+	Capacitance between two coplanar strips in vacuum (conformal mapping), plus the side walls of the traces
+	Returns:
+		float: Capacitance per length (F/m)
+	"""
+	m = (trace_spacing / (trace_spacing + 2 * trace_width))**2
+	(elliptic_k, _) = inductance.get_elliptic_integrals(m)
+	(elliptic_k_complement, _) = inductance.get_elliptic_integrals(1 - m)
+
+	return EPSILON_0 * (elliptic_k_complement / elliptic_k + copper_thickness / trace_spacing)
+
+
+def get_side_permittivity(stack: coilstackup.Stackup) -> np.ndarray:
+	"""
+	Effective permittivity around the traces of every copper layer, the mean of the dielectric above and below it.
+	Outer layers have air on one side
+	Returns:
+		np.ndarray: (copper layer count,) relative permittivity
+	"""
+	sides = np.concatenate(([1.0], stack.epsilon_r, [1.0]))
+
+	return (sides[:-1] + sides[1:]) / 2
+
+
+def get_capacitance(layer_count, turns_per_layer, trace_width, trace_spacing, outer_diameter, stack: coilstackup.Stackup) -> dict:
+	"""
+	Turn to turn, layer to layer and equivalent capacitance of coils, their layers on the top copper layers of a stack
+	Args:
+		layer_count, turns_per_layer, trace_width, trace_spacing, outer_diameter: Coil parameters, scalars or (D,) arrays
+		stack: Stackup with at least as many copper layers as the largest coil
+
+	Returns:
+		dict: "turn" and "layer" summed capacitance of all turn gaps and layer pairs, "equivalent" capacitance (F)
+	"""
+	layer_count = np.asarray(layer_count, dtype = int)
+	turns = np.asarray(turns_per_layer, dtype = float)
+
+	# prefix sums over the stack, so designs with different layer counts stay vectorized
+	pair_permittivity = np.array([e / t for (t, e) in zip(stack.dielectric_thickness, stack.epsilon_r)] or [0.0])
+	pair_sum = np.concatenate(([0.0], np.cumsum(pair_permittivity)))
+	side_sum = np.concatenate(([0.0], np.cumsum(get_side_permittivity(stack))))
+
+	# all layer pairs share one fringing factor, taken at the mean dielectric thickness of the coil
+	pair_count = np.maximum(layer_count - 1, 0)
+	mean_thickness = np.sum(stack.dielectric_thickness) / max(len(stack.dielectric_thickness), 1)
+	plate = get_plate_factor(trace_width, mean_thickness)
+	area = get_layer_length(turns, trace_width, trace_spacing, outer_diameter) * get_overlap_width(trace_width, trace_spacing)
+	layer = EPSILON_0 * area * pair_sum[pair_count] * plate * 1e-3
+
+	gap_length = get_gap_length(turns, trace_width, trace_spacing, outer_diameter)
+	turn = get_turn_capacitance_per_length(trace_width, trace_spacing, stack.copper_thickness) * gap_length * side_sum[layer_count] * 1e-3
+
+	# every layer pair sees a voltage rising from zero at one end to two layer voltages at the other end,
+	# adjacent turns see one turn voltage
+	equivalent = 4 / (3 * layer_count**2) * layer + turn / (layer_count * turns)**2
+
+	return {
+		"turn": turn,
+		"layer": layer,
+		"equivalent": equivalent
+	}
+
+
+def get_resonant_frequency(inductance_h, capacitance_f):
+	"""
+	Returns:
+		float: Self resonant frequency (Hz)
+	"""
+	return 1 / (2 * np.pi * np.sqrt(inductance_h * capacitance_f))
+
+
+def estimate(specs: list[dict], stackup_data: dict = None, copper_layer_count: int = None) -> dict:
+	"""
+	Capacitance, inductance and self resonant frequency of many designs
+	Args:
+		specs: Coil specs
+		stackup_data: Stackup description, see stackup.from_dict(). Coils sit on the top layers of the stack
+		copper_layer_count: Copper layers of the board, defaults to the layers of the largest coil
+
+	Returns:
+		dict: (D,) arrays "feasible" (bool), "turn", "layer", "equivalent" capacitance (F), "inductance" (H) and "srf"
+		(Hz). All values of designs that are not feasible are NaN, see inductance.get_feasible()
+	"""
+	copper_layer_count = max([2, copper_layer_count or 0] + [spec["layer_count"] for spec in specs])
+	stack = coilstackup.from_dict(stackup_data, copper_layer_count)
+
+	columns = dict((key, np.array([spec[key] for spec in specs], dtype = float)) for key in ["layer_count", "turns_count", "trace_width", "trace_spacing", "outer_diameter"])
+	feasible = np.atleast_1d(inductance.get_feasible(columns["turns_count"], columns["trace_width"], columns["trace_spacing"], columns["outer_diameter"]))
+
+	with np.errstate(all = "ignore"):
+		result = get_capacitance(columns["layer_count"], columns["turns_count"], columns["trace_width"], columns["trace_spacing"], columns["outer_diameter"], stack)
+
+	for value in result.values():
+		value[~feasible] = np.nan
+
+	estimates = {}
+	for (spec, ok) in zip(specs, feasible):
+		key = coilspec.get_key(spec)
+		if ok and key not in estimates:
+			estimates[key] = inductance.estimate_inductance(spec, stack.layer_z)
+
+	result["feasible"] = feasible
+	result["inductance"] = np.array([estimates.get(coilspec.get_key(spec), np.nan) for spec in specs])
+	result["srf"] = get_resonant_frequency(result["inductance"], result["equivalent"])
+
+	return result
@@ -0,0 +1,323 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Precomputed catalog of feasible coils over a grid of layer counts, trace presets, diameters and turns, with their
+# estimated inductance, DC resistance and self resonant frequency. Nothing is generated: feasibility is the closed
+# form of limits.py and the estimates are the ones of inductance.py, resistance.py and capacitance.py.
+# The turns of a spiral are placed from the outer diameter inwards, so a design with N turns uses the N outermost
+# radii of its diameter and preset. The mutual inductance of two layers for every N is then one 2D prefix sum over
+# the loop pairs of the largest design.
+#
+# The catalog file is columnar and read with a memory map: a JSON header and one aligned block per column. Rows are
+# sorted by layer count and inductance, so a lookup is a binary search in the rows of its layer count.
+
+import os
+import json
+import math
+
+import numpy as np
+
+from . import menu
+from . import limits
+from . import inductance
+from . import resistance
+from . import capacitance
+from . import stackup as coilstackup
+
+MAGIC = b"PCBCOILS"
+VERSION = 1
+ALIGNMENT = 64
+
+# (trace width, trace spacing) of common fab capabilities (mm)
+TRACE_PRESETS = [(0.1, 0.1), (0.127, 0.127), (0.15, 0.15), (0.2, 0.2), (0.25, 0.25), (0.3, 0.3)]
+DIAMETERS = np.arange(3.0, 50.25, 0.5) # (mm)
+
+COLUMNS = [
+	("layer_count", "u1"),
+	("turns_count", "u2"),
+	("preset", "u1"),
+	("outer_diameter", "f4"),
+	("inductance", "f4"), # (H)
+	("resistance", "f4"), # DC (Ohm)
+	("srf", "f4") # (Hz)
+]
+
+MATCH_COUNT = 10
+SEARCH_WINDOW = 64 # rows next to the target inductance checked first, grown until the closest designs are inside
+
+
+def _get_menu_default(identifier: str):
+	return next(entry["default"] for entry in menu.structure if entry["id"] == identifier)
+
+
+def get_mutual_sums(turns_count: int, trace_width: float, trace_spacing: float, outer_diameter: float, distances: np.ndarray) -> np.ndarray:
+	"""
+	Mutual inductance of two identical spiral layers at several distances, for every number of turns at once,
+	see inductance.get_layer_mutual()
+	Args:
+		turns_count: Largest number of turns
+		distances: (K,) axial distances of the layers (mm)
+
+	Returns:
+		np.ndarray: (K, turns_count) mutual inductance (H) of designs with 1 to turns_count turns
+	"""
+	# radius of the j-th turn from the outside, the same for every number of turns
+	radii = outer_diameter / 2 + trace_spacing - (np.arange(turns_count) + 0.5) * (trace_width + trace_spacing)
+
+	loops = inductance.get_loop_mutual(radii[None, :, None], radii[None, None, :], distances[:, None, None])
+	sums = loops.cumsum(axis = 1).cumsum(axis = 2)
+
+	return sums[:, np.arange(turns_count), np.arange(turns_count)]
+
+
+def compute(copper_layer_count: int, stackup_data: dict = None, presets: list[tuple[float, float]] = TRACE_PRESETS, diameters = DIAMETERS, via_outer: float = None) -> dict:
+	"""
+	Estimates of every feasible design of the grid
+	Args:
+		copper_layer_count: Copper layers of the board, the grid covers coils with 1 to this many layers
+		stackup_data: Stackup description, see stackup.from_dict(). Coils sit on the top layers of the stack
+		via_outer: Via diameter for the feasibility check, defaults to the dialog's default
+
+	Returns:
+		dict: (R,) array per column of COLUMNS, unsorted
+	"""
+	via_outer = _get_menu_default("via_outer") if via_outer is None else via_outer
+	stack = coilstackup.from_dict(stackup_data, copper_layer_count)
+	layer_counts = np.arange(1, copper_layer_count + 1)
+
+	# the layer pairs of a coil with n layers are the pairs among the top n layers of the stack
+	z = np.array(stack.layer_z)
+	pairs = [(i, j) for i in range(copper_layer_count) for j in range(i + 1, copper_layer_count)]
+	(distances, pair_index) = np.unique(np.round([abs(z[i] - z[j]) for (i, j) in pairs], 9), return_inverse = True)
+	pair_counts = np.zeros((copper_layer_count, len(distances)))
+	for ((i, j), index) in zip(pairs, pair_index):
+		pair_counts[j:, index] += 1
+
+	columns = dict((name, []) for (name, _) in COLUMNS)
+
+	for (preset, (trace_width, trace_spacing)) in enumerate(presets):
+		for outer_diameter in diameters:
+			max_turns = limits.get_max_turns(layer_counts, trace_width, trace_spacing, via_outer, outer_diameter).astype(int)
+			if max_turns.max() < 1:
+				continue
+
+			turns = np.arange(1, max_turns.max() + 1)
+			self_inductance = inductance.get_layer_inductance(turns, trace_width, trace_spacing, outer_diameter)
+
+			if len(distances):
+				mutual = pair_counts @ get_mutual_sums(int(turns[-1]), trace_width, trace_spacing, outer_diameter, distances)
+			else:
+				mutual = np.zeros((copper_layer_count, len(turns)))
+
+			for (index, layer_count) in enumerate(layer_counts):
+				count = max_turns[index]
+				if count < 1:
+					continue
+
+				columns["layer_count"].append(np.full(count, layer_count))
+				columns["turns_count"].append(turns[:count])
+				columns["preset"].append(np.full(count, preset))
+				columns["outer_diameter"].append(np.full(count, outer_diameter))
+				columns["inductance"].append(layer_count * self_inductance[:count] + 2 * mutual[index, :count])
+
+	if not columns["layer_count"]:
+		return dict((name, np.zeros(0, dtype = dtype)) for (name, dtype) in COLUMNS)
+
+	columns = dict((name, np.concatenate(values)) for (name, values) in columns.items() if values)
+
+	widths = np.array([w for (w, _) in presets])[columns["preset"]]
+	spacings = np.array([s for (_, s) in presets])[columns["preset"]]
+	design = (columns["layer_count"], columns["turns_count"], widths, spacings, columns["outer_diameter"])
+
+	columns["resistance"] = resistance.get_dc_resistance(*design, stack.copper_thickness)
+	# single turns on a single layer have no capacitance estimate, their resonance is infinite
+	with np.errstate(divide = "ignore"):
+		columns["srf"] = capacitance.get_resonant_frequency(columns["inductance"], capacitance.get_capacitance(*design, stack)["equivalent"])
+
+	return columns
+
+
+def build(path: str, copper_layer_count: int, stackup_data: dict = None, presets: list[tuple[float, float]] = TRACE_PRESETS, diameters = DIAMETERS, via_outer: float = None) -> int:
+	"""
+	Computes the catalog of a board and writes it, see compute()
+	Returns:
+		int: Number of designs
+	"""
+	via_outer = _get_menu_default("via_outer") if via_outer is None else via_outer
+	columns = compute(copper_layer_count, stackup_data, presets, diameters, via_outer)
+
+	order = np.lexsort((columns["inductance"], columns["layer_count"]))
+	layer_starts = np.searchsorted(columns["layer_count"][order], np.arange(1, copper_layer_count + 2))
+
+	header = {
+		"version": VERSION,
+		"rows": len(order),
+		"copper_layer_count": copper_layer_count,
+		"stackup": stackup_data or {},
+		"via_outer": via_outer,
+		"via_drill": _get_menu_default("via_drill"),
+		"presets": [list(preset) for preset in presets],
+		"layer_starts": layer_starts.tolist(),
+		"columns": {}
+	}
+
+	# column offsets depend on the header length, which depends on the offsets, so room for them is reserved
+	offset = 0
+	for (name, dtype) in COLUMNS:
+		header["columns"][name] = [dtype, offset]
+		offset += -(-len(order) * np.dtype(dtype).itemsize // ALIGNMENT) * ALIGNMENT
+
+	header_size = -(-(len(MAGIC) + 4 + len(json.dumps(header)) + 32 * len(COLUMNS)) // ALIGNMENT) * ALIGNMENT
+	for entry in header["columns"].values():
+		entry[1] += header_size
+
+	text = json.dumps(header).encode("utf-8")
+
+	temporary_path = path + ".tmp"
+	with open(temporary_path, "wb") as file:
+		file.write(MAGIC + len(text).to_bytes(4, "little") + text)
+
+		for (name, dtype) in COLUMNS:
+			file.seek(header["columns"][name][1])
+			file.write(np.ascontiguousarray(columns[name][order], dtype = dtype).tobytes())
+
+	os.replace(temporary_path, path)
+
+	return len(order)
+
+
+def get_file_name(copper_layer_count: int, board_thickness: float) -> str:
+	"""
+	Returns:
+		str: Catalog file name of a board, catalogs of different boards can live in one folder
+	"""
+	return f"catalog-{copper_layer_count}-{board_thickness:g}mm.bin"
+
+
+class Catalog:
+	"""
+	Catalog file opened as memory map, lookups only touch the rows they read
+	"""
+
+	def __init__(self, path: str):
+		self.path = path
+		data = np.memmap(path, dtype = np.uint8, mode = "r")
+
+		if bytes(data[:len(MAGIC)]) != MAGIC:
+			raise ValueError("Not a coil catalog: " + path)
+
+		length = int.from_bytes(bytes(data[len(MAGIC):len(MAGIC) + 4]), "little")
+		self.header = json.loads(bytes(data[len(MAGIC) + 4:len(MAGIC) + 4 + length]).decode("utf-8"))
+
+		if self.header.get("version") != VERSION:
+			raise ValueError("Unsupported catalog version: " + path)
+
+		rows = self.header["rows"]
+		self.columns = {}
+		for (name, (dtype, offset)) in self.header["columns"].items():
+			# plain arrays on the map, slices of np.memmap objects are slower to create
+			self.columns[name] = data[offset:offset + rows * np.dtype(dtype).itemsize].view(np.ndarray).view(dtype)
+
+		self.presets = self.header["presets"]
+		self.layer_starts = self.header["layer_starts"]
+
+	def __len__(self) -> int:
+		return self.header["rows"]
+
+	def find(self, inductance_h: float, max_diameter: float = math.inf, layer_count: int = None, count: int = MATCH_COUNT) -> list[dict]:
+		"""
+		Designs closest to a target inductance
+		Args:
+			inductance_h: Target inductance (H)
+			max_diameter: Largest outer diameter (mm)
+			layer_count: Layer count of the designs, all layer counts if None
+			count: Number of designs
+
+		Returns:
+			[dict]: Specs with "inductance", "resistance", "srf" and relative "error", closest first
+		"""
+		if layer_count is None:
+			layer_counts = range(1, len(self.layer_starts))
+		elif 1 <= layer_count < len(self.layer_starts):
+			layer_counts = [layer_count]
+		else:
+			return []
+
+		rows = np.concatenate([self._find_rows(inductance_h, max_diameter, n, count) for n in layer_counts])
+		errors = np.abs(self.columns["inductance"][rows] / inductance_h - 1)
+		rows = rows[np.argsort(errors, kind = "stable")[:count]]
+
+		return self.get_specs(rows, inductance_h)
+
+	def _find_rows(self, inductance_h: float, max_diameter: float, layer_count: int, count: int) -> np.ndarray:
+		(start, end) = (self.layer_starts[layer_count - 1], self.layer_starts[layer_count])
+		inductances = self.columns["inductance"][start:end]
+		diameters = self.columns["outer_diameter"][start:end]
+
+		# a float64 target would convert the whole column for the search
+		center = int(np.searchsorted(inductances, np.float32(inductance_h)))
+		window = SEARCH_WINDOW
+
+		# the window grows around the target until it holds enough fitting designs and reaches as far in inductance
+		# as the worst of them on both sides, so no fitting design outside of it can be closer
+		while True:
+			(low, high) = (max(center - window, 0), min(center + window, end - start))
+			rows = np.flatnonzero(diameters[low:high] <= max_diameter) + low
+			errors = np.abs(inductances[rows] / inductance_h - 1)
+			nearest = np.argsort(errors, kind = "stable")[:count]
+
+			if low == 0 and high == end - start:
+				break
+
+			if len(nearest) >= count:
+				worst = errors[nearest[-1]]
+				if (low == 0 or inductances[low] <= inductance_h * (1 - worst)) and (high == end - start or inductances[high - 1] >= inductance_h * (1 + worst)):
+					break
+
+			window *= 4
+
+		return rows[nearest] + start
+
+	def get_specs(self, rows: np.ndarray, inductance_h: float = None) -> list[dict]:
+		"""
+		Returns:
+			[dict]: Spec of every row keyed by menu ids, with its estimates and the relative error to a target
+		"""
+		values = dict((name, column[rows].tolist()) for (name, column) in self.columns.items())
+
+		specs = []
+		for index in range(len(rows)):
+			(trace_width, trace_spacing) = self.presets[values["preset"][index]]
+			spec = {
+				"layer_count": values["layer_count"][index],
+				"turns_count": values["turns_count"][index],
+				"outer_diameter": values["outer_diameter"][index],
+				"trace_width": trace_width,
+				"trace_spacing": trace_spacing,
+				"via_outer": self.header["via_outer"],
+				"via_drill": self.header["via_drill"],
+				"inductance": values["inductance"][index],
+				"resistance": values["resistance"][index],
+				"srf": values["srf"][index]
+			}
+
+			if inductance_h is not None:
+				spec["error"] = spec["inductance"] / inductance_h - 1
+
+			specs.append(spec)
+
+		return specs
@@ -0,0 +1,989 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Clearance of coils against the copper that is already on a board, checked before the coils are placed.
+# Board copper is reduced to capsules, segments with a radius: tracks, arcs split into chords, vias, pads and polygon
+# edges. The capsules of every copper layer are kept in a grid hash, a sorted table of (cell, capsule) entries. Items
+# are keyed by their UUID, so a refresh only touches the items that were added, removed or changed since.
+# A coil is split into capsules once and checked at any number of positions, e.g. for array placement.
+#
+# Item geometry is given as tuples, which also tell if an item changed:
+#     ("segment", layer, ax, ay, bx, by, width)
+#     ("arc", layer, start x, start y, mid x, mid y, end x, end y, width)
+#     ("circle", layer, x, y, diameter)                  filled, vias and round pads
+#     ("rect", layer, x, y, width, height, angle)        filled, pads
+#     ("oval", layer, x, y, width, height, angle)        filled, pads
+#     ("polygon", layer, ((x, y), ...), width)           filled, zones and copper polygons
+
+import math
+
+import numpy as np
+
+from . import board as coilboard
+from . import coilgenerator
+from . import mutual
+from . import segments
+from . import sexpr
+from . import spec as coilspec
+
+CLEARANCE = 0.2 # (mm)
+CELL_SIZE = 2.0 # (mm)
+CHUNK_SIZE = 4096 # coil capsules checked at once, bounds the memory of candidate pairs
+CONTAINMENT_SIZE = 1 << 20 # point and polygon edge pairs tested at once
+CELL_OFFSET = 1 << 24 # cell indices are shifted positive before they are packed into one integer key
+EPSILON = 1e-12
+
+
+class BoardItem:
+	"""
+	Copper item of a board, e.g. a track, a via, all pads of a footprint or a zone
+	"""
+
+	def __init__(self, key: str, kind: str, reference: str, shapes: tuple):
+		self.key = key
+		self.kind = kind
+		self.reference = reference
+		self.shapes = shapes
+
+
+class Conflict:
+	"""
+	Board item closer to a coil than the clearance. Negative gaps are overlaps
+	"""
+
+	def __init__(self, placement: int, layer: str, kind: str, reference: str, gap: float, x: float, y: float):
+		self.placement = placement
+		self.layer = layer
+		self.kind = kind
+		self.reference = reference
+		self.gap = gap
+		self.x = x
+		self.y = y
+
+	def to_dict(self) -> dict:
+		return {
+			"placement": self.placement,
+			"layer": self.layer,
+			"kind": self.kind,
+			"reference": self.reference,
+			"gap": round(self.gap, 4),
+			"x": round(self.x, 4),
+			"y": round(self.y, 4)
+		}
+
+
+def get_segment_distance(a0: np.ndarray, a1: np.ndarray, b0: np.ndarray, b1: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+	"""
+	Closest points of segment pairs, segments may have zero length
+	Args:
+		a0, a1, b0, b1: (N, 2) start and end points of the segments a and b
+
+	Returns:
+		(np.ndarray, np.ndarray, np.ndarray): ((N,) distances, (N, 2) closest points on a, (N, 2) closest points on b)
+	"""
+	(da, db, r) = (a1 - a0, b1 - b0, a0 - b0)
+	a = np.einsum("ij,ij->i", da, da)
+	e = np.einsum("ij,ij->i", db, db)
+	b = np.einsum("ij,ij->i", da, db)
+	c = np.einsum("ij,ij->i", da, r)
+	f = np.einsum("ij,ij->i", db, r)
+
+	a_safe = np.where(a > EPSILON, a, 1)
+	e_safe = np.where(e > EPSILON, e, 1)
+	denominator = a * e - b * b
+
+	# closest points of the infinite lines, then clamped to the segments
+	s = np.where(denominator > EPSILON, np.clip((b * f - c * e) / np.where(denominator > EPSILON, denominator, 1), 0, 1), 0)
+	t = (b * s + f) / e_safe
+	s = np.where(t < 0, np.clip(-c / a_safe, 0, 1), np.where(t > 1, np.clip((b - c) / a_safe, 0, 1), s))
+	t = np.clip(t, 0, 1)
+
+	# degenerated segments are points
+	s = np.where(e <= EPSILON, np.clip(-c / a_safe, 0, 1), s)
+	t = np.where(e <= EPSILON, 0, t)
+	s = np.where(a <= EPSILON, 0, s)
+	t = np.where(a <= EPSILON, np.clip(f / e_safe, 0, 1), t)
+
+	pa = a0 + da * s[:, None]
+	pb = b0 + db * t[:, None]
+
+	return (np.hypot(*(pa - pb).T), pa, pb)
+
+
+def _split_capsules(capsules: np.ndarray, max_length: float) -> np.ndarray:
+	# long capsules are split, so every capsule covers only a few grid cells. Columns after the radius are copied
+	length = np.hypot(capsules[:, 2] - capsules[:, 0], capsules[:, 3] - capsules[:, 1])
+	counts = np.maximum(np.ceil(length / max_length), 1).astype(int)
+
+	if np.all(counts == 1):
+		return capsules
+
+	index = np.repeat(np.arange(len(capsules)), counts)
+	step = np.arange(len(index)) - np.repeat(np.cumsum(counts) - counts, counts)
+	start = (step / counts[index])[:, None]
+	end = ((step + 1) / counts[index])[:, None]
+
+	(a, b) = (capsules[index, 0:2], capsules[index, 2:4])
+
+	return np.column_stack((a + (b - a) * start, a + (b - a) * end, capsules[index, 4:]))
+
+
+def _get_rect_capsules(x: float, y: float, width: float, height: float, angle: float, oval: bool) -> list[tuple]:
+	# the core capsule along the long side fills the rectangle up to its corners, the edges close them
+	(cos, sin) = (math.cos(math.radians(angle)), math.sin(math.radians(angle)))
+
+	def to_board(u, v):
+		return (x + u * cos + v * sin, y - u * sin + v * cos)
+
+	(u, v) = ((width - height) / 2, 0) if width >= height else (0, (height - width) / 2)
+	capsules = [to_board(-u, -v) + to_board(u, v) + (min(width, height) / 2,)]
+
+	if not oval:
+		corners = [to_board(su * width / 2, sv * height / 2) for (su, sv) in ((-1, -1), (1, -1), (1, 1), (-1, 1))]
+		capsules += [corners[i] + corners[(i + 1) % 4] + (0.0,) for i in range(4)]
+
+	return capsules
+
+
+def get_capsules(shapes, layer_names: list[str], chord_tolerance: float = segments.CHORD_TOLERANCE) -> tuple[dict, dict]:
+	"""
+	Splits shape tuples into capsules, see the top of this file for the tuples
+	Args:
+		shapes: Shape tuples
+		layer_names: Copper layers, shapes on other layers are skipped
+		chord_tolerance: Maximum deviation of arc chords from the arc (mm), capsules of chords are widened by it
+
+	Returns:
+		(dict, dict): ((N, 5) arrays of ax, ay, bx, by, radius, polygons as (P, 2) point arrays) keyed by layer index
+	"""
+	(capsules, polygons) = _get_owned_capsules([(0, shapes)], layer_names, chord_tolerance)
+
+	return (dict((layer, rows[:, :5]) for (layer, rows) in capsules.items()), dict((layer, [points for (_, points) in owned]) for (layer, owned) in polygons.items()))
+
+
+def _get_owned_capsules(owned_shapes: list[tuple], layer_names: list[str], chord_tolerance: float) -> tuple[dict, dict]:
+	# capsules of many items at once, the owner of each capsule is kept in a sixth column
+	layer_index = dict((name, index) for (index, name) in enumerate(layer_names))
+	(rows, arcs, polygons) = ({}, {}, {})
+
+	for (owner, shapes) in owned_shapes:
+		for shape in shapes:
+			layer = layer_index.get(shape[1])
+			if layer is None:
+				continue
+
+			kind = shape[0]
+			if kind == "segment":
+				rows.setdefault(layer, []).append(shape[2:6] + (shape[6] / 2, owner))
+			elif kind == "arc":
+				arcs.setdefault(layer, []).append(shape[2:] + (owner,))
+			elif kind == "circle":
+				rows.setdefault(layer, []).append((shape[2], shape[3], shape[2], shape[3], shape[4] / 2, owner))
+			elif kind in ("rect", "oval"):
+				rows.setdefault(layer, []).extend(capsule + (owner,) for capsule in _get_rect_capsules(*shape[2:7], kind == "oval"))
+			elif kind == "polygon":
+				points = np.array(shape[2], dtype = float).reshape(-1, 2)
+				if len(points) < 2:
+					continue
+
+				polygons.setdefault(layer, []).append((owner, points))
+				edges = np.column_stack((points, np.roll(points, -1, axis = 0), np.full(len(points), shape[3] / 2), np.full(len(points), owner)))
+				rows.setdefault(layer, []).extend(edges.tolist())
+
+	capsules = {}
+	for layer in set(rows) | set(arcs):
+		parts = [np.array(rows.get(layer, []), dtype = float).reshape(-1, 6)]
+
+		if layer in arcs:
+			values = np.array(arcs[layer], dtype = float)
+			(points, offsets) = segments.tessellate_arcs(values[:, :6], chord_tolerance)
+
+			# chords connect neighbouring points of the same arc
+			chord = np.ones(len(points) - 1, dtype = bool)
+			chord[offsets[1:-1] - 1] = False
+			arc_ids = np.repeat(np.arange(len(values)), np.diff(offsets))[:-1][chord]
+
+			parts.append(np.column_stack((points[:-1][chord], points[1:][chord], values[arc_ids, 6] / 2 + chord_tolerance, values[arc_ids, 7])))
+
+		capsules[layer] = np.concatenate(parts)
+
+	return (capsules, polygons)
+
+
+def get_coil_shapes(geometry) -> list[tuple]:
+	"""
+	Shape tuples of a generated coil in footprint coordinates. Vias reach through all copper layers of the board
+	"""
+	shapes = [("segment", l.layer, l.start.x, l.start.y, l.end.x, l.end.y, l.width) for l in geometry.lines]
+	shapes += [("arc", a.layer, a.start.x, a.start.y, a.mid.x, a.mid.y, a.end.x, a.end.y, a.width) for a in geometry.arcs]
+	shapes += [("circle", layer, v.loc.x, v.loc.y, v.diameter) for v in geometry.vias for layer in geometry.layer_names]
+	shapes += [("rect", p.layer, p.loc.x, p.loc.y, p.width, p.height, 0) for p in geometry.pads]
+
+	return shapes
+
+
+def place_capsules(capsules: dict, placement: coilboard.Placement, copper_layer_count: int) -> dict:
+	"""
+	Moves footprint capsules to their board position, flipped footprints have their layers reversed
+	"""
+	placed = {}
+	for (layer, rows) in capsules.items():
+		(ax, ay) = placement.to_board(rows[:, 0], rows[:, 1])
+		(bx, by) = placement.to_board(rows[:, 2], rows[:, 3])
+		placed[placement.to_board_layer(layer, copper_layer_count)] = np.column_stack((ax, ay, bx, by, rows[:, 4]))
+
+	return placed
+
+
+def _get_bounds(capsules: dict, margin: float) -> np.ndarray:
+	rows = np.concatenate(list(capsules.values()) or [np.zeros((0, 5))])
+	if not len(rows):
+		return None
+
+	radius = rows[:, 4] + margin
+
+	return np.array([
+		np.minimum(rows[:, 0], rows[:, 2]).min() - radius.max(),
+		np.minimum(rows[:, 1], rows[:, 3]).min() - radius.max(),
+		np.maximum(rows[:, 0], rows[:, 2]).max() + radius.max(),
+		np.maximum(rows[:, 1], rows[:, 3]).max() + radius.max()
+	])
+
+
+def _contains(polygon: np.ndarray, points: np.ndarray) -> np.ndarray:
+	# even-odd rule, a ray to +x crosses the edges
+	(x0, y0) = polygon.T
+	(x1, y1) = np.roll(polygon, -1, axis = 0).T
+	(px, py) = (points[:, 0:1], points[:, 1:2])
+
+	crosses = (y0 > py) != (y1 > py)
+	with np.errstate(divide = "ignore", invalid = "ignore"):
+		at = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+
+	return np.count_nonzero(crosses & (px < at), axis = 1) % 2 == 1
+
+
+class _LayerGrid:
+	"""
+	Capsules of one copper layer with a grid hash. Removed capsules are only marked, the table of (cell, capsule)
+	entries is sorted again on the next query after a change
+	"""
+
+	def __init__(self, cell_size: float):
+		self.cell_size = cell_size
+		self.capsules = np.zeros((0, 5))
+		self.bounds = np.zeros((0, 4)) # low x, low y, high x, high y, widened by the radius
+		self.owners = np.zeros(0, dtype = int)
+		self.alive = np.zeros(0, dtype = bool)
+		self.count = 0
+		self.polygons = {} # owner -> [(points, bounds)]
+
+		self._cell_keys = np.zeros(0, dtype = np.int64)
+		self._cell_rows = np.zeros(0, dtype = int)
+		self._pending = []
+
+	def _get_cells(self, capsules: np.ndarray, margin: float) -> tuple[np.ndarray, np.ndarray]:
+		# every cell touched by the bounding box of a capsule, widened by its radius and the margin
+		radius = capsules[:, 4] + margin
+		x0 = np.floor((np.minimum(capsules[:, 0], capsules[:, 2]) - radius) / self.cell_size).astype(np.int64)
+		y0 = np.floor((np.minimum(capsules[:, 1], capsules[:, 3]) - radius) / self.cell_size).astype(np.int64)
+		x1 = np.floor((np.maximum(capsules[:, 0], capsules[:, 2]) + radius) / self.cell_size).astype(np.int64)
+		y1 = np.floor((np.maximum(capsules[:, 1], capsules[:, 3]) + radius) / self.cell_size).astype(np.int64)
+
+		(nx, ny) = (x1 - x0 + 1, y1 - y0 + 1)
+		counts = nx * ny
+		index = np.repeat(np.arange(len(capsules)), counts)
+		local = np.arange(len(index)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+		cx = x0[index] + local % nx[index] + CELL_OFFSET
+		cy = y0[index] + local // nx[index] + CELL_OFFSET
+
+		return (cx * (2 * CELL_OFFSET) + cy, index)
+
+	def add(self, capsules: np.ndarray, polygons: list) -> tuple[np.ndarray, np.ndarray]:
+		"""
+		Args:
+			capsules: (N, 6) array of ax, ay, bx, by, radius and owner
+			polygons: (owner, (P, 2) points) of filled polygons
+
+		Returns:
+			(np.ndarray, np.ndarray): (rows, owners) of the added capsules
+		"""
+		capsules = _split_capsules(capsules, self.cell_size)
+		owners = capsules[:, 5].astype(int)
+		capsules = capsules[:, :5]
+
+		if self.count + len(capsules) > len(self.capsules):
+			capacity = max(2 * len(self.capsules), self.count + len(capsules), 1024)
+			self.capsules = np.resize(self.capsules, (capacity, 5))
+			self.bounds = np.resize(self.bounds, (capacity, 4))
+			self.owners = np.resize(self.owners, capacity)
+			self.alive = np.concatenate((self.alive[:self.count], np.zeros(capacity - self.count, dtype = bool)))
+
+		rows = np.arange(self.count, self.count + len(capsules))
+		self.capsules[rows] = capsules
+		self.bounds[rows] = np.column_stack((np.minimum(capsules[:, 0:2], capsules[:, 2:4]), np.maximum(capsules[:, 0:2], capsules[:, 2:4]))) + capsules[:, 4:5] * [-1, -1, 1, 1]
+		self.owners[rows] = owners
+		self.alive[rows] = True
+		self.count += len(capsules)
+
+		(keys, index) = self._get_cells(capsules, 0)
+		self._pending.append((keys, rows[index]))
+
+		for (owner, points) in polygons or []:
+			self.polygons.setdefault(owner, []).append((points, np.concatenate((points.min(axis = 0), points.max(axis = 0)))))
+
+		return (rows, owners)
+
+	def remove(self, owner: int, rows: np.ndarray):
+		self.alive[rows] = False
+		self.polygons.pop(owner, None)
+		self._pending.append(None)
+
+	def _get_table(self) -> tuple[np.ndarray, np.ndarray]:
+		if self._pending:
+			keys = [self._cell_keys] + [p[0] for p in self._pending if p is not None]
+			rows = [self._cell_rows] + [p[1] for p in self._pending if p is not None]
+			(keys, rows) = (np.concatenate(keys), np.concatenate(rows))
+
+			# entries of removed capsules are dropped here
+			keep = self.alive[rows]
+			order = np.argsort(keys[keep], kind = "stable")
+			(self._cell_keys, self._cell_rows) = (keys[keep][order], rows[keep][order])
+			self._pending = []
+
+		return (self._cell_keys, self._cell_rows)
+
+	def query(self, capsules: np.ndarray, clearance: float) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+		"""
+		Board capsules closer than the clearance to the given capsules
+		Returns:
+			(np.ndarray, ...): (given capsule, board row, gap, (N, 2) location) per close pair
+		"""
+		(table_keys, table_rows) = self._get_table()
+		if not len(table_keys):
+			return (np.zeros(0, dtype = int), np.zeros(0, dtype = int), np.zeros(0), np.zeros((0, 2)))
+
+		(keys, index) = self._get_cells(capsules, clearance)
+		low = np.searchsorted(table_keys, keys, "left")
+		counts = np.searchsorted(table_keys, keys, "right") - low
+
+		pair_index = np.repeat(index, counts)
+		pair_rows = table_rows[np.repeat(low - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+
+		# pairs whose bounding boxes are too far apart are dropped before the exact distance. Capsules sharing more
+		# than one cell are paired more than once, which only repeats the same distance
+		widening = capsules[:, 4:5] + clearance
+		bounds = np.column_stack((np.minimum(capsules[:, 0:2], capsules[:, 2:4]) - widening, np.maximum(capsules[:, 0:2], capsules[:, 2:4]) + widening))
+		(a, b) = (bounds[pair_index], self.bounds[pair_rows])
+
+		near = (a[:, 0] <= b[:, 2]) & (b[:, 0] <= a[:, 2]) & (a[:, 1] <= b[:, 3]) & (b[:, 1] <= a[:, 3])
+		(pair_index, pair_rows) = (pair_index[near], pair_rows[near])
+
+		(a, b) = (capsules[pair_index], self.capsules[pair_rows])
+		(distance, pa, pb) = get_segment_distance(a[:, 0:2], a[:, 2:4], b[:, 0:2], b[:, 2:4])
+		gap = distance - a[:, 4] - b[:, 4]
+
+		close = gap < clearance
+
+		return (pair_index[close], pair_rows[close], gap[close], (pa[close] + pb[close]) / 2)
+
+
+class CopperIndex:
+	"""
+	Copper of a board in one grid hash per copper layer
+	"""
+
+	def __init__(self, layer_names: list[str], cell_size: float = CELL_SIZE, chord_tolerance: float = segments.CHORD_TOLERANCE):
+		self.layer_names = list(layer_names)
+		self.cell_size = cell_size
+		self.chord_tolerance = chord_tolerance
+		self.grids = [_LayerGrid(cell_size) for _ in layer_names]
+
+		self.items = {} # key -> BoardItem
+		self._owners = {} # key -> owner number
+		self._item_rows = {} # owner number -> [(layer, rows)]
+		self._owner_items = {} # owner number -> BoardItem
+		self._next_owner = 0
+		self._coil_capsules = {} # spec key -> capsules in footprint coordinates
+		self._coil_indexes = {} # spec key -> CopperIndex of the coil alone
+
+	def add(self, items: list[BoardItem]):
+		"""
+		Indexes items, all at once. Items with a known key replace the known ones
+		"""
+		for item in items:
+			if item.key in self.items:
+				self.remove(item.key)
+
+		owned_shapes = []
+		for item in items:
+			owner = self._next_owner
+			self._next_owner += 1
+
+			self.items[item.key] = item
+			self._owners[item.key] = owner
+			self._owner_items[owner] = item
+			self._item_rows[owner] = []
+			owned_shapes.append((owner, item.shapes))
+
+		(capsules, polygons) = _get_owned_capsules(owned_shapes, self.layer_names, self.chord_tolerance)
+		self._add_capsules(capsules, polygons)
+
+	def _add_capsules(self, capsules: dict, polygons: dict):
+		for (layer, layer_capsules) in capsules.items():
+			(rows, owners) = self.grids[layer].add(layer_capsules, polygons.get(layer))
+
+			# rows of every owner, so items can be removed again
+			order = np.argsort(owners, kind = "stable")
+			(rows, owners) = (rows[order], owners[order])
+			bounds = np.flatnonzero(np.diff(owners)) + 1
+
+			for (owner, owner_rows) in zip(owners[np.concatenate(([0], bounds))].tolist(), np.split(rows, bounds)):
+				self._item_rows[owner].append((layer, owner_rows))
+
+	def remove(self, key: str):
+		owner = self._owners.pop(key)
+		del self.items[key]
+		del self._owner_items[owner]
+
+		for (layer, rows) in self._item_rows.pop(owner):
+			self.grids[layer].remove(owner, rows)
+
+	def update(self, items) -> tuple[int, int]:
+		"""
+		Brings the index to the given items. Only added, changed and removed items are indexed again
+		Returns:
+			(int, int): (added or changed items, removed items)
+		"""
+		present = set()
+		changed = []
+
+		for item in items:
+			present.add(item.key)
+			known = self.items.get(item.key)
+
+			if known is None or known.shapes != item.shapes:
+				changed.append(item)
+			else:
+				# references may change without the copper
+				known.reference = item.reference
+
+		removed = [key for key in self.items if key not in present]
+		for key in removed:
+			self.remove(key)
+
+		self.add(changed)
+
+		return (len(changed), len(removed))
+
+	def query(self, capsules: dict, clearance: float = CLEARANCE, exclude = (), placement: int = 0) -> list[Conflict]:
+		"""
+		Board items closer than the clearance to capsules in board coordinates
+		Args:
+			capsules: (N, 5) arrays keyed by layer index, see get_capsules()
+			clearance: Minimum gap between copper (mm)
+			exclude: References of items to ignore, e.g. the coil itself if it is already on the board
+			placement: Index written to the conflicts
+
+		Returns:
+			[Conflict]: Closest spot of every close item per layer, closest first
+		"""
+		closest = {} # (owner, layer) -> (gap, x, y)
+
+		for (layer, layer_capsules) in capsules.items():
+			grid = self.grids[layer]
+			layer_capsules = _split_capsules(layer_capsules, self.cell_size)
+
+			for start in range(0, len(layer_capsules), CHUNK_SIZE):
+				(_, rows, gap, location) = grid.query(layer_capsules[start:start + CHUNK_SIZE], clearance)
+				owners = grid.owners[rows]
+
+				# closest pair of every owner
+				order = np.lexsort((gap, owners))
+				first = order[np.concatenate(([True], owners[order][1:] != owners[order][:-1]))] if len(order) else order
+
+				for spot in first.tolist():
+					previous = closest.get((owners[spot], layer))
+
+					if previous is None or gap[spot] < previous[0]:
+						closest[(owners[spot], layer)] = (float(gap[spot]), float(location[spot, 0]), float(location[spot, 1]))
+
+			# copper that lies completely inside a filled polygon does not come close to any of its edges
+			if grid.polygons:
+				points = layer_capsules[:, 0:2]
+				for (owner, polygons) in grid.polygons.items():
+					for (polygon, bounds) in polygons:
+						if closest.get((owner, layer), (0,))[0] < 0:
+							break
+
+						near = np.flatnonzero(np.all((points >= bounds[0:2]) & (points <= bounds[2:4]), axis = 1))
+						step = max(1, CONTAINMENT_SIZE // len(polygon))
+
+						for start in range(0, len(near), step):
+							inside = near[start:start + step][_contains(polygon, points[near[start:start + step]])]
+
+							if len(inside):
+								spot = inside[0]
+								closest[(owner, layer)] = (-float(layer_capsules[spot, 4]), float(points[spot, 0]), float(points[spot, 1]))
+								break
+
+		conflicts = []
+		for ((owner, layer), (gap, x, y)) in closest.items():
+			item = self._owner_items[owner]
+			if item.reference in exclude:
+				continue
+
+			conflicts.append(Conflict(placement, self.layer_names[layer], item.kind, item.reference, gap, x, y))
+
+		return sorted(conflicts, key = lambda conflict: conflict.gap)
+
+	def get_coil_capsules(self, spec: dict) -> dict:
+		"""
+		Capsules of a coil in footprint coordinates, generated once per design
+		"""
+		key = coilspec.get_key(spec)
+
+		if key not in self._coil_capsules:
+			geometry = coilspec.generate_geometry(spec, self.layer_names)
+			self._coil_capsules[key] = get_capsules(get_coil_shapes(geometry), self.layer_names, self.chord_tolerance)[0]
+
+		return self._coil_capsules[key]
+
+	def _get_coil_index(self, spec: dict):
+		# a coil on its own, in footprint coordinates
+		key = coilspec.get_key(spec)
+
+		if key not in self._coil_indexes:
+			index = CopperIndex(self.layer_names, self.cell_size, self.chord_tolerance)
+			index.add([BoardItem("coil", "coil", "", ())])
+			index._add_capsules(dict((layer, np.column_stack((rows, np.zeros(len(rows))))) for (layer, rows) in self.get_coil_capsules(spec).items()), {})
+			self._coil_indexes[key] = index
+
+		return self._coil_indexes[key]
+
+	def check(self, placements: list[coilboard.Placement], clearance: float = CLEARANCE, exclude = ()) -> list[list[Conflict]]:
+		"""
+		Checks coils at their intended positions against the board and against each other
+		Args:
+			placements: Coils with their position, e.g. an array of the same coil
+			clearance: Minimum gap between copper (mm)
+			exclude: References of board items to ignore
+
+		Returns:
+			[[Conflict]]: Conflicts per placement
+		"""
+		copper_layer_count = len(self.layer_names)
+		placed = [place_capsules(self.get_coil_capsules(p.spec), p, copper_layer_count) for p in placements]
+
+		conflicts = [self.query(capsules, clearance, exclude, index) for (index, capsules) in enumerate(placed)]
+
+		# coils of the array against each other, only pairs whose bounds come closer than the clearance
+		bounds = [_get_bounds(capsules, clearance) for capsules in placed]
+		present = [index for (index, b) in enumerate(bounds) if b is not None]
+		if len(present) < 2:
+			return conflicts
+
+		box = np.array([bounds[index] for index in present])
+		overlap = (box[:, None, 0] <= box[None, :, 2]) & (box[None, :, 0] <= box[:, None, 2]) & (box[:, None, 1] <= box[None, :, 3]) & (box[None, :, 1] <= box[:, None, 3])
+
+		# pairs with the same relative placement, like neighbours in an array, are checked once
+		pair_conflicts = {}
+
+		for (i, j) in zip(*np.nonzero(np.triu(overlap, 1))):
+			(first, second) = (placements[present[i]], placements[present[j]])
+			key = mutual.get_pair_key(first, second)
+
+			if key not in pair_conflicts:
+				# the second coil in the frame of the first one, against the first coil's own index
+				local = dict((first.to_board_layer(layer, copper_layer_count), _to_local(rows, first)) for (layer, rows) in placed[present[j]].items())
+				pair_conflicts[key] = self._get_coil_index(first.spec).query(local, clearance)
+
+			for conflict in pair_conflicts[key]:
+				layer = self.layer_names[first.to_board_layer(self.layer_names.index(conflict.layer), copper_layer_count)]
+				(x, y) = first.to_board(conflict.x, conflict.y)
+
+				conflicts[present[i]].append(Conflict(present[i], layer, "coil", _get_placement_name(second, present[j]), conflict.gap, x, y))
+				conflicts[present[j]].append(Conflict(present[j], layer, "coil", _get_placement_name(first, present[i]), conflict.gap, x, y))
+
+		for placement_conflicts in conflicts:
+			placement_conflicts.sort(key = lambda conflict: conflict.gap)
+
+		return conflicts
+
+
+def _to_local(capsules: np.ndarray, placement: coilboard.Placement) -> np.ndarray:
+	# inverse of placement.to_board()
+	angle = math.radians(placement.rotation)
+	(cos, sin) = (math.cos(angle), math.sin(angle))
+
+	local = capsules.copy()
+	for column in (0, 2):
+		(dx, dy) = (capsules[:, column] - placement.x, capsules[:, column + 1] - placement.y)
+		local[:, column] = dx * cos - dy * sin
+		local[:, column + 1] = dx * sin + dy * cos
+
+		if placement.flipped:
+			local[:, column] = -local[:, column]
+
+	return local
+
+
+def _get_placement_name(placement: coilboard.Placement, index: int) -> str:
+	return placement.reference or "#" + str(index)
+
+
+def get_array(placement: coilboard.Placement, columns: int, rows: int, pitch_x: float, pitch_y: float) -> list[coilboard.Placement]:
+	"""
+	Copies of a placement on a grid, the placement is the top left one
+	"""
+	placements = []
+	for row in range(rows):
+		for column in range(columns):
+			placements.append(coilboard.Placement(
+				placement.spec,
+				placement.x + column * pitch_x,
+				placement.y + row * pitch_y,
+				placement.rotation,
+				placement.flipped,
+				(placement.reference or placement.spec["name"]) + "_" + str(row) + "_" + str(column)
+			))
+
+	return placements
+
+
+def _get_copper_layers(layers: list, copper_layers: list[str]) -> list[str]:
+	# expands the wildcards KiCad uses in layer lists
+	names = []
+	for layer in layers:
+		if layer == "*.Cu":
+			return list(copper_layers)
+		elif layer == "F&B.Cu":
+			names += [copper_layers[0], copper_layers[-1]]
+		elif layer in copper_layers:
+			names.append(layer)
+
+	return names
+
+
+def _get_points(node: list) -> tuple:
+	pts = sexpr.find(node, "pts") or []
+
+	return tuple((float(p[1]), float(p[2])) for p in pts[1:] if isinstance(p, list) and p[0] == "xy")
+
+
+def _get_width(node: list) -> float:
+	stroke = sexpr.find(node, "stroke")
+	if stroke is not None:
+		return float(sexpr.get_value(stroke, "width", 0))
+
+	return float(sexpr.get_value(node, "width", 0))
+
+
+def _get_graphic_shapes(node: list, layer: str, transform) -> list[tuple]:
+	# copper drawings: gr_* on the board or fp_* in footprints, transform maps them to board coordinates
+	kind = node[0][3:]
+	width = _get_width(node)
+
+	def point(name):
+		value = sexpr.find(node, name)
+
+		return transform(float(value[1]), float(value[2]))
+
+	if kind == "line":
+		return [("segment", layer) + point("start") + point("end") + (width,)]
+	elif kind == "arc":
+		return [("arc", layer) + point("start") + point("mid") + point("end") + (width,)]
+	elif kind == "circle":
+		(center, end) = (point("center"), point("end"))
+		opposite = (2 * center[0] - end[0], 2 * center[1] - end[1])
+		side = (center[0] - (end[1] - center[1]), center[1] + (end[0] - center[0]))
+		other_side = (2 * center[0] - side[0], 2 * center[1] - side[1])
+
+		if sexpr.get_value(node, "fill") in ("solid", "yes"):
+			return [("circle", layer) + center + (2 * math.hypot(end[0] - center[0], end[1] - center[1]) + width,)]
+
+		return [("arc", layer) + end + side + opposite + (width,), ("arc", layer) + opposite + other_side + end + (width,)]
+	elif kind == "rect":
+		(x0, y0) = (float(sexpr.find(node, "start")[1]), float(sexpr.find(node, "start")[2]))
+		(x1, y1) = (float(sexpr.find(node, "end")[1]), float(sexpr.find(node, "end")[2]))
+
+		return [("polygon", layer, tuple(transform(x, y) for (x, y) in ((x0, y0), (x1, y0), (x1, y1), (x0, y1))), width)]
+	elif kind == "poly":
+		return [("polygon", layer, tuple(transform(x, y) for (x, y) in _get_points(node)), width)]
+
+	return []
+
+
+def _get_pad_shapes(pad: list, copper_layers: list[str], transform) -> list[tuple]:
+	layers = _get_copper_layers(sexpr.find(pad, "layers")[1:], copper_layers)
+	if not layers:
+		return []
+
+	at = sexpr.find(pad, "at")
+	(x, y) = transform(float(at[1]), float(at[2]))
+	# pad angles in board files already include the rotation of the footprint
+	angle = float(at[3]) if len(at) > 3 else 0
+
+	size = sexpr.find(pad, "size")
+	(width, height) = (float(size[1]), float(size[2]))
+
+	shape = pad[3]
+	if pad[2] == "np_thru_hole":
+		drill = sexpr.find(pad, "drill")
+		# unplated holes only matter as holes
+		(width, height) = (float(drill[-1]), float(drill[-1])) if len(drill) > 1 else (width, height)
+
+	if shape == "circle":
+		return [("circle", layer, x, y, width) for layer in layers]
+	if shape == "oval":
+		return [("oval", layer, x, y, width, height, angle) for layer in layers]
+
+	# rect, roundrect, trapezoid and custom pads are kept as their rectangle
+	return [("rect", layer, x, y, width, height, angle) for layer in layers]
+
+
+def read_kicad_pcb(text: str) -> tuple[list[str], list[BoardItem]]:
+	"""
+	Reads the copper of a .kicad_pcb file
+	Returns:
+		([str], [BoardItem]): (copper layer names from top to bottom, items)
+	"""
+	board = sexpr.parse(text)
+
+	copper_layers = [layer[1] for layer in sexpr.find(board, "layers")[1:] if isinstance(layer, list) and layer[1].endswith(".Cu")]
+	copper_layers = coilgenerator.get_layer_names(len(copper_layers))
+	items = []
+
+	def get_key(node, fallback):
+		return str(sexpr.get_value(node, "uuid", sexpr.get_value(node, "tstamp", fallback)))
+
+	def identity(x, y):
+		return (x, y)
+
+	for (index, node) in enumerate(board[1:]):
+		if not isinstance(node, list):
+			continue
+
+		name = node[0]
+		if name == "segment" or name == "arc":
+			layer = sexpr.get_value(node, "layer")
+			width = float(sexpr.get_value(node, "width", 0))
+			points = [sexpr.find(node, p) for p in (("start", "end") if name == "segment" else ("start", "mid", "end"))]
+			shape = (name, layer) + tuple(float(v) for p in points for v in p[1:3]) + (width,)
+
+			items.append(BoardItem(get_key(node, "item " + str(index)), "track", "", (shape,)))
+		elif name == "via":
+			at = sexpr.find(node, "at")
+			layers = sexpr.find(node, "layers")[1:]
+			diameter = float(sexpr.get_value(node, "size", 0))
+
+			# blind and buried vias span the copper between their two layers
+			span = [copper_layers.index(layer) for layer in layers if layer in copper_layers]
+			span = copper_layers[min(span):max(span) + 1] if span else []
+
+			shapes = tuple(("circle", layer, float(at[1]), float(at[2]), diameter) for layer in span)
+			items.append(BoardItem(get_key(node, "item " + str(index)), "via", "", shapes))
+		elif name == "zone":
+			layers = [sexpr.get_value(node, "layer")] if sexpr.find(node, "layer") else sexpr.find(node, "layers")[1:]
+			layers = _get_copper_layers(layers, copper_layers)
+			kind = "keepout" if sexpr.find(node, "keepout") is not None else "zone"
+
+			# filled copper where the zone is filled, its outline otherwise
+			fills = sexpr.find_all(node, "filled_polygon")
+			if fills and kind == "zone":
+				shapes = tuple(("polygon", sexpr.get_value(fill, "layer"), _get_points(fill), 0.0) for fill in fills if sexpr.get_value(fill, "layer") in layers)
+			else:
+				outline = _get_points(sexpr.find(node, "polygon") or [])
+				shapes = tuple(("polygon", layer, outline, 0.0) for layer in layers)
+
+			reference = str(sexpr.get_value(node, "net_name", "")) or str(sexpr.get_value(node, "name", ""))
+			items.append(BoardItem(get_key(node, "item " + str(index)), kind, reference, shapes))
+		elif name in ("gr_line", "gr_arc", "gr_circle", "gr_rect", "gr_poly"):
+			layer = sexpr.get_value(node, "layer")
+			if layer in copper_layers:
+				items.append(BoardItem(get_key(node, "item " + str(index)), "graphic", "", tuple(_get_graphic_shapes(node, layer, identity))))
+		elif name == "footprint":
+			at = sexpr.find(node, "at")
+			placement = coilboard.Placement(None, float(at[1]), float(at[2]), float(at[3]) if len(at) > 3 else 0)
+
+			properties = dict((p[1], p[2]) for p in sexpr.find_all(node, "property") if len(p) > 2)
+			reference = properties.get("Reference", "")
+			if not reference:
+				text = [t for t in sexpr.find_all(node, "fp_text") if len(t) > 2 and t[1] == "reference"]
+				reference = str(text[0][2]) if text else ""
+
+			# all copper of a footprint is one item, so it can be excluded by its reference
+			shapes = []
+			for child in node[2:]:
+				if not isinstance(child, list):
+					continue
+
+				if child[0] == "pad":
+					shapes += _get_pad_shapes(child, copper_layers, placement.to_board)
+				elif child[0] in ("fp_line", "fp_arc", "fp_circle", "fp_rect", "fp_poly"):
+					layer = sexpr.get_value(child, "layer")
+					if layer in copper_layers:
+						shapes += _get_graphic_shapes(child, layer, placement.to_board)
+
+			if shapes:
+				items.append(BoardItem(get_key(node, "item " + str(index)), "footprint", reference, tuple(shapes)))
+
+	return (copper_layers, items)
+
+
+def read_pcbnew(board) -> tuple[list[str], list[BoardItem]]:
+	"""
+	Reads the copper of the board open in pcbnew, in the same form as read_kicad_pcb()
+	"""
+	import pcbnew # type: ignore
+
+	copper_ids = list(board.GetEnabledLayers().CuStack())
+	copper_layers = coilgenerator.get_layer_names(len(copper_ids))
+	layer_names = dict((layer_id, board.GetLayerName(layer_id)) for layer_id in copper_ids)
+
+	def mm(point):
+		return (pcbnew.ToMM(point.x), pcbnew.ToMM(point.y))
+
+	def get_layers(item):
+		return [layer_names[layer_id] for layer_id in copper_ids if item.IsOnLayer(layer_id)]
+
+	def get_chain_points(chain):
+		return tuple(mm(chain.CPoint(i)) for i in range(chain.PointCount()))
+
+	def get_graphic_shapes(item):
+		layer = layer_names.get(item.GetLayer())
+		if layer is None:
+			return []
+
+		shape = item.GetShape()
+		width = pcbnew.ToMM(item.GetWidth())
+
+		if shape == pcbnew.SHAPE_T_SEGMENT:
+			return [("segment", layer) + mm(item.GetStart()) + mm(item.GetEnd()) + (width,)]
+		elif shape == pcbnew.SHAPE_T_ARC:
+			return [("arc", layer) + mm(item.GetStart()) + mm(item.GetArcMid()) + mm(item.GetEnd()) + (width,)]
+		elif shape == pcbnew.SHAPE_T_CIRCLE:
+			return [("circle", layer) + mm(item.GetCenter()) + (2 * pcbnew.ToMM(item.GetRadius()) + width,)]
+		elif shape in (pcbnew.SHAPE_T_POLY, pcbnew.SHAPE_T_RECT):
+			polygon = item.GetPolyShape() if shape == pcbnew.SHAPE_T_POLY else None
+			if polygon is None:
+				corners = tuple(mm(corner) for corner in item.GetRectCorners())
+				return [("polygon", layer, corners, width)]
+
+			return [("polygon", layer, get_chain_points(polygon.Outline(i)), width) for i in range(polygon.OutlineCount())]
+
+		return []
+
+	items = []
+	for track in board.GetTracks():
+		key = track.m_Uuid.AsString()
+		kind = track.GetClass()
+
+		if kind == "PCB_VIA":
+			shapes = tuple(("circle", layer) + mm(track.GetPosition()) + (pcbnew.ToMM(track.GetWidth()),) for layer in get_layers(track))
+			items.append(BoardItem(key, "via", track.GetNetname(), shapes))
+		elif kind == "PCB_ARC":
+			shape = ("arc", layer_names.get(track.GetLayer())) + mm(track.GetStart()) + mm(track.GetMid()) + mm(track.GetEnd()) + (pcbnew.ToMM(track.GetWidth()),)
+			items.append(BoardItem(key, "track", track.GetNetname(), (shape,)))
+		else:
+			shape = ("segment", layer_names.get(track.GetLayer())) + mm(track.GetStart()) + mm(track.GetEnd()) + (pcbnew.ToMM(track.GetWidth()),)
+			items.append(BoardItem(key, "track", track.GetNetname(), (shape,)))
+
+	for footprint in board.GetFootprints():
+		shapes = []
+		for pad in footprint.Pads():
+			(x, y) = mm(pad.GetPosition())
+			size = pad.GetSize()
+			(width, height) = (pcbnew.ToMM(size.x), pcbnew.ToMM(size.y))
+			angle = pad.GetOrientationDegrees()
+
+			for layer in get_layers(pad):
+				if pad.GetShape() == pcbnew.PAD_SHAPE_CIRCLE:
+					shapes.append(("circle", layer, x, y, width))
+				elif pad.GetShape() == pcbnew.PAD_SHAPE_OVAL:
+					shapes.append(("oval", layer, x, y, width, height, angle))
+				else:
+					shapes.append(("rect", layer, x, y, width, height, angle))
+
+		for item in footprint.GraphicalItems():
+			# FP_SHAPE up to KiCad 7
+			if item.GetClass() in ("PCB_SHAPE", "FP_SHAPE"):
+				shapes += get_graphic_shapes(item)
+
+		if shapes:
+			items.append(BoardItem(footprint.m_Uuid.AsString(), "footprint", footprint.GetReference(), tuple(shapes)))
+
+	for item in board.GetDrawings():
+		if item.GetClass() == "PCB_SHAPE":
+			shapes = get_graphic_shapes(item)
+			if shapes:
+				items.append(BoardItem(item.m_Uuid.AsString(), "graphic", "", tuple(shapes)))
+
+	for zone in board.Zones():
+		kind = "keepout" if zone.GetIsRuleArea() else "zone"
+		shapes = []
+
+		for layer_id in copper_ids:
+			if not zone.IsOnLayer(layer_id):
+				continue
+
+			polygons = zone.GetFilledPolysList(layer_id) if kind == "zone" and zone.IsFilled() else zone.Outline()
+			for i in range(polygons.OutlineCount()):
+				shapes.append(("polygon", layer_names[layer_id], get_chain_points(polygons.Outline(i)), 0.0))
+
+		items.append(BoardItem(zone.m_Uuid.AsString(), kind, zone.GetNetname() or zone.GetZoneName(), tuple(shapes)))
+
+	# KiCad names inner layers freely, the index uses the generator's names by position
+	renamed = dict(zip([layer_names[layer_id] for layer_id in copper_ids], copper_layers))
+	for item in items:
+		item.shapes = tuple((shape[0], renamed.get(shape[1])) + shape[2:] for shape in item.shapes)
+
+	return (copper_layers, items)
+
+
+# index of the board open in pcbnew, kept for the whole session, see get_board_index()
+_board_index = None
+
+
+def get_board_index(board) -> CopperIndex:
+	"""
+	Index of the board open in pcbnew. Built on the first call, later calls only take over the changes of the board
+	"""
+	global _board_index
+
+	(layer_names, items) = read_pcbnew(board)
+
+	if _board_index is None or _board_index.layer_names != layer_names:
+		_board_index = CopperIndex(layer_names)
+
+	_board_index.update(items)
+
+	return _board_index
+
+
+def read_index(path: str, cell_size: float = CELL_SIZE, chord_tolerance: float = segments.CHORD_TOLERANCE) -> CopperIndex:
+	"""
+	Index of the copper of a .kicad_pcb file
+	"""
+	with open(path, "r", encoding = "utf-8") as file:
+		(layer_names, items) = read_kicad_pcb(file.read())
+
+	index = CopperIndex(layer_names, cell_size, chord_tolerance)
+	index.update(items)
+
+	return index
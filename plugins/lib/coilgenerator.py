@@ -20,6 +20,8 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import os
 import math
 from . import generator
+from . import primitives
+from . import metrics
 
 TEMPLATE_FILE = "../dynamic/template.kicad_mod"
 BREAKOUT_LEN = 0.5  # (mm)
@@ -35,7 +37,29 @@ class Connector:
 		self.angle = angle
 		self
 
-def generate(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, coil_name, layer_names):
+class GenerationCancelled(Exception):
+	"""
+	Raised when a progress callback requests to abort a running coil generation
+	"""
+	pass
+
+def get_progress_steps(layer_count, turns_per_layer):
+	"""
+	Returns:
+		int: Steps reported to a progress callback, every turn of every layer and the assembly of the footprint text
+	"""
+	return layer_count * turns_per_layer + 1
+
+def report_progress(progress, done_steps, layer_count, turns_per_layer):
+	"""
+	Calls a progress callback with the done steps out of get_progress_steps()
+	Raises:
+		GenerationCancelled: If the progress callback requested to abort
+	"""
+	if progress(done_steps, get_progress_steps(layer_count, turns_per_layer)) is False:
+		raise GenerationCancelled()
+
+def generate(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, coil_name, layer_names, progress = None, shape = None):
 	"""
 	Generates coils with given parameters. Attempts to place all parts to generate valid coils, though with some parameters, producing a valid coil might not be possible
 	Args:
@@ -49,22 +73,22 @@ def generate(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_sp
 		outer_diameter: Desires outer coil diameter. Coil generation is from outside to inside, so if this is too small, coil wraps may collode
 		coil_name: Reference name of coil to put in kicad
 		layer_names: Names of Kicad layers to place coil in. Lenght is expected to be >= layer_count
+		progress: Optional callback, called as progress(done_steps, total_steps) after every turn and before the footprint text is assembled, see get_progress_steps(). Returning False aborts the generation
+		shape: Optional shape parameters keyed by menu ids, see spec.get_shape(). None generates a circular coil
 	Returns:
 		File: Generated coil in file
+	Raises:
+		GenerationCancelled: If the progress callback requested to abort
 	"""
 	template_file = os.path.join(os.path.dirname(__file__), TEMPLATE_FILE)
 
 	with open(template_file, "r") as file:
 		template = file.read()
 
-	# generate vias and their connectors
-	(vias, arc_connectors) = generate_vias(outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, layer_count)
+	(vias, arcs, lines, pads, _) = generate_parts(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, layer_names, shape, progress)
 
-	# generate coil spirals and connect them to vias
-	(arcs, lines, last_used_radius) = generate_coil_spiral(wrap_clockwise, layer_count, trace_width, trace_spacing, turns_per_layer, outer_diameter, layer_names, arc_connectors)
-
-	# build coil endpoints
-	(lines, pads) = generate_pads(lines, last_used_radius, trace_width, via_diameter, wrap_clockwise, layer_count, layer_names[0], layer_names[layer_count -1])
+	if progress is not None:
+		report_progress(progress, layer_count * turns_per_layer, layer_count, turns_per_layer)
 
 	substitution_dict = {
 		"NAME": coil_name,
@@ -72,14 +96,126 @@ def generate(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_sp
 		"ARCS": ''.join(arcs),
 		"VIAS": ''.join(vias),
 		"PADS": ''.join(pads),
+		"SPEC": get_spec_string(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, shape),
 		"UUID1": generator.get_uuid(),
 		"UUID2": generator.get_uuid(),
 		"UUID3": generator.get_uuid(),
+		"UUID4": generator.get_uuid(),
 	}
 
 	return template.format(**substitution_dict)
 
-def generate_coil_spiral(wrap_clockwise, layer_count, trace_width, trace_spacing, turns_per_layer, outer_diameter, layer_names, arc_connectors):
+def generate_geometry(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, layer_names, shape = None):
+	"""
+	Generates the geometry of a coil, with the same placement logic as generate(), but as primitive records instead of KiCad text
+	Args:
+		layer_count: Number of layers in coil
+		wrap_clockwise: Clockwise or counter-clockwise coil wrapping
+		turns_per_layer: Minimum number of turns per layer: Connecting to vias might introduce up to one more turn
+		trace_width: Width of line trace
+		trace_spacing: Distance between line traces
+		via_diameter: Outer diameter of connecting vias
+		via_drill: Diameter of via drill hole
+		outer_diameter: Desires outer coil diameter. Coil generation is from outside to inside, so if this is too small, coil wraps may collode
+		layer_names: Names of Kicad layers to place coil in. Lenght is expected to be >= layer_count
+		shape: Optional shape parameters, see generate()
+	Returns:
+		CoilGeometry: Lines, arcs, vias and pads of the coil
+	"""
+	(vias, arcs, lines, pads, _) = generate_parts(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, layer_names, shape, None, primitives)
+
+	return primitives.CoilGeometry(lines, arcs, vias, pads, layer_names)
+
+def generate_metrics(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, layer_names, shape = None):
+	"""
+	Dry run of generate(): runs the same placement logic, but only aggregates metrics. Creates no text, no UUIDs and
+	does not read the template
+	Args:
+		See generate_geometry()
+	Returns:
+		CoilMetrics: Trace length per layer, bounding box, primitive counts, vias, pads and clearances
+	"""
+	emitter = metrics.Emitter(layer_names[:layer_count])
+
+	(_, _, _, _, last_used_radius) = generate_parts(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, layer_names, shape, None, emitter)
+
+	(inner_radius, _) = get_spiral_radii(outer_diameter, turns_per_layer, trace_width, trace_spacing)
+	coil_shape = get_shape(outer_diameter, trace_spacing, shape)
+	ring = coil_shape.get_ring(turns_per_layer, trace_width, trace_spacing) if coil_shape is not None else None
+
+	return emitter.get_metrics(inner_radius, last_used_radius, trace_width, ring)
+
+def generate_parts(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, layer_names, shape = None, progress = None, emitter = generator):
+	"""
+	Places all parts of a coil, shared by generate(), generate_geometry() and generate_metrics()
+	Args:
+		See generate()
+	Returns:
+		(list, list, list, list, float): (Vias, arcs, lines, pads, radius of the outer end of the spirals)
+	Raises:
+		GenerationCancelled: If the progress callback requested to abort
+	"""
+	coil_shape = get_shape(outer_diameter, trace_spacing, shape)
+
+	if coil_shape is None:
+		# generate vias and their connectors
+		(vias, arc_connectors) = generate_vias(outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, layer_count, emitter)
+
+		# generate coil spirals and connect them to vias
+		(arcs, lines, last_used_radius) = generate_coil_spiral(wrap_clockwise, layer_count, trace_width, trace_spacing, turns_per_layer, outer_diameter, layer_names, arc_connectors, progress, emitter)
+	else:
+		(vias, arc_connectors) = coil_shape.generate_vias(turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, layer_count, emitter)
+		(arcs, lines, last_used_radius) = coil_shape.generate_coil_spiral(wrap_clockwise, layer_count, trace_width, trace_spacing, turns_per_layer, layer_names, arc_connectors, progress, emitter)
+
+	# build coil endpoints
+	(lines, pads) = generate_pads(lines, last_used_radius, trace_width, via_diameter, wrap_clockwise, layer_count, layer_names[0], layer_names[layer_count -1], emitter)
+
+	return (vias, arcs, lines, pads, last_used_radius)
+
+def get_shape(outer_diameter, trace_spacing, shape):
+	"""
+	Args:
+		shape: Shape parameters keyed by menu ids, see spec.get_shape()
+	Returns:
+		shapes.Shape: Outlines of a non-circular coil, None for circular coils, which keep the placement of this module
+	"""
+	if shape is None or shape.get("shape", "circle") == "circle":
+		return None
+
+	# shapes need numpy, which circular coils do not
+	from . import shapes
+
+	return shapes.get_shape(outer_diameter, trace_spacing, shape)
+
+def get_spec_string(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, shape = None):
+	"""
+	Describes the coil parameters as a single line of text, stored in the footprint so placed coils can be analyzed later.
+	Keys are the ids of the menu entries, circular coils leave out the shape
+	Returns:
+		str: Space separated key=value pairs
+	"""
+	entries = [
+		"layer_count=" + str(layer_count),
+		"turn_direction=" + ("cw" if wrap_clockwise else "ccw"),
+		"turns_count=" + str(turns_per_layer),
+		"trace_width=" + str(trace_width),
+		"trace_spacing=" + str(trace_spacing),
+		"via_outer=" + str(via_diameter),
+		"via_drill=" + str(via_drill),
+		"outer_diameter=" + str(outer_diameter)
+	]
+
+	if shape is not None and shape.get("shape", "circle") != "circle":
+		entries.append("shape=" + shape["shape"])
+		entries.append("outer_height=" + str(shape["outer_height"]))
+		entries.append("corner_radius=" + str(shape["corner_radius"]))
+
+		if shape["shape"] == "polygon":
+			entries.append("polygon_sides=" + str(shape["polygon_sides"]))
+
+	return " ".join(entries)
+
+def generate_coil_spiral(wrap_clockwise, layer_count, trace_width, trace_spacing, turns_per_layer, outer_diameter, layer_names, arc_connectors, progress = None, emitter = generator):
 	"""
 	Generates coil spirals for a given coil and connects them to vias.
 	Args:
@@ -91,9 +227,13 @@ def generate_coil_spiral(wrap_clockwise, layer_count, trace_width, trace_spacing
 		outer_diameter: Desires outer coil diameter. Coil generation is from outside to inside, so if this is too small, coil wraps may collode
 		layer_names: Names of Kicad layers to place coil in. Lenght is expected to be >= layer_count
 		arc_connectors: Via connector points to connect to
+		progress: Optional callback, called as progress(done_steps, total_steps) after every turn, see get_progress_steps(). Returning False aborts the generation
+		emitter: Module producing the primitives, generator for KiCad text or primitives for geometry records
 
 	Returns:
 		([str], [str], float): (Generated arcs for spirals for PCBNew, Generated connector lines for spirals to vias, last used radius in coil generation)
+	Raises:
+		GenerationCancelled: If the progress callback requested to abort
 	"""
 	# build out arcs to spec, until # turns is reached
 	wrap_direction_multiplier = 1 if wrap_clockwise else -1
@@ -101,7 +241,11 @@ def generate_coil_spiral(wrap_clockwise, layer_count, trace_width, trace_spacing
 	arcs = []
 	lines = []
 
-	start_radius = outer_diameter / 2 - turns_per_layer * trace_width - (turns_per_layer - 1) * trace_spacing
+	# layers of the same parity share their turns, emitters that can relabel primitives compute them once
+	relabel = getattr(emitter, "relabel", None)
+	layer_turns = {}
+
+	(start_radius, _) = get_spiral_radii(outer_diameter, turns_per_layer, trace_width, trace_spacing)
 	for layer in range(layer_count):
 		current_radius = start_radius
 
@@ -110,16 +254,30 @@ def generate_coil_spiral(wrap_clockwise, layer_count, trace_width, trace_spacing
 		if layer % 2 != 0:
 			inverse_turn_mult = -1
 
-		#generate all full turns for one layer
-		for _ in range(turns_per_layer):
-			arcs.extend(generator.loop(
-					current_radius,
-					increment,
-					trace_width,
-					layer_names[layer],
-					wrap_direction_multiplier * inverse_turn_mult
-				))
-			current_radius += increment
+		if relabel is not None and inverse_turn_mult in layer_turns:
+			(turn_arcs, current_radius) = layer_turns[inverse_turn_mult]
+			arcs.extend(relabel(turn_arcs, layer_names[layer]))
+
+			if progress is not None:
+				report_progress(progress, (layer + 1) * turns_per_layer, layer_count, turns_per_layer)
+		else:
+			#generate all full turns for one layer
+			turn_arcs = []
+			for turn in range(turns_per_layer):
+				turn_arcs.extend(emitter.loop(
+						current_radius,
+						increment,
+						trace_width,
+						layer_names[layer],
+						wrap_direction_multiplier * inverse_turn_mult
+					))
+				current_radius += increment
+
+				if progress is not None:
+					report_progress(progress, layer * turns_per_layer + turn + 1, layer_count, turns_per_layer)
+
+			layer_turns[inverse_turn_mult] = (turn_arcs, current_radius)
+			arcs.extend(turn_arcs)
 
 		# connect to vias
 		if layer % 2 == 0:
@@ -147,7 +305,7 @@ def generate_coil_spiral(wrap_clockwise, layer_count, trace_width, trace_spacing
 				loop_end_point = loop_outer_point
 				end_point_radius = current_radius
 
-			(arcs, lines) = connect_via(end_point_radius, loop_end_point, increment, layer_names[layer], trace_width, first_via_inside, current_clockwise, arc_connectors[layer -1], arcs, lines)
+			(arcs, lines) = connect_via(end_point_radius, loop_end_point, increment, layer_names[layer], trace_width, first_via_inside, current_clockwise, arc_connectors[layer -1], arcs, lines, emitter)
 
 		if layer < (layer_count -1) or (layer_count % 2 != 0):
 			if second_via_inside:
@@ -157,12 +315,12 @@ def generate_coil_spiral(wrap_clockwise, layer_count, trace_width, trace_spacing
 				loop_end_point = loop_outer_point
 				end_point_radius = current_radius
 
-			(arcs, lines) = connect_via(end_point_radius, loop_end_point, increment, layer_names[layer], trace_width, second_via_inside, current_clockwise, arc_connectors[layer], arcs, lines)
+			(arcs, lines) = connect_via(end_point_radius, loop_end_point, increment, layer_names[layer], trace_width, second_via_inside, current_clockwise, arc_connectors[layer], arcs, lines, emitter)
 
 	return (arcs, lines, current_radius)
 
 
-def generate_vias(outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, layer_count):
+def generate_vias(outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, layer_count, emitter = generator):
 	"""
 	Generates vias for a given coil.
 	Connection has to be done when coil spirals have been generated
@@ -174,6 +332,7 @@ def generate_vias(outer_diameter, turns_per_layer, trace_width, trace_spacing, v
 		via_diameter: Outer diameter of connecting vias
 		via_drill: Diameter of via drill hole
 		layer_count: Number of layers in coil
+		emitter: Module producing the primitives, generator for KiCad text or primitives for geometry records
 
 	Returns:
 		([str], [Connector]): (Generated vias for PCBNew, Via positions to be used for easier connecting with coil spiral)
@@ -221,7 +380,7 @@ def generate_vias(outer_diameter, turns_per_layer, trace_width, trace_spacing, v
 		# if the coil has an odd layer count, the last via shold be pad number 2
 		if odd_layer_count == 1 and v == via_count -1:
 			vias.append(
-				generator.via(
+				emitter.via(
 					generator.P2D(width, height),
 					via_diameter,
 					via_drill,
@@ -230,7 +389,7 @@ def generate_vias(outer_diameter, turns_per_layer, trace_width, trace_spacing, v
 			)
 		else:
 			vias.append(
-				generator.via(
+				emitter.via(
 					generator.P2D(width, height),
 					via_diameter,
 					via_drill
@@ -239,7 +398,7 @@ def generate_vias(outer_diameter, turns_per_layer, trace_width, trace_spacing, v
 
 	return (vias, arc_connectors)
 
-def generate_pads(lines, outer_radius, trace_width, via_diameter, clockwise, layer_count, top_layer_name, bottom_layer_name):
+def generate_pads(lines, outer_radius, trace_width, via_diameter, clockwise, layer_count, top_layer_name, bottom_layer_name, emitter = generator):
 	"""
 	Generates and connects pads for a given coil.
 	Coils with uneven number of layers will only have one pad, as the other connection is a via on the inside of the coil
@@ -252,6 +411,7 @@ def generate_pads(lines, outer_radius, trace_width, via_diameter, clockwise, lay
 		layer_count: Number of layers in coil
 		top_layer_name: PCBNew name of top coil layer
 		bottom_layer_name: PCBNew name of bottom coil layer (not necessarily PCB bottom layer!)
+		emitter: Module producing the primitives, generator for KiCad text or primitives for geometry records
 
 	Returns:
 		([str], [str]): (Modified lines array, Generated Pads array)
@@ -265,7 +425,7 @@ def generate_pads(lines, outer_radius, trace_width, via_diameter, clockwise, lay
 
 	# draw lines from coil spiral end point to top pad
 	lines.append(
-		generator.line(
+		emitter.line(
 			generator.P2D(outer_radius, 0),
 			generator.P2D(outer_radius, top_pad_center_point.y),
 			trace_width,
@@ -274,7 +434,7 @@ def generate_pads(lines, outer_radius, trace_width, via_diameter, clockwise, lay
 	)
 
 	lines.append(
-		generator.line(
+		emitter.line(
 			generator.P2D(outer_radius, top_pad_center_point.y),
 			generator.P2D(top_pad_center_point.x - 3 * trace_width, top_pad_center_point.y),
 			trace_width,
@@ -285,7 +445,7 @@ def generate_pads(lines, outer_radius, trace_width, via_diameter, clockwise, lay
 	# if bottom pad exists, draw lines from spiral end point to bottom pad
 	if layer_count > 1 and layer_count % 2 == 0:
 		lines.append(
-			generator.line(
+			emitter.line(
 				generator.P2D(outer_radius, 0),
 				generator.P2D(outer_radius, bottom_pad_center_point.y),
 				trace_width,
@@ -294,7 +454,7 @@ def generate_pads(lines, outer_radius, trace_width, via_diameter, clockwise, lay
 		)
 
 		lines.append(
-			generator.line(
+			emitter.line(
 				generator.P2D(outer_radius, bottom_pad_center_point.y),
 				generator.P2D(bottom_pad_center_point.x - 3 * trace_width, bottom_pad_center_point.y),
 				trace_width,
@@ -308,7 +468,7 @@ def generate_pads(lines, outer_radius, trace_width, via_diameter, clockwise, lay
 	# trace does not throw the "The routing start point violates DRC error". I have found that a 0.5mm gap works ok in
 	# most scenarios, with a 1.2mm wide pad. Feel free to adjust to your needs, but you've been warned.
 	pads.append(
-		generator.pad(
+		emitter.pad(
 			1,
 			top_pad_center_point,
 			8 * trace_width,
@@ -319,7 +479,7 @@ def generate_pads(lines, outer_radius, trace_width, via_diameter, clockwise, lay
 
 	if layer_count > 1 and layer_count % 2 == 0:
 		pads.append(
-			generator.pad(
+			emitter.pad(
 				2,
 				bottom_pad_center_point,
 				8 * trace_width,
@@ -330,6 +490,42 @@ def generate_pads(lines, outer_radius, trace_width, via_diameter, clockwise, lay
 
 	return (lines, pads)
 
+def get_layer_names(copper_layer_count):
+	"""
+	Generates the KiCad copper layer names of a board.
+	KiCAD seems to want standard layer names for our generated objects, instead of custom defined layer names
+	Args:
+		copper_layer_count: Number of copper layers of the board
+
+	Returns:
+		[str]: Layer names, ordered from top to bottom
+	"""
+	layer_names = []
+	for x in range(copper_layer_count):
+		layer_names.append("In" + str(x) + ".Cu")
+	#first and last layer have different naming scheme than InX.Cu
+	layer_names[0] = "F.Cu"
+	layer_names[copper_layer_count -1] = "B.Cu"
+
+	return layer_names
+
+def get_copper_layer_index(layer_name, copper_layer_count):
+	"""
+	Inverse of get_layer_names
+	Args:
+		layer_name: KiCad copper layer name
+		copper_layer_count: Number of copper layers of the board
+
+	Returns:
+		int: Index of the layer, 0 is the top layer
+	"""
+	if layer_name == "F.Cu":
+		return 0
+	if layer_name == "B.Cu":
+		return copper_layer_count -1
+
+	return int(layer_name[2:-3])
+
 def get_num_vias(layer_count):
 	"""
 	Calculates number of vias required inside and outside of coil
@@ -346,6 +542,23 @@ def get_num_vias(layer_count):
 
 	return (num_vias_inside, num_vias_outside)
 
+def get_spiral_radii(outer_diameter, turns_per_layer, trace_width, trace_spacing):
+	"""
+	Calculates the centerline radii of the first and last turn of a spiral layer. Works on numbers and numpy arrays
+	Args:
+		outer_diameter: Desired outer coil diameter
+		turns_per_layer: Number of spiral turns per coil layer
+		trace_width: Width of line trace
+		trace_spacing: Distance between line traces
+
+	Returns:
+		(float, float): (Inner radius, outer radius)
+	"""
+	inner_radius = outer_diameter / 2 - turns_per_layer * trace_width - (turns_per_layer - 1) * trace_spacing
+	outer_radius = inner_radius + turns_per_layer * (trace_width + trace_spacing)
+
+	return (inner_radius, outer_radius)
+
 def get_via_radius(outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter):
 	"""
 	Calculates diameter at which vias need to be placed
@@ -365,6 +578,46 @@ def get_via_radius(outer_diameter, turns_per_layer, trace_width, trace_spacing,
 	return (VIA_INSIDE_RADIUS, VIA_OUTSIDE_RADIUS)
 
 
+def estimate_is_coil_generatable(outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter, layer_count, shape = None):
+	"""
+	Checks if a coil is generatable.
+	If this returns true, the coil is likely to be fault free.
+	If this return false, the coil is likely to be faulty.
+	Checks are ESTIMATES only
+	Checks this by checking inner via placement
+	Args:
+		outer_diameter: Desires outer coil diameter. Coil generation is from outside to inside, so if this is too small, coil wraps may collode
+		turns_per_layer: Minimum number of turns per layer: Connecting to vias might introduce up to one more turn
+		trace_width: Width of line trace
+		trace_spacing: Distance between line traces
+		via_diameter: Outer diameter of connecting vias
+		layer_count: Number of layers in coil
+		shape: Optional shape parameters, see generate()
+
+	Returns:
+		Bool: False, if coil is definitely not generatable, True, if coil MAY be generatable
+	"""
+	coil_shape = get_shape(outer_diameter, trace_spacing, shape)
+	if coil_shape is not None:
+		return coil_shape.estimate_is_coil_generatable(turns_per_layer, trace_width, trace_spacing, via_diameter, layer_count)
+
+	(via_inner_diameter, _) = get_via_radius(outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter)
+
+	# if via diameter is negative, then coil spiral traces are overlapping in one layer, even without considering vias
+	if via_inner_diameter <= 0:
+		return False
+
+	# check if inner vias fit on radius
+	(num_vias_inside, _) = get_num_vias(layer_count)
+
+	circumference = 2 * math.pi * (via_inner_diameter / 2)
+
+	# using trace width as minimum distance between vias, a ROUGH ESTIMATE can be made if the vias fit on the chosen circle
+	if circumference - num_vias_inside * (via_diameter + trace_width) < 0:
+		return False
+
+	return True
+
 def get_circle_section_centerpoint(point_a, point_b, radius):
 	"""
 	Takes two points A and B, generates a point central to A and B and places it on a radius from origin
@@ -481,7 +734,7 @@ def is_left_of(point_a, point_b):
 	"""
 	return point_a < point_b
 
-def connect_via(end_point_radius, loop_end_point, loop_increment, layer_name, trace_width, inside, clockwise, arc_connector, arcs, lines):
+def connect_via(end_point_radius, loop_end_point, loop_increment, layer_name, trace_width, inside, clockwise, arc_connector, arcs, lines, emitter = generator):
 	"""
 	Connects a coil spirals endpoint to a designated via.
 	Does so in three steps:
@@ -499,6 +752,7 @@ def connect_via(end_point_radius, loop_end_point, loop_increment, layer_name, tr
 		arc_connector: Via to connect to
 		arcs: Previously drawn arcs array to manipulate / append
 		lines: previously drawn lines array to manipulate / append
+		emitter: Module producing the primitives, generator for KiCad text or primitives for geometry records
 	Returns:
 		([str], [str]): Modified (arcs array, lines array)
 	"""
@@ -535,7 +789,7 @@ def connect_via(end_point_radius, loop_end_point, loop_increment, layer_name, tr
 			if inside != clockwise:
 				center_point.y = center_point.y * -1
 
-			arcs.extend(generator.arc(
+			arcs.append(emitter.arc(
 				loop_end_point,
 				center_point,
 				opposite_point,
@@ -552,7 +806,7 @@ def connect_via(end_point_radius, loop_end_point, loop_increment, layer_name, tr
 		if remaining_angle >= MIN_DIRECT_BRIDGE_DISTANCE:
 			arc_center_radius = (target_radius_closest_to_via - current_closest_to_via_radius) / 2 + current_closest_to_via_radius
 
-			arcs.extend(generator.arc(
+			arcs.append(emitter.arc(
 				current_closest_to_via,
 				get_circle_section_centerpoint(current_closest_to_via, nearest_connector_point, arc_center_radius),
 				nearest_connector_point,
@@ -563,7 +817,7 @@ def connect_via(end_point_radius, loop_end_point, loop_increment, layer_name, tr
 			current_closest_to_via = nearest_connector_point
 
 	# connecting the last piece to via with direct line
-	lines.extend(generator.line(
+	lines.append(emitter.line(
 		current_closest_to_via,
 		generator.P2D(arc_connector.x, arc_connector.y),
 		trace_width,
@@ -0,0 +1,401 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# 2D drawings of generated coils as SVG and DXF. Arcs of a geometry are tessellated all at once (segments.py), every
+# geometry is prepared once and then placed as often as needed: sweeps become one sheet with a grid of coils, where
+# identical coils share one SVG <defs> entry or DXF block. Elements are written one by one while drawing.
+
+import os
+import math
+import itertools
+
+import numpy as np
+
+from . import segments
+from . import coilgenerator
+from . import spec as coilspec
+
+# colors of KiCad's default theme, top and bottom copper plus a cycle for inner layers
+TOP_COLOUR = "#c83434"
+BOTTOM_COLOUR = "#4d7fc4"
+INNER_COLOURS = ["#c2c200", "#c200c2", "#008484", "#c27426", "#7fc87f", "#840084"]
+VIA_COLOUR = "#ececec"
+
+# AutoCAD color index of the same layers
+TOP_ACI = 1
+BOTTOM_ACI = 5
+INNER_ACIS = [2, 6, 4, 30, 3, 216]
+
+MARGIN = 2.0 # (mm) space between coils of a sheet
+LABEL_HEIGHT = 1.0 # (mm)
+POINT_FORMAT = "%.4f"
+
+
+class Drawing:
+	"""
+	Geometry of one coil prepared for drawing: primitives sorted by layer, arcs tessellated or as center, radius and angles
+	"""
+
+	def __init__(self, geometry, chord_tolerance: float = segments.CHORD_TOLERANCE):
+		self.geometry = geometry
+		self.layer_names = [name for name in geometry.layer_names if any(p.layer == name for p in itertools.chain(geometry.lines, geometry.arcs, geometry.pads))]
+
+		if geometry.arcs:
+			(self.arc_points, self.arc_offsets) = segments.tessellate_arcs(geometry.arcs, chord_tolerance)
+			self.arc_params = np.column_stack(segments.get_arc_arrays(geometry.arcs))
+		else:
+			(self.arc_points, self.arc_offsets) = (np.zeros((0, 2)), np.zeros(1, dtype = int))
+			self.arc_params = np.zeros((0, 5))
+
+		self.bounds = self._get_bounds()
+
+	def _get_bounds(self) -> tuple[float, float, float, float]:
+		g = self.geometry
+		width = max([p.width for p in itertools.chain(g.lines, g.arcs)] + [0])
+
+		points = [self.arc_points]
+		points += [np.array([(l.start.x, l.start.y), (l.end.x, l.end.y)]) for l in g.lines]
+		points = np.concatenate(points) if len(points) > 1 or len(self.arc_points) else np.zeros((1, 2))
+
+		(min_x, min_y) = points.min(axis = 0) - width / 2
+		(max_x, max_y) = points.max(axis = 0) + width / 2
+
+		for v in g.vias:
+			(min_x, min_y) = (min(min_x, v.loc.x - v.diameter / 2), min(min_y, v.loc.y - v.diameter / 2))
+			(max_x, max_y) = (max(max_x, v.loc.x + v.diameter / 2), max(max_y, v.loc.y + v.diameter / 2))
+
+		for p in g.pads:
+			(min_x, min_y) = (min(min_x, p.loc.x - p.width / 2), min(min_y, p.loc.y - p.height / 2))
+			(max_x, max_y) = (max(max_x, p.loc.x + p.width / 2), max(max_y, p.loc.y + p.height / 2))
+
+		return (float(min_x), float(min_y), float(max_x), float(max_y))
+
+	def get_layer_index(self, name: str) -> int:
+		"""
+		Returns:
+			int: Index of a layer in the board's layer list, for colors
+		"""
+		return self.geometry.layer_names.index(name)
+
+	def iter_traces(self, layer: str):
+		"""
+		Yields ("line", start, end, width) and ("arc", index, width) of every trace on a layer
+		"""
+		for l in self.geometry.lines:
+			if l.layer == layer:
+				yield ("line", (l.start.x, l.start.y), (l.end.x, l.end.y), l.width)
+
+		for (index, a) in enumerate(self.geometry.arcs):
+			if a.layer == layer:
+				yield ("arc", index, a.width)
+
+	def get_arc_points(self, index: int) -> np.ndarray:
+		return self.arc_points[self.arc_offsets[index]:self.arc_offsets[index + 1]]
+
+
+def get_layout(drawings: list[Drawing], columns: int = None) -> tuple[list[tuple[float, float]], tuple[float, float]]:
+	"""
+	Places drawings on a grid of equal cells, a label line below each coil
+	Args:
+		columns: Cells per row, defaults to a square grid
+
+	Returns:
+		([(float, float)], (float, float)): (offset of the coil origin per drawing, (sheet width, sheet height))
+	"""
+	columns = columns or math.ceil(math.sqrt(len(drawings)))
+	cell_width = max(d.bounds[2] - d.bounds[0] for d in drawings) + MARGIN
+	cell_height = max(d.bounds[3] - d.bounds[1] for d in drawings) + MARGIN + 2 * LABEL_HEIGHT
+
+	offsets = []
+	for (index, d) in enumerate(drawings):
+		(row, column) = divmod(index, columns)
+		offsets.append((column * cell_width + MARGIN / 2 - d.bounds[0], row * cell_height + MARGIN / 2 - d.bounds[1]))
+
+	rows = math.ceil(len(drawings) / columns)
+
+	return (offsets, (min(columns, len(drawings)) * cell_width, rows * cell_height))
+
+
+def _format_points(points: np.ndarray) -> str:
+	return ((POINT_FORMAT + "," + POINT_FORMAT + " ") * len(points)) % tuple(points.ravel())
+
+
+def get_svg_colour(layer: int, layer_count: int) -> str:
+	if layer == 0:
+		return TOP_COLOUR
+	if layer == layer_count - 1:
+		return BOTTOM_COLOUR
+
+	return INNER_COLOURS[(layer - 1) % len(INNER_COLOURS)]
+
+
+def _write_svg_coil(file, drawing: Drawing, coil_id: str):
+	"""
+	Writes one coil as group with one sub group per layer, bottom layer first so the top layer is drawn above all others
+	"""
+	layer_count = len(drawing.geometry.layer_names)
+	file.write(f'<g id="{coil_id}">\n')
+
+	for name in reversed(drawing.layer_names):
+		layer = drawing.get_layer_index(name)
+		colour = get_svg_colour(layer, layer_count)
+		file.write(f'<g id="{coil_id}-{name}" inkscape:groupmode="layer" inkscape:label="{name}" stroke="{colour}" fill="none" stroke-linecap="round" stroke-linejoin="round">\n')
+
+		for trace in drawing.iter_traces(name):
+			if trace[0] == "line":
+				(_, (ax, ay), (bx, by), width) = trace
+				file.write(f'<path stroke-width="{width:g}" d="M{ax:.4f},{ay:.4f} L{bx:.4f},{by:.4f}"/>\n')
+			else:
+				(_, index, width) = trace
+				points = drawing.get_arc_points(index)
+				file.write(f'<path stroke-width="{width:g}" d="M{_format_points(points[:1])}L{_format_points(points[1:])}"/>\n')
+
+		for p in drawing.geometry.pads:
+			if p.layer == name:
+				file.write(f'<rect x="{p.loc.x - p.width / 2:.4f}" y="{p.loc.y - p.height / 2:.4f}" width="{p.width:g}" height="{p.height:g}" fill="{colour}" stroke="none"/>\n')
+
+		file.write("</g>\n")
+
+	if drawing.geometry.vias:
+		file.write(f'<g id="{coil_id}-vias" inkscape:groupmode="layer" inkscape:label="Vias" fill="{VIA_COLOUR}">\n')
+		for v in drawing.geometry.vias:
+			# ring with the drill as hole
+			(r, d) = (v.diameter / 2, v.drill / 2)
+			file.write(f'<path fill-rule="evenodd" d="M{v.loc.x + r:.4f},{v.loc.y:.4f} a{r:g},{r:g} 0 1,0 {-2 * r:g},0 a{r:g},{r:g} 0 1,0 {2 * r:g},0 Z M{v.loc.x + d:.4f},{v.loc.y:.4f} a{d:g},{d:g} 0 1,0 {-2 * d:g},0 a{d:g},{d:g} 0 1,0 {2 * d:g},0 Z"/>\n')
+		file.write("</g>\n")
+
+	file.write("</g>\n")
+
+
+def write_svg(file, items: list[tuple[str, Drawing]], columns: int = None):
+	"""
+	Writes an SVG sheet. A single coil is drawn in footprint coordinates, several coils are placed on a grid with
+	their name below. Coils that share a Drawing are only written once and referenced
+	Args:
+		file: Open text file
+		items: (name, Drawing) per coil
+		columns: Cells per row of the grid
+	"""
+	drawings = [drawing for (_, drawing) in items]
+	single = len(items) == 1
+
+	if single:
+		(min_x, min_y, max_x, max_y) = drawings[0].bounds
+		view = (min_x - MARGIN / 2, min_y - MARGIN / 2, max_x - min_x + MARGIN, max_y - min_y + MARGIN)
+	else:
+		(offsets, (width, height)) = get_layout(drawings, columns)
+		view = (0, 0, width, height)
+
+	file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+	file.write('<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" ')
+	file.write('width="{2:g}mm" height="{3:g}mm" viewBox="{0:g} {1:g} {2:g} {3:g}">\n'.format(*view))
+
+	if single:
+		_write_svg_coil(file, drawings[0], _escape(items[0][0]) or "coil")
+	else:
+		ids = {}
+		file.write("<defs>\n")
+		for drawing in drawings:
+			if id(drawing) not in ids:
+				ids[id(drawing)] = "coil" + str(len(ids))
+				_write_svg_coil(file, drawing, ids[id(drawing)])
+		file.write("</defs>\n")
+
+		for ((name, drawing), (x, y)) in zip(items, offsets):
+			label_x = x + (drawing.bounds[0] + drawing.bounds[2]) / 2
+			label_y = y + drawing.bounds[3] + 1.5 * LABEL_HEIGHT
+			file.write(f'<use xlink:href="#{ids[id(drawing)]}" transform="translate({x:.4f} {y:.4f})"/>\n')
+			file.write(f'<text x="{label_x:.4f}" y="{label_y:.4f}" font-size="{LABEL_HEIGHT:g}" font-family="sans-serif" text-anchor="middle">{_escape(name)}</text>\n')
+
+	file.write("</svg>\n")
+
+
+def _escape(text: str) -> str:
+	return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+
+def get_dxf_layer(name: str) -> str:
+	"""
+	Returns:
+		str: Layer name allowed in DXF R12, which has no dots
+	"""
+	return name.replace(".", "_")
+
+
+def get_dxf_colour(layer: int, layer_count: int) -> int:
+	if layer == 0:
+		return TOP_ACI
+	if layer == layer_count - 1:
+		return BOTTOM_ACI
+
+	return INNER_ACIS[(layer - 1) % len(INNER_ACIS)]
+
+
+def _write_group(file, *pairs):
+	file.write("".join(f"{code}\n{value}\n" for (code, value) in pairs))
+
+
+def _write_dxf_polyline(file, layer: str, points: np.ndarray, width: float, closed: bool = False):
+	"""
+	R12 polyline of constant width, y is flipped as DXF has its y axis upwards
+	"""
+	_write_group(file, (0, "POLYLINE"), (8, layer), (66, 1), (10, 0.0), (20, 0.0), (30, 0.0), (70, 1 if closed else 0), (40, width), (41, width))
+
+	vertex = "0\nVERTEX\n8\n" + layer + "\n10\n" + POINT_FORMAT + "\n20\n" + POINT_FORMAT + "\n30\n0.0\n"
+	flipped = np.column_stack((points[:, 0], -points[:, 1]))
+	file.write((vertex * len(points)) % tuple(flipped.ravel()))
+
+	_write_group(file, (0, "SEQEND"), (8, layer))
+
+
+def _write_dxf_coil(file, drawing: Drawing, polylines: bool):
+	"""
+	Writes the entities of one coil. Traces are LINE and ARC center lines, or polylines of the trace width
+	"""
+	g = drawing.geometry
+
+	for name in drawing.layer_names:
+		layer = get_dxf_layer(name)
+
+		for trace in drawing.iter_traces(name):
+			if trace[0] == "line":
+				(_, (ax, ay), (bx, by), width) = trace
+				if polylines:
+					_write_dxf_polyline(file, layer, np.array([(ax, ay), (bx, by)]), width)
+				else:
+					_write_group(file, (0, "LINE"), (8, layer), (10, f"{ax:.4f}"), (20, f"{-ay:.4f}"), (30, 0.0), (11, f"{bx:.4f}"), (21, f"{-by:.4f}"), (31, 0.0))
+			else:
+				(_, index, width) = trace
+				if polylines:
+					_write_dxf_polyline(file, layer, drawing.get_arc_points(index), width)
+				else:
+					# flipping y mirrors the angles, DXF arcs always run counter-clockwise from start to end angle
+					(ux, uy, radius, start, sweep) = drawing.arc_params[index]
+					(low, high) = sorted((-start, -start - sweep))
+					_write_group(file, (0, "ARC"), (8, layer), (10, f"{ux:.4f}"), (20, f"{-uy:.4f}"), (30, 0.0), (40, f"{radius:.4f}"), (50, f"{math.degrees(low):.6f}"), (51, f"{math.degrees(high):.6f}"))
+
+		for p in g.pads:
+			if p.layer == name:
+				(x, y, w, h) = (p.loc.x, p.loc.y, p.width / 2, p.height / 2)
+				corners = np.array([(x - w, y - h), (x + w, y - h), (x + w, y + h), (x - w, y + h)])
+				_write_dxf_polyline(file, layer, corners, 0.0, closed = True)
+
+	for v in g.vias:
+		for diameter in (v.diameter, v.drill):
+			_write_group(file, (0, "CIRCLE"), (8, "Vias"), (10, f"{v.loc.x:.4f}"), (20, f"{-v.loc.y:.4f}"), (30, 0.0), (40, f"{diameter / 2:.4f}"))
+
+
+def write_dxf(file, items: list[tuple[str, Drawing]], polylines: bool = False, columns: int = None):
+	"""
+	Writes a DXF R12 drawing with one layer per copper layer. Every distinct coil is a block, inserted at its place on
+	the grid with its name below, see write_svg()
+	Args:
+		file: Open text file
+		items: (name, Drawing) per coil
+		polylines: Write traces as polylines of their width instead of center line arcs
+		columns: Cells per row of the grid
+	"""
+	drawings = [drawing for (_, drawing) in items]
+
+	if len(items) == 1:
+		offsets = [(0.0, 0.0)]
+	else:
+		(offsets, _) = get_layout(drawings, columns)
+
+	# layer list of the largest board
+	layer_names = max((d.geometry.layer_names for d in drawings), key = len)
+
+	_write_group(file, (0, "SECTION"), (2, "HEADER"), (9, "$ACADVER"), (1, "AC1009"), (0, "ENDSEC"))
+
+	_write_group(file, (0, "SECTION"), (2, "TABLES"), (0, "TABLE"), (2, "LAYER"), (70, len(layer_names) + 2))
+	for (index, name) in enumerate(layer_names):
+		_write_group(file, (0, "LAYER"), (2, get_dxf_layer(name)), (70, 0), (62, get_dxf_colour(index, len(layer_names))), (6, "CONTINUOUS"))
+	_write_group(file, (0, "LAYER"), (2, "Vias"), (70, 0), (62, 7), (6, "CONTINUOUS"))
+	_write_group(file, (0, "LAYER"), (2, "Labels"), (70, 0), (62, 7), (6, "CONTINUOUS"))
+	_write_group(file, (0, "ENDTAB"), (0, "ENDSEC"))
+
+	blocks = {}
+	_write_group(file, (0, "SECTION"), (2, "BLOCKS"))
+	for drawing in drawings:
+		if id(drawing) not in blocks:
+			blocks[id(drawing)] = "COIL" + str(len(blocks))
+			name = blocks[id(drawing)]
+			_write_group(file, (0, "BLOCK"), (8, 0), (2, name), (70, 0), (10, 0.0), (20, 0.0), (30, 0.0), (3, name))
+			_write_dxf_coil(file, drawing, polylines)
+			_write_group(file, (0, "ENDBLK"), (8, 0))
+	_write_group(file, (0, "ENDSEC"))
+
+	_write_group(file, (0, "SECTION"), (2, "ENTITIES"))
+	for ((name, drawing), (x, y)) in zip(items, offsets):
+		_write_group(file, (0, "INSERT"), (8, 0), (2, blocks[id(drawing)]), (10, f"{x:.4f}"), (20, f"{-y:.4f}"), (30, 0.0))
+
+		if len(items) > 1:
+			label_x = x + (drawing.bounds[0] + drawing.bounds[2]) / 2
+			label_y = y + drawing.bounds[3] + 1.5 * LABEL_HEIGHT
+			_write_group(file, (0, "TEXT"), (8, "Labels"), (10, f"{label_x:.4f}"), (20, f"{-label_y:.4f}"), (30, 0.0), (40, LABEL_HEIGHT), (1, name), (72, 1), (11, f"{label_x:.4f}"), (21, f"{-label_y:.4f}"), (31, 0.0))
+	_write_group(file, (0, "ENDSEC"), (0, "EOF"))
+
+
+def get_drawings(specs: list[dict], chord_tolerance: float = segments.CHORD_TOLERANCE, copper_layer_count: int = None) -> list[tuple[str, Drawing]]:
+	"""
+	Generates and prepares every distinct coil of a sweep once, specs with the same geometry share their Drawing
+	Args:
+		copper_layer_count: Copper layers of the board, defaults to the layers of the largest coil
+
+	Returns:
+		[(str, Drawing)]: (name, Drawing) per spec
+	"""
+	copper_layer_count = max([2, copper_layer_count or 0] + [spec["layer_count"] for spec in specs])
+	layer_names = coilgenerator.get_layer_names(copper_layer_count)
+
+	cache = {}
+	items = []
+	for spec in specs:
+		key = coilspec.get_key(spec)
+		if key not in cache:
+			cache[key] = Drawing(coilspec.generate_geometry(spec, layer_names), chord_tolerance)
+		items.append((spec["name"], cache[key]))
+
+	return items
+
+
+def write(path: str, items: list[tuple[str, Drawing]], polylines: bool = False, columns: int = None):
+	"""
+	Writes a single SVG or DXF sheet, the format follows the file extension
+	"""
+	with open(path, "w") as file:
+		if path.lower().endswith(".dxf"):
+			write_dxf(file, items, polylines, columns)
+		else:
+			write_svg(file, items, columns)
+
+
+def write_files(folder: str, items: list[tuple[str, Drawing]], extension: str = ".svg", polylines: bool = False) -> list[str]:
+	"""
+	Writes one file per coil into a folder
+	Returns:
+		[str]: Written paths
+	"""
+	os.makedirs(folder, exist_ok = True)
+
+	names = coilspec.get_file_names([{"name": name} for (name, _) in items], extension)
+	paths = [os.path.join(folder, name) for name in names]
+
+	for (path, item) in zip(paths, items):
+		write(path, [item], polylines)
+
+	return paths
@@ -0,0 +1,162 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# FastHenry input files of generated coils. The current path is walked from pad 1 to the other terminal, every trace
+# becomes a chain of nodes and segments, every via a vertical segment between its layers. Nodes and segments are
+# written per trace while walking, so memory does not grow with the number of segments.
+
+import os
+import concurrent.futures
+
+import numpy as np
+
+from . import segments
+from . import coilgenerator
+from . import spec as coilspec
+from . import stackup as coilstackup
+
+COPPER_CONDUCTIVITY = 5.8e4 # (S/mm)
+FREQUENCIES = (1e6, 20e6, 1) # (min, max, points per decade)
+
+
+class Writer:
+	"""
+	Numbers nodes and segments of one FastHenry file while they are written
+	"""
+
+	def __init__(self, file, stack: coilstackup.Stackup):
+		self.file = file
+		self.stack = stack
+		self.node_count = 0
+		self.segment_count = 0
+		self.last = None # (x, y, layer) of the last node
+
+	def add_nodes(self, points: np.ndarray, layer: int, width: float, height: float):
+		"""
+		Continues the path with a chain of nodes on one layer, connected by segments of given cross section.
+		A first point at the position of the last node is merged into it
+		"""
+		if self.last is not None and self.last[2] == layer and np.allclose(points[0], self.last[:2], atol = 10**-segments.POINT_DIGITS):
+			points = points[1:]
+
+		if len(points) == 0:
+			return
+
+		first = self.node_count + 1
+		ids = np.arange(first, first + len(points))
+		z = self.stack.get_layer_z(layer)
+
+		np.savetxt(self.file, np.column_stack((ids, points, np.full(len(points), z))), fmt = "N%d x=%.6f y=%.6f z=%.6f")
+
+		# the chain starts at the last node, unless this is the very first node
+		starts = ids - 1 if self.last is not None else ids[:-1]
+		ends = ids if self.last is not None else ids[1:]
+		count = len(starts)
+
+		if count:
+			edge_ids = np.arange(self.segment_count + 1, self.segment_count + 1 + count)
+			np.savetxt(self.file, np.column_stack((edge_ids, starts, ends)), fmt = "E%d N%d N%d w=" + format(width, ".6f") + " h=" + format(height, ".6f"))
+
+		self.node_count += len(points)
+		self.segment_count += count
+		self.last = (float(points[-1][0]), float(points[-1][1]), layer)
+
+	def write_path(self, geometry, chord_tolerance: float = segments.CHORD_TOLERANCE):
+		"""
+		Writes the whole current path of a coil
+		"""
+		for step in segments.iter_path(geometry, chord_tolerance):
+			if step[0] == "via":
+				(_, via, _, to_layer) = step
+
+				# the barrel as square conductor of the drill's width
+				self.add_nodes(np.array([[via.loc.x, via.loc.y]]), to_layer, via.drill, via.drill)
+			else:
+				(_, points, layer, width) = step
+				self.add_nodes(points, layer, width, self.stack.copper_thickness)
+
+
+def write(file, geometry, stack: coilstackup.Stackup, chord_tolerance: float = segments.CHORD_TOLERANCE, frequencies: tuple = FREQUENCIES, filaments: tuple = (1, 1), title: str = "coil") -> tuple[int, int]:
+	"""
+	Writes a FastHenry input file of a single coil, with one port between its terminals
+	Args:
+		file: Open text file
+		geometry: Coil geometry from coilgenerator.generate_geometry()
+		stack: Stackup providing z positions and copper thickness
+		chord_tolerance: Maximum deviation of arc chords from the arc (mm)
+		frequencies: (min, max, points per decade) of the frequency sweep (Hz)
+		filaments: (width, height) filaments per segment, more filaments resolve skin and proximity effect
+		title: Title line of the file
+
+	Returns:
+		(int, int): (node count, segment count)
+	"""
+	file.write("* " + title + "\n")
+	file.write(".units mm\n")
+	file.write(".default sigma={:g} nwinc={:d} nhinc={:d}\n".format(COPPER_CONDUCTIVITY, filaments[0], filaments[1]))
+
+	writer = Writer(file, stack)
+	writer.write_path(geometry, chord_tolerance)
+
+	file.write(".external N1 N{:d}\n".format(writer.node_count))
+	file.write(".freq fmin={:g} fmax={:g} ndec={:g}\n".format(*frequencies))
+	file.write(".end\n")
+
+	return (writer.node_count, writer.segment_count)
+
+
+def write_spec(path: str, spec: dict, stackup_data: dict = None, chord_tolerance: float = segments.CHORD_TOLERANCE, frequencies: tuple = FREQUENCIES, filaments: tuple = (1, 1), copper_layer_count: int = None) -> tuple[int, int]:
+	"""
+	Generates a coil from its spec and writes it as FastHenry input file, see write()
+	Args:
+		copper_layer_count: Copper layers of the board, defaults to the layers of the coil
+	"""
+	copper_layer_count = max(spec["layer_count"], 2, copper_layer_count or 0)
+	stack = coilstackup.from_dict(stackup_data, copper_layer_count)
+	geometry = coilspec.generate_geometry(spec, coilgenerator.get_layer_names(copper_layer_count))
+
+	with open(path, "w") as file:
+		return write(file, geometry, stack, chord_tolerance, frequencies, filaments, coilspec.to_string(spec))
+
+
+def _write_spec_task(task):
+	return write_spec(*task)
+
+
+def write_batch(specs: list[dict], folder: str, stackup_data: dict = None, chord_tolerance: float = segments.CHORD_TOLERANCE, frequencies: tuple = FREQUENCIES, filaments: tuple = (1, 1), copper_layer_count: int = None, workers: int = None) -> list[tuple[str, int, int]]:
+	"""
+	Writes one FastHenry input file per spec of a sweep, all coils on one board stackup
+	Args:
+		copper_layer_count: Copper layers of the board, defaults to the layers of the largest coil
+		workers: Number of worker processes, 1 writes in this process, None uses all CPUs
+
+	Returns:
+		[(str, int, int)]: (path, node count, segment count) per spec
+	"""
+	os.makedirs(folder, exist_ok = True)
+
+	paths = [os.path.join(folder, name) for name in coilspec.get_file_names(specs, ".inp")]
+	copper_layer_count = max([2, copper_layer_count or 0] + [spec["layer_count"] for spec in specs])
+	tasks = [(path, spec, stackup_data, chord_tolerance, frequencies, filaments, copper_layer_count) for (path, spec) in zip(paths, specs)]
+
+	if workers == 1 or len(tasks) < 2:
+		counts = [_write_spec_task(task) for task in tasks]
+	else:
+		with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+			counts = list(executor.map(_write_spec_task, tasks))
+
+	return [(path, nodes, edges) for (path, (nodes, edges)) in zip(paths, counts)]
@@ -149,6 +149,23 @@ def pad(pid: int, loc: P2D, width: float, height: float, layer: str) -> str:
 	)\n"""
 
 
+def relabel(items: list[str], layer: str) -> list[str]:
+	"""
+	Copies of lines and arcs generated by this module on another layer. Layer and uuid close every item, so only they
+	are written again and the coordinates are not formatted a second time
+
+	Args:
+		items: lines and arcs in string form
+		layer: new layer of the copies
+
+	Returns:
+		list of the copies in string form, each with a new uuid
+	"""
+	return [f"""{item[:item.rindex('(layer "')]}(layer "{layer}")
+		({get_uuid()})
+	)\n""" for item in items]
+
+
 def get_uuid() -> str:
 	"""
 	Timestamps in KiCAD are really just UUIDs that pcbnew can link back to later (I think?).
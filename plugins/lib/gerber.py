@@ -0,0 +1,324 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Fabrication files of coil test coupons without going through pcbnew: RS-274X Gerber per copper layer with native
+# G02/G03 arcs, the board outline, and an Excellon drill file for the vias. A sweep becomes one coupon with the grid of
+# drawing.get_layout(). Every distinct coil is converted to integer coordinates per layer and aperture once, each
+# placement only adds its offset and is written right away, so files are streamed instead of built in memory.
+
+import os
+import datetime
+import concurrent.futures
+
+import numpy as np
+
+from . import segments
+from . import drawing as coildrawing
+from . import spec as coilspec
+
+SOFTWARE = "pcb-coil-generator"
+COUPON_MARGIN = 3.0 # (mm) copper free border of a coupon inside its outline
+OUTLINE_WIDTH = 0.1 # (mm)
+ROUNDRECT_RATIO = 0.25 # corner radius of the pads relative to their smaller side, as in generator.get_pad()
+
+# coordinates are written in the 4.6 format, as integer nanometers
+UNITS = 1e6
+
+LINE_FORMAT = "X%dY%dD02*\nX%dY%dD01*\n"
+ARC_FORMATS = {
+	"G02": "X%dY%dD02*\nG02X%dY%dI%dJ%dD01*\n",
+	"G03": "X%dY%dD02*\nG03X%dY%dI%dJ%dD01*\n"
+}
+FLASH_FORMAT = "X%dY%dD03*\n"
+DRILL_FORMAT = "X%.4fY%.4f\n"
+
+# rounded rectangle of width $1, height $2 and corner radius $3 from two rectangles and four corner circles
+ROUNDRECT_MACRO = (
+	"%AMRoundRect*\n"
+	"21,1,$1-2x$3,$2,0,0,0*\n"
+	"21,1,$1,$2-2x$3,0,0,0*\n"
+	"1,1,2x$3,$1/2-$3,$2/2-$3*\n"
+	"1,1,2x$3,-$1/2+$3,$2/2-$3*\n"
+	"1,1,2x$3,-$1/2+$3,-$2/2+$3*\n"
+	"1,1,2x$3,$1/2-$3,-$2/2+$3*%\n"
+)
+
+
+def get_layer_extension(layer_name: str) -> str:
+	"""
+	Returns:
+		str: Protel style extension KiCad uses for the Gerber file of a copper layer
+	"""
+	if layer_name == "F.Cu":
+		return ".gtl"
+	if layer_name == "B.Cu":
+		return ".gbl"
+
+	return f".g{int(layer_name[2:-3]) + 1}"
+
+
+def get_layer_function(layer_name: str, layer_names: list[str]) -> str:
+	"""
+	Returns:
+		str: Value of the X2 FileFunction attribute of a copper layer
+	"""
+	position = layer_names.index(layer_name) + 1
+	side = "Top" if layer_name == "F.Cu" else "Bot" if layer_name == "B.Cu" else "Inr"
+
+	return f"Copper,L{position},{side}"
+
+
+def _get_aperture(kind: str, *size: float) -> str:
+	if kind == "C":
+		return f"C,{size[0]:.6f}"
+
+	(width, height) = size
+	return f"RoundRect,{width:.6f}X{height:.6f}X{ROUNDRECT_RATIO * min(width, height):.6f}"
+
+
+class CouponLayer:
+	"""
+	Copper of one coil on one layer, in Gerber orientation (y up) relative to the coil origin, grouped by aperture
+	"""
+
+	def __init__(self, coil: coildrawing.Drawing, layer: str):
+		g = coil.geometry
+
+		self.lines = {} # aperture -> (N, 4) start and end points
+		self.arcs = {} # (aperture, "G02" or "G03") -> (A, 6) start, end and center points
+		self.flashes = {} # aperture -> (F, 2) points
+
+		lines = [l for l in g.lines if l.layer == layer]
+		for width in sorted(set(l.width for l in lines)):
+			points = np.array([(l.start.x, l.start.y, l.end.x, l.end.y) for l in lines if l.width == width], dtype = float)
+			self.lines[_get_aperture("C", width)] = points * (1, -1, 1, -1)
+
+		indices = [i for (i, a) in enumerate(g.arcs) if a.layer == layer]
+		if indices:
+			(center_x, center_y, _, _, sweep) = coil.arc_params[indices].T
+			points = np.array([(g.arcs[i].start.x, g.arcs[i].start.y, g.arcs[i].end.x, g.arcs[i].end.y) for i in indices], dtype = float)
+			points = np.column_stack((points, center_x, center_y)) * (1, -1, 1, -1, 1, -1)
+			widths = np.array([g.arcs[i].width for i in indices])
+
+			# a positive sweep turns from +x towards +y, which is clockwise once y points up
+			for width in sorted(set(widths.tolist())):
+				for (code, mask) in (("G02", sweep > 0), ("G03", sweep <= 0)):
+					mask = mask & (widths == width)
+					if mask.any():
+						self.arcs[(_get_aperture("C", width), code)] = points[mask]
+
+		flashes = {}
+		for p in g.pads:
+			if p.layer == layer:
+				flashes.setdefault(_get_aperture("R", p.width, p.height), []).append((p.loc.x, -p.loc.y))
+
+		# vias connect all layers, their annular ring is on every copper layer of the board
+		for v in g.vias:
+			flashes.setdefault(_get_aperture("C", v.diameter), []).append((v.loc.x, -v.loc.y))
+
+		self.flashes = {aperture: np.array(points, dtype = float) for (aperture, points) in flashes.items()}
+
+	def get_apertures(self) -> set[str]:
+		return set(self.lines) | set(aperture for (aperture, _) in self.arcs) | set(self.flashes)
+
+	def write(self, file, codes: dict, offset: tuple[float, float]):
+		"""
+		Writes the copper of one placement
+		Args:
+			codes: D code per aperture
+			offset: Position of the coil origin in Gerber coordinates (mm)
+		"""
+		(x, y) = offset
+
+		for aperture in sorted(self.get_apertures(), key = codes.get):
+			file.write(f"D{codes[aperture]}*\n")
+
+			if aperture in self.lines:
+				points = np.rint((self.lines[aperture] + (x, y, x, y)) * UNITS).astype(np.int64)
+				file.write(LINE_FORMAT * len(points) % tuple(points.ravel().tolist()))
+
+			for code in ("G02", "G03"):
+				if (aperture, code) in self.arcs:
+					points = np.rint((self.arcs[(aperture, code)] + (x, y, x, y, x, y)) * UNITS).astype(np.int64)
+					# I and J are the signed offsets of the center from the start point
+					points[:, 4:6] -= points[:, 0:2]
+					file.write(ARC_FORMATS[code] * len(points) % tuple(points.ravel().tolist()))
+
+			if aperture in self.flashes:
+				points = np.rint((self.flashes[aperture] + (x, y)) * UNITS).astype(np.int64)
+				file.write(FLASH_FORMAT * len(points) % tuple(points.ravel().tolist()))
+
+
+def get_coupon(items: list[tuple[str, coildrawing.Drawing]], columns: int = None, margin: float = COUPON_MARGIN) -> tuple[list[tuple[float, float]], tuple[float, float]]:
+	"""
+	Grid of a coupon, see drawing.get_layout(), with a margin around it
+	Returns:
+		([(float, float)], (float, float)): (coil origin per item in Gerber coordinates, (coupon width, coupon height))
+	"""
+	(offsets, (width, height)) = coildrawing.get_layout([d for (_, d) in items], columns)
+	(width, height) = (width + 2 * margin, height + 2 * margin)
+
+	# the layout's y points down from the top edge, Gerber's y points up from the bottom edge
+	return ([(x + margin, height - margin - y) for (x, y) in offsets], (width, height))
+
+
+def _write_header(file, function: str, polarity: bool = True):
+	file.write(f"%TF.GenerationSoftware,{SOFTWARE}*%\n")
+	file.write(f"%TF.CreationDate,{datetime.datetime.now().astimezone().isoformat(timespec = 'seconds')}*%\n")
+	file.write(f"%TF.FileFunction,{function}*%\n")
+	if polarity:
+		file.write("%TF.FilePolarity,Positive*%\n")
+	file.write("%FSLAX46Y46*%\n%MOMM*%\n%LPD*%\nG01*\nG75*\n")
+
+
+def write_copper(file, items: list[tuple[str, coildrawing.Drawing]], offsets: list[tuple[float, float]], layer: str, layer_names: list[str]):
+	"""
+	Streams the Gerber file of one copper layer of a coupon
+	Args:
+		offsets: Coil origin per item in Gerber coordinates, see get_coupon()
+	"""
+	layers = {}
+	for (_, d) in items:
+		if id(d) not in layers:
+			layers[id(d)] = CouponLayer(d, layer)
+
+	apertures = sorted(set().union(*(l.get_apertures() for l in layers.values())))
+	codes = {aperture: 10 + index for (index, aperture) in enumerate(apertures)}
+
+	_write_header(file, get_layer_function(layer, layer_names))
+	if any(aperture.startswith("RoundRect") for aperture in apertures):
+		file.write(ROUNDRECT_MACRO)
+	for aperture in apertures:
+		file.write(f"%ADD{codes[aperture]}{aperture}*%\n")
+
+	for ((_, d), offset) in zip(items, offsets):
+		layers[id(d)].write(file, codes, offset)
+
+	file.write("M02*\n")
+
+
+def write_outline(file, size: tuple[float, float]):
+	"""
+	Writes the rectangular board outline of a coupon
+	"""
+	(width, height) = (round(size[0] * UNITS), round(size[1] * UNITS))
+
+	_write_header(file, "Profile,NP", polarity = False)
+	file.write(f"%ADD10C,{OUTLINE_WIDTH:.6f}*%\nD10*\n")
+	file.write(f"X0Y0D02*\nX{width}Y0D01*\nX{width}Y{height}D01*\nX0Y{height}D01*\nX0Y0D01*\n")
+	file.write("M02*\n")
+
+
+def write_drill(file, items: list[tuple[str, coildrawing.Drawing]], offsets: list[tuple[float, float]], layer_count: int):
+	"""
+	Streams the Excellon file of the plated via holes of a coupon, one tool per drill diameter
+	"""
+	holes = {}
+	for (_, d) in items:
+		if id(d) not in holes:
+			holes[id(d)] = {}
+			for v in d.geometry.vias:
+				holes[id(d)].setdefault(v.drill, []).append((v.loc.x, -v.loc.y))
+			holes[id(d)] = {drill: np.array(points, dtype = float) for (drill, points) in holes[id(d)].items()}
+
+	drills = sorted(set().union(*(h.keys() for h in holes.values())))
+
+	file.write("M48\n")
+	file.write(f"; DRILL file {{{SOFTWARE}}} date {datetime.datetime.now().astimezone().isoformat(timespec = 'seconds')}\n")
+	file.write("; FORMAT={-:-/ absolute / metric / decimal}\n")
+	file.write(f"; #@! TF.FileFunction,Plated,1,{layer_count},PTH\n")
+	file.write("FMAT,2\nMETRIC\n")
+	for (index, drill) in enumerate(drills):
+		file.write(f"; #@! TA.AperFunction,Plated,PTH,ViaDrill\nT{index + 1}C{drill:.3f}\n")
+	file.write("%\nG90\nG05\n")
+
+	for (index, drill) in enumerate(drills):
+		file.write(f"T{index + 1}\n")
+		for ((_, d), offset) in zip(items, offsets):
+			points = holes[id(d)].get(drill)
+			if points is not None:
+				file.write(DRILL_FORMAT * len(points) % tuple((points + offset).ravel().tolist()))
+
+	file.write("M30\n")
+
+
+def write_coupon(folder: str, name: str, items: list[tuple[str, coildrawing.Drawing]], columns: int = None, margin: float = COUPON_MARGIN) -> list[str]:
+	"""
+	Writes the files of one coupon, named like KiCad's plot output
+	Returns:
+		[str]: Written paths
+	"""
+	(offsets, size) = get_coupon(items, columns, margin)
+	layer_names = items[0][1].geometry.layer_names
+	used = set(layer for (_, d) in items for layer in d.layer_names)
+	has_vias = any(d.geometry.vias for (_, d) in items)
+
+	paths = []
+	for layer in layer_names:
+		# vias reach every layer of the board, layers without traces or pads still carry their rings
+		if layer in used or has_vias:
+			paths.append(os.path.join(folder, f"{name}-{layer.replace('.', '_')}{get_layer_extension(layer)}"))
+			with open(paths[-1], "w") as file:
+				write_copper(file, items, offsets, layer, layer_names)
+
+	paths.append(os.path.join(folder, f"{name}-Edge_Cuts.gm1"))
+	with open(paths[-1], "w") as file:
+		write_outline(file, size)
+
+	if has_vias:
+		paths.append(os.path.join(folder, f"{name}-PTH.drl"))
+		with open(paths[-1], "w") as file:
+			write_drill(file, items, offsets, len(layer_names))
+
+	return paths
+
+
+def _write_coupon_task(task) -> list[str]:
+	(folder, name, specs, columns, margin, copper_layer_count) = task
+
+	return write_coupon(folder, name, coildrawing.get_drawings(specs, segments.CHORD_TOLERANCE, copper_layer_count), columns, margin)
+
+
+def write_batch(specs: list[dict], folder: str, name: str = "coupon", split: bool = False, columns: int = None, margin: float = COUPON_MARGIN, copper_layer_count: int = None, workers: int = None) -> list[str]:
+	"""
+	Writes the Gerber and drill files of a sweep, all coils on one coupon or one coupon per spec
+	Args:
+		name: File name prefix of the coupon, unused with split
+		split: One coupon per spec, named after the spec
+		copper_layer_count: Copper layers of the board, defaults to the layers of the largest coil
+		workers: Number of worker processes for split coupons, 1 writes in this process, None uses all CPUs
+
+	Returns:
+		[str]: Written paths
+	"""
+	os.makedirs(folder, exist_ok = True)
+
+	# all coupons share the board of the largest coil
+	copper_layer_count = max([2, copper_layer_count or 0] + [spec["layer_count"] for spec in specs])
+
+	if split:
+		names = coilspec.get_file_names(specs)
+		tasks = [(folder, file_name, [spec], None, margin, copper_layer_count) for (file_name, spec) in zip(names, specs)]
+	else:
+		tasks = [(folder, name, specs, columns, margin, copper_layer_count)]
+
+	if workers == 1 or len(tasks) < 2:
+		return [path for task in tasks for path in _write_coupon_task(task)]
+
+	# workers generate their coils themselves, only the specs are sent to them
+	with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+		return [path for paths in executor.map(_write_coupon_task, tasks) for path in paths]
@@ -0,0 +1,223 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Inductance estimates of a single coil, without generating its geometry.
+# Every layer is a circular spiral, estimated with the current sheet approximation of the modified Wheeler formula
+# (Mohan et al., "Simple Accurate Expressions for Planar Spiral Inductances", 1999, see also coil32.net/pcb-coil.html).
+# Layers couple through the mutual inductance of their turns, treated as coaxial circular filaments (Maxwell).
+# All functions broadcast over numpy arrays, so many designs can be estimated at once. Designs whose turns do not fit
+# into their outer diameter are estimated as NaN, without numpy warnings, see get_feasible().
+
+import numpy as np
+
+from . import coilgenerator
+
+MU_0 = 4e-7 * np.pi
+
+# current sheet coefficients for circular spirals
+C1 = 1.00
+C2 = 2.46
+C3 = 0.00
+C4 = 0.20
+
+AGM_ITERATIONS = 12
+MUTUAL_BLOCK = 1 << 22 # loop pairs evaluated at once by get_layer_mutuals()
+
+
+def get_spiral_radii(turns_per_layer, trace_width, trace_spacing, outer_diameter):
+	"""
+	Centerline radii of the first and last turn of a spiral, as placed by coilgenerator.generate_coil_spiral
+	Returns:
+		(float, float): (inner radius, outer radius) (mm)
+	"""
+	return coilgenerator.get_spiral_radii(outer_diameter, turns_per_layer, trace_width, trace_spacing)
+
+
+def get_feasible(turns_per_layer, trace_width, trace_spacing, outer_diameter):
+	"""
+	Designs the estimates hold for: at least one turn, a positive trace width and turns that fit into the outer
+	diameter, so the innermost turn has a positive radius
+	Returns:
+		np.ndarray: bool per design
+	"""
+	(inner, _) = get_spiral_radii(turns_per_layer, trace_width, trace_spacing, outer_diameter)
+
+	return (np.asarray(turns_per_layer) >= 1) & (np.asarray(trace_width) > 0) & (np.asarray(inner) > 0)
+
+
+def get_feasible_radii(turns_per_layer, trace_width, trace_spacing, outer_diameter):
+	"""
+	Spiral radii, see get_spiral_radii(), NaN for designs that are not feasible
+	Returns:
+		(float, float): (inner radius, outer radius) (mm)
+	"""
+	(inner, outer) = get_spiral_radii(turns_per_layer, trace_width, trace_spacing, outer_diameter)
+	feasible = get_feasible(turns_per_layer, trace_width, trace_spacing, outer_diameter)
+
+	return (np.where(feasible, inner, np.nan)[()], np.where(feasible, outer, np.nan)[()])
+
+
+def get_layer_inductance(turns_per_layer, trace_width, trace_spacing, outer_diameter):
+	"""
+	Self inductance of a single spiral layer (current sheet approximation)
+	Returns:
+		float: Inductance (H), NaN if the design is not feasible
+	"""
+	(inner, outer) = get_feasible_radii(turns_per_layer, trace_width, trace_spacing, outer_diameter)
+
+	d_out = 2 * outer + trace_width
+	d_in = np.maximum(2 * inner - trace_width, 0)
+	d_avg = (d_out + d_in) / 2
+	fill = (d_out - d_in) / (d_out + d_in)
+
+	return MU_0 * turns_per_layer**2 * d_avg * 1e-3 * C1 / 2 * (np.log(C2 / fill) + C3 * fill + C4 * fill**2)
+
+
+def get_elliptic_integrals(m):
+	"""
+	Complete elliptic integrals of the first and second kind, by arithmetic-geometric mean
+	Args:
+		m: Parameter m = k^2, 0 <= m < 1
+
+	Returns:
+		(np.ndarray, np.ndarray): (K(m), E(m))
+	"""
+	m = np.asarray(m, dtype = float)
+	a = np.ones_like(m)
+	b = np.sqrt(1 - m)
+	c = np.sqrt(m)
+	total = c * c / 2
+	power = 0.5
+
+	for _ in range(AGM_ITERATIONS):
+		c = (a - b) / 2
+		(a, b) = ((a + b) / 2, np.sqrt(a * b))
+		power *= 2
+		total = total + power * c * c
+
+	k = np.pi / (2 * a)
+
+	return (k, k * (1 - total))
+
+
+def get_loop_mutual(radius_a, radius_b, distance):
+	"""
+	Mutual inductance of two coaxial circular filaments (Maxwell)
+	Args:
+		radius_a: Radius of first loop (mm)
+		radius_b: Radius of second loop (mm)
+		distance: Axial distance of the loops (mm), must be > 0 for equal radii
+
+	Returns:
+		float: Mutual inductance (H), NaN if a radius is not positive
+	"""
+	radius_a = np.where(np.asarray(radius_a) > 0, radius_a, np.nan)
+	radius_b = np.where(np.asarray(radius_b) > 0, radius_b, np.nan)
+
+	m = 4 * radius_a * radius_b / ((radius_a + radius_b)**2 + distance**2)
+	k = np.sqrt(m)
+	(elliptic_k, elliptic_e) = get_elliptic_integrals(m)
+
+	return MU_0 * np.sqrt(radius_a * radius_b) * 1e-3 * ((2 / k - k) * elliptic_k - 2 / k * elliptic_e)
+
+
+def get_layer_mutual(turns_per_layer, trace_width, trace_spacing, outer_diameter, distance):
+	"""
+	Mutual inductance of two identical spiral layers, as sum over all turn pairs.
+	Only works on a single design, turn counts differ between designs
+	Args:
+		distance: Axial distance of the layers (mm)
+
+	Returns:
+		float: Mutual inductance (H), NaN if the design is not feasible
+	"""
+	if not get_feasible(turns_per_layer, trace_width, trace_spacing, outer_diameter):
+		return float("nan")
+
+	(inner, _) = get_spiral_radii(turns_per_layer, trace_width, trace_spacing, outer_diameter)
+	radii = inner + (np.arange(turns_per_layer) + 0.5) * (trace_width + trace_spacing)
+
+	return float(np.sum(get_loop_mutual(radii[:, None], radii[None, :], distance)))
+
+
+def get_layer_mutuals(turns_per_layer, trace_width, trace_spacing, outer_diameter, distances) -> np.ndarray:
+	"""
+	Mutual inductance of two identical spiral layers for many designs and layer distances at once, see
+	get_layer_mutual(). Turns are padded to the largest turn count and masked, designs are evaluated in blocks
+	Args:
+		turns_per_layer, trace_width, trace_spacing, outer_diameter: (D,) design parameters
+		distances: (K,) axial distances of the layers (mm)
+
+	Returns:
+		np.ndarray: (D, K) mutual inductance (H), NaN for designs that are not feasible
+	"""
+	turns = np.asarray(turns_per_layer, dtype = int)
+	distances = np.asarray(distances, dtype = float)
+	pitch = np.asarray(trace_width, dtype = float) + trace_spacing
+
+	(inner, _) = get_feasible_radii(turns, trace_width, trace_spacing, outer_diameter)
+	index = np.arange(max(int(turns.max(initial = 0)), 1))
+	radii = np.asarray(inner, dtype = float)[:, None] + (index + 0.5) * pitch[:, None]
+	valid = index < turns[:, None]
+
+	result = np.zeros((len(turns), len(distances)))
+	block = max(MUTUAL_BLOCK // (len(index)**2 * max(len(distances), 1)), 1)
+
+	for start in range(0, len(turns), block):
+		(r, v) = (radii[start:start + block], valid[start:start + block])
+		loops = get_loop_mutual(r[:, None, :, None], r[:, None, None, :], distances[None, :, None, None])
+		result[start:start + block] = np.where(v[:, None, :, None] & v[:, None, None, :], loops, 0).sum(axis = (-2, -1))
+
+	result[~get_feasible(turns, trace_width, trace_spacing, outer_diameter)] = np.nan
+
+	return result
+
+
+def estimate_inductance(spec: dict, layer_z: list[float]) -> float:
+	"""
+	Estimates the total inductance of a coil, all layers in series with the same winding sense
+	Args:
+		spec: Coil spec
+		layer_z: z position of each coil layer (mm), see stackup.Stackup.layer_z
+
+	Returns:
+		float: Inductance (H)
+	Raises:
+		ValueError: If the design is not feasible, see get_feasible()
+	"""
+	turns = spec["turns_count"]
+	width = spec["trace_width"]
+	spacing = spec["trace_spacing"]
+	diameter = spec["outer_diameter"]
+	layer_count = spec["layer_count"]
+
+	if not get_feasible(turns, width, spacing, diameter):
+		raise ValueError(str(spec.get("name")) + ": turns do not fit into the outer diameter, the innermost turn has no positive radius")
+
+	inductance = layer_count * float(get_layer_inductance(turns, width, spacing, diameter))
+
+	# the coupling of a layer pair only depends on their distance
+	distances = {}
+	for i in range(layer_count):
+		for j in range(i + 1, layer_count):
+			distance = round(abs(layer_z[i] - layer_z[j]), 9)
+			distances[distance] = distances.get(distance, 0) + 1
+
+	for (distance, count) in distances.items():
+		inductance += 2 * count * get_layer_mutual(turns, width, spacing, diameter, distance)
+
+	return inductance
@@ -0,0 +1,324 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# The project's coil footprint library. A manifest in the library folder maps every footprint file to the hash of the
+# coil design it holds, so a design is stored only once and a name is never reused for a different design. Files
+# edited by hand are found by their modification time and size and only those are read again.
+
+import os
+import re
+import json
+import hashlib
+
+from . import spec as coilspec
+from . import sexpr
+from . import coilgenerator
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+FOOTPRINT_EXTENSION = ".kicad_mod"
+
+# entry of the library in the project's fp-lib-table
+LIBRARY_NAME = "PCB Coils"
+LIBRARY_FOLDER = "pcb_coils"
+LIBRARY_DESCRIPTION = "auto-generated coil footprints"
+LIB_TABLE_FILE = "fp-lib-table"
+
+# footprint files can be large, only the needed atoms are scanned instead of parsing the whole file
+SPEC_PATTERN = re.compile(r'\(property\s+"CoilSpec"\s+"([^"]*)"')
+LAYER_PATTERN = re.compile(r'\(layers?\s+"([^"*]+\.Cu)"')
+
+
+def get_layer_order(name: str) -> int:
+	"""
+	Returns:
+		int: Position of a copper layer from top to bottom, for sorting
+	"""
+	if name == "F.Cu":
+		return 0
+	if name == "B.Cu":
+		return 1 << 16
+
+	return int(name[2:-3])
+
+
+def get_design_hash(spec_string: str, layers: list[str]) -> str:
+	"""
+	Identity of a coil design: its parameters and the copper layers it occupies, independent of its name
+	Args:
+		spec_string: Parameters as stored in the CoilSpec property
+		layers: Copper layer names the coil uses
+
+	Returns:
+		str: Hex digest
+	"""
+	text = spec_string + " layers=" + ",".join(sorted(set(layers), key = get_layer_order))
+
+	return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def get_spec_hash(spec: dict, layer_names: list[str]) -> str:
+	"""
+	Design hash of a spec generated on a board with the given copper layers, see get_design_hash()
+	"""
+	return get_design_hash(coilspec.to_string(spec), layer_names[:spec["layer_count"]])
+
+
+def get_stats(spec: dict, layer_names: list[str]) -> dict:
+	"""
+	Returns:
+		dict: Short summary of a design stored in the manifest
+	"""
+	metrics = coilspec.generate_metrics(spec, layer_names)
+
+	return {
+		"layer_count": spec["layer_count"],
+		"turns_count": spec["turns_count"],
+		"outer_diameter": spec["outer_diameter"],
+		"trace_length": round(metrics.get_total_trace_length(), 4),
+		"bounds": [round(value, 4) for value in metrics.bounds],
+		"via_count": len(metrics.vias)
+	}
+
+
+def read_footprint(path: str) -> tuple[str, list[str]]:
+	"""
+	Reads the CoilSpec property and the copper layers of a footprint file
+	Returns:
+		(str, [str]): (spec string or None if the footprint is no generated coil, copper layers)
+	"""
+	with open(path, "r", encoding = "utf-8") as file:
+		text = file.read()
+
+	match = SPEC_PATTERN.search(text)
+	if match is None:
+		return (None, [])
+
+	# the footprint itself is placed on F.Cu, its primitives name the layers the coil occupies
+	layers = set(LAYER_PATTERN.findall(text, match.end()))
+
+	return (match.group(1), sorted(layers, key = get_layer_order))
+
+
+def add_to_lib_table(path: str, name: str = LIBRARY_NAME, uri: str = "${KIPRJMOD}/" + LIBRARY_FOLDER + "/", description: str = LIBRARY_DESCRIPTION) -> bool:
+	"""
+	Adds a KiCad library to a fp-lib-table, creating the table if needed. Idempotent: a library with the same name
+	and uri is kept as is, one with a stale uri gets the new one. All other entries keep their content
+	Returns:
+		bool: True if the table was written
+	"""
+	if os.path.exists(path):
+		with open(path, "r", encoding = "utf-8") as file:
+			table = sexpr.parse(file.read())
+	else:
+		table = ["fp_lib_table", ["version", "7"]]
+
+	entry = next((entry for entry in sexpr.find_all(table, "lib") if sexpr.get_value(entry, "name") == name), None)
+
+	if entry is None:
+		table.append(["lib", ["name", sexpr.String(name)], ["type", sexpr.String("KiCad")], ["uri", sexpr.String(uri)], ["options", sexpr.String("")], ["descr", sexpr.String(description)]])
+	elif sexpr.get_value(entry, "uri") == uri:
+		return False
+	elif sexpr.find(entry, "uri") is not None:
+		sexpr.find(entry, "uri")[1:] = [sexpr.String(uri)]
+	else:
+		entry.append(["uri", sexpr.String(uri)])
+
+	# written next to the table and renamed, so KiCad never reads a partly written table
+	temporary_path = path + ".tmp"
+	with open(temporary_path, "w", encoding = "utf-8") as file:
+		file.write(sexpr.dump(table) + "\n")
+
+	os.replace(temporary_path, path)
+
+	return True
+
+
+class Library:
+	"""
+	Footprint folder with its manifest. Lookups by design hash and by file name are dict lookups
+	"""
+
+	def __init__(self, folder: str):
+		self.folder = folder
+		self.manifest_path = os.path.join(folder, MANIFEST_FILE)
+		self.files = {} # file name -> entry
+		self.designs = {} # design hash -> file name
+
+		self._load_manifest()
+
+	def _load_manifest(self):
+		try:
+			with open(self.manifest_path, "r") as file:
+				data = json.load(file)
+		except (OSError, ValueError):
+			return
+
+		if data.get("version") == MANIFEST_VERSION:
+			self.files = data.get("files", {})
+			self._index()
+
+	def _index(self):
+		self.designs = {}
+
+		# sorted, so the same file answers for a design that is stored more than once by hand
+		for (file_name, entry) in sorted(self.files.items()):
+			if entry.get("hash") is not None:
+				self.designs.setdefault(entry["hash"], file_name)
+
+	def save_manifest(self):
+		os.makedirs(self.folder, exist_ok = True)
+
+		# written next to the manifest and renamed, so an interrupted save keeps the previous manifest
+		temporary_path = self.manifest_path + ".tmp"
+		with open(temporary_path, "w") as file:
+			json.dump({"version": MANIFEST_VERSION, "files": self.files}, file, indent = 4, sort_keys = True)
+
+		os.replace(temporary_path, self.manifest_path)
+
+	def refresh(self) -> tuple[int, int]:
+		"""
+		Brings the manifest up to date with the folder. Only files that are new or changed in modification time or
+		size are read
+		Returns:
+			(int, int): (read files, removed files)
+		"""
+		if not os.path.isdir(self.folder):
+			self.files = {}
+			self.designs = {}
+
+			return (0, 0)
+
+		present = {}
+		with os.scandir(self.folder) as entries:
+			for entry in entries:
+				if entry.is_file() and entry.name.endswith(FOOTPRINT_EXTENSION):
+					stat = entry.stat()
+					present[entry.name] = (stat.st_mtime, stat.st_size)
+
+		removed = [file_name for file_name in self.files if file_name not in present]
+		for file_name in removed:
+			del self.files[file_name]
+
+		read = 0
+		for (file_name, (mtime, size)) in present.items():
+			entry = self.files.get(file_name)
+			if entry is not None and entry.get("mtime") == mtime and entry.get("size") == size:
+				continue
+
+			self.files[file_name] = self._read_entry(file_name, mtime, size)
+			read += 1
+
+		if read or removed:
+			self._index()
+			self.save_manifest()
+
+		return (read, len(removed))
+
+	def _read_entry(self, file_name: str, mtime: float, size: int) -> dict:
+		name = file_name[:-len(FOOTPRINT_EXTENSION)]
+		(spec_string, layers) = read_footprint(os.path.join(self.folder, file_name))
+
+		entry = {"name": name, "mtime": mtime, "size": size, "hash": None}
+		if spec_string is None:
+			# foreign footprints are kept in the manifest, so they are not read again
+			return entry
+
+		entry.update({"hash": get_design_hash(spec_string, layers), "spec": spec_string, "layers": layers})
+
+		try:
+			spec = coilspec.from_string(spec_string, name)
+			entry["stats"] = get_stats(spec, coilgenerator.get_layer_names(max(2, spec["layer_count"])))
+		except (ValueError, KeyError, ZeroDivisionError):
+			entry["stats"] = None
+
+		return entry
+
+	def find(self, design_hash: str) -> str:
+		"""
+		Returns:
+			str: Footprint file holding a design, None if it is not stored
+		"""
+		return self.designs.get(design_hash)
+
+	def get_entry(self, file_name: str) -> dict:
+		return self.files.get(file_name)
+
+	def get_specs(self) -> list[dict]:
+		"""
+		Returns:
+			[dict]: Specs of all stored coils sorted by file name, named like their footprints. Call refresh() first
+		"""
+		specs = []
+		for (file_name, entry) in sorted(self.files.items()):
+			if entry.get("spec") is None:
+				continue
+
+			try:
+				specs.append(coilspec.from_string(entry["spec"], entry["name"]))
+			except (ValueError, KeyError):
+				continue
+
+		return specs
+
+	def get_collision(self, file_name: str, design_hash: str) -> dict:
+		"""
+		Returns:
+			dict: Entry of a different design already stored under this file name, None if the name is free
+		"""
+		entry = self.files.get(file_name)
+		if entry is None or entry.get("hash") == design_hash:
+			return None
+
+		return entry
+
+	def add(self, file_name: str, template: str, spec: dict, layer_names: list[str], save: bool = True) -> dict:
+		"""
+		Writes a generated footprint and records it in the manifest
+		Args:
+			file_name: Footprint file name inside the folder
+			template: Footprint text
+			spec: Spec the footprint was generated from
+			layer_names: Copper layers of the board it was generated for
+			save: Write the manifest, batches save it once after their last footprint
+
+		Returns:
+			dict: Manifest entry
+		"""
+		os.makedirs(self.folder, exist_ok = True)
+		path = os.path.join(self.folder, file_name)
+
+		with open(path, "w", encoding = "utf-8") as file:
+			file.write(template)
+
+		stat = os.stat(path)
+		entry = {
+			"name": file_name[:-len(FOOTPRINT_EXTENSION)],
+			"mtime": stat.st_mtime,
+			"size": stat.st_size,
+			"hash": get_spec_hash(spec, layer_names),
+			"spec": coilspec.to_string(spec),
+			"layers": layer_names[:spec["layer_count"]],
+			"stats": get_stats(spec, layer_names)
+		}
+
+		self.files[file_name] = entry
+		self._index()
+		if save:
+			self.save_manifest()
+
+		return entry
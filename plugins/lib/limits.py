@@ -0,0 +1,107 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Closed form limits of coilgenerator.estimate_is_coil_generatable(). With the inner via radius
+#     r = D / 2 - N * (w + s) - v - w                          (get_via_radius)
+# the estimate holds if the inner vias fit on half the circumference of that radius
+#     pi * r >= n * (v + w),  n = ceil(L / 2) inner vias       (get_num_vias)
+# which also makes r positive. Solving for one parameter with all others fixed gives its limit.
+# All functions work on numbers and numpy arrays.
+
+import math
+
+from . import coilgenerator
+
+
+def get_max_turns(layer_count, trace_width, trace_spacing, via_diameter, outer_diameter):
+	"""
+	Returns:
+		float: Largest whole number of turns per layer that passes the estimate, below 1 if none does
+	"""
+	(via_count, _) = coilgenerator.get_num_vias(layer_count)
+	free = outer_diameter / 2 - via_diameter - trace_width - via_count * (via_diameter + trace_width) / math.pi
+
+	return free // (trace_width + trace_spacing)
+
+
+def get_min_outer_diameter(layer_count, turns_per_layer, trace_width, trace_spacing, via_diameter):
+	"""
+	Returns:
+		float: Smallest outer diameter that passes the estimate
+	"""
+	(via_count, _) = coilgenerator.get_num_vias(layer_count)
+
+	return 2 * (turns_per_layer * (trace_width + trace_spacing) + via_diameter + trace_width + via_count * (via_diameter + trace_width) / math.pi)
+
+
+def get_max_trace_width(layer_count, turns_per_layer, trace_spacing, via_diameter, outer_diameter):
+	"""
+	Returns:
+		float: Largest trace width that passes the estimate at the given spacing, not positive if none does
+	"""
+	share = coilgenerator.get_num_vias(layer_count)[0] / math.pi
+
+	return (outer_diameter / 2 - turns_per_layer * trace_spacing - via_diameter * (1 + share)) / (turns_per_layer + 1 + share)
+
+
+def get_max_trace_spacing(layer_count, turns_per_layer, trace_width, via_diameter, outer_diameter):
+	"""
+	Returns:
+		float: Largest trace spacing that passes the estimate, negative if none does
+	"""
+	(via_count, _) = coilgenerator.get_num_vias(layer_count)
+	free = outer_diameter / 2 - via_diameter - trace_width - via_count * (via_diameter + trace_width) / math.pi
+
+	return free / turns_per_layer - trace_width
+
+
+def get_max_via_diameter(layer_count, turns_per_layer, trace_width, trace_spacing, outer_diameter):
+	"""
+	Returns:
+		float: Largest via outer diameter that passes the estimate, not positive if none does
+	"""
+	share = coilgenerator.get_num_vias(layer_count)[0] / math.pi
+
+	return (outer_diameter / 2 - turns_per_layer * (trace_width + trace_spacing) - trace_width * (1 + share)) / (1 + share)
+
+
+def get_max_layers(turns_per_layer, trace_width, trace_spacing, via_diameter, outer_diameter):
+	"""
+	Returns:
+		float: Largest layer count that passes the estimate, 0 if none does
+	"""
+	(radius, _) = coilgenerator.get_via_radius(outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter)
+	via_count = math.pi * radius / (via_diameter + trace_width) // 1
+
+	# n = ceil(L / 2) inner vias fit up to L = 2 * n layers
+	return 2 * via_count * (radius > 0)
+
+
+def get_limits(layer_count, turns_per_layer, trace_width, trace_spacing, via_diameter, outer_diameter) -> dict:
+	"""
+	Limit of every parameter with the others held fixed
+	Returns:
+		dict: ("max" or "min", limit) keyed by the menu ids of the parameters
+	"""
+	return {
+		"turns_count": ("max", int(get_max_turns(layer_count, trace_width, trace_spacing, via_diameter, outer_diameter))),
+		"outer_diameter": ("min", get_min_outer_diameter(layer_count, turns_per_layer, trace_width, trace_spacing, via_diameter)),
+		"trace_width": ("max", get_max_trace_width(layer_count, turns_per_layer, trace_spacing, via_diameter, outer_diameter)),
+		"trace_spacing": ("max", get_max_trace_spacing(layer_count, turns_per_layer, trace_width, via_diameter, outer_diameter)),
+		"via_outer": ("max", get_max_via_diameter(layer_count, turns_per_layer, trace_width, trace_spacing, outer_diameter)),
+		"layer_count": ("max", int(get_max_layers(turns_per_layer, trace_width, trace_spacing, via_diameter, outer_diameter)))
+	}
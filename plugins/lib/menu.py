@@ -29,6 +29,36 @@ structure = [
         "datatype" : "float",
 		"unit" : "mm"
 	},{
+        "id" : "shape",
+		"type" : "choices",
+		"label" : "shape",
+		"choices" : ["circle", "rounded rectangle", "stadium", "polygon"],
+        "choices_data" : ["circle", "rectangle", "stadium", "polygon"],
+		"default" : 0,
+        "datatype" : "str",
+		"unit" : None
+	},{
+        "id" : "outer_height",
+		"type" : "text",
+		"label" : "outer height",
+		"default" : 12.0,
+        "datatype" : "float",
+		"unit" : "mm"
+	},{
+        "id" : "corner_radius",
+		"type" : "text",
+		"label" : "corner radius",
+		"default" : 1.0,
+        "datatype" : "float",
+		"unit" : "mm"
+	},{
+        "id" : "polygon_sides",
+		"type" : "text",
+		"label" : "polygon sides",
+		"default" : 6,
+        "datatype" : "int",
+		"unit" : None
+	},{
         "id" : "turn_direction",
 		"type" : "choices",
 		"label" : "turn direction",
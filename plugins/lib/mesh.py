@@ -0,0 +1,317 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# 3D copper model of generated coils as VRML, the format KiCad's 3D viewer loads for footprints. Every trace becomes
+# a strip of the trace width extruded by the copper thickness, with all arcs of a layer tessellated and extruded at
+# once into one shared vertex buffer. Vias are one mesh per via shape (barrel plus annular rings) that is placed by
+# reference. Layers are built and written one after another, so memory is bounded by the largest layer.
+# Copper foil i spans z = stackup.get_layer_z(i) ... + copper thickness, z is up and y is flipped to point up as well.
+
+import os
+import concurrent.futures
+
+import numpy as np
+
+from . import segments
+from . import coilgenerator
+from . import spec as coilspec
+from . import stackup as coilstackup
+
+VRML_SCALE = 1 / 2.54 # KiCad's VRML unit is 0.1 inch
+COPPER_COLOUR = (0.81, 0.58, 0.24)
+VIA_COLOUR = (0.75, 0.75, 0.75)
+NUMBER_FORMAT = "%.5g"
+
+# faces of one strip segment between points a and b, in vertex numbers of a point:
+# 0 outer top, 1 inner top, 2 outer bottom, 3 inner bottom, a + 4 is the same vertex of b
+SEGMENT_FACES = np.array([
+	(0, 4, 5), (0, 5, 1), # top
+	(2, 7, 6), (2, 3, 7), # bottom
+	(0, 2, 6), (0, 6, 4), # outer wall
+	(1, 5, 7), (1, 7, 3) # inner wall
+])
+CAP_FACES = np.array([(0, 1, 3), (0, 3, 2)])
+
+
+def get_strip_mesh(points: np.ndarray, normals: np.ndarray, widths: np.ndarray, strip_ids: np.ndarray, z_bottom: float, thickness: float) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Extrudes many strips at once
+	Args:
+		points: (P, 2) center line points of all strips, the points of a strip are consecutive
+		normals: (P, 2) unit normals of the center line
+		widths: (P,) strip width per point
+		strip_ids: (P,) strip of every point
+		z_bottom: Bottom face of the strips
+		thickness: Height of the strips
+
+	Returns:
+		(np.ndarray, np.ndarray): ((4P, 3) vertices, (F, 3) vertex indices of the triangles)
+	"""
+	offset = normals * (widths / 2)[:, None]
+	outer = points + offset
+	inner = points - offset
+
+	vertices = np.empty((len(points), 4, 3))
+	vertices[:, 0, :2] = outer
+	vertices[:, 1, :2] = inner
+	vertices[:, 2, :2] = outer
+	vertices[:, 3, :2] = inner
+	vertices[:, :2, 2] = z_bottom + thickness
+	vertices[:, 2:, 2] = z_bottom
+
+	# a segment joins each point to the next one of the same strip
+	starts = np.flatnonzero(strip_ids[:-1] == strip_ids[1:])
+	faces = (4 * starts[:, None, None] + SEGMENT_FACES[None]).reshape(-1, 3)
+
+	first = np.flatnonzero(np.concatenate(([True], strip_ids[1:] != strip_ids[:-1])))
+	last = np.concatenate((first[1:] - 1, [len(points) - 1]))
+	caps = (4 * np.concatenate((first, last))[:, None, None] + CAP_FACES[None]).reshape(-1, 3)
+
+	return (vertices.reshape(-1, 3), np.concatenate((faces, caps)))
+
+
+def get_ring_mesh(inner_radius: float, outer_radius: float, z_bottom: float, z_top: float, sides: int) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Annulus extruded from z_bottom to z_top around the origin
+	Returns:
+		(np.ndarray, np.ndarray): (vertices, triangles)
+	"""
+	angles = np.linspace(0, 2 * np.pi, sides + 1)
+	circle = np.column_stack((np.cos(angles), np.sin(angles)))
+
+	# a closed strip along the ring's mid circle, its normals point outwards
+	radius = (inner_radius + outer_radius) / 2
+	return get_strip_mesh(circle * radius, circle, np.full(sides + 1, outer_radius - inner_radius), np.zeros(sides + 1, dtype = int), z_bottom, z_top - z_bottom)
+
+
+def get_via_mesh(diameter: float, drill: float, layer_z: list[float], stack: coilstackup.Stackup, chord_tolerance: float) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Plated barrel through the whole board plus an annular ring on every given layer, centered at the origin
+	Args:
+		layer_z: Bottom z of the copper layers with rings
+	"""
+	sides = max(int(segments.get_chord_count(diameter / 2, 2 * np.pi, chord_tolerance)), 8)
+	t = stack.copper_thickness
+
+	parts = [get_ring_mesh(max(drill / 2 - t, 0), drill / 2, stack.get_layer_z(stack.copper_layer_count - 1), t, sides)]
+	parts += [get_ring_mesh(drill / 2, diameter / 2, z, z + t, sides) for z in layer_z]
+
+	return _join(parts)
+
+
+def _join(parts: list[tuple[np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray]:
+	offsets = np.cumsum([0] + [len(vertices) for (vertices, _) in parts[:-1]])
+
+	return (np.concatenate([vertices for (vertices, _) in parts]), np.concatenate([faces + offset for ((_, faces), offset) in zip(parts, offsets)]))
+
+
+def iter_layer_meshes(geometry, stack: coilstackup.Stackup, chord_tolerance: float = segments.CHORD_TOLERANCE):
+	"""
+	Yields (layer name, vertices, triangles) of the traces and pads of every layer the coil occupies
+	"""
+	# tessellated once for all layers, normals of arc points point away from the arc's center
+	if geometry.arcs:
+		(arc_points, arc_offsets) = segments.tessellate_arcs(geometry.arcs, chord_tolerance)
+		(ux, uy, radius, _, _) = segments.get_arc_arrays(geometry.arcs)
+		arc_ids = np.repeat(np.arange(len(geometry.arcs)), np.diff(arc_offsets))
+		arc_normals = (arc_points - np.column_stack((ux, uy))[arc_ids]) / radius[arc_ids, None]
+	else:
+		(arc_points, arc_ids, arc_normals) = (np.zeros((0, 2)), np.zeros(0, dtype = int), np.zeros((0, 2)))
+
+	layer_index = dict((name, index) for (index, name) in enumerate(geometry.layer_names))
+	arc_layers = np.array([layer_index[arc.layer] for arc in geometry.arcs], dtype = int)
+	arc_widths = np.array([arc.width for arc in geometry.arcs], dtype = float)
+
+	# points sorted by layer once, every layer is a slice. The sort is stable, so strips stay in order
+	order = np.argsort(arc_layers[arc_ids], kind = "stable")
+	(arc_points, arc_normals, arc_ids) = (arc_points[order], arc_normals[order], arc_ids[order])
+	bounds = np.searchsorted(arc_layers[arc_ids], np.arange(len(geometry.layer_names) + 1))
+
+	for (index, name) in enumerate(geometry.layer_names):
+		z = stack.get_layer_z(index)
+		parts = []
+
+		layer = slice(bounds[index], bounds[index + 1])
+		if bounds[index] < bounds[index + 1]:
+			ids = arc_ids[layer]
+			parts.append(get_strip_mesh(arc_points[layer], arc_normals[layer], arc_widths[ids], ids, z, stack.copper_thickness))
+
+		lines = [line for line in geometry.lines if line.layer == name]
+		if lines:
+			ends = np.array([((l.start.x, l.start.y), (l.end.x, l.end.y)) for l in lines], dtype = float)
+			direction = ends[:, 1] - ends[:, 0]
+			length = np.hypot(direction[:, 0], direction[:, 1])
+			normals = np.column_stack((-direction[:, 1], direction[:, 0])) / np.where(length > 0, length, 1)[:, None]
+
+			widths = np.repeat([l.width for l in lines], 2)
+			parts.append(get_strip_mesh(ends.reshape(-1, 2), np.repeat(normals, 2, axis = 0), widths, np.repeat(np.arange(len(lines)), 2), z, stack.copper_thickness))
+
+		# pads as a strip of one segment along their width
+		pads = [pad for pad in geometry.pads if pad.layer == name]
+		if pads:
+			points = np.array([((p.loc.x - p.width / 2, p.loc.y), (p.loc.x + p.width / 2, p.loc.y)) for p in pads], dtype = float).reshape(-1, 2)
+			heights = np.repeat([p.height for p in pads], 2)
+			parts.append(get_strip_mesh(points, np.tile([0.0, 1.0], (len(points), 1)), heights, np.repeat(np.arange(len(pads)), 2), z, stack.copper_thickness))
+
+		if parts:
+			yield (name, *_join(parts))
+
+
+def _format_rows(rows: np.ndarray, row_format: str) -> str:
+	# python numbers format faster than numpy scalars
+	return ((row_format + ",\n") * len(rows)) % tuple(rows.ravel().tolist())
+
+
+def _to_vrml(vertices: np.ndarray) -> np.ndarray:
+	# KiCad footprints have y downwards, VRML models y upwards
+	return vertices * np.array([VRML_SCALE, -VRML_SCALE, VRML_SCALE])
+
+
+def _write_shape(file, vertices: np.ndarray, faces: np.ndarray, colour: tuple, name: str = None):
+	if name is not None:
+		file.write(f"DEF {name} ")
+
+	file.write("Shape {\n")
+	file.write("appearance Appearance {{ material Material {{ diffuseColor {:g} {:g} {:g} specularColor 0.3 0.3 0.3 shininess 0.4 }} }}\n".format(*colour))
+	# strips are not closed at their joints, both sides are drawn
+	file.write("geometry IndexedFaceSet {\nsolid FALSE\ncreaseAngle 0.5\ncoord Coordinate { point [\n")
+	file.write(_format_rows(_to_vrml(vertices), " ".join([NUMBER_FORMAT] * 3)))
+	file.write("] }\ncoordIndex [\n")
+	file.write(_format_rows(faces, "%d,%d,%d,-1"))
+	file.write("] }\n}\n")
+
+
+def write_vrml(file, geometry, stack: coilstackup.Stackup, chord_tolerance: float = segments.CHORD_TOLERANCE) -> tuple[int, int]:
+	"""
+	Writes a VRML 2.0 model of a coil's copper
+	Args:
+		file: Open text file
+		geometry: Coil geometry from coilgenerator.generate_geometry()
+		stack: Stackup of the board, its layer count has to match the geometry's layer names
+		chord_tolerance: Maximum deviation of arc chords from the arc (mm)
+
+	Returns:
+		(int, int): (vertex count, triangle count), vias counted once per shape
+	"""
+	file.write("#VRML V2.0 utf8\n")
+	counts = [0, 0]
+
+	used_z = []
+	for (name, vertices, faces) in iter_layer_meshes(geometry, stack, chord_tolerance):
+		file.write(f"# {name}\n")
+		_write_shape(file, vertices, faces, COPPER_COLOUR)
+
+		used_z.append(stack.get_layer_z(geometry.layer_names.index(name)))
+		counts[0] += len(vertices)
+		counts[1] += len(faces)
+
+	shapes = {}
+	for via in geometry.vias:
+		key = (via.diameter, via.drill)
+		translation = _to_vrml(np.array([via.loc.x, via.loc.y, 0.0]))
+		file.write("Transform {{ translation {:g} {:g} {:g} children [ ".format(*translation))
+
+		if key in shapes:
+			file.write(f"USE {shapes[key]} ")
+		else:
+			shapes[key] = "VIA" + str(len(shapes))
+			(vertices, faces) = get_via_mesh(via.diameter, via.drill, used_z, stack, chord_tolerance)
+			_write_shape(file, vertices, faces, VIA_COLOUR, shapes[key])
+
+			counts[0] += len(vertices)
+			counts[1] += len(faces)
+
+		file.write("] }\n")
+
+	return tuple(counts)
+
+
+def get_model_reference(model_path: str) -> str:
+	"""
+	Returns:
+		str: Footprint model entry of a VRML file, for add_model_reference()
+	"""
+	return "\t(model \"" + model_path.replace("\\", "/") + "\"\n\t\t(offset (xyz 0 0 0))\n\t\t(scale (xyz 1 1 1))\n\t\t(rotate (xyz 0 0 0))\n\t)\n"
+
+
+def add_model_reference(footprint: str, model_path: str) -> str:
+	"""
+	Returns:
+		str: Footprint text with the model added as its last entry
+	"""
+	end = footprint.rstrip().rfind(")")
+
+	return footprint[:end] + get_model_reference(model_path) + footprint[end:]
+
+
+def write_spec(path: str, spec: dict, stackup_data: dict = None, chord_tolerance: float = segments.CHORD_TOLERANCE, copper_layer_count: int = None, footprint_path: str = None, model_uri: str = None) -> tuple[int, int]:
+	"""
+	Generates a coil from its spec and writes its VRML model, see write_vrml()
+	Args:
+		copper_layer_count: Copper layers of the board, defaults to the layers of the coil
+		footprint_path: Optional .kicad_mod file written alongside, referencing the model
+		model_uri: Model path written to the footprint, e.g. "${KIPRJMOD}/pcb_coils/coil.wrl", defaults to the absolute path
+	"""
+	copper_layer_count = max(spec["layer_count"], 2, copper_layer_count or 0)
+	stack = coilstackup.from_dict(stackup_data, copper_layer_count)
+	layer_names = coilgenerator.get_layer_names(copper_layer_count)
+
+	with open(path, "w") as file:
+		counts = write_vrml(file, coilspec.generate_geometry(spec, layer_names), stack, chord_tolerance)
+
+	if footprint_path is not None:
+		with open(footprint_path, "w") as file:
+			file.write(add_model_reference(coilspec.generate(spec, layer_names), model_uri or os.path.abspath(path)))
+
+	return counts
+
+
+def _write_spec_task(task):
+	return write_spec(*task)
+
+
+def write_batch(specs: list[dict], folder: str, stackup_data: dict = None, chord_tolerance: float = segments.CHORD_TOLERANCE, copper_layer_count: int = None, footprints: bool = False, model_folder_uri: str = None, workers: int = None) -> list[tuple[str, int, int]]:
+	"""
+	Writes one VRML model per spec of a sweep, all coils on one board stackup
+	Args:
+		copper_layer_count: Copper layers of the board, defaults to the layers of the largest coil
+		footprints: Write a .kicad_mod referencing its model next to every model
+		model_folder_uri: Folder written to the footprints in front of the model file names, defaults to the absolute folder
+		workers: Number of worker processes, 1 writes in this process, None uses all CPUs
+
+	Returns:
+		[(str, int, int)]: (path, vertex count, triangle count) per spec
+	"""
+	os.makedirs(folder, exist_ok = True)
+
+	names = coilspec.get_file_names(specs)
+	paths = [os.path.join(folder, name + ".wrl") for name in names]
+	copper_layer_count = max([2, copper_layer_count or 0] + [spec["layer_count"] for spec in specs])
+
+	tasks = []
+	for (name, path, spec) in zip(names, paths, specs):
+		footprint_path = os.path.join(folder, name + ".kicad_mod") if footprints else None
+		model_uri = model_folder_uri.rstrip("/") + "/" + name + ".wrl" if model_folder_uri else None
+		tasks.append((path, spec, stackup_data, chord_tolerance, copper_layer_count, footprint_path, model_uri))
+
+	if workers == 1 or len(tasks) < 2:
+		counts = [_write_spec_task(task) for task in tasks]
+	else:
+		with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+			counts = list(executor.map(_write_spec_task, tasks))
+
+	return [(path, vertices, faces) for (path, (vertices, faces)) in zip(paths, counts)]
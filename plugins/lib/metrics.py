@@ -0,0 +1,262 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Geometry emitter with the same interface as generator.py and primitives.py, that keeps no primitives at all.
+# It only aggregates the numbers needed for validation and sweeps: trace length per layer, bounding box, primitive
+# counts, vias, pads and clearances. Full turns are measured in closed form. Like the other emitters, it relabels
+# the turns of the first layer of each parity for the layers that share them, which only adds their lengths again.
+
+import math
+import itertools
+
+from . import primitives
+
+# kinds of the records returned for emitted lines, arcs and full turns
+LINE = 0
+ARC = 1
+LOOP = 2
+
+
+class CoilMetrics:
+	"""
+	Aggregated metrics of a generated coil, all lengths in mm
+	"""
+
+	def __init__(self, layer_names: list[str], trace_length: list[float], bounds: tuple, line_count: int, arc_count: int, vias: list[tuple], pads: list[tuple], clearances: dict):
+		self.layer_names = layer_names
+		self.trace_length = trace_length
+		self.bounds = bounds
+		self.line_count = line_count
+		self.arc_count = arc_count
+		self.vias = vias
+		self.pads = pads
+		self.clearances = clearances
+
+	def get_total_trace_length(self) -> float:
+		return sum(self.trace_length)
+
+	def to_dict(self) -> dict:
+		"""
+		Returns:
+			dict: JSON serializable metrics
+		"""
+		return {
+			"trace_length": dict(zip(self.layer_names, self.trace_length)),
+			"total_trace_length": self.get_total_trace_length(),
+			"bounds": list(self.bounds),
+			"line_count": self.line_count,
+			"arc_count": self.arc_count,
+			"via_count": len(self.vias),
+			"pad_count": len(self.pads),
+			"pads": [{"pid": pid, "x": x, "y": y, "layer": layer} for (pid, x, y, _, _, layer) in self.pads],
+			# JSON has no infinity, clearances without a pair of objects are null
+			"clearances": dict((key, value if math.isfinite(value) else None) for (key, value) in self.clearances.items())
+		}
+
+
+class Emitter:
+	"""
+	Collects metrics while coilgenerator runs its placement logic. Emitted lines, arcs and turns are returned as
+	(kind, length) records for relabel(), vias and pads as None
+	"""
+
+	def __init__(self, layer_names: list[str]):
+		self.layer_names = layer_names
+		self.layer_index = dict((name, index) for (index, name) in enumerate(layer_names))
+		self.trace_length = [0.0] * len(layer_names)
+		self.bounds = [math.inf, math.inf, -math.inf, -math.inf]
+		self.line_count = 0
+		self.arc_count = 0
+		self.vias = []
+		self.pads = []
+
+		# full turns only add up their length, bounds follow from the widest turn per winding direction
+		self.loop_length = [0.0] * len(layer_names)
+		self.loop_count = 0
+		self.widest_loops = {}
+
+	def _extend_bounds(self, min_x, min_y, max_x, max_y):
+		bounds = self.bounds
+
+		if min_x < bounds[0]:
+			bounds[0] = min_x
+		if min_y < bounds[1]:
+			bounds[1] = min_y
+		if max_x > bounds[2]:
+			bounds[2] = max_x
+		if max_y > bounds[3]:
+			bounds[3] = max_y
+
+	def via(self, loc, diameter, drill, padnum = 0):
+		self.vias.append((loc.x, loc.y, diameter, drill))
+		self._extend_bounds(loc.x - diameter / 2, loc.y - diameter / 2, loc.x + diameter / 2, loc.y + diameter / 2)
+
+	def line(self, start, stop, width, layer):
+		length = math.hypot(stop.x - start.x, stop.y - start.y)
+
+		self.line_count += 1
+		self.trace_length[self.layer_index[layer]] += length
+
+		(low_x, high_x) = (start.x, stop.x) if start.x < stop.x else (stop.x, start.x)
+		(low_y, high_y) = (start.y, stop.y) if start.y < stop.y else (stop.y, start.y)
+		self._extend_bounds(low_x - width / 2, low_y - width / 2, high_x + width / 2, high_y + width / 2)
+
+		return (LINE, length)
+
+	def arc(self, start, mid, stop, width, layer, swap_start_stop):
+		# direction does not matter for length and extent
+		(ux, uy, radius, start_angle, sweep) = primitives.get_arc_sweep(primitives.Arc(start, mid, stop, width, layer))
+
+		length = radius * abs(sweep)
+
+		self.arc_count += 1
+		self.trace_length[self.layer_index[layer]] += length
+
+		(low_x, high_x) = (start.x, stop.x) if start.x < stop.x else (stop.x, start.x)
+		(low_y, high_y) = (start.y, stop.y) if start.y < stop.y else (stop.y, start.y)
+
+		# axis crossings inside the sweep are extreme points of the arc
+		(low, high) = (start_angle, start_angle + sweep) if sweep > 0 else (start_angle + sweep, start_angle)
+		for quarter in range(math.ceil(low / (math.pi / 2)), math.floor(high / (math.pi / 2)) + 1):
+			quarter %= 4
+			if quarter == 0:
+				high_x = max(high_x, ux + radius)
+			elif quarter == 1:
+				high_y = max(high_y, uy + radius)
+			elif quarter == 2:
+				low_x = min(low_x, ux - radius)
+			else:
+				low_y = min(low_y, uy - radius)
+
+		self._extend_bounds(low_x - width / 2, low_y - width / 2, high_x + width / 2, high_y + width / 2)
+
+		return (ARC, length)
+
+	def pad(self, pid, loc, width, height, layer):
+		self.pads.append((pid, loc.x, loc.y, width, height, layer))
+		self._extend_bounds(loc.x - width / 2, loc.y - height / 2, loc.x + width / 2, loc.y + height / 2)
+
+	def loop(self, radius, increment, width, layer, wrap_multiplier):
+		"""
+		Counterpart of generator.loop: two half circles, around the origin and around (increment / 2, 0). Their
+		length is multiplied by pi once in _add_loops()
+		"""
+		length = 2 * radius + increment / 2
+
+		self.loop_count += 1
+		self.loop_length[self.layer_index[layer]] += length
+
+		widest = self.widest_loops.get(wrap_multiplier)
+		if widest is None or radius > widest[0]:
+			self.widest_loops[wrap_multiplier] = (radius, increment, width)
+
+		return ((LOOP, length),)
+
+	def relabel(self, items: list, layer: str) -> list:
+		"""
+		Counterpart of generator.relabel: copies of emitted lines, arcs and turns on another layer. The copies cover
+		the same area, so only lengths and counts are added
+		"""
+		index = self.layer_index[layer]
+
+		for (kind, length) in items:
+			if kind == LOOP:
+				self.loop_length[index] += length
+				self.loop_count += 1
+			elif kind == ARC:
+				self.trace_length[index] += length
+				self.arc_count += 1
+			else:
+				self.trace_length[index] += length
+				self.line_count += 1
+
+		return items
+
+	def _add_loops(self):
+		"""
+		Adds the aggregated full turns to lengths, counts and bounds
+		"""
+		for index in range(len(self.trace_length)):
+			self.trace_length[index] += math.pi * self.loop_length[index]
+			self.loop_length[index] = 0.0
+
+		self.arc_count += 2 * self.loop_count
+		self.loop_count = 0
+
+		for (wrap_multiplier, (radius, increment, width)) in self.widest_loops.items():
+			first_y = -wrap_multiplier * radius
+			second_y = wrap_multiplier * (radius + increment / 2)
+			self._extend_bounds(-radius - width / 2, min(first_y, second_y) - width / 2, radius + increment + width / 2, max(first_y, second_y) + width / 2)
+
+		self.widest_loops = {}
+
+	def get_metrics(self, inner_radius: float, outer_radius: float, trace_width: float, ring = None) -> CoilMetrics:
+		"""
+		Args:
+			inner_radius: Centerline radius of the innermost turn
+			outer_radius: Centerline radius where the outermost turn ends
+			trace_width: Width of line trace
+			ring: Optional shapes.Ring covered by the turns of non-circular coils, replaces the radii
+
+		Returns:
+			CoilMetrics: Metrics of everything emitted so far
+		"""
+		self._add_loops()
+
+		ring_inner = inner_radius - trace_width / 2
+		ring_outer = outer_radius + trace_width / 2
+
+		via_to_via = math.inf
+		for ((ax, ay, ad, _), (bx, by, bd, _)) in itertools.combinations(self.vias, 2):
+			via_to_via = min(via_to_via, math.hypot(ax - bx, ay - by) - (ad + bd) / 2)
+
+		# vias pass all layers, so they have to clear the turns of every layer
+		via_to_turns = math.inf
+		if ring is not None and self.vias:
+			distances = ring.get_point_distances([(x, y) for (x, y, _, _) in self.vias])
+			via_to_turns = min(float(distance) - diameter / 2 for (distance, (_, _, diameter, _)) in zip(distances, self.vias))
+		elif ring is None:
+			for (x, y, diameter, _) in self.vias:
+				distance = math.hypot(x, y)
+				via_to_turns = min(via_to_turns, max(ring_inner - distance, distance - ring_outer) - diameter / 2)
+
+		pad_to_via = math.inf
+		pad_to_turns = math.inf
+		for (_, px, py, width, height, _) in self.pads:
+			for (x, y, diameter, _) in self.vias:
+				dx = max(abs(x - px) - width / 2, 0)
+				dy = max(abs(y - py) - height / 2, 0)
+				pad_to_via = min(pad_to_via, math.hypot(dx, dy) - diameter / 2)
+
+			if ring is not None:
+				pad_to_turns = min(pad_to_turns, ring.get_rect_distance(px, py, width, height))
+				continue
+
+			dx = max(abs(px) - width / 2, 0)
+			dy = max(abs(py) - height / 2, 0)
+			pad_to_turns = min(pad_to_turns, math.hypot(dx, dy) - ring_outer)
+
+		# turns are trace_spacing apart by construction, but the connectors to the vias are not, so there is no
+		# turn to turn clearance
+		clearances = {
+			"via_to_via": via_to_via,
+			"via_to_turns": via_to_turns,
+			"pad_to_via": pad_to_via,
+			"pad_to_turns": pad_to_turns
+		}
+
+		return CoilMetrics(self.layer_names, self.trace_length, tuple(self.bounds), self.line_count, self.arc_count, self.vias, self.pads, clearances)
@@ -0,0 +1,201 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Mutual inductance matrix of coils placed on a board, from the Neumann double integral over their current segments.
+# Coil pairs with the same relative placement, like neighbors in an array with constant pitch, have the same mutual
+# inductance and are only computed once. Self terms come from the single coil estimator in inductance.py.
+
+import math
+import concurrent.futures
+
+import numpy as np
+
+from . import segments
+from . import inductance
+from . import spec as coilspec
+
+MU_0 = 4e-7 * np.pi
+MAX_PAIRS = 1 << 16
+FAR_FIELD_FACTOR = 2.0 # pairs further apart than this many times the sum of their radii use the coarse discretization
+COARSE_CHORD_TOLERANCE = 0.1 # (mm)
+KEY_DIGITS = 4
+
+
+def get_neumann(starts_a: np.ndarray, ends_a: np.ndarray, starts_b: np.ndarray, ends_b: np.ndarray, max_pairs: int = MAX_PAIRS) -> float:
+	"""
+	Neumann double integral over two sets of current segments, using segment midpoints
+	Args:
+		starts_a: (A, 3) segment start points of first coil (mm)
+		ends_a: (A, 3) segment end points of first coil (mm)
+		starts_b: (B, 3) segment start points of second coil (mm)
+		ends_b: (B, 3) segment end points of second coil (mm)
+		max_pairs: Number of segment pairs evaluated per block
+
+	Returns:
+		float: Mutual inductance (H)
+	"""
+	(middle_a, length_a) = ((starts_a + ends_a) / 2, ends_a - starts_a)
+	(middle_b, length_b) = ((starts_b + ends_b) / 2, ends_b - starts_b)
+
+	block = max(1, max_pairs // max(len(middle_b), 1))
+	total = 0.0
+
+	for a in range(0, len(middle_a), block):
+		dx = middle_a[a:a + block, 0, None] - middle_b[None, :, 0]
+		dy = middle_a[a:a + block, 1, None] - middle_b[None, :, 1]
+		dz = middle_a[a:a + block, 2, None] - middle_b[None, :, 2]
+		distance = np.sqrt(dx * dx + dy * dy + dz * dz)
+
+		dot = length_a[a:a + block] @ length_b.T
+		total += float(np.sum(np.divide(dot, distance, out = np.zeros_like(dot), where = distance > 0)))
+
+	# lengths are given in mm
+	return MU_0 / (4 * np.pi) * total * 1e-3
+
+
+def get_pair_key(placement_a, placement_b) -> tuple:
+	"""
+	Describes the placement of coil b relative to coil a. Pairs with equal keys have equal mutual inductance
+	Returns:
+		tuple: Hashable relative placement
+	"""
+	angle = math.radians(placement_a.rotation)
+	(dx, dy) = (placement_b.x - placement_a.x, placement_b.y - placement_a.y)
+
+	# offset in the frame of coil a, undoing its rotation and flip
+	local_x = dx * math.cos(angle) - dy * math.sin(angle)
+	local_y = dx * math.sin(angle) + dy * math.cos(angle)
+	relative_rotation = placement_b.rotation - placement_a.rotation
+
+	if placement_a.flipped:
+		local_x = -local_x
+		relative_rotation = -relative_rotation
+
+	return (
+		coilspec.get_key(placement_a.spec),
+		placement_a.flipped,
+		coilspec.get_key(placement_b.spec),
+		placement_b.flipped,
+		round(local_x, KEY_DIGITS) + 0.0,
+		round(local_y, KEY_DIGITS) + 0.0,
+		round(relative_rotation % 360, KEY_DIGITS) % 360
+	)
+
+
+def get_symmetric_key(placement_a, placement_b) -> tuple:
+	"""
+	Mutual inductance is symmetric, so (a, b) and (b, a) share one key
+	"""
+	return min(get_pair_key(placement_a, placement_b), get_pair_key(placement_b, placement_a))
+
+
+_worker_segments = None
+
+def _init_worker(coil_segments):
+	global _worker_segments
+	_worker_segments = coil_segments
+
+
+def _compute_pair(task):
+	(a, b, coarse) = task
+	(starts_a, ends_a) = _worker_segments[coarse][a]
+	(starts_b, ends_b) = _worker_segments[coarse][b]
+
+	return get_neumann(starts_a, ends_a, starts_b, ends_b)
+
+
+def get_self_inductance(layout, placement) -> float:
+	"""
+	Single coil estimate, with the coil's layers at their board positions
+	"""
+	layer_z = [layout.stackup.get_layer_z(placement.to_board_layer(i, layout.copper_layer_count)) for i in range(placement.spec["layer_count"])]
+
+	return inductance.estimate_inductance(placement.spec, layer_z)
+
+
+def get_matrix(layout, chord_tolerance: float = segments.CHORD_TOLERANCE, workers: int = None) -> tuple[np.ndarray, int]:
+	"""
+	Computes the mutual inductance matrix of all coils of a board layout
+	Args:
+		layout: board.Layout with placed coils
+		chord_tolerance: Maximum arc discretization error for close coil pairs (mm)
+		workers: Number of worker processes, 1 computes in this process, None uses all CPUs
+
+	Returns:
+		(np.ndarray, int): ((N, N) inductance matrix (H), number of pairs that were actually computed)
+	"""
+	placements = layout.placements
+	count = len(placements)
+
+	coil_segments = (
+		segments.get_layout_segments(layout, chord_tolerance),
+		segments.get_layout_segments(layout, max(chord_tolerance, COARSE_CHORD_TOLERANCE))
+	)
+
+	radius = []
+	for (placement, (starts, _)) in zip(placements, coil_segments[0]):
+		radius.append(float(np.max(np.hypot(starts[:, 0] - placement.x, starts[:, 1] - placement.y))))
+
+	# collect one representative pair per relative placement
+	pairs = {}
+	tasks = []
+	scheduled = set()
+	for a in range(count):
+		for b in range(a + 1, count):
+			key = get_symmetric_key(placements[a], placements[b])
+			pairs[(a, b)] = key
+
+			if key in scheduled:
+				continue
+			scheduled.add(key)
+
+			distance = math.hypot(placements[a].x - placements[b].x, placements[a].y - placements[b].y)
+			coarse = 1 if distance > FAR_FIELD_FACTOR * (radius[a] + radius[b]) else 0
+			tasks.append((key, (a, b, coarse)))
+
+	if workers == 1 or len(tasks) < 2:
+		_init_worker(coil_segments)
+		values = [_compute_pair(task) for (_, task) in tasks]
+	else:
+		with concurrent.futures.ProcessPoolExecutor(workers, initializer = _init_worker, initargs = (coil_segments,)) as executor:
+			values = list(executor.map(_compute_pair, [task for (_, task) in tasks], chunksize = max(1, len(tasks) // 64)))
+
+	computed = dict((key, value) for ((key, _), value) in zip(tasks, values))
+
+	matrix = np.zeros((count, count))
+	for ((a, b), key) in pairs.items():
+		matrix[a, b] = matrix[b, a] = computed[key]
+
+	self_cache = {}
+	for (i, placement) in enumerate(placements):
+		key = (coilspec.get_key(placement.spec), placement.flipped)
+		if key not in self_cache:
+			self_cache[key] = get_self_inductance(layout, placement)
+
+		matrix[i, i] = self_cache[key]
+
+	return (matrix, len(tasks))
+
+
+def get_coupling(matrix: np.ndarray) -> np.ndarray:
+	"""
+	Returns:
+		np.ndarray: Coupling coefficients k_ij = M_ij / sqrt(L_i L_j)
+	"""
+	diagonal = np.sqrt(np.diag(matrix))
+
+	return matrix / np.outer(diagonal, diagonal)
@@ -0,0 +1,307 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Characterization boards of a sweep without pcbnew: every distinct coil is generated once (in worker processes), its
+# extent including the outer vias and the pads is taken from the metrics dry run, and the coils are packed onto the
+# board with the MaxRects algorithm. The .kicad_pcb embeds the footprints with a label per coil and the footprints
+# are stored in the project's coil library, so the board and the library match.
+
+import os
+import re
+import math
+import uuid
+import concurrent.futures
+
+from . import spec as coilspec
+from . import library as coillibrary
+from . import coilgenerator
+from . import stackup as coilstackup
+
+BOARD_VERSION = 20240108
+CLEARANCE = 1.0 # (mm) between the copper of two coils
+EDGE_CLEARANCE = 1.0 # (mm) between copper and the board outline
+LABEL_HEIGHT = 1.0 # (mm) text size of the labels
+LABEL_THICKNESS = 0.15 # (mm)
+LABEL_GAP = 0.5 # (mm) between a coil and its label
+LABEL_CHAR_WIDTH = 0.8 # average width of a character of KiCad's stroke font relative to its size
+OUTLINE_WIDTH = 0.1 # (mm)
+FILL_RATIO = 0.8 # expected share of the board a packing fills, for the width of boards without a given size
+
+TECHNICAL_LAYERS = [
+	(32, "B.Adhes", "B.Adhesive"), (33, "F.Adhes", "F.Adhesive"), (34, "B.Paste", None), (35, "F.Paste", None),
+	(36, "B.SilkS", "B.Silkscreen"), (37, "F.SilkS", "F.Silkscreen"), (38, "B.Mask", None), (39, "F.Mask", None),
+	(40, "Dwgs.User", "User.Drawings"), (41, "Cmts.User", "User.Comments"), (42, "Eco1.User", "User.Eco1"),
+	(43, "Eco2.User", "User.Eco2"), (44, "Edge.Cuts", None), (45, "Margin", None), (46, "B.CrtYd", "B.Courtyard"),
+	(47, "F.CrtYd", "F.Courtyard"), (48, "B.Fab", None), (49, "F.Fab", None)
+]
+
+HEADER_PATTERN = re.compile(r'\(footprint "(?:[^"\\]|\\.)*"(?: \(version \d+\))?(?: \(generator [^)]*\))?')
+UUID_PATTERN = re.compile(r"\(uuid [^)]*\)")
+
+
+class Packer:
+	"""
+	MaxRects bin packing with the bottom left rule, which also fills bins of unbounded height row by row. The free
+	space of the bin is kept as maximal free rectangles, which may overlap each other
+	"""
+
+	def __init__(self, width: float, height: float):
+		self.free = [(0.0, 0.0, width, height)]
+
+	def insert(self, width: float, height: float) -> tuple[float, float]:
+		"""
+		Returns:
+			(float, float): Position of the placed rectangle, None if it does not fit
+		"""
+		best = None
+		for (x, y, w, h) in self.free:
+			if width <= w and height <= h:
+				score = (y + height, x)
+				if best is None or score < best[0]:
+					best = (score, x, y)
+
+		if best is None:
+			return None
+
+		(_, x, y) = best
+		self._split(x, y, width, height)
+
+		return (x, y)
+
+	def _split(self, x: float, y: float, width: float, height: float):
+		kept = []
+		created = []
+		for rect in self.free:
+			(fx, fy, fw, fh) = rect
+			if x >= fx + fw or x + width <= fx or y >= fy + fh or y + height <= fy:
+				kept.append(rect)
+				continue
+
+			# the parts of a free rectangle around the placed one are the new maximal rectangles
+			if x > fx:
+				created.append((fx, fy, x - fx, fh))
+			if x + width < fx + fw:
+				created.append((x + width, fy, fx + fw - x - width, fh))
+			if y > fy:
+				created.append((fx, fy, fw, y - fy))
+			if y + height < fy + fh:
+				created.append((fx, y + height, fw, fy + fh - y - height))
+
+		# kept rectangles were maximal among each other, only containment involving new ones has to be checked
+		created.sort(key = lambda r: r[2] * r[3], reverse = True)
+		added = []
+		for rect in created:
+			if not any(_contains(other, rect) for other in added) and not any(_contains(other, rect) for other in kept):
+				added.append(rect)
+
+		self.free = [rect for rect in kept if not any(_contains(other, rect) for other in added)] + added
+
+
+def _contains(outer: tuple, inner: tuple) -> bool:
+	return inner[0] >= outer[0] and inner[1] >= outer[1] and inner[0] + inner[2] <= outer[0] + outer[2] and inner[1] + inner[3] <= outer[1] + outer[3]
+
+
+def pack(sizes: list[tuple[float, float]], width: float, height: float = math.inf) -> list[tuple[float, float]]:
+	"""
+	Packs rectangles into a bin, tallest first
+	Args:
+		height: Height of the bin, unbounded by default
+
+	Returns:
+		[(float, float)]: Position of every rectangle, None for those that do not fit
+	"""
+	packer = Packer(width, height)
+	positions = [None] * len(sizes)
+
+	for index in sorted(range(len(sizes)), key = lambda i: (sizes[i][1], sizes[i][0]), reverse = True):
+		positions[index] = packer.insert(*sizes[index])
+
+	return positions
+
+
+def _generate_task(task) -> tuple[str, tuple]:
+	(spec, layer_names, generate) = task
+	bounds = tuple(coilspec.generate_metrics(spec, layer_names).bounds)
+
+	return (coilspec.generate(spec, layer_names) if generate else None, bounds)
+
+
+def get_label_size(name: str) -> tuple[float, float]:
+	"""
+	Returns:
+		(float, float): Estimated (width, height) of a label including its gap to the coil
+	"""
+	return (len(name) * LABEL_HEIGHT * LABEL_CHAR_WIDTH + LABEL_THICKNESS, LABEL_GAP + LABEL_HEIGHT + LABEL_THICKNESS)
+
+
+def get_footprint_text(template: str, library_name: str, file_name: str, reference: str, x: float, y: float) -> str:
+	"""
+	Turns the text of a footprint file into a footprint placed on a board. Every placement gets its own uuids
+	"""
+	footprint_id = (library_name + ":" + file_name[:-len(coillibrary.FOOTPRINT_EXTENSION)]).replace("\\", "\\\\").replace('"', '\\"')
+
+	text = HEADER_PATTERN.sub(lambda _: f'(footprint "{footprint_id}"', template, count = 1)
+	text = text.replace('(layer "F.Cu")', f'(layer "F.Cu")\n\t(uuid {uuid.uuid4()})\n\t(at {x:.4f} {y:.4f})', 1)
+	text = text.replace('(property "Reference" "REF**"', f'(property "Reference" "{reference}"', 1)
+	text = UUID_PATTERN.sub(lambda _: f"(uuid {uuid.uuid4()})", text)
+
+	return "\t" + text.strip().replace("\n", "\n\t") + "\n"
+
+
+def _write_layers(file, layer_names: list[str]):
+	file.write("\t(layers\n")
+	for (index, name) in enumerate(layer_names):
+		# KiCad numbers inner layers from 1 and the bottom layer 31
+		file.write(f'\t\t({31 if name == "B.Cu" else index} "{name}" signal)\n')
+	for (index, name, user_name) in TECHNICAL_LAYERS:
+		file.write(f'\t\t({index} "{name}" user' + (f' "{user_name}"' if user_name else "") + ")\n")
+	file.write("\t)\n")
+
+
+def _write_setup(file, layer_names: list[str], stackup: coilstackup.Stackup):
+	file.write("\t(setup\n\t\t(stackup\n")
+	for (index, name) in enumerate(layer_names):
+		file.write(f'\t\t\t(layer "{name}" (type "copper") (thickness {stackup.copper_thickness:.4f}))\n')
+
+		if index < len(stackup.dielectric_thickness):
+			dielectric_type = "core" if index % 2 == 0 else "prepreg"
+			file.write(f'\t\t\t(layer "dielectric {index + 1}" (type "{dielectric_type}") (thickness {stackup.dielectric_thickness[index]:.4f}) (material "FR4") (epsilon_r {stackup.epsilon_r[index]:.4g}))\n')
+	file.write("\t\t)\n\t\t(pad_to_mask_clearance 0)\n\t)\n")
+
+
+def _write_outline(file, size: tuple[float, float]):
+	file.write(f'\t(gr_rect (start 0 0) (end {size[0]:.4f} {size[1]:.4f}) (stroke (width {OUTLINE_WIDTH}) (type default)) (fill none) (layer "Edge.Cuts") (uuid {uuid.uuid4()}))\n')
+
+
+def _write_label(file, name: str, x: float, y: float):
+	text = name.replace("\\", "\\\\").replace('"', '\\"')
+	file.write(f'\t(gr_text "{text}" (at {x:.4f} {y:.4f} 0) (layer "F.SilkS") (uuid {uuid.uuid4()})\n')
+	file.write(f"\t\t(effects (font (size {LABEL_HEIGHT} {LABEL_HEIGHT}) (thickness {LABEL_THICKNESS})))\n\t)\n")
+
+
+def build(specs: list[dict], path: str, size: tuple[float, float] = None, clearance: float = CLEARANCE, edge_clearance: float = EDGE_CLEARANCE, stackup_data: dict = None, copper_layer_count: int = None, workers: int = None) -> dict:
+	"""
+	Writes a .kicad_pcb with all coils of a sweep packed onto it and stores the footprints in the coil library next
+	to it, which is added to the project's fp-lib-table
+	Args:
+		size: (width, height) of the board outline, defaults to a board just large enough, about as wide as high
+		clearance: Space between the bounding boxes of two coils
+		edge_clearance: Space between the bounding boxes and the board outline
+		stackup_data: Stackup description, see stackup.from_dict()
+		copper_layer_count: Copper layers of the board, defaults to the layers of the largest coil
+		workers: Number of worker processes for generation, 1 generates in this process, None uses all CPUs
+
+	Returns:
+		dict: Summary with the board size, the number of coils, generated and reused footprints
+	"""
+	copper_layer_count = max([2, copper_layer_count or 0] + [spec["layer_count"] for spec in specs])
+	layer_names = coilgenerator.get_layer_names(copper_layer_count)
+	stackup = coilstackup.from_dict(stackup_data, copper_layer_count)
+
+	folder = os.path.dirname(os.path.abspath(path))
+	library = coillibrary.Library(os.path.join(folder, coillibrary.LIBRARY_FOLDER))
+	library.refresh()
+
+	file_names = coilspec.get_file_names(specs, coillibrary.FOOTPRINT_EXTENSION)
+
+	# designs already in the library are referenced instead of written again, a name of a different design is an error
+	designs = {}
+	for (spec, file_name) in zip(specs, file_names):
+		design_hash = coillibrary.get_spec_hash(spec, layer_names)
+		if design_hash in designs:
+			continue
+
+		stored = library.find(design_hash)
+		if stored is None and library.get_collision(file_name, design_hash) is not None:
+			raise ValueError("Footprint name already used by a different coil: " + file_name)
+
+		designs[design_hash] = (spec, stored or file_name, stored is None)
+
+	tasks = [(spec, layer_names, generate) for (spec, _, generate) in designs.values()]
+	if workers == 1 or len(tasks) < 2:
+		results = [_generate_task(task) for task in tasks]
+	else:
+		with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+			results = list(executor.map(_generate_task, tasks))
+
+	footprints = {}
+	for ((design_hash, (spec, file_name, generate)), (template, bounds)) in zip(designs.items(), results):
+		if generate:
+			library.add(file_name, template, spec, layer_names, save = False)
+		else:
+			with open(os.path.join(library.folder, file_name), "r", encoding = "utf-8") as file:
+				template = file.read()
+
+		footprints[design_hash] = (file_name, template, bounds)
+
+	if any(generate for (_, _, generate) in designs.values()):
+		library.save_manifest()
+
+	coils = [footprints[coillibrary.get_spec_hash(spec, layer_names)] for spec in specs]
+
+	# coils of a sweep share their name, they are labeled with the name of their footprint in the library
+	labels = [file_name[:-len(coillibrary.FOOTPRINT_EXTENSION)] for (file_name, _, _) in coils]
+
+	# every coil takes its bounding box and its label, the clearance is added to the right and below each of them
+	sizes = []
+	for (label, (_, _, (min_x, min_y, max_x, max_y))) in zip(labels, coils):
+		(label_width, label_height) = get_label_size(label)
+		sizes.append((max(max_x - min_x, label_width) + clearance, max_y - min_y + label_height + clearance))
+
+	if size is None:
+		area = sum(w * h for (w, h) in sizes)
+		width = max([math.sqrt(area / FILL_RATIO)] + [w for (w, _) in sizes])
+		positions = pack(sizes, width)
+		size = (width - clearance + 2 * edge_clearance, max(y + h for ((_, h), (_, y)) in zip(sizes, positions)) - clearance + 2 * edge_clearance)
+	else:
+		positions = pack(sizes, size[0] - 2 * edge_clearance + clearance, size[1] - 2 * edge_clearance + clearance)
+
+		missing = sum(position is None for position in positions)
+		if missing:
+			raise ValueError(f"{missing} of {len(specs)} coils do not fit on a {size[0]:g} x {size[1]:g} mm board")
+
+	with open(path, "w", encoding = "utf-8") as file:
+		file.write(f'(kicad_pcb (version {BOARD_VERSION}) (generator pcb_coil_generator)\n')
+		file.write(f"\t(general (thickness {stackup.get_thickness():.4f}))\n")
+		file.write('\t(paper "A4")\n')
+		_write_layers(file, layer_names)
+		_write_setup(file, layer_names, stackup)
+		file.write('\t(net 0 "")\n')
+
+		for (index, (label, (file_name, template, bounds), (width, _), (x, y))) in enumerate(zip(labels, coils, sizes, positions)):
+			(min_x, min_y, max_x, max_y) = bounds
+			(left, top) = (x + edge_clearance, y + edge_clearance)
+			cell_width = width - clearance
+
+			# the coil is centered horizontally in its cell, the label below it
+			origin_x = left + (cell_width - (max_x - min_x)) / 2 - min_x
+			origin_y = top - min_y
+
+			file.write(get_footprint_text(template, coillibrary.LIBRARY_NAME, file_name, f"L{index + 1}", origin_x, origin_y))
+			_write_label(file, label, left + cell_width / 2, top + max_y - min_y + LABEL_GAP + (LABEL_HEIGHT + LABEL_THICKNESS) / 2)
+
+		_write_outline(file, size)
+		file.write(")\n")
+
+	coillibrary.add_to_lib_table(os.path.join(folder, coillibrary.LIB_TABLE_FILE))
+
+	return {
+		"size": [round(size[0], 4), round(size[1], 4)],
+		"coils": len(specs),
+		"generated": sum(generate for (_, _, generate) in designs.values()),
+		"reused": sum(not generate for (_, _, generate) in designs.values())
+	}
@@ -0,0 +1,171 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Geometry emitter with the same interface as generator.py. Instead of KiCad text, every function returns a plain
+# geometry record, which allows analysis and export of a coil without parsing footprint files.
+
+import math
+
+from .generator import P2D
+
+
+class Line:
+	"""
+	Straight trace from start to end
+	"""
+
+	def __init__(self, start: P2D, end: P2D, width: float, layer: str):
+		self.start = start
+		self.end = end
+		self.width = width
+		self.layer = layer
+
+
+class Arc:
+	"""
+	Arc trace through start, mid and end, in the point order written to the footprint file
+	"""
+
+	def __init__(self, start: P2D, mid: P2D, end: P2D, width: float, layer: str):
+		self.start = start
+		self.mid = mid
+		self.end = end
+		self.width = width
+		self.layer = layer
+
+
+class Via:
+	"""
+	Through hole via, connecting all copper layers
+	"""
+
+	def __init__(self, loc: P2D, diameter: float, drill: float, padnum: int):
+		self.loc = loc
+		self.diameter = diameter
+		self.drill = drill
+		self.padnum = padnum
+
+
+class Pad:
+	"""
+	SMD pad on a single copper layer
+	"""
+
+	def __init__(self, pid: int, loc: P2D, width: float, height: float, layer: str):
+		self.pid = pid
+		self.loc = loc
+		self.width = width
+		self.height = height
+		self.layer = layer
+
+
+class CoilGeometry:
+	"""
+	All primitives of a generated coil, in footprint coordinates (mm)
+	"""
+
+	def __init__(self, lines: list, arcs: list, vias: list, pads: list, layer_names: list[str]):
+		self.lines = lines
+		self.arcs = arcs
+		self.vias = vias
+		self.pads = pads
+		self.layer_names = layer_names
+
+
+def get_arc_center(arc: Arc) -> tuple[float, float, float]:
+	"""
+	Returns:
+		(float, float, float): (center x, center y, radius) of the circle through start, mid and end of an arc
+	"""
+	(ax, ay) = (arc.start.x, arc.start.y)
+	(bx, by) = (arc.mid.x, arc.mid.y)
+	(cx, cy) = (arc.end.x, arc.end.y)
+
+	d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+	ux = ((ax**2 + ay**2) * (by - cy) + (bx**2 + by**2) * (cy - ay) + (cx**2 + cy**2) * (ay - by)) / d
+	uy = ((ax**2 + ay**2) * (cx - bx) + (bx**2 + by**2) * (ax - cx) + (cx**2 + cy**2) * (bx - ax)) / d
+
+	return (ux, uy, math.hypot(ax - ux, ay - uy))
+
+
+def get_arc_sweep(arc: Arc) -> tuple[float, float, float, float, float]:
+	"""
+	Returns:
+		(float, float, float, float, float): (center x, center y, radius, start angle, signed sweep through mid) in radians
+	"""
+	(ux, uy, radius) = get_arc_center(arc)
+
+	start = math.atan2(arc.start.y - uy, arc.start.x - ux)
+	mid = math.atan2(arc.mid.y - uy, arc.mid.x - ux)
+	end = math.atan2(arc.end.y - uy, arc.end.x - ux)
+
+	sweep = (end - start) % (2 * math.pi)
+	# counter-clockwise sweep does not pass the mid point, the arc goes the other way around
+	if (mid - start) % (2 * math.pi) > sweep:
+		sweep -= 2 * math.pi
+
+	return (ux, uy, radius, start, sweep)
+
+
+def via(loc: P2D, diameter: float, drill: float, padnum: int = 0) -> Via:
+	return Via(loc, diameter, drill, padnum)
+
+
+def line(start: P2D, stop: P2D, width: float, layer: str) -> Line:
+	return Line(start, stop, width, layer)
+
+
+def arc(start: P2D, mid: P2D, stop: P2D, width: float, layer: str, swap_start_stop: bool) -> Arc:
+	if swap_start_stop:
+		return Arc(stop, mid, start, width, layer)
+
+	return Arc(start, mid, stop, width, layer)
+
+
+def relabel(items: list, layer: str) -> list:
+	"""
+	Copies of lines and arcs on another layer, sharing their points
+	"""
+	return [Line(item.start, item.end, item.width, layer) if isinstance(item, Line) else Arc(item.start, item.mid, item.end, item.width, layer) for item in items]
+
+
+def pad(pid: int, loc: P2D, width: float, height: float, layer: str) -> Pad:
+	return Pad(pid, loc, width, height, layer)
+
+
+def loop(radius: float, increment: float, width: float, layer: str, wrap_multiplier: int) -> list[Arc]:
+	"""
+	Geometry counterpart of generator.loop, see there
+	"""
+	return [
+		arc(
+			P2D(radius, 0),
+			P2D(0, -wrap_multiplier * radius),
+			P2D(-radius, 0),
+			width,
+			layer,
+			bool(wrap_multiplier + 1)
+		),
+		arc(
+			P2D(-radius, 0),
+			P2D(increment / 2, wrap_multiplier * (radius + increment / 2)),
+			P2D(radius + increment, 0),
+			width,
+			layer,
+			bool(wrap_multiplier + 1)
+		)
+	]
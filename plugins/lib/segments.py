@@ -0,0 +1,291 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Turns coil geometry into straight current segments. The primitives are walked along the current path, starting at
+# pad 1, through all vias, to the other coil terminal. Arcs are split into chords within a given tolerance.
+
+import numpy as np
+
+from . import coilgenerator
+from . import primitives
+from . import spec as coilspec
+
+CHORD_TOLERANCE = 0.01 # (mm)
+POINT_DIGITS = 6 # points closer than 1 nm are considered connected
+
+
+def get_chord_count(radius, sweep, chord_tolerance):
+	"""
+	Number of chords needed so no chord deviates more than chord_tolerance from the arc.
+	Works on floats and on numpy arrays
+	"""
+	ratio = np.clip(1 - chord_tolerance / np.maximum(radius, chord_tolerance), -1, 1)
+	max_step = np.maximum(2 * np.arccos(ratio), 1e-6)
+
+	return np.maximum(np.ceil(np.abs(sweep) / max_step), 1).astype(int)
+
+
+def get_arc_arrays(arcs: list) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+	"""
+	Vectorized primitives.get_arc_sweep for many arcs at once
+	Args:
+		arcs: primitives.Arc records, or an (A, 6) array of start, mid and end points
+
+	Returns:
+		(np.ndarray, ...): (A,) arrays of center x, center y, radius, start angle and signed sweep through mid (radians)
+	"""
+	if isinstance(arcs, np.ndarray):
+		points = arcs
+	else:
+		points = np.array([(a.start.x, a.start.y, a.mid.x, a.mid.y, a.end.x, a.end.y) for a in arcs], dtype = float).reshape(-1, 6)
+
+	(ax, ay, bx, by, cx, cy) = points.T
+
+	d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+	ux = ((ax**2 + ay**2) * (by - cy) + (bx**2 + by**2) * (cy - ay) + (cx**2 + cy**2) * (ay - by)) / d
+	uy = ((ax**2 + ay**2) * (cx - bx) + (bx**2 + by**2) * (ax - cx) + (cx**2 + cy**2) * (bx - ax)) / d
+
+	start = np.arctan2(ay - uy, ax - ux)
+	mid = np.arctan2(by - uy, bx - ux)
+	end = np.arctan2(cy - uy, cx - ux)
+
+	sweep = (end - start) % (2 * np.pi)
+	sweep = np.where((mid - start) % (2 * np.pi) > sweep, sweep - 2 * np.pi, sweep)
+
+	return (ux, uy, np.hypot(ax - ux, ay - uy), start, sweep)
+
+
+def tessellate_arcs(arcs: list, chord_tolerance: float = CHORD_TOLERANCE) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Splits all arcs into chords at once, the number of chords adapts to each arc's radius and sweep
+	Args:
+		arcs: primitives.Arc records, or an (A, 6) array of start, mid and end points
+		chord_tolerance: Maximum deviation of arc chords from the arc (mm)
+
+	Returns:
+		(np.ndarray, np.ndarray): ((P, 2) points of all arcs from start to end, (A + 1,) offsets of each arc's points)
+	"""
+	(ux, uy, radius, start, sweep) = get_arc_arrays(arcs)
+	counts = get_chord_count(radius, sweep, chord_tolerance)
+
+	offsets = np.concatenate(([0], np.cumsum(counts + 1)))
+	index = np.repeat(np.arange(len(arcs)), counts + 1)
+	fraction = (np.arange(offsets[-1]) - offsets[index]) / counts[index]
+	angles = start[index] + sweep[index] * fraction
+
+	points = np.column_stack((ux[index] + radius[index] * np.cos(angles), uy[index] + radius[index] * np.sin(angles)))
+
+	return (points, offsets)
+
+
+def _key(layer, point):
+	return (layer, round(point.x, POINT_DIGITS), round(point.y, POINT_DIGITS))
+
+
+def trace_path(geometry: primitives.CoilGeometry) -> list:
+	"""
+	Orders the coil primitives along the current path, from pad 1 to the other terminal
+	Args:
+		geometry: Coil geometry from coilgenerator.generate_geometry()
+
+	Returns:
+		list: ("trace", primitive, reversed) and ("via", Via, from layer name, to layer name) steps in current direction
+	"""
+	traces = geometry.lines + geometry.arcs
+	endpoints = {}
+	for (index, trace) in enumerate(traces):
+		endpoints.setdefault(_key(trace.layer, trace.start), []).append(index)
+		endpoints.setdefault(_key(trace.layer, trace.end), []).append(index)
+
+	vias = dict(((round(v.loc.x, POINT_DIGITS), round(v.loc.y, POINT_DIGITS)), v) for v in geometry.vias)
+
+	# the path starts at the trace end that lies within pad 1
+	start_pad = [p for p in geometry.pads if p.pid == 1][0]
+	(layer, point) = (None, None)
+	for trace in traces:
+		for end in (trace.start, trace.end):
+			if trace.layer == start_pad.layer and abs(end.x - start_pad.loc.x) <= start_pad.width / 2 and abs(end.y - start_pad.loc.y) <= start_pad.height / 2:
+				(layer, point) = (trace.layer, end)
+
+	used = [False] * len(traces)
+	steps = []
+
+	while point is not None:
+		candidates = [i for i in endpoints.get(_key(layer, point), []) if not used[i]]
+
+		if candidates:
+			index = candidates[0]
+			used[index] = True
+			trace = traces[index]
+			reverse = _key(layer, trace.end) == _key(layer, point)
+
+			steps.append(("trace", trace, reverse))
+			point = trace.start if reverse else trace.end
+
+			continue
+
+		# continue on another layer if the path ends in a via
+		via = vias.get((round(point.x, POINT_DIGITS), round(point.y, POINT_DIGITS)))
+		next_layer = None
+
+		if via is not None:
+			for other_layer in geometry.layer_names:
+				if other_layer != layer and any(not used[i] for i in endpoints.get(_key(other_layer, point), [])):
+					next_layer = other_layer
+					break
+
+		if next_layer is None:
+			break
+
+		steps.append(("via", via, layer, next_layer))
+		layer = next_layer
+
+	return steps
+
+
+def iter_path(geometry: primitives.CoilGeometry, chord_tolerance: float = CHORD_TOLERANCE):
+	"""
+	Discretizes the current path of a coil step by step, so callers can stream it
+	Args:
+		geometry: Coil geometry from coilgenerator.generate_geometry()
+		chord_tolerance: Maximum deviation of arc chords from the arc (mm)
+
+	Yields:
+		("trace", (M, 2) points in current direction (mm), copper layer index, trace width) or
+		("via", Via, from copper layer index, to copper layer index)
+	"""
+	copper_layer_count = len(geometry.layer_names)
+
+	for step in trace_path(geometry):
+		if step[0] == "via":
+			(_, via, from_layer, to_layer) = step
+			yield ("via", via, coilgenerator.get_copper_layer_index(from_layer, copper_layer_count), coilgenerator.get_copper_layer_index(to_layer, copper_layer_count))
+
+			continue
+
+		(_, trace, reverse) = step
+		layer = coilgenerator.get_copper_layer_index(trace.layer, copper_layer_count)
+
+		if isinstance(trace, primitives.Line):
+			points = np.array([(trace.start.x, trace.start.y), (trace.end.x, trace.end.y)])
+		else:
+			(ux, uy, radius, start, sweep) = primitives.get_arc_sweep(trace)
+			angles = start + sweep * np.linspace(0, 1, int(get_chord_count(radius, sweep, chord_tolerance)) + 1)
+			points = np.column_stack((ux + radius * np.cos(angles), uy + radius * np.sin(angles)))
+
+		if reverse:
+			points = points[::-1]
+
+		yield ("trace", points, layer, trace.width)
+
+
+def get_path_vertices(geometry: primitives.CoilGeometry, chord_tolerance: float = CHORD_TOLERANCE) -> np.ndarray:
+	"""
+	Discretizes the current path of a coil into a polyline. Vias show up as two consecutive vertices with the same
+	position but different layers
+	Args:
+		geometry: Coil geometry from coilgenerator.generate_geometry()
+		chord_tolerance: Maximum deviation of arc chords from the arc (mm)
+
+	Returns:
+		np.ndarray: (N, 3) vertices of x, y (mm) and copper layer index
+	"""
+	vertices = []
+
+	for step in iter_path(geometry, chord_tolerance):
+		if step[0] == "via":
+			(_, via, _, to_layer) = step
+			vertices.append(np.array([[via.loc.x, via.loc.y, to_layer]]))
+
+			continue
+
+		(_, points, layer, _) = step
+
+		# the first point equals the last vertex of the previous trace
+		if vertices:
+			points = points[1:]
+
+		vertices.append(np.column_stack((points, np.full(len(points), layer))))
+
+	if not vertices:
+		return np.zeros((0, 3))
+
+	return np.concatenate(vertices).astype(float)
+
+
+def place_vertices(vertices: np.ndarray, placement, copper_layer_count: int) -> np.ndarray:
+	"""
+	Moves footprint vertices to their position on the board
+	Args:
+		vertices: (N, 3) vertices from get_path_vertices()
+		placement: board.Placement of the coil
+		copper_layer_count: Number of copper layers of the board
+
+	Returns:
+		np.ndarray: (N, 3) vertices in board coordinates
+	"""
+	placed = np.empty_like(vertices)
+	(placed[:, 0], placed[:, 1]) = placement.to_board(vertices[:, 0], vertices[:, 1])
+
+	if placement.flipped:
+		placed[:, 2] = copper_layer_count - 1 - vertices[:, 2]
+	else:
+		placed[:, 2] = vertices[:, 2]
+
+	return placed
+
+
+def to_segments(vertices: np.ndarray, stackup) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Converts a polyline into straight 3d current segments
+	Args:
+		vertices: (N, 3) vertices of x, y and copper layer index
+		stackup: Stackup providing the z position of each layer
+
+	Returns:
+		(np.ndarray, np.ndarray): (N - 1, 3) segment start and end points in mm
+	"""
+	layer_z = np.array(stackup.layer_z)
+	points = np.column_stack((vertices[:, 0], vertices[:, 1], layer_z[vertices[:, 2].astype(int)]))
+
+	return (points[:-1], points[1:])
+
+
+def get_layout_segments(layout, chord_tolerance: float = CHORD_TOLERANCE) -> list[tuple[np.ndarray, np.ndarray]]:
+	"""
+	Discretizes every coil of a board layout. Coils with identical specs are only generated once
+	Args:
+		layout: board.Layout with placed coils
+		chord_tolerance: Maximum deviation of arc chords from the arc (mm)
+
+	Returns:
+		[(np.ndarray, np.ndarray)]: Segment start and end points per placed coil, in board coordinates
+	"""
+	layer_names = coilgenerator.get_layer_names(layout.copper_layer_count)
+	cache = {}
+	result = []
+
+	for placement in layout.placements:
+		key = coilspec.get_key(placement.spec)
+
+		if key not in cache:
+			cache[key] = get_path_vertices(coilspec.generate_geometry(placement.spec, layer_names), chord_tolerance)
+
+		vertices = place_vertices(cache[key], placement, layout.copper_layer_count)
+		result.append(to_segments(vertices, layout.stackup))
+
+	return result
@@ -0,0 +1,485 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Local JSON-RPC 2.0 service for scripted generation. Messages are single lines of JSON on a Unix socket or a localhost
+# TCP connection. Requests wait in a bounded queue, a dispatcher hands them in batches to a pool of worker processes
+# that have imported the generator once. A full queue or unread responses stop reading from a connection, so clients
+# are slowed down by their socket instead of growing the server's memory.
+# The service has no authentication, so TCP is only served on loopback addresses unless remote clients are allowed
+# explicitly. A worker that dies breaks the whole pool, the pool is then replaced and its running batches fail.
+
+import os
+import json
+import socket
+import asyncio
+import ipaddress
+import concurrent.futures
+
+from . import spec as coilspec
+from . import coilgenerator
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+QUEUE_SIZE = 1024 # requests waiting for a worker
+BATCH_SIZE = 32 # requests sent to a worker at once
+LINE_LIMIT = 1 << 20 # (bytes) longest request line, also bounds the unread input per connection
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class ServiceError(Exception):
+	"""
+	Error response of the service
+	"""
+
+	def __init__(self, code: int, message: str):
+		super().__init__(message)
+		self.code = code
+
+
+def get_address(text: str):
+	"""
+	Returns:
+		str | (str, int): Unix socket path, or (host, port) for "host:port"
+	"""
+	(host, separator, port) = text.rpartition(":")
+
+	if separator and port.isdigit() and "/" not in text:
+		return (host or "127.0.0.1", int(port))
+
+	return text
+
+
+def is_loopback(host: str) -> bool:
+	"""
+	Returns:
+		bool: True if every address a host name resolves to is a loopback address
+	"""
+	try:
+		return ipaddress.ip_address(host).is_loopback
+	except ValueError:
+		pass
+
+	try:
+		infos = socket.getaddrinfo(host, None, proto = socket.IPPROTO_TCP)
+	except socket.gaierror:
+		return False
+
+	return bool(infos) and all(ipaddress.ip_address(info[4][0].split("%")[0]).is_loopback for info in infos)
+
+
+def check_address(address, allow_remote: bool = False):
+	"""
+	Args:
+		address: Unix socket path or (host, port)
+		allow_remote: Allow TCP hosts that are not loopback addresses
+	Raises:
+		ValueError: If a TCP host is not a loopback address and remote clients are not allowed
+	"""
+	if isinstance(address, tuple) and not allow_remote and not is_loopback(address[0]):
+		raise ValueError(f"{address[0]} is not a loopback address and the service has no authentication, remote clients have to be allowed explicitly")
+
+
+def _get_spec(params: dict) -> tuple[dict, list[str]]:
+	spec = coilspec.normalize(params.get("spec", {}))
+	copper_layer_count = max(spec["layer_count"], 2, int(params.get("copper_layer_count") or 0))
+
+	return (spec, coilgenerator.get_layer_names(copper_layer_count))
+
+
+def _generate(params: dict) -> dict:
+	(spec, layer_names) = _get_spec(params)
+
+	return {"name": spec["name"], "footprint": coilspec.generate(spec, layer_names)}
+
+
+def _validate(params: dict) -> dict:
+	(spec, _) = _get_spec(params)
+
+	warnings = []
+	if spec["via_outer"] < spec["via_drill"]:
+		warnings.append("Via drill is greater than outer diameter")
+	if not coilgenerator.estimate_is_coil_generatable(spec["outer_diameter"], spec["turns_count"], spec["trace_width"], spec["trace_spacing"], spec["via_outer"], spec["layer_count"], coilspec.get_shape(spec)):
+		warnings.append("This coil MAY not be generatable")
+
+	return {"generatable": not warnings, "warnings": warnings}
+
+
+def _metrics(params: dict) -> dict:
+	(spec, layer_names) = _get_spec(params)
+
+	return coilspec.generate_metrics(spec, layer_names).to_dict()
+
+
+def _ping(params: dict) -> dict:
+	return {"pid": os.getpid()}
+
+
+METHODS = {
+	"generate": _generate,
+	"validate": _validate,
+	"metrics": _metrics,
+	"ping": _ping
+}
+
+
+def execute(calls: list[tuple[str, dict]]) -> list[tuple[bool, object]]:
+	"""
+	Runs a batch of calls, in a worker process
+	Returns:
+		[(bool, object)]: (success, result or (error code, message)) per call
+	"""
+	results = []
+
+	for (method, params) in calls:
+		try:
+			results.append((True, METHODS[method](params)))
+		except (KeyError, TypeError, ValueError) as e:
+			results.append((False, (INVALID_PARAMS, type(e).__name__ + ": " + str(e))))
+		except Exception as e:
+			results.append((False, (SERVER_ERROR, type(e).__name__ + ": " + str(e))))
+
+	return results
+
+
+def _warm_up():
+	# loads the footprint template and runs every code path once, so the first request is as fast as all others
+	execute([(method, {"spec": {"layer_count": 2, "turns_count": 2}}) for method in METHODS])
+
+
+class Server:
+	"""
+	JSON-RPC server, see the module description
+	"""
+
+	def __init__(self, workers: int = None, queue_size: int = QUEUE_SIZE, batch_size: int = BATCH_SIZE, allow_remote: bool = False):
+		self.workers = workers or os.cpu_count() or 1
+		self.batch_size = batch_size
+		self.queue = None
+		self.queue_size = queue_size
+		self.allow_remote = allow_remote
+		self.executor = None
+		self.request_count = 0
+		self.restart_count = 0
+
+	async def serve(self, address):
+		"""
+		Serves until cancelled
+		Args:
+			address: Unix socket path or (host, port)
+		Raises:
+			ValueError: If a TCP host is not a loopback address and remote clients are not allowed
+		"""
+		check_address(address, self.allow_remote)
+
+		loop = asyncio.get_running_loop()
+		self.queue = asyncio.Queue(self.queue_size)
+		self.executor = self._create_executor()
+
+		# start every worker before the first request arrives
+		await asyncio.gather(*[loop.run_in_executor(self.executor, execute, []) for _ in range(self.workers)])
+
+		if isinstance(address, tuple):
+			server = await asyncio.start_server(self._on_connection, address[0], address[1], limit = LINE_LIMIT)
+		else:
+			if os.path.exists(address):
+				os.remove(address)
+			server = await asyncio.start_unix_server(self._on_connection, address, limit = LINE_LIMIT)
+
+		dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(2 * self.workers)]
+
+		try:
+			async with server:
+				await server.serve_forever()
+		finally:
+			for dispatcher in dispatchers:
+				dispatcher.cancel()
+			self.executor.shutdown(cancel_futures = True)
+
+			if not isinstance(address, tuple) and os.path.exists(address):
+				os.remove(address)
+
+	def _create_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+		return concurrent.futures.ProcessPoolExecutor(self.workers, initializer = _warm_up)
+
+	def _restart(self, executor: concurrent.futures.ProcessPoolExecutor):
+		"""
+		Replaces a broken pool. Dispatchers that saw the same pool break only replace it once
+		"""
+		if self.executor is not executor:
+			return
+
+		self.executor = self._create_executor()
+		self.restart_count += 1
+		executor.shutdown(wait = False, cancel_futures = True)
+
+	async def _dispatch(self):
+		"""
+		Takes the waiting requests, up to a batch, and runs them in one worker call.
+		Two dispatchers per worker keep the next batch ready while a worker is busy
+		"""
+		loop = asyncio.get_running_loop()
+
+		while True:
+			batch = [await self.queue.get()]
+			while len(batch) < self.batch_size and not self.queue.empty():
+				batch.append(self.queue.get_nowait())
+
+			executor = self.executor
+			try:
+				results = await loop.run_in_executor(executor, execute, [(method, params) for (method, params, _) in batch])
+			except concurrent.futures.BrokenExecutor as e:
+				# the batch may have killed the worker, so it is not run again
+				self._restart(executor)
+				results = [(False, (SERVER_ERROR, "Worker pool broke, it was restarted: " + type(e).__name__))] * len(batch)
+			except Exception as e:
+				results = [(False, (SERVER_ERROR, type(e).__name__ + ": " + str(e)))] * len(batch)
+
+			for ((_, _, future), result) in zip(batch, results):
+				if not future.done():
+					future.set_result(result)
+
+	async def _on_connection(self, reader, writer):
+		pending = set()
+
+		try:
+			while True:
+				try:
+					line = await reader.readline()
+				except (ValueError, asyncio.LimitOverrunError):
+					self._respond(writer, _error(None, INVALID_REQUEST, "Request line too long"))
+					break
+
+				if not line:
+					break
+				if not line.strip():
+					continue
+
+				try:
+					message = json.loads(line)
+				except ValueError as e:
+					self._respond(writer, _error(None, PARSE_ERROR, str(e)))
+					continue
+
+				if isinstance(message, list) and not message:
+					self._respond(writer, _error(None, INVALID_REQUEST, "Empty batch"))
+					continue
+
+				# waits while the queue is full, the connection is not read meanwhile
+				calls = [await self._submit(request) for request in (message if isinstance(message, list) else [message])]
+
+				task = asyncio.create_task(self._finish(writer, calls, isinstance(message, list)))
+				pending.add(task)
+				task.add_done_callback(pending.discard)
+
+				# a client that does not read its responses is not read either
+				await writer.drain()
+
+			if pending:
+				await asyncio.gather(*pending, return_exceptions = True)
+		except ConnectionError:
+			pass
+		finally:
+			for task in pending:
+				task.cancel()
+			writer.close()
+
+	async def _submit(self, request) -> tuple:
+		"""
+		Queues a single request
+		Returns:
+			(object, object, asyncio.Future): (request id, error response or None, future of the worker result or None)
+		"""
+		if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+			request_id = request.get("id") if isinstance(request, dict) else None
+			return (request_id, _error(request_id, INVALID_REQUEST, "Not a JSON-RPC 2.0 request"), None)
+
+		request_id = request.get("id")
+		method = request["method"]
+		params = request.get("params", {})
+
+		if method not in METHODS:
+			return (request_id, _error(request_id, METHOD_NOT_FOUND, "Unknown method " + method), None)
+		if not isinstance(params, dict):
+			return (request_id, _error(request_id, INVALID_PARAMS, "Parameters have to be an object"), None)
+
+		future = asyncio.get_running_loop().create_future()
+		await self.queue.put((method, params, future))
+		self.request_count += 1
+
+		# notifications are run, but get no response
+		return (request_id if "id" in request else _NOTIFICATION, None, future)
+
+	async def _finish(self, writer, calls: list[tuple], is_batch: bool):
+		"""
+		Writes the responses of one request line once all its calls are done
+		"""
+		responses = []
+
+		for (request_id, response, future) in calls:
+			if future is not None:
+				(success, result) = await future
+
+				if request_id is _NOTIFICATION:
+					continue
+
+				response = {"jsonrpc": "2.0", "id": request_id, "result": result} if success else _error(request_id, *result)
+
+			responses.append(response)
+
+		if not responses:
+			return
+
+		self._respond(writer, responses if is_batch else responses[0])
+		await writer.drain()
+
+	def _respond(self, writer, response):
+		writer.write(json.dumps(response, separators = (",", ":")).encode("utf-8") + b"\n")
+
+
+_NOTIFICATION = object()
+
+
+def _error(request_id, code: int, message: str) -> dict:
+	return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def serve(address = DEFAULT_ADDRESS, workers: int = None, queue_size: int = QUEUE_SIZE, batch_size: int = BATCH_SIZE, allow_remote: bool = False):
+	"""
+	Runs the service until interrupted
+	Args:
+		address: Unix socket path or "host:port"
+		workers: Worker processes, defaults to all CPUs
+		queue_size: Requests waiting for a worker before connections are no longer read
+		batch_size: Requests handed to a worker at once
+		allow_remote: Serve TCP on hosts that are not loopback addresses
+	Raises:
+		ValueError: If a TCP host is not a loopback address and remote clients are not allowed
+	"""
+	try:
+		asyncio.run(Server(workers, queue_size, batch_size, allow_remote).serve(get_address(address) if isinstance(address, str) else address))
+	except KeyboardInterrupt:
+		pass
+
+
+class Client:
+	"""
+	Blocking client for the service, one connection per client
+	"""
+
+	def __init__(self, address = DEFAULT_ADDRESS, timeout: float = None):
+		address = get_address(address) if isinstance(address, str) else address
+
+		if isinstance(address, tuple):
+			self.socket = socket.create_connection(address, timeout)
+			self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		else:
+			self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			self.socket.settimeout(timeout)
+			self.socket.connect(address)
+
+		self.file = self.socket.makefile("rb")
+		self.next_id = 0
+
+	def close(self):
+		self.file.close()
+		self.socket.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def _request(self, method: str, params: dict) -> dict:
+		self.next_id += 1
+
+		return {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params}
+
+	def _send(self, message):
+		self.socket.sendall(json.dumps(message, separators = (",", ":")).encode("utf-8") + b"\n")
+
+	def _receive(self):
+		line = self.file.readline()
+		if not line:
+			raise ConnectionError("Service closed the connection")
+
+		return json.loads(line)
+
+	def call(self, method: str, **params):
+		"""
+		Returns:
+			object: Result of a single call, raises ServiceError on error responses
+		"""
+		self._send(self._request(method, params))
+
+		return _get_result(self._receive())
+
+	def batch(self, calls: list[tuple[str, dict]], window: int = BATCH_SIZE * 4) -> list:
+		"""
+		Runs many calls. They are sent as JSON-RPC batches of at most window calls, which are pipelined two at a time
+		Returns:
+			list: Result or ServiceError per call, in order of the calls
+		"""
+		chunks = [[self._request(method, params) for (method, params) in calls[start:start + window]] for start in range(0, len(calls), window)]
+		results = {}
+
+		sent = 0
+		for received in range(len(chunks)):
+			while sent < len(chunks) and sent < received + 2:
+				self._send(chunks[sent])
+				sent += 1
+
+			responses = self._receive()
+			if isinstance(responses, dict):
+				raise _get_error(responses)
+
+			for response in responses:
+				try:
+					results[response["id"]] = _get_result(response)
+				except ServiceError as e:
+					results[response["id"]] = e
+
+		return [results[request["id"]] for chunk in chunks for request in chunk]
+
+	def generate(self, spec: dict, copper_layer_count: int = None) -> str:
+		"""
+		Returns:
+			str: Footprint text of a (partial) spec, see coilgenerator.generate()
+		"""
+		return self.call("generate", spec = spec, copper_layer_count = copper_layer_count)["footprint"]
+
+	def validate(self, spec: dict) -> dict:
+		return self.call("validate", spec = spec)
+
+	def metrics(self, spec: dict, copper_layer_count: int = None) -> dict:
+		return self.call("metrics", spec = spec, copper_layer_count = copper_layer_count)
+
+
+def _get_error(response: dict) -> ServiceError:
+	return ServiceError(response["error"]["code"], response["error"]["message"])
+
+
+def _get_result(response: dict):
+	if "error" in response:
+		raise _get_error(response)
+
+	return response["result"]
@@ -0,0 +1,170 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Minimal reader and writer for the S-expression files KiCad uses (.kicad_pcb, .kicad_mod, fp-lib-table).
+# Lists become python lists, bare atoms become str and quoted strings become String, so files can be written back
+# with their original quoting. Quoted strings keep their source text, atoms that are not replaced are written back
+# byte for byte.
+
+import re
+
+TOKEN = re.compile(r'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+UNESCAPED = re.compile(r'[\\"\n\r\t]')
+
+# escapes KiCad writes, any other escaped character stands for itself
+ESCAPES = {"n": "\n", "r": "\r", "t": "\t"}
+ESCAPED = dict([(value, "\\" + key) for (key, value) in ESCAPES.items()] + [("\\", "\\\\"), ('"', '\\"')])
+
+
+class String(str):
+	"""
+	Atom that was quoted in the source file
+	"""
+
+	def __new__(cls, value: str, source: str = None):
+		string = super().__new__(cls, value)
+		string.source = source
+
+		return string
+
+
+def unescape(text: str) -> str:
+	return ESCAPE.sub(lambda match: ESCAPES.get(match.group(1), match.group(1)), text)
+
+
+def escape(text: str) -> str:
+	return UNESCAPED.sub(lambda match: ESCAPED[match.group(0)], text)
+
+
+def parse(text: str) -> list:
+	"""
+	Parses the first S-expression in text
+	Args:
+		text: File content
+
+	Returns:
+		list: Nested lists of atoms
+	"""
+	stack = [[]]
+
+	for match in TOKEN.finditer(text):
+		token = match.group(0)
+
+		if token == "(":
+			stack.append([])
+		elif token == ")":
+			node = stack.pop()
+			stack[-1].append(node)
+
+			if len(stack) == 1:
+				break
+		elif token[0] == '"':
+			stack[-1].append(String(unescape(token[1:-1]), token))
+		else:
+			stack[-1].append(token)
+
+	if len(stack) != 1 or not stack[0]:
+		raise ValueError("Unbalanced S-expression")
+
+	return stack[0][0]
+
+
+def dump(node, indent: str = "", step: str = "  ") -> str:
+	"""
+	Formats an S-expression, placing nested lists on their own lines like KiCad does
+	Args:
+		node: Nested lists of atoms
+		indent: Indentation of node
+		step: Additional indentation per level
+
+	Returns:
+		str: Formatted S-expression
+	"""
+	if not isinstance(node, list):
+		return quote(node)
+
+	atoms = []
+	children = []
+	for child in node:
+		if isinstance(child, list):
+			children.append(child)
+		elif children:
+			# atoms after nested lists keep their position
+			children.append(child)
+		else:
+			atoms.append(quote(child))
+
+	text = indent + "(" + " ".join(atoms)
+
+	if not children:
+		return text + ")"
+
+	# lists that only hold flat lists stay on one line
+	if all(isinstance(child, list) and not any(isinstance(c, list) for c in child) for child in children):
+		return text + " " + " ".join(dump(child) for child in children) + ")"
+
+	for child in children:
+		if isinstance(child, list):
+			text += "\n" + dump(child, indent + step, step)
+		else:
+			text += " " + quote(child)
+
+	return text + "\n" + indent + ")"
+
+
+def quote(atom) -> str:
+	if isinstance(atom, String) and atom.source is not None:
+		return atom.source
+
+	if isinstance(atom, String) or atom == "" or re.search(r'[\s()"]', atom):
+		return '"' + escape(atom) + '"'
+
+	return atom
+
+
+def find(node: list, name: str):
+	"""
+	Returns:
+		list: First direct child list of node starting with name, None if there is none
+	"""
+	for child in node:
+		if isinstance(child, list) and child and child[0] == name:
+			return child
+
+	return None
+
+
+def find_all(node: list, name: str) -> list:
+	"""
+	Returns:
+		[list]: All direct child lists of node starting with name
+	"""
+	return [child for child in node if isinstance(child, list) and child and child[0] == name]
+
+
+def get_value(node: list, name: str, default = None):
+	"""
+	Returns:
+		str: First atom of the child list starting with name, default if there is none
+	"""
+	child = find(node, name)
+
+	if child is None or len(child) < 2:
+		return default
+
+	return child[1]
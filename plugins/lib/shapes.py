@@ -0,0 +1,594 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Spirals of any convex shape that is symmetric to the x axis and crosses it perpendicularly. Every outline is a
+# core polygon grown by a corner radius: circles, stadiums and rounded rectangles share a rectangular core, regular
+# polygons with an even number of sides have flats facing +x and -x. An outline is shrunk by its inset: first its
+# corner radius, then its core. All outlines of a shape are parallel, outlines one pitch apart are one pitch apart
+# everywhere.
+#
+# Turns are placed like the two half circles of generator.loop(): the half from +x to -x is the outline at the
+# inset of the turn, the half back to +x is the outline half a pitch further out, shifted by half a pitch along x.
+# Both halves meet on the x axis and every turn ends one pitch further out than it started. The outlines of all
+# turns are computed at once, the pieces of a half outline are arcs around the core's vertices and the lines between
+# them. Connections to vias continue the spiral by one more turn, inwards or outwards, up to the point closest to
+# the via. The shape only needs numpy, circular coils without a shape keep the placement of coilgenerator.
+
+import math
+
+import numpy as np
+
+from . import generator
+from . import coilgenerator
+
+SHAPES = ["circle", "rectangle", "stadium", "polygon"]
+EPSILON = 1e-9 # (mm) pieces shorter than this are dropped
+ARC_SEGMENTS = 8 # segments of a corner arc in polylines
+
+
+class Shape:
+	"""
+	Family of parallel outlines. Inset 0 is the outline through the outer end of the spiral, like the radius
+	outer_diameter / 2 + trace_spacing of a circular coil. Positive insets are further inside
+	"""
+
+	def __init__(self, kind: str, outer_diameter: float, outer_height: float, corner_radius: float, polygon_sides: int, trace_spacing: float):
+		"""
+		Args:
+			kind: One of SHAPES
+			outer_diameter: Width of circles, stadiums and rectangles, distance of opposite flats of polygons (mm)
+			outer_height: Height of stadiums and rectangles (mm)
+			corner_radius: Corner radius of rectangles and polygons (mm)
+			polygon_sides: Even number of polygon sides
+			trace_spacing: Distance between line traces, the outer end of the spiral is this far outside the outline
+		"""
+		self.kind = kind
+
+		if kind in ("circle", "stadium", "rectangle"):
+			half_width = outer_diameter / 2 + trace_spacing
+			half_height = (outer_diameter if kind == "circle" else outer_height) / 2 + trace_spacing
+			self.inradius = min(half_width, half_height)
+
+			if kind == "rectangle":
+				self.radius = min(max(corner_radius, 0) + trace_spacing, self.inradius)
+			else:
+				self.radius = self.inradius
+
+			(core_x, core_y) = (half_width - self.radius, half_height - self.radius)
+			vertices = [(core_x, 0), (core_x, -core_y), (-core_x, -core_y), (-core_x, 0)]
+			miters = [(1, 0), (1, -1), (-1, -1), (-1, 0)]
+			normals = [0, -math.pi / 2, -math.pi]
+		elif kind == "polygon":
+			if polygon_sides < 4 or polygon_sides % 2 != 0:
+				raise ValueError("Polygon coils need an even number of at least 4 sides")
+
+			self.inradius = outer_diameter / 2 + trace_spacing
+			self.radius = min(max(corner_radius, 0) + trace_spacing, self.inradius)
+
+			# vertices of a polygon with apothem 1, the lower half from +x to -x
+			step = 2 * math.pi / polygon_sides
+			units = [(math.cos(-(j + 0.5) * step) / math.cos(step / 2), math.sin(-(j + 0.5) * step) / math.cos(step / 2)) for j in range(polygon_sides // 2)]
+
+			core = self.inradius - self.radius
+			vertices = [(core, 0)] + [(x * core, y * core) for (x, y) in units] + [(-core, 0)]
+			miters = [(1, 0)] + units + [(-1, 0)]
+			normals = [-j * step for j in range(polygon_sides // 2 + 1)]
+		else:
+			raise ValueError("Unknown coil shape: " + str(kind))
+
+		# chain of core vertices of the lower half, each with the normal angles of the edges before and after it
+		self.vertices = np.array(vertices, dtype = float)
+		self.miters = np.array(miters, dtype = float)
+		angles_in = np.array([normals[0]] + normals, dtype = float)
+		angles_out = np.array(normals + [normals[-1]], dtype = float)
+
+		self.sweeps = angles_out - angles_in
+		self.units_in = np.stack((np.cos(angles_in), np.sin(angles_in)), axis = 1)
+		self.units_mid = np.stack((np.cos((angles_in + angles_out) / 2), np.sin((angles_in + angles_out) / 2)), axis = 1)
+		self.units_out = np.stack((np.cos(angles_out), np.sin(angles_out)), axis = 1)
+
+	def get_x(self, inset: float) -> float:
+		"""
+		Returns:
+			float: x where the outline crosses the +x axis, which is the same distance as the -x crossing (mm)
+		"""
+		return float(self.vertices[0, 0] + self.radius - inset)
+
+	def get_halves(self, insets: np.ndarray) -> tuple:
+		"""
+		Lower halves of outlines, from +x to -x through negative y
+		Args:
+			insets: (T,) insets of the outlines
+
+		Returns:
+			(np.ndarray, ...): (centers (T, K, 2), radii (T,), arc starts, arc mids, arc ends (T, K, 2)) of the corner
+			arcs around the K core vertices, the lines between them connect the end of one arc to the start of the next
+		"""
+		insets = np.asarray(insets, dtype = float)
+		radii = self.radius - insets
+		shrink = np.maximum(-radii, 0.0)
+		radii = np.maximum(radii, 0.0)
+
+		centers = self.vertices - shrink[:, None, None] * self.miters
+		offsets = radii[:, None, None]
+
+		return (centers, radii, centers + offsets * self.units_in, centers + offsets * self.units_mid, centers + offsets * self.units_out)
+
+	def get_core(self, inset: float) -> tuple[np.ndarray, float]:
+		"""
+		Returns:
+			(np.ndarray, float): (closed core polygon (K, 2) counter-clockwise, corner radius) of an outline
+		"""
+		(centers, radii, _, _, _) = self.get_halves([inset])
+		lower = centers[0]
+
+		return (np.concatenate((lower[::-1] * (1, -1), lower[1:-1])), float(radii[0]))
+
+	def get_outline(self, inset: float) -> list[tuple]:
+		"""
+		Returns:
+			[tuple]: Pieces of the closed outline, counter-clockwise from the +x axis through positive y
+		"""
+		(centers, radii, starts, mids, ends) = self.get_halves([inset])
+		flip = np.array([1.0, -1.0])
+
+		pieces = []
+		# the upper half is the lower one mirrored, the lower half runs backwards from -x to +x
+		add_half(pieces, (centers[0] * flip).tolist(), radii[0], (starts[0] * flip).tolist(), (mids[0] * flip).tolist(), (ends[0] * flip).tolist(), (-self.sweeps).tolist())
+		add_half(pieces, centers[0, ::-1].tolist(), radii[0], ends[0, ::-1].tolist(), mids[0, ::-1].tolist(), starts[0, ::-1].tolist(), (-self.sweeps[::-1]).tolist())
+
+		return merge_pieces(pieces)
+
+	def get_length(self, inset: float) -> float:
+		"""
+		Returns:
+			float: Circumference of an outline (mm)
+		"""
+		return sum(get_piece_length(piece) for piece in self.get_outline(inset))
+
+	def get_points(self, inset: float, fractions) -> list[tuple[float, float]]:
+		"""
+		Points at fractions of the circumference of an outline, counter-clockwise from the +x axis
+		"""
+		pieces = self.get_outline(inset)
+		lengths = np.cumsum([get_piece_length(piece) for piece in pieces])
+		targets = np.asarray(fractions, dtype = float) * lengths[-1]
+		indices = np.minimum(np.searchsorted(lengths, targets, side = "right"), len(pieces) - 1)
+
+		points = []
+		for (target, index) in zip(targets.tolist(), indices.tolist()):
+			before = lengths[index - 1] if index > 0 else 0.0
+			piece = pieces[index]
+			points.append(get_piece_point(piece, (target - before) / max(get_piece_length(piece), EPSILON)))
+
+		return points
+
+	def get_polyline(self, inset: float) -> list[tuple[float, float]]:
+		"""
+		Returns:
+			[(float, float)]: Closed outline with arcs split into chords, counter-clockwise
+		"""
+		points = []
+		for piece in self.get_outline(inset):
+			if piece[0] == "line":
+				points.append(piece[1])
+			else:
+				points.extend(get_piece_point(piece, step / ARC_SEGMENTS) for step in range(ARC_SEGMENTS))
+
+		return points
+
+	def get_half_size(self, inset: float) -> tuple[float, float]:
+		"""
+		Returns:
+			(float, float): (half width, half height) of an outline (mm)
+		"""
+		(core, radius) = self.get_core(inset)
+
+		return (float(np.abs(core[:, 0]).max()) + radius, float(np.abs(core[:, 1]).max()) + radius)
+
+	def get_signed_distance(self, inset: float, points: np.ndarray) -> np.ndarray:
+		"""
+		Args:
+			points: (P, 2) points (mm)
+
+		Returns:
+			np.ndarray: (P,) distance of the points to an outline, negative inside of it (mm)
+		"""
+		(core, radius) = self.get_core(inset)
+		points = np.asarray(points, dtype = float)
+
+		starts = core
+		edges = np.roll(core, -1, axis = 0) - core
+		offsets = points[:, None, :] - starts[None, :, :]
+
+		lengths = np.maximum(np.einsum("ij,ij->i", edges, edges), EPSILON**2)
+		t = np.clip(np.einsum("pij,ij->pi", offsets, edges) / lengths, 0, 1)
+		distances = np.hypot(*np.moveaxis(offsets - t[..., None] * edges, -1, 0)).min(axis = 1)
+
+		# inside of the counter-clockwise core all edges have the point on their left, degenerate cores have no inside
+		cross = edges[None, :, 0] * offsets[..., 1] - edges[None, :, 1] * offsets[..., 0]
+		inside = np.all(cross > EPSILON, axis = 1)
+
+		return np.where(inside, -distances, distances) - radius
+
+	def get_rect_distance(self, inset: float, x: float, y: float, width: float, height: float) -> float:
+		"""
+		Returns:
+			float: Distance of an axis aligned rectangle outside of an outline to the outline (mm)
+		"""
+		(core, radius) = self.get_core(inset)
+		corners = np.array([(x + sx * width / 2, y + sy * height / 2) for sx in (-1, 1) for sy in (-1, 1)])
+
+		# two convex shapes are closest at a vertex of one of them
+		dx = np.maximum(np.abs(core[:, 0] - x) - width / 2, 0)
+		dy = np.maximum(np.abs(core[:, 1] - y) - height / 2, 0)
+		to_rect = float(np.hypot(dx, dy).min())
+		to_core = float((self.get_signed_distance(inset, corners) + radius).min())
+
+		return min(to_rect, to_core) - radius
+
+	def get_turn_pieces(self, insets: np.ndarray, pitch: float, multiplier: int) -> list[tuple]:
+		"""
+		Pieces of consecutive turns. Each turn starts at the +x crossing of its inset and ends one pitch further out
+		Args:
+			insets: (T,) insets of the turns
+			pitch: Trace width plus trace spacing
+			multiplier: 1 for CW, -1 for CCW, the first half runs through -multiplier * y
+
+		Returns:
+			[tuple]: Pieces, see add_half()
+		"""
+		insets = np.asarray(insets, dtype = float)
+		scale = np.array([1.0, multiplier])
+		(centers, radii, starts, mids, ends) = self.get_halves(insets)
+
+		# the second half is mirrored to the other side of the x axis, runs backwards and is shifted by half a pitch
+		shift = np.array([pitch / 2, 0.0])
+		flip = scale * (1, -1)
+		(upper_centers, upper_radii, upper_starts, upper_mids, upper_ends) = self.get_halves(insets - pitch / 2)
+
+		lower = [(centers * scale).tolist(), radii.tolist(), (starts * scale).tolist(), (mids * scale).tolist(), (ends * scale).tolist()]
+		upper = [(upper_centers[:, ::-1] * flip + shift).tolist(), upper_radii.tolist(), (upper_ends[:, ::-1] * flip + shift).tolist(), (upper_mids[:, ::-1] * flip + shift).tolist(), (upper_starts[:, ::-1] * flip + shift).tolist()]
+
+		# mirroring and running backwards cancel out, both halves turn the same way
+		lower_sweeps = (multiplier * self.sweeps).tolist()
+		upper_sweeps = lower_sweeps[::-1]
+
+		pieces = []
+		for turn in range(len(insets)):
+			add_half(pieces, lower[0][turn], lower[1][turn], lower[2][turn], lower[3][turn], lower[4][turn], lower_sweeps)
+			add_half(pieces, upper[0][turn], upper[1][turn], upper[2][turn], upper[3][turn], upper[4][turn], upper_sweeps)
+
+		return merge_pieces(pieces)
+
+	def generate_coil_spiral(self, wrap_clockwise, layer_count, trace_width, trace_spacing, turns_per_layer, layer_names, arc_connectors, progress = None, emitter = generator):
+		"""
+		Generates coil spirals and connects them to vias, see coilgenerator.generate_coil_spiral()
+		Returns:
+			([str], [str], float): (Generated arcs, generated lines, x of the outer end of the spirals)
+		Raises:
+			GenerationCancelled: If the progress callback requested to abort
+		"""
+		wrap_direction_multiplier = 1 if wrap_clockwise else -1
+		pitch = trace_width + trace_spacing
+		insets = (turns_per_layer - np.arange(turns_per_layer)) * pitch
+		arcs = []
+		lines = []
+
+		# layers of the same parity share their turns, emitters that can relabel primitives emit them once
+		relabel = getattr(emitter, "relabel", None)
+		layer_pieces = {}
+		layer_turns = {}
+
+		for layer in range(layer_count):
+			# for odd layers, the wrap direction needs to be flipped
+			multiplier = wrap_direction_multiplier * (-1 if layer % 2 != 0 else 1)
+
+			if relabel is not None and multiplier in layer_turns:
+				(turn_arcs, turn_lines) = layer_turns[multiplier]
+				arcs.extend(relabel(turn_arcs, layer_names[layer]))
+				lines.extend(relabel(turn_lines, layer_names[layer]))
+
+				if progress is not None:
+					coilgenerator.report_progress(progress, (layer + 1) * turns_per_layer, layer_count, turns_per_layer)
+			else:
+				if multiplier not in layer_pieces:
+					layer_pieces[multiplier] = self.get_turn_pieces(insets, pitch, multiplier)
+
+				(turn_arcs, turn_lines) = ([], [])
+				pieces = layer_pieces[multiplier]
+
+				# merged pieces span turns, the layer is emitted in one chunk of about a turn per progress step
+				bounds = np.linspace(0, len(pieces), turns_per_layer + 1).astype(int) if progress is not None else [0, len(pieces)]
+				for turn in range(len(bounds) - 1):
+					emit_pieces(pieces[bounds[turn]:bounds[turn + 1]], trace_width, layer_names[layer], turn_arcs, turn_lines, emitter)
+
+					if progress is not None:
+						coilgenerator.report_progress(progress, layer * turns_per_layer + turn + 1, layer_count, turns_per_layer)
+
+				layer_turns[multiplier] = (turn_arcs, turn_lines)
+				arcs.extend(turn_arcs)
+				lines.extend(turn_lines)
+
+			# connect up to two vias, or one for the first layer
+			(first_via_inside, second_via_inside) = (layer % 2 != 0, layer % 2 == 0)
+
+			if layer > 0:
+				self.connect_via(turns_per_layer * pitch if first_via_inside else 0.0, first_via_inside, multiplier, pitch, arc_connectors[layer - 1], trace_width, layer_names[layer], arcs, lines, emitter)
+
+			if layer < (layer_count - 1) or (layer_count % 2 != 0):
+				self.connect_via(turns_per_layer * pitch if second_via_inside else 0.0, second_via_inside, multiplier, pitch, arc_connectors[layer], trace_width, layer_names[layer], arcs, lines, emitter)
+
+		return (arcs, lines, self.get_x(0))
+
+	def connect_via(self, end_inset, inside, multiplier, pitch, arc_connector, trace_width, layer_name, arcs, lines, emitter = generator):
+		"""
+		Connects an end of a spiral to a via. Far vias are reached by continuing the spiral up to the point closest to
+		the via: inner ends run the turn inside of the spiral backwards, outer ends run one more turn outside of it
+		Args:
+			end_inset: Inset of the spiral end, which is on the +x axis
+			inside: True for the inner end of the spiral
+			multiplier: Winding of the layer, see get_turn_pieces()
+		"""
+		end = (self.get_x(end_inset), 0.0)
+		target = (arc_connector.x, arc_connector.y)
+
+		if math.dist(end, target) >= 3 * pitch:
+			if inside:
+				pieces = [reverse_piece(piece) for piece in reversed(self.get_turn_pieces([end_inset + pitch], pitch, multiplier))]
+			else:
+				pieces = self.get_turn_pieces([end_inset], pitch, multiplier)
+
+			pieces = cut_pieces(pieces, target)
+			emit_pieces(pieces, trace_width, layer_name, arcs, lines, emitter)
+
+			if pieces:
+				end = pieces[-1][-4] if pieces[-1][0] == "arc" else pieces[-1][2]
+
+		lines.append(emitter.line(generator.P2D(*end), generator.P2D(*target), trace_width, layer_name))
+
+	def generate_vias(self, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, layer_count, emitter = generator):
+		"""
+		Generates vias spread evenly along the outlines one pitch and a via diameter inside and outside of the spiral,
+		see coilgenerator.generate_vias()
+		Returns:
+			([str], [Connector]): (Generated vias, via positions for connecting the spirals)
+		"""
+		pitch = trace_width + trace_spacing
+		(num_vias_inside, num_vias_outside) = coilgenerator.get_num_vias(layer_count)
+
+		inside = self.get_points((turns_per_layer + 1) * pitch + via_diameter, np.arange(num_vias_inside) / num_vias_inside)
+		outside = self.get_points(-(pitch + via_diameter), np.arange(num_vias_outside) / max(num_vias_outside, 1)) if num_vias_outside else []
+
+		via_count = num_vias_inside + num_vias_outside
+		arc_connectors = []
+		vias = []
+
+		for v in range(via_count):
+			(points, count) = (inside, num_vias_inside) if v % 2 == 0 else (outside, num_vias_outside)
+			(x, y) = points[v // 2]
+
+			arc_connectors.append(coilgenerator.Connector(x, y, (v // 2) * 360 / count))
+
+			# if the coil has an odd layer count, the last via is pad number 2
+			padnum = 2 if layer_count % 2 == 1 and v == via_count - 1 else 0
+			vias.append(emitter.via(generator.P2D(x, y), via_diameter, via_drill, padnum))
+
+		return (vias, arc_connectors)
+
+	def get_ring(self, turns_per_layer, trace_width, trace_spacing) -> "Ring":
+		"""
+		Returns:
+			Ring: Area covered by the turns of a layer
+		"""
+		return Ring(self, turns_per_layer * (trace_width + trace_spacing), 0.0, trace_width)
+
+	def estimate_is_coil_generatable(self, turns_per_layer, trace_width, trace_spacing, via_diameter, layer_count):
+		"""
+		Estimate of coilgenerator.estimate_is_coil_generatable() for this shape: the inner vias fit on half the
+		circumference of their outline
+		"""
+		inset = (turns_per_layer + 1) * (trace_width + trace_spacing) + via_diameter
+
+		if inset >= self.inradius:
+			return False
+
+		(num_vias_inside, _) = coilgenerator.get_num_vias(layer_count)
+
+		return self.get_length(inset) / 2 - num_vias_inside * (via_diameter + trace_width) >= 0
+
+
+class Ring:
+	"""
+	Copper of all turns of a layer, between the inner edge of the innermost and the outer edge of the outermost turn
+	"""
+
+	def __init__(self, shape: Shape, inner_inset: float, outer_inset: float, trace_width: float):
+		self.shape = shape
+		self.inner_inset = inner_inset + trace_width / 2
+		self.outer_inset = outer_inset - trace_width / 2
+
+	def get_point_distance(self, x: float, y: float) -> float:
+		"""
+		Returns:
+			float: Distance of a point to the ring, negative on it (mm)
+		"""
+		return float(self.get_point_distances([(x, y)])[0])
+
+	def get_point_distances(self, points) -> np.ndarray:
+		"""
+		Args:
+			points: (P, 2) points (mm)
+
+		Returns:
+			np.ndarray: (P,) distance of the points to the ring, negative on it (mm)
+		"""
+		points = np.asarray(points, dtype = float).reshape(-1, 2)
+		inner = self.shape.get_signed_distance(self.inner_inset, points)
+		outer = self.shape.get_signed_distance(self.outer_inset, points)
+
+		return np.maximum(-inner, outer)
+
+	def get_rect_distance(self, x: float, y: float, width: float, height: float) -> float:
+		"""
+		Returns:
+			float: Distance of a rectangle outside of the ring to the ring (mm)
+		"""
+		return self.shape.get_rect_distance(self.outer_inset, x, y, width, height)
+
+
+def get_shape(outer_diameter: float, trace_spacing: float, shape: dict) -> Shape:
+	"""
+	Args:
+		shape: Shape parameters keyed by menu ids, see spec.get_shape()
+	"""
+	return Shape(shape["shape"], outer_diameter, shape["outer_height"], shape["corner_radius"], shape["polygon_sides"], trace_spacing)
+
+
+def add_half(pieces: list, centers: list, radius: float, starts: list, mids: list, ends: list, sweeps: list):
+	"""
+	Appends the pieces of a half outline: ("arc", start, mid, end, center, radius, sweep) with the sweep in the
+	direction of travel, or ("line", start, end). Corner arcs without radius and lines without length are dropped
+	"""
+	for index in range(len(centers)):
+		if radius > EPSILON and sweeps[index] != 0:
+			pieces.append(("arc", tuple(starts[index]), tuple(mids[index]), tuple(ends[index]), tuple(centers[index]), radius, sweeps[index]))
+
+		if index + 1 < len(centers):
+			(start, end) = (ends[index], starts[index + 1])
+			if abs(end[0] - start[0]) + abs(end[1] - start[1]) > EPSILON:
+				pieces.append(("line", tuple(start), tuple(end)))
+
+
+def merge_pieces(pieces: list) -> list:
+	"""
+	Joins consecutive collinear lines and consecutive arcs around the same center, so straight sides and half
+	circles are single primitives even where two halves of a turn meet
+	"""
+	merged = []
+
+	for piece in pieces:
+		previous = merged[-1] if merged else None
+
+		if previous is not None and previous[0] == piece[0] == "line":
+			(a, b, c) = (previous[1], previous[2], piece[2])
+			cross = (b[0] - a[0]) * (c[1] - b[1]) - (b[1] - a[1]) * (c[0] - b[0])
+			if abs(cross) <= EPSILON * math.dist(a, b) * math.dist(b, c) * 1e3 and math.dist(b, piece[1]) <= EPSILON:
+				merged[-1] = ("line", a, c)
+				continue
+
+		if previous is not None and previous[0] == piece[0] == "arc":
+			sweep = previous[6] + piece[6]
+			if math.dist(previous[4], piece[4]) <= EPSILON and abs(previous[5] - piece[5]) <= EPSILON and previous[6] * piece[6] > 0 and abs(sweep) < 2 * math.pi - EPSILON:
+				(center, radius) = (previous[4], previous[5])
+				angle = math.atan2(previous[1][1] - center[1], previous[1][0] - center[0]) + sweep / 2
+				mid = (center[0] + radius * math.cos(angle), center[1] + radius * math.sin(angle))
+				merged[-1] = ("arc", previous[1], mid, piece[3], center, radius, sweep)
+				continue
+
+		merged.append(piece)
+
+	return merged
+
+
+def reverse_piece(piece: tuple) -> tuple:
+	if piece[0] == "line":
+		return ("line", piece[2], piece[1])
+
+	return ("arc", piece[3], piece[2], piece[1], piece[4], piece[5], -piece[6])
+
+
+def get_piece_length(piece: tuple) -> float:
+	if piece[0] == "line":
+		return math.dist(piece[1], piece[2])
+
+	return piece[5] * abs(piece[6])
+
+
+def get_piece_point(piece: tuple, fraction: float) -> tuple[float, float]:
+	"""
+	Returns:
+		(float, float): Point at a fraction of the length of a piece
+	"""
+	if piece[0] == "line":
+		(start, end) = (piece[1], piece[2])
+		return (start[0] + fraction * (end[0] - start[0]), start[1] + fraction * (end[1] - start[1]))
+
+	(start, center, radius) = (piece[1], piece[4], piece[5])
+	angle = math.atan2(start[1] - center[1], start[0] - center[0]) + fraction * piece[6]
+
+	return (center[0] + radius * math.cos(angle), center[1] + radius * math.sin(angle))
+
+
+def get_piece_projection(piece: tuple, point: tuple[float, float]) -> tuple[float, float]:
+	"""
+	Returns:
+		(float, float): (distance of a point to a piece, fraction of the piece's length at the closest point)
+	"""
+	if piece[0] == "line":
+		(start, end) = (piece[1], piece[2])
+		(dx, dy) = (end[0] - start[0], end[1] - start[1])
+		fraction = min(max(((point[0] - start[0]) * dx + (point[1] - start[1]) * dy) / max(dx * dx + dy * dy, EPSILON**2), 0.0), 1.0)
+
+		return (math.dist(point, (start[0] + fraction * dx, start[1] + fraction * dy)), fraction)
+
+	(start, center, radius, sweep) = (piece[1], piece[4], piece[5], piece[6])
+	offset = math.atan2(point[1] - center[1], point[0] - center[0]) - math.atan2(start[1] - center[1], start[0] - center[0])
+	offset = offset % (2 * math.pi) if sweep > 0 else -(-offset % (2 * math.pi))
+
+	if offset / sweep <= 1:
+		return (abs(math.dist(point, center) - radius), offset / sweep)
+
+	# outside of the sweep the closer end is closest
+	(to_start, to_end) = (math.dist(point, start), math.dist(point, piece[3]))
+
+	return (to_start, 0.0) if to_start <= to_end else (to_end, 1.0)
+
+
+def cut_pieces(pieces: list, point: tuple[float, float]) -> list:
+	"""
+	Returns:
+		[tuple]: Pieces up to the first point closest to the given point, the last piece cut there
+	"""
+	projections = [get_piece_projection(piece, point) for piece in pieces]
+	closest = min(distance for (distance, _) in projections)
+	index = next(index for (index, (distance, _)) in enumerate(projections) if distance <= closest + EPSILON)
+
+	(piece, fraction) = (pieces[index], projections[index][1])
+	end = get_piece_point(piece, fraction)
+
+	if piece[0] == "line":
+		cut = ("line", piece[1], end)
+	else:
+		cut = ("arc", piece[1], get_piece_point(piece, fraction / 2), end, piece[4], piece[5], piece[6] * fraction)
+
+	if get_piece_length(cut) <= EPSILON:
+		return pieces[:index]
+
+	return pieces[:index] + [cut]
+
+
+def emit_pieces(pieces: list, trace_width: float, layer_name: str, arcs: list, lines: list, emitter = generator):
+	"""
+	Emits pieces as lines and arcs. Arcs are written counter-clockwise in footprint coordinates like generator.loop()
+	writes them, so pieces that turn the other way swap their start and end
+	"""
+	for piece in pieces:
+		if piece[0] == "line":
+			lines.append(emitter.line(generator.P2D(*piece[1]), generator.P2D(*piece[2]), trace_width, layer_name))
+		else:
+			arcs.append(emitter.arc(generator.P2D(*piece[1]), generator.P2D(*piece[2]), generator.P2D(*piece[3]), trace_width, layer_name, piece[6] < 0))
@@ -0,0 +1,250 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Coil specs are plain dicts keyed by the ids of the menu entries, holding the same parameters the dialog passes to
+# coilgenerator.generate(). They are used wherever coils are described without the dialog: board files, sweeps and
+# the footprint's CoilSpec property.
+
+import re
+import json
+import itertools
+
+from . import menu
+from . import coilgenerator
+
+# keys that describe the geometry of a coil, the name does not change it
+GEOMETRY_KEYS = ["layer_count", "turn_direction", "turns_count", "trace_width", "trace_spacing", "via_outer", "via_drill", "outer_diameter", "shape", "outer_height", "corner_radius", "polygon_sides"]
+
+# keys of non-circular coils, see coilgenerator.get_shape()
+SHAPE_KEYS = ["shape", "outer_height", "corner_radius", "polygon_sides"]
+
+def get_defaults():
+	"""
+	Returns:
+		dict: Spec with the defaults of the menu structure
+	"""
+	spec = {}
+
+	for entry in menu.structure:
+		if entry["type"] == "choices":
+			spec[entry["id"]] = entry["choices_data"][entry["default"]]
+		elif entry["type"] == "choices_from_board":
+			# board sourced choices count up from one
+			spec[entry["id"]] = entry["default"] + 1
+		else:
+			spec[entry["id"]] = entry["default"]
+
+	return normalize(spec)
+
+def normalize(data):
+	"""
+	Fills missing keys with menu defaults and converts values to the menu's datatypes
+	Args:
+		data: Partial spec
+
+	Returns:
+		dict: Complete spec
+	"""
+	spec = {}
+	defaults = None
+
+	for entry in menu.structure:
+		key = entry["id"]
+
+		if key not in data:
+			if defaults is None:
+				defaults = get_defaults()
+
+			spec[key] = defaults[key]
+			continue
+
+		value = data[key]
+
+		if key == "turn_direction" and isinstance(value, str):
+			value = value.lower() in ("cw", "clockwise", "true")
+
+		if entry["datatype"] == "float":
+			spec[key] = float(value)
+		elif entry["datatype"] == "int":
+			spec[key] = int(value)
+		elif entry["datatype"] == "bool":
+			spec[key] = bool(value)
+		else:
+			spec[key] = str(value)
+
+	return spec
+
+def get_key(spec):
+	"""
+	Returns:
+		tuple: Hashable identity of the coil geometry, equal for specs that only differ in name
+	"""
+	return tuple(spec[key] for key in GEOMETRY_KEYS)
+
+def get_file_names(specs, extension = ""):
+	"""
+	Unique file names from spec names, characters that are not safe in file names are replaced by underscores
+	Args:
+		extension: Appended to every name, including the dot
+	Returns:
+		[str]: File name per spec
+	"""
+	names = []
+	used = set()
+
+	for spec in specs:
+		base = re.sub(r"[^\w.-]", "_", spec["name"]) or "coil"
+		name = base
+		index = 1
+
+		while name in used:
+			index += 1
+			name = base + "_" + str(index)
+
+		used.add(name)
+		names.append(name + extension)
+
+	return names
+
+def get_generator_args(spec):
+	"""
+	Returns:
+		tuple: Positional arguments of coilgenerator.generate_geometry() without layer names
+	"""
+	return (
+		spec["layer_count"],
+		spec["turn_direction"],
+		spec["turns_count"],
+		spec["trace_width"],
+		spec["trace_spacing"],
+		spec["via_outer"],
+		spec["via_drill"],
+		spec["outer_diameter"]
+	)
+
+def get_shape(spec):
+	"""
+	Returns:
+		dict: Shape parameters of a non-circular coil, None for circular coils
+	"""
+	if spec.get("shape", "circle") == "circle":
+		return None
+
+	return dict((key, spec[key]) for key in SHAPE_KEYS)
+
+def get_default_layer_names(spec):
+	"""
+	Layer names for a board that has exactly as many copper layers as the coil, but at least two
+	"""
+	return coilgenerator.get_layer_names(max(spec["layer_count"], 2))
+
+def generate(spec, layer_names = None, progress = None):
+	"""
+	Generates the footprint text of a spec, see coilgenerator.generate()
+	"""
+	if layer_names is None:
+		layer_names = get_default_layer_names(spec)
+
+	return coilgenerator.generate(*get_generator_args(spec), spec["name"], layer_names, progress, get_shape(spec))
+
+def generate_geometry(spec, layer_names = None):
+	"""
+	Generates the geometry records of a spec, see coilgenerator.generate_geometry()
+	"""
+	if layer_names is None:
+		layer_names = get_default_layer_names(spec)
+
+	return coilgenerator.generate_geometry(*get_generator_args(spec), layer_names, get_shape(spec))
+
+def generate_metrics(spec, layer_names = None):
+	"""
+	Dry run of a spec, see coilgenerator.generate_metrics()
+	"""
+	if layer_names is None:
+		layer_names = get_default_layer_names(spec)
+
+	return coilgenerator.generate_metrics(*get_generator_args(spec), layer_names, get_shape(spec))
+
+def to_string(spec):
+	"""
+	Returns:
+		str: Spec as stored in the footprint's CoilSpec property
+	"""
+	return coilgenerator.get_spec_string(*get_generator_args(spec), get_shape(spec))
+
+def from_string(text, name = None):
+	"""
+	Parses the footprint's CoilSpec property
+	Args:
+		text: Space separated key=value pairs
+		name: Optional footprint name
+
+	Returns:
+		dict: Complete spec
+	"""
+	data = dict(pair.split("=", 1) for pair in text.split())
+
+	if name is not None:
+		data["name"] = name
+
+	return normalize(data)
+
+def expand(data):
+	"""
+	Expands a sweep into single specs. Every key holding a list is swept, all combinations are generated.
+	If no name is given, one is derived from the swept values
+	Args:
+		data: Partial spec, list values are swept
+
+	Returns:
+		[dict]: Complete specs
+	"""
+	swept_keys = [key for key in data if isinstance(data[key], list)]
+	specs = []
+
+	for values in itertools.product(*[data[key] for key in swept_keys]):
+		combination = dict(data)
+		combination.update(zip(swept_keys, values))
+
+		spec = normalize(combination)
+
+		if "name" not in data and swept_keys:
+			spec["name"] = "COIL_" + "_".join(key + "_" + str(value) for (key, value) in zip(swept_keys, values))
+
+		specs.append(spec)
+
+	return specs
+
+def load(path):
+	"""
+	Loads specs from a JSON file holding a spec, a sweep, a list of them, or an object with a "specs" list
+	Returns:
+		[dict]: Complete specs
+	"""
+	with open(path, "r") as file:
+		data = json.load(file)
+
+	if isinstance(data, dict) and "specs" in data:
+		data = data["specs"]
+	if isinstance(data, dict):
+		data = [data]
+
+	specs = []
+	for entry in data:
+		specs.extend(expand(entry))
+
+	return specs
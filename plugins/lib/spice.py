@@ -0,0 +1,209 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# SPICE equivalent circuits of coils, from the closed forms of inductance.py, resistance.py and capacitance.py.
+# Every spiral layer is one rung of a ladder between the vias that join it to its neighbours: series resistance and
+# partial inductance, with its turn to turn capacitance across it. Layers couple by K statements with the mutual
+# inductance of every layer pair. Adjacent layers are mirrored spirals joined at a via, the voltage between them
+# rises from zero at that via to two layer voltages at their other ends. Their overlap capacitance is lumped between
+# those ends as a third of it, which stores the same energy. At low frequency a model has the inductance of
+# inductance.estimate_inductance() and the capacitance of capacitance.get_capacitance().
+# All designs are computed at once, layers along the second axis. The estimates assume circular coils.
+
+import re
+
+import numpy as np
+
+from . import inductance
+from . import resistance
+from . import capacitance
+from . import spec as coilspec
+from . import stackup as coilstackup
+
+NUMBER_FORMAT = ".6g"
+
+
+def get_models(specs: list[dict], stackup_data: dict = None, copper_layer_count: int = None) -> dict:
+	"""
+	Ladder models of many designs. L is the largest layer count, entries of layers a design does not have are zero
+	Args:
+		specs: Coil specs
+		stackup_data: Stackup description, see stackup.from_dict(). Coils sit on the top layers of the stack
+		copper_layer_count: Copper layers of the board, defaults to the layers of the largest coil
+
+	Returns:
+		dict: (D,) "layer_count", (D,) "feasible", (D,) "inductance" and "resistance" of every layer (H, Ohm),
+		(D, L, L) "coupling" coefficients of all layer pairs, (D, L) "turn" capacitance across every layer and (D, L - 1)
+		"layer" capacitance between the outer ends of adjacent layers (F). Values of designs that are not feasible are
+		NaN, see inductance.get_feasible()
+	"""
+	copper_layer_count = max([2, copper_layer_count or 0] + [spec["layer_count"] for spec in specs])
+	stack = coilstackup.from_dict(stackup_data, copper_layer_count)
+
+	columns = dict((key, np.array([spec[key] for spec in specs], dtype = float)) for key in ["turns_count", "trace_width", "trace_spacing", "outer_diameter"])
+	args = (columns["turns_count"], columns["trace_width"], columns["trace_spacing"], columns["outer_diameter"])
+	(turns, width) = (columns["turns_count"], columns["trace_width"])
+
+	layer_count = np.array([spec["layer_count"] for spec in specs], dtype = int)
+	max_layers = int(layer_count.max())
+	layers = np.arange(max_layers)
+	present = layers < layer_count[:, None]
+	feasible = inductance.get_feasible(*args)
+
+	layer_inductance = inductance.get_layer_inductance(*args)
+
+	# the coupling of a layer pair only depends on its distance, which all designs share
+	layer_z = np.array(stack.layer_z[:max_layers])
+	(distances, pair_index) = np.unique(np.round(np.abs(layer_z[:, None] - layer_z[None, :]), 9), return_inverse = True)
+	mutual = inductance.get_layer_mutuals(columns["turns_count"].astype(int), *args[1:], np.where(distances > 0, distances, 1.0))
+
+	coupling = mutual[:, pair_index.reshape(max_layers, max_layers)] / layer_inductance[:, None, None]
+	coupling[:, layers, layers] = np.where(feasible, 1, np.nan)[:, None]
+	coupling *= present[:, :, None] & present[:, None, :]
+
+	# the closed forms of designs that are not feasible are masked below
+	with np.errstate(all = "ignore"):
+		# turn gaps see one turn voltage, lumped across the layer they are part of
+		side_permittivity = capacitance.get_side_permittivity(stack)[:max_layers]
+		turn_per_length = capacitance.get_turn_capacitance_per_length(args[1], args[2], stack.copper_thickness)
+		gap_length = capacitance.get_gap_length(*args)
+		turn = (turn_per_length * gap_length * 1e-3 / turns**2)[:, None] * side_permittivity * present
+
+		# overlap of adjacent layers, every pair with the fringing of its own dielectric
+		thickness = np.array(stack.dielectric_thickness[:max_layers - 1])
+		permittivity = np.array(stack.epsilon_r[:max_layers - 1])
+		area = capacitance.get_layer_length(*args) * capacitance.get_overlap_width(args[1], args[2])
+		plate = capacitance.get_plate_factor(width[:, None], thickness)
+		layer = capacitance.EPSILON_0 * area[:, None] * permittivity / thickness * plate * 1e-3 / 3 * present[:, 1:]
+
+		layer_resistance = resistance.get_dc_resistance(1, *args, stack.copper_thickness)
+
+	layer_resistance[~feasible] = np.nan
+	turn[~feasible] = np.nan
+	layer[~feasible] = np.nan
+
+	return {
+		"layer_count": layer_count,
+		"feasible": feasible,
+		"inductance": layer_inductance,
+		"resistance": layer_resistance,
+		"coupling": coupling,
+		"turn": turn,
+		"layer": layer
+	}
+
+
+def get_totals(models: dict) -> dict:
+	"""
+	Terminal values of the models at low frequency, with the voltage spread evenly over the layers
+	Returns:
+		dict: (D,) "inductance" (H), "resistance" (Ohm), "capacitance" (F) and "srf" (Hz)
+	"""
+	layer_count = models["layer_count"]
+
+	# a layer sees 1 / n of the terminal voltage, the outer ends of adjacent layers 2 / n
+	totals = {
+		"inductance": models["inductance"] * models["coupling"].sum(axis = (1, 2)),
+		"resistance": models["resistance"] * layer_count,
+		"capacitance": (models["turn"].sum(axis = 1) + 4 * models["layer"].sum(axis = 1)) / layer_count**2
+	}
+	totals["srf"] = capacitance.get_resonant_frequency(totals["inductance"], totals["capacitance"])
+
+	return totals
+
+
+def get_subckt_names(specs: list[dict]) -> list[str]:
+	"""
+	Unique subcircuit names from spec names, which are the footprint names. Characters SPICE uses as delimiters are
+	replaced by underscores
+	"""
+	names = []
+	used = set()
+
+	for spec in specs:
+		base = re.sub(r"[\s()=,;*]", "_", spec["name"]) or "coil"
+		name = base
+		index = 1
+
+		while name.lower() in used:
+			index += 1
+			name = base + "_" + str(index)
+
+		# SPICE names are case insensitive
+		used.add(name.lower())
+		names.append(name)
+
+	return names
+
+
+def write_model(file, name: str, spec: dict, models: dict, totals: dict, index: int):
+	"""
+	Writes the subcircuit of one design of get_models(). Pads 1 and 2 of the footprint are the terminals, node vK is
+	the via between layers K and K + 1, counted from 1
+	"""
+	def number(value):
+		return format(float(value), NUMBER_FORMAT)
+
+	layer_count = int(models["layer_count"][index])
+	nodes = ["1"] + ["v" + str(layer) for layer in range(1, layer_count)] + ["2"]
+
+	file.write(f"* {name}: {coilspec.to_string(spec)}\n")
+	file.write(f"* L = {number(totals['inductance'][index])} H, R = {number(totals['resistance'][index])} Ohm, C = {number(totals['capacitance'][index])} F, SRF = {number(totals['srf'][index])} Hz\n")
+	file.write(f".subckt {name} 1 2\n")
+
+	for layer in range(layer_count):
+		(start, end) = (nodes[layer], nodes[layer + 1])
+		label = str(layer + 1)
+
+		file.write(f"R{label} {start} r{label} {number(models['resistance'][index])}\n")
+		file.write(f"L{label} r{label} {end} {number(models['inductance'][index])}\n")
+		file.write(f"CT{label} {start} {end} {number(models['turn'][index, layer])}\n")
+
+	for layer in range(layer_count - 1):
+		file.write(f"CL{layer + 1} {nodes[layer]} {nodes[layer + 2]} {number(models['layer'][index, layer])}\n")
+
+	for a in range(layer_count):
+		for b in range(a + 1, layer_count):
+			file.write(f"K{a + 1}_{b + 1} L{a + 1} L{b + 1} {number(models['coupling'][index, a, b])}\n")
+
+	file.write(f".ends {name}\n\n")
+
+
+def write(path: str, specs: list[dict], stackup_data: dict = None, copper_layer_count: int = None) -> list[str]:
+	"""
+	Writes the subcircuits of many coils into one SPICE library file, all coils on one board stackup
+	Args:
+		copper_layer_count: Copper layers of the board, defaults to the layers of the largest coil
+
+	Designs that are not feasible, see inductance.get_feasible(), are left out with a comment
+	Returns:
+		[str]: Subcircuit name per spec, None for designs that were left out
+	"""
+	models = get_models(specs, stackup_data, copper_layer_count)
+	totals = get_totals(models)
+	names = get_subckt_names(specs)
+
+	with open(path, "w") as file:
+		file.write("* Equivalent circuits of PCB coils, terminals are the footprint pads 1 and 2\n\n")
+
+		for (index, (name, spec)) in enumerate(zip(names, specs)):
+			if models["feasible"][index]:
+				write_model(file, name, spec, models, totals, index)
+			else:
+				file.write(f"* {name}: not feasible, the turns do not fit into the outer diameter\n\n")
+
+	return [name if ok else None for (name, ok) in zip(names, models["feasible"])]
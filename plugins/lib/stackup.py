@@ -0,0 +1,105 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+BOARD_THICKNESS = 1.6 # (mm)
+COPPER_THICKNESS = 0.035 # (mm)
+EPSILON_R = 4.5 # FR4
+
+
+class Stackup:
+	"""
+	Copper and dielectric layers of a board, ordered from top (F.Cu) to bottom (B.Cu).
+	The top copper layer sits at z = 0, all other layers below it at negative z (mm)
+	"""
+
+	def __init__(self, copper_layer_count: int, board_thickness: float = BOARD_THICKNESS, copper_thickness: float = COPPER_THICKNESS, dielectric_thickness: list[float] = None, epsilon_r: list[float] = None):
+		"""
+		Args:
+			copper_layer_count: Number of copper layers of the board
+			board_thickness: Total board thickness, used to spread dielectrics evenly if dielectric_thickness is not given
+			copper_thickness: Thickness of every copper layer
+			dielectric_thickness: Thickness of the dielectric between copper layer i and i + 1
+			epsilon_r: Relative permittivity of the dielectric between copper layer i and i + 1, or a single value for all of them
+		"""
+		self.copper_layer_count = copper_layer_count
+		self.copper_thickness = copper_thickness
+
+		dielectric_count = max(copper_layer_count - 1, 0)
+
+		if dielectric_thickness is None:
+			dielectric_thickness = [(board_thickness - copper_layer_count * copper_thickness) / max(dielectric_count, 1)] * dielectric_count
+		if epsilon_r is None:
+			epsilon_r = EPSILON_R
+		if not isinstance(epsilon_r, (list, tuple)):
+			epsilon_r = [epsilon_r] * dielectric_count
+
+		if len(dielectric_thickness) != dielectric_count or len(epsilon_r) != dielectric_count:
+			raise ValueError("Stackup needs " + str(dielectric_count) + " dielectric layers")
+
+		self.dielectric_thickness = list(dielectric_thickness)
+		self.epsilon_r = list(epsilon_r)
+
+		self.layer_z = [0.0]
+		for thickness in self.dielectric_thickness:
+			self.layer_z.append(self.layer_z[-1] - thickness - copper_thickness)
+
+	def get_layer_z(self, index: int) -> float:
+		"""
+		Returns:
+			float: z position of the copper layer with given index (mm)
+		"""
+		return self.layer_z[index]
+
+	def get_dielectric(self, layer_a: int, layer_b: int) -> tuple[float, float]:
+		"""
+		Dielectric between two copper layers, combined as capacitors in series
+		Args:
+			layer_a: Index of first copper layer
+			layer_b: Index of second copper layer
+
+		Returns:
+			(float, float): (Total dielectric thickness (mm), effective relative permittivity)
+		"""
+		(top, bottom) = (min(layer_a, layer_b), max(layer_a, layer_b))
+		thickness = self.dielectric_thickness[top:bottom]
+		epsilon_r = self.epsilon_r[top:bottom]
+
+		total = sum(thickness)
+		if total == 0:
+			return (0.0, 1.0)
+
+		return (total, total / sum(t / e for (t, e) in zip(thickness, epsilon_r)))
+
+	def get_thickness(self) -> float:
+		return -self.layer_z[-1] + self.copper_thickness
+
+
+def from_dict(data: dict, copper_layer_count: int) -> Stackup:
+	"""
+	Builds a stackup from a description as used in board and sweep files, all keys are optional:
+	{"board_thickness": 1.6, "copper_thickness": 0.035, "dielectric_thickness": [...], "epsilon_r": 4.5 or [...]}
+	"""
+	if data is None:
+		data = {}
+
+	return Stackup(
+		copper_layer_count,
+		data.get("board_thickness", BOARD_THICKNESS),
+		data.get("copper_thickness", COPPER_THICKNESS),
+		data.get("dielectric_thickness"),
+		data.get("epsilon_r")
+	)
@@ -0,0 +1,275 @@
+"""
+Copyright (C) 2023 Tim Goll, Jonas Wenner
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+# Monte Carlo analysis of manufacturing tolerances. Many variants of one spec are drawn with normally distributed
+# trace width, spacing, via and drill diameter, drill offset, dielectric and copper thickness, then estimated all at
+# once: self inductance and DC resistance with the closed forms of inductance.py and resistance.py, feasibility
+# with the via check of coilgenerator.estimate_is_coil_generatable() plus fab rules. Variants whose turns do not fit
+# fail the "turns" check and are estimated as NaN.
+# Mutual inductance of two layers sums over all turn pairs and is too slow per variant. It is smooth in the varied
+# parameters, so it is computed exactly on a small grid spanning all variants and interpolated (tensor Lagrange),
+# once per distinct layer distance of the nominal stackup.
+
+import numpy as np
+
+from . import coilgenerator
+from . import inductance
+from . import resistance
+from . import stackup as coilstackup
+
+SAMPLE_COUNT = 100000
+PERCENTILES = [1, 5, 50, 95, 99]
+GRID_NODES = 5
+
+# standard deviations, absolute (mm) for the spec parameters, relative for the stackup thicknesses
+TOLERANCES = {
+	"etch": 0.015, # over- or under-etching, widens traces by as much as it narrows the gaps
+	"trace_width": 0.0,
+	"trace_spacing": 0.0,
+	"outer_diameter": 0.0,
+	"via_outer": 0.0,
+	"via_drill": 0.02,
+	"drill_offset": 0.025, # per axis, shifts the hole inside the via pad
+	"dielectric_thickness": 0.1, # per dielectric layer
+	"copper_thickness": 0.1
+}
+
+# smallest values a fab accepts (mm)
+RULES = {
+	"trace_width": 0.075,
+	"trace_spacing": 0.075,
+	"annular_ring": 0.05
+}
+
+
+def draw(spec: dict, stack: coilstackup.Stackup, tolerances: dict, count: int, rng: np.random.Generator) -> dict:
+	"""
+	Perturbed variants of a spec
+	Returns:
+		dict: (S,) arrays of the spec parameters, "drill_offset", "copper_thickness" and (S, K) "dielectric_thickness"
+	"""
+	tolerances = dict(TOLERANCES, **(tolerances or {}))
+
+	def normal(key, value):
+		return value + tolerances[key] * rng.standard_normal(count) if tolerances[key] else np.full(count, float(value))
+
+	etch = tolerances["etch"] * rng.standard_normal(count)
+
+	variants = {
+		"trace_width": normal("trace_width", spec["trace_width"]) + etch,
+		"trace_spacing": normal("trace_spacing", spec["trace_spacing"]) - etch,
+		"outer_diameter": normal("outer_diameter", spec["outer_diameter"]),
+		"via_outer": normal("via_outer", spec["via_outer"]),
+		"via_drill": normal("via_drill", spec["via_drill"]),
+		"drill_offset": tolerances["drill_offset"] * np.hypot(rng.standard_normal(count), rng.standard_normal(count)),
+		"copper_thickness": stack.copper_thickness * (1 + tolerances["copper_thickness"] * rng.standard_normal(count))
+	}
+
+	thickness = np.array(stack.dielectric_thickness, dtype = float)
+	variants["dielectric_thickness"] = thickness * (1 + tolerances["dielectric_thickness"] * rng.standard_normal((count, len(thickness))))
+
+	return variants
+
+
+def get_mutual_grid(turns_per_layer: int, outer_radius, pitch, distance) -> np.ndarray:
+	"""
+	Exact mutual inductance of two identical spiral layers on a grid, see inductance.get_layer_mutual()
+	Args:
+		outer_radius, pitch, distance: (n,) node values of every parameter (mm)
+
+	Returns:
+		np.ndarray: (n_radius, n_pitch, n_distance) mutual inductance (H)
+	"""
+	# the grid spans radius and pitch independently, its corner of small radius and large pitch may not fit even if
+	# every variant does. Loops there shrink to almost nothing instead of becoming NaN
+	radii = np.maximum(outer_radius[:, None, None] - np.arange(turns_per_layer) * pitch[None, :, None], 1e-6)
+
+	loops = inductance.get_loop_mutual(radii[:, :, None, :, None], radii[:, :, None, None, :], np.asarray(distance)[:, None, None])
+
+	return loops.sum(axis = (-2, -1))
+
+
+def get_nodes(values: np.ndarray) -> np.ndarray:
+	"""
+	Returns:
+		np.ndarray: Chebyshev nodes spanning the values, a single node if they do not vary
+	"""
+	(low, high) = (values.min(), values.max())
+	if high - low <= 1e-12 * max(abs(high), 1):
+		return np.array([low])
+
+	return (low + high) / 2 + (high - low) / 2 * np.cos((np.arange(GRID_NODES) + 0.5) * np.pi / GRID_NODES)
+
+
+def get_lagrange_basis(nodes: np.ndarray, values: np.ndarray) -> np.ndarray:
+	"""
+	Returns:
+		np.ndarray: (S, n) weight of every node for every value
+	"""
+	basis = np.ones((len(values), len(nodes)))
+
+	for (i, node) in enumerate(nodes):
+		for (j, other) in enumerate(nodes):
+			if i != j:
+				basis[:, i] *= (values - other) / (node - other)
+
+	return basis
+
+
+def get_mutual(turns_per_layer: int, trace_width: np.ndarray, trace_spacing: np.ndarray, outer_diameter: np.ndarray, distances: np.ndarray) -> np.ndarray:
+	"""
+	Mutual inductance of two identical spiral layers for many variants, interpolated from an exact grid
+	Args:
+		trace_width, trace_spacing, outer_diameter: (S,) variant parameters
+		distances: (S, P) distance of P layer pairs that share one grid
+
+	Returns:
+		np.ndarray: (S,) summed mutual inductance of all P pairs (H)
+	"""
+	# the turns only depend on the radius of the outermost one and the pitch, etching shifts the first but keeps the
+	# second, so the grid stays close to the variants
+	pitch = trace_width + trace_spacing
+	outer_radius = outer_diameter / 2 + trace_spacing - pitch / 2
+
+	parameters = [outer_radius, pitch]
+	nodes = [get_nodes(values) for values in parameters] + [get_nodes(distances)]
+	grid = get_mutual_grid(turns_per_layer, *nodes)
+
+	weights = np.einsum("rpk,nr,np->nk", grid, *(get_lagrange_basis(n, values) for (n, values) in zip(nodes, parameters)), optimize = True)
+
+	total = np.zeros(len(pitch))
+	for pair in range(distances.shape[1]):
+		total += np.einsum("nk,nk->n", weights, get_lagrange_basis(nodes[2], distances[:, pair]))
+
+	return total
+
+
+def get_checks(layer_count: int, turns_per_layer: int, variants: dict, rules: dict) -> dict:
+	"""
+	Feasibility of every variant, see coilgenerator.estimate_is_coil_generatable()
+	Returns:
+		dict: (S,) bool arrays "turns", "vias", "trace_width", "trace_spacing" and "annular_ring"
+	"""
+	rules = dict(RULES, **(rules or {}))
+
+	(trace_width, via_outer) = (variants["trace_width"], variants["via_outer"])
+	(via_radius, _) = coilgenerator.get_via_radius(variants["outer_diameter"], turns_per_layer, trace_width, variants["trace_spacing"], via_outer)
+	(via_count, _) = coilgenerator.get_num_vias(layer_count)
+	ring = (via_outer - variants["via_drill"]) / 2 - variants["drill_offset"]
+
+	return {
+		"turns": inductance.get_feasible(turns_per_layer, trace_width, variants["trace_spacing"], variants["outer_diameter"]),
+		# inner vias fit on half the circumference of their radius
+		"vias": (via_radius > 0) & (np.pi * via_radius - via_count * (via_outer + trace_width) >= 0),
+		"trace_width": trace_width >= rules["trace_width"],
+		"trace_spacing": variants["trace_spacing"] >= rules["trace_spacing"],
+		"annular_ring": ring >= rules["annular_ring"]
+	}
+
+
+def analyze(spec: dict, tolerances: dict = None, rules: dict = None, count: int = SAMPLE_COUNT, stackup_data: dict = None, copper_layer_count: int = None, seed: int = None) -> dict:
+	"""
+	Monte Carlo analysis of one spec
+	Args:
+		spec: Coil spec
+		tolerances: Standard deviations, missing keys are taken from TOLERANCES
+		rules: Fab minimums, missing keys are taken from RULES
+		count: Number of variants
+		stackup_data: Stackup description, see stackup.from_dict(). Coils sit on the top layers of the stack
+		copper_layer_count: Copper layers of the board, defaults to the layers of the coil
+		seed: Seed of the random generator, for repeatable results
+
+	Returns:
+		dict: (S,) arrays "inductance" (H), "resistance" (Ohm), "feasible", dict "checks" of (S,) bool arrays,
+		dict "variants" of the drawn parameters and "nominal" inductance and resistance. Inductance and resistance of
+		variants that fail the "turns" check are NaN
+	Raises:
+		ValueError: If the turns of the spec do not fit, see inductance.estimate_inductance()
+	"""
+	layer_count = spec["layer_count"]
+	turns = spec["turns_count"]
+	stack = coilstackup.from_dict(stackup_data, max([2, copper_layer_count or 0, layer_count]))
+
+	# an infeasible spec is rejected before its variants are drawn
+	nominal_inductance = inductance.estimate_inductance(spec, stack.layer_z)
+
+	variants = draw(spec, stack, tolerances, count, np.random.default_rng(seed))
+	(width, spacing, diameter) = (variants["trace_width"], variants["trace_spacing"], variants["outer_diameter"])
+	checks = get_checks(layer_count, turns, variants, rules)
+	fits = checks["turns"]
+
+	with np.errstate(all = "ignore"):
+		variant_resistance = resistance.get_dc_resistance(layer_count, turns, width, spacing, diameter, variants["copper_thickness"])
+	variant_resistance[~fits] = np.nan
+
+	result = {
+		"inductance": layer_count * inductance.get_layer_inductance(turns, width, spacing, diameter),
+		"resistance": variant_resistance,
+		"checks": checks,
+		"variants": variants,
+		"nominal": {
+			"inductance": nominal_inductance,
+			"resistance": float(resistance.get_dc_resistance(layer_count, turns, spec["trace_width"], spec["trace_spacing"], spec["outer_diameter"], stack.copper_thickness))
+		}
+	}
+
+	# layer z of every variant, the top copper layer at 0
+	layer_step = variants["dielectric_thickness"][:, :layer_count - 1] + variants["copper_thickness"][:, None]
+	layer_z = np.concatenate((np.zeros((count, 1)), -np.cumsum(layer_step, axis = 1)), axis = 1)
+
+	# pairs with the same nominal distance share one interpolation grid
+	groups = {}
+	for i in range(layer_count):
+		for j in range(i + 1, layer_count):
+			groups.setdefault(round(abs(stack.layer_z[i] - stack.layer_z[j]), 9), []).append((i, j))
+
+	# the grid only spans variants that fit, the others stay NaN
+	for pairs in groups.values():
+		distances = np.stack([layer_z[fits, i] - layer_z[fits, j] for (i, j) in pairs], axis = 1)
+		result["inductance"][fits] += 2 * get_mutual(turns, width[fits], spacing[fits], diameter[fits], distances)
+
+	result["feasible"] = np.logical_and.reduce(list(result["checks"].values()))
+
+	return result
+
+
+def get_summary(result: dict, percentiles: list[float] = PERCENTILES) -> dict:
+	"""
+	Distributions of an analysis
+	Returns:
+		dict: "samples", overall "yield", "check_yield" per check and "nominal", "mean", "std" and "percentiles"
+		of "inductance" (H) and "resistance" (Ohm), over all variants whose turns fit
+	"""
+	summary = {
+		"samples": len(result["feasible"]),
+		"yield": float(result["feasible"].mean()),
+		"check_yield": dict((name, float(passed.mean())) for (name, passed) in result["checks"].items())
+	}
+
+	for key in ("inductance", "resistance"):
+		values = result[key][np.isfinite(result[key])]
+		if not len(values):
+			values = np.array([np.nan])
+
+		summary[key] = {
+			"nominal": result["nominal"][key],
+			"mean": float(values.mean()),
+			"std": float(values.std()),
+			"percentiles": dict((str(p), value) for (p, value) in zip(percentiles, np.percentile(values, percentiles).tolist()))
+		}
+
+	return summary
@@ -0,0 +1,238 @@
+import time
+
+import wx # type: ignore
+
+from .lib import primitives
+from .lib import coilgenerator
+
+# colors of KiCad's default theme, top and bottom copper plus a cycle for inner layers
+TOP_COLOUR = (200, 52, 52)
+BOTTOM_COLOUR = (77, 127, 196)
+INNER_COLOURS = [(194, 194, 0), (194, 0, 194), (0, 132, 132), (194, 116, 38), (127, 200, 127), (132, 0, 132)]
+VIA_COLOUR = (236, 236, 236)
+PAD_COLOUR = (200, 52, 52)
+BACKGROUND_COLOUR = (0, 16, 35)
+
+LAYER_ALPHA = 160
+MARGIN = 8 # (px)
+LOD_MIN_PITCH = 2.0 # (px) turns closer than this are drawn as filled rings
+LOD_MAX_TURNS = 4000 # total turns above which no single traces are generated
+
+# Canvas in the coil dialog, showing every layer of the current coil in its KiCad color.
+# Paths are built in footprint coordinates (mm) and cached per coil geometry, a paint only scales and strokes them.
+class CoilPreview(wx.Panel):
+	def __init__(self, parent, size = (300, 300)):
+		super(CoilPreview, self).__init__(parent, size = size)
+
+		self.SetMinSize(size)
+		self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
+
+		self.Bind(wx.EVT_PAINT, self._on_paint)
+		self.Bind(wx.EVT_SIZE, self._on_size)
+
+		self._renderer = wx.GraphicsRenderer.GetDefaultRenderer()
+		self._parameters = None
+		self._shape = None
+		self._cache_key = None
+		self._layers = []
+		self._vias = []
+		self._pads = []
+		self._extent = 1.0
+		self.last_paint_ms = 0.0
+
+	def set_coil(self, layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, shape = None):
+		"""
+		Shows a coil. Parameters are the ones of coilgenerator.generate_geometry(), paths are only rebuilt if they change.
+		None clears the preview
+		"""
+		parameters = None
+		if layer_count is not None:
+			parameters = (layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter)
+
+		# kept hashable for the path cache
+		shape = tuple(sorted(shape.items())) if shape is not None else None
+
+		if parameters == self._parameters and shape == self._shape:
+			return
+
+		self._parameters = parameters
+		self._shape = shape
+		self.Refresh(False)
+
+	def clear(self):
+		self.set_coil(*([None] * 8))
+
+	def get_scale(self):
+		"""
+		Returns:
+			float: Pixels per mm at the current panel size
+		"""
+		size = self.GetClientSize()
+
+		return max(min(size.GetWidth(), size.GetHeight()) - 2 * MARGIN, 1) / (2 * self._extent)
+
+	def _get_layer_colour(self, layer, layer_count):
+		if layer == 0:
+			colour = TOP_COLOUR
+		elif layer == layer_count - 1:
+			colour = BOTTOM_COLOUR
+		else:
+			colour = INNER_COLOURS[(layer - 1) % len(INNER_COLOURS)]
+
+		return wx.Colour(colour[0], colour[1], colour[2], LAYER_ALPHA)
+
+	def _use_rings(self):
+		(layer_count, _, turns_per_layer, trace_width, trace_spacing, _, _, _) = self._parameters
+
+		if layer_count * turns_per_layer > LOD_MAX_TURNS:
+			return True
+
+		return (trace_width + trace_spacing) * self.get_scale() < LOD_MIN_PITCH
+
+	def _update_paths(self):
+		"""
+		Rebuilds the cached paths if the coil or the level of detail changed
+		"""
+		(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter) = self._parameters
+
+		coil_shape = self._get_shape()
+		if coil_shape is None:
+			(_, outside_via_radius) = coilgenerator.get_via_radius(outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter)
+			self._extent = max(outside_via_radius + via_diameter, outer_diameter / 2) + trace_width
+		else:
+			# the outer vias are the outermost parts, next to the pads
+			(half_width, half_height) = coil_shape.get_half_size(-(trace_width + trace_spacing + via_diameter))
+			self._extent = max(half_width, half_height) + via_diameter + trace_width
+
+		rings = self._use_rings()
+		key = (self._parameters, self._shape, rings)
+		if key == self._cache_key:
+			return
+
+		self._cache_key = key
+		self._layers = []
+
+		if rings:
+			self._build_rings()
+		else:
+			self._build_traces()
+
+	def _build_traces(self):
+		(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter) = self._parameters
+		layer_names = coilgenerator.get_layer_names(max(layer_count, 2))
+
+		geometry = coilgenerator.generate_geometry(layer_count, wrap_clockwise, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter, layer_names, dict(self._shape) if self._shape else None)
+
+		paths = dict((name, self._renderer.CreatePath()) for name in layer_names[:layer_count])
+
+		for line in geometry.lines:
+			path = paths[line.layer]
+			path.MoveToPoint(line.start.x, line.start.y)
+			path.AddLineToPoint(line.end.x, line.end.y)
+
+		for arc in geometry.arcs:
+			(ux, uy, radius, start, sweep) = primitives.get_arc_sweep(arc)
+			path = paths[arc.layer]
+			path.MoveToPoint(arc.start.x, arc.start.y)
+			path.AddArc(ux, uy, radius, start, start + sweep, sweep > 0)
+
+		for (layer, name) in enumerate(layer_names[:layer_count]):
+			self._layers.append(("traces", paths[name], self._get_layer_colour(layer, layer_count), trace_width))
+
+		self._vias = [(v.loc.x, v.loc.y, v.diameter, v.drill) for v in geometry.vias]
+		self._pads = [(p.loc.x - p.width / 2, p.loc.y - p.height / 2, p.width, p.height) for p in geometry.pads]
+
+	def _build_rings(self):
+		"""
+		Level of detail for dense coils: every layer is the filled ring its turns cover
+		"""
+		(layer_count, _, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, outer_diameter) = self._parameters
+		coil_shape = self._get_shape()
+		path = self._renderer.CreatePath()
+
+		if coil_shape is None:
+			(inner, outer) = coilgenerator.get_spiral_radii(outer_diameter, turns_per_layer, trace_width, trace_spacing)
+
+			path.AddCircle(0, 0, outer + trace_width / 2)
+			path.AddCircle(0, 0, max(inner - trace_width / 2, 0))
+		else:
+			ring = coil_shape.get_ring(turns_per_layer, trace_width, trace_spacing)
+
+			for inset in (ring.outer_inset, ring.inner_inset):
+				points = coil_shape.get_polyline(inset)
+				path.MoveToPoint(*points[0])
+				for point in points[1:]:
+					path.AddLineToPoint(*point)
+				path.CloseSubpath()
+
+		for layer in range(layer_count):
+			self._layers.append(("ring", path, self._get_layer_colour(layer, layer_count), None))
+
+		# vias stay exact, they are few and mark the connections
+		if coil_shape is None:
+			(vias, _) = coilgenerator.generate_vias(outer_diameter, turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, layer_count, primitives)
+		else:
+			(vias, _) = coil_shape.generate_vias(turns_per_layer, trace_width, trace_spacing, via_diameter, via_drill, layer_count, primitives)
+		self._vias = [(v.loc.x, v.loc.y, v.diameter, v.drill) for v in vias]
+		self._pads = []
+
+	def _get_shape(self):
+		"""
+		Returns:
+			shapes.Shape: Outlines of the shown coil, None for circular coils
+		"""
+		if self._shape is None:
+			return None
+
+		(_, _, _, _, trace_spacing, _, _, outer_diameter) = self._parameters
+
+		return coilgenerator.get_shape(outer_diameter, trace_spacing, dict(self._shape))
+
+	def _on_size(self, event):
+		self.Refresh(False)
+		event.Skip()
+
+	def _on_paint(self, event):
+		start = time.perf_counter()
+
+		dc = wx.AutoBufferedPaintDC(self)
+		dc.SetBackground(wx.Brush(wx.Colour(*BACKGROUND_COLOUR)))
+		dc.Clear()
+
+		if self._parameters is None:
+			return
+
+		self._update_paths()
+
+		gc = wx.GraphicsContext.Create(dc)
+		if gc is None:
+			return
+
+		size = self.GetClientSize()
+		scale = self.get_scale()
+		gc.Translate(size.GetWidth() / 2, size.GetHeight() / 2)
+		gc.Scale(scale, scale)
+
+		# bottom layer first, so the top layer is drawn above all others
+		for (kind, path, colour, width) in reversed(self._layers):
+			if kind == "ring":
+				gc.SetPen(wx.TRANSPARENT_PEN)
+				gc.SetBrush(wx.Brush(colour))
+				gc.FillPath(path, wx.ODDEVEN_RULE)
+			else:
+				# keep traces visible if they are thinner than a pixel
+				gc.SetPen(gc.CreatePen(wx.GraphicsPenInfo(colour).Width(max(width, 1 / scale)).Cap(wx.CAP_ROUND)))
+				gc.StrokePath(path)
+
+		gc.SetPen(wx.TRANSPARENT_PEN)
+		gc.SetBrush(wx.Brush(wx.Colour(*PAD_COLOUR)))
+		for (x, y, width, height) in self._pads:
+			gc.DrawRectangle(x, y, width, height)
+
+		for (x, y, diameter, drill) in self._vias:
+			gc.SetBrush(wx.Brush(wx.Colour(*VIA_COLOUR)))
+			gc.DrawEllipse(x - diameter / 2, y - diameter / 2, diameter, diameter)
+			gc.SetBrush(wx.Brush(wx.Colour(*BACKGROUND_COLOUR)))
+			gc.DrawEllipse(x - drill / 2, y - drill / 2, drill, drill)
+
+		self.last_paint_ms = (time.perf_counter() - start) * 1000
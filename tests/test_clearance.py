@@ -0,0 +1,129 @@
+"""
+Clearance index against a brute force check of all capsule pairs. Run from the repository root:
+	python -m pytest tests
+"""
+
+import math
+import random
+import unittest
+
+import numpy as np
+
+from plugins.lib import board as coilboard
+from plugins.lib import clearance
+from plugins.lib import spec as coilspec
+
+LAYER_NAMES = ["F.Cu", "B.Cu"]
+ITEM_COUNT = 300
+CLEARANCE = 0.3
+
+
+def get_random_shape(rng: random.Random) -> tuple:
+	layer = rng.choice(LAYER_NAMES)
+	(x, y) = (rng.uniform(-9, 9), rng.uniform(-9, 9))
+	kind = rng.choice(["segment", "arc", "circle", "rect", "oval"])
+
+	if kind == "segment":
+		return ("segment", layer, x, y, x + rng.uniform(-4, 4), y + rng.uniform(-4, 4), rng.uniform(0.1, 0.5))
+	if kind == "arc":
+		(radius, start) = (rng.uniform(0.5, 4), rng.uniform(0, 2 * math.pi))
+		angles = [start, start + 0.5 * rng.uniform(0.2, 3), start + rng.uniform(0.2, 3)]
+		points = [(x + radius * math.cos(angle), y + radius * math.sin(angle)) for angle in angles]
+
+		return ("arc", layer) + points[0] + points[1] + points[2] + (rng.uniform(0.1, 0.5),)
+	if kind == "circle":
+		return ("circle", layer, x, y, rng.uniform(0.3, 1.5))
+
+	return (kind, layer, x, y, rng.uniform(0.3, 2), rng.uniform(0.3, 2), rng.uniform(0, 360))
+
+
+def get_gaps(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+	# all pairs of two capsule arrays
+	(a, b) = (np.repeat(a, len(b), axis = 0), np.tile(b, (len(a), 1)))
+	(distance, _, _) = clearance.get_segment_distance(a[:, 0:2], a[:, 2:4], b[:, 0:2], b[:, 2:4])
+
+	return distance - a[:, 4] - b[:, 4]
+
+
+def get_closest(capsules: dict, other: dict) -> dict:
+	"""
+	Returns:
+		dict: Smallest gap below the clearance per layer index
+	"""
+	closest = {}
+	for (layer, rows) in capsules.items():
+		if layer in other:
+			gap = float(get_gaps(rows, other[layer]).min())
+			if gap < CLEARANCE:
+				closest[layer] = gap
+
+	return closest
+
+
+class ClearanceTest(unittest.TestCase):
+
+	def setUp(self):
+		self.rng = random.Random(42)
+		self.spec = coilspec.normalize({"layer_count": 2, "turns_count": 4, "outer_diameter": 8, "name": "L"})
+
+		self.items = [clearance.BoardItem("item" + str(i), "track", "R" + str(i), (get_random_shape(self.rng),)) for i in range(ITEM_COUNT)]
+		self.index = clearance.CopperIndex(LAYER_NAMES)
+		self.index.add(self.items)
+
+	def get_placed(self, placement: coilboard.Placement) -> dict:
+		return clearance.place_capsules(self.index.get_coil_capsules(self.spec), placement, len(LAYER_NAMES))
+
+	def check_board(self, placement: coilboard.Placement):
+		placed = self.get_placed(placement)
+
+		expected = {}
+		for item in self.items:
+			(capsules, _) = clearance.get_capsules(item.shapes, LAYER_NAMES)
+			for (layer, gap) in get_closest(placed, capsules).items():
+				expected[(item.reference, LAYER_NAMES[layer])] = gap
+
+		(conflicts,) = self.index.check([placement], CLEARANCE)
+		found = dict(((conflict.reference, conflict.layer), conflict.gap) for conflict in conflicts)
+
+		self.assertGreater(len(expected), 0)
+		self.assertEqual(set(found), set(expected))
+		for (key, gap) in expected.items():
+			self.assertAlmostEqual(found[key], gap, places = 9, msg = key)
+
+	def test_board_agrees_with_brute_force(self):
+		for _ in range(5):
+			self.check_board(coilboard.Placement(self.spec, self.rng.uniform(-3, 3), self.rng.uniform(-3, 3), self.rng.uniform(0, 360), self.rng.random() < 0.5))
+
+	def test_updated_board_agrees_with_brute_force(self):
+		# moved, removed and added items are indexed again
+		for i in range(0, ITEM_COUNT, 3):
+			self.items[i] = clearance.BoardItem(self.items[i].key, "track", self.items[i].reference, (get_random_shape(self.rng),))
+		del self.items[1::7]
+		self.items.append(clearance.BoardItem("new", "via", "V1", (("circle", "F.Cu", 0.0, 0.0, 0.8),)))
+
+		self.index.update(self.items)
+		self.check_board(coilboard.Placement(self.spec, 1.0, -1.0, 30))
+
+	def test_array_agrees_with_brute_force(self):
+		placements = clearance.get_array(coilboard.Placement(self.spec, 0, 0, 15), 3, 2, 8.2, 8.4)
+		placed = [self.get_placed(placement) for placement in placements]
+
+		conflicts = clearance.CopperIndex(LAYER_NAMES).check(placements, CLEARANCE)
+
+		for (i, placement_conflicts) in enumerate(conflicts):
+			expected = {}
+			for (j, other) in enumerate(placed):
+				if j != i:
+					for (layer, gap) in get_closest(placed[i], other).items():
+						expected[(placements[j].reference, LAYER_NAMES[layer])] = gap
+
+			found = dict(((conflict.reference, conflict.layer), conflict.gap) for conflict in placement_conflicts)
+
+			self.assertGreater(len(expected), 0)
+			self.assertEqual(set(found), set(expected))
+			for (key, gap) in expected.items():
+				self.assertAlmostEqual(found[key], gap, places = 9, msg = key)
+
+
+if __name__ == "__main__":
+	unittest.main()
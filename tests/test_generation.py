@@ -0,0 +1,54 @@
+"""
+Progress and cancellation of coil generation. Run from the repository root:
+	python -m pytest tests
+"""
+
+import unittest
+
+from plugins.lib import coilgenerator
+from plugins.lib import spec as coilspec
+
+
+class CancelTest(unittest.TestCase):
+
+	def generate(self, spec, cancel_at = None):
+		calls = []
+
+		def progress(done_steps, total_steps):
+			calls.append((done_steps, total_steps))
+
+			return cancel_at is None or done_steps < cancel_at
+
+		if cancel_at is None:
+			coilspec.generate(spec, progress = progress)
+		else:
+			with self.assertRaises(coilgenerator.GenerationCancelled):
+				coilspec.generate(spec, progress = progress)
+
+		return calls
+
+	def test_single_layer_cancelled_mid_layer(self):
+		spec = coilspec.normalize({"layer_count": 1, "turns_count": 200, "outer_diameter": 120})
+		calls = self.generate(spec, cancel_at = 50)
+
+		self.assertEqual(calls[-1], (50, coilgenerator.get_progress_steps(1, 200)))
+		self.assertEqual([done for (done, _) in calls], list(range(1, 51)))
+
+	def test_shaped_single_layer_cancelled_mid_layer(self):
+		spec = coilspec.normalize({"layer_count": 1, "turns_count": 40, "outer_diameter": 40, "shape": "rectangle", "outer_height": 30})
+		calls = self.generate(spec, cancel_at = 10)
+
+		self.assertEqual(calls[-1][0], 10)
+
+	def test_progress_reaches_text_assembly(self):
+		spec = coilspec.normalize({"layer_count": 4, "turns_count": 6})
+		calls = self.generate(spec)
+		total = coilgenerator.get_progress_steps(4, 6)
+
+		self.assertTrue(all(steps == total for (_, steps) in calls))
+		self.assertEqual(calls[-1][0], total - 1)
+		self.assertEqual([done for (done, _) in calls], sorted(done for (done, _) in calls))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,39 @@
+"""
+Import cost of plugin registration, measured with the stand-ins of tools/headless. Run from the repository root:
+	python -m pytest tests
+"""
+
+import unittest
+
+from tools import importtime
+
+# registration is measured a few times, the fastest run is compared to the budget of tools/importtime.py
+REPEAT = 3
+
+
+class ImportTimeTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		cls.env = importtime.get_env(headless = True)
+		cls.registrations = [importtime.measure_registration(cls.env) for _ in range(REPEAT)]
+
+	def test_registration_defers_modules(self):
+		for modules in self.registrations:
+			self.assertEqual(importtime.get_deferred_imports(modules), [])
+
+	def test_registration_within_budget(self):
+		fastest_us = min(importtime.get_total_us(modules) for modules in self.registrations)
+
+		self.assertLessEqual(fastest_us, importtime.BUDGET_MS * 1000)
+
+	def test_first_run_imports_deferred_modules(self):
+		# the measurement sees the modules registration leaves out
+		deferred = importtime.get_deferred_imports(importtime.measure_first_run(self.env))
+
+		self.assertIn(importtime.PACKAGE + ".dialog", deferred)
+		self.assertIn("wx", deferred)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,82 @@
+"""
+Inductance estimates of infeasible designs. Run from the repository root:
+	python -m pytest tests
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+
+from plugins.lib import capacitance
+from plugins.lib import inductance
+from plugins.lib import resistance
+from plugins.lib import spice
+from plugins.lib import tolerance
+from plugins.lib import spec as coilspec
+
+
+class InfeasibleTest(unittest.TestCase):
+
+	def setUp(self):
+		# infeasible rows must be masked without numpy warnings
+		self.warnings = warnings.catch_warnings()
+		self.warnings.__enter__()
+		warnings.simplefilter("error")
+
+	def tearDown(self):
+		self.warnings.__exit__(None, None, None)
+
+	def test_single_spec_is_rejected_by_name(self):
+		spec = coilspec.normalize({"layer_count": 2, "turns_count": 60, "outer_diameter": 10, "name": "L7"})
+
+		with self.assertRaisesRegex(ValueError, "L7"):
+			inductance.estimate_inductance(spec, [0, -1.6])
+
+	def test_infeasible_rows_are_nan(self):
+		self.assertTrue(np.isnan(inductance.get_loop_mutual(0, 2, 1)))
+		self.assertTrue(np.isnan(inductance.get_layer_mutual(60, 0.127, 0.127, 10, 1.6)))
+
+		inductances = inductance.get_layer_inductance(np.array([4, 60, 0]), 0.127, 0.127, 10)
+		np.testing.assert_array_equal(np.isnan(inductances), [False, True, True])
+
+		mutuals = inductance.get_layer_mutuals(np.array([4, 60]), np.full(2, 0.127), np.full(2, 0.127), np.full(2, 10.0), np.array([1.6]))
+		self.assertTrue(np.isfinite(mutuals[0]).all())
+		self.assertTrue(np.isnan(mutuals[1]).all())
+
+	def test_batch_masks_infeasible_designs(self):
+		specs = coilspec.expand({"layer_count": 2, "outer_diameter": 10, "turns_count": [8, 60]})
+		feasible = [True, False]
+
+		swept = resistance.sweep(specs, [1e6, 1e7])
+		np.testing.assert_array_equal(swept["feasible"], feasible)
+		for key in ("dc", "inductance", "resistance", "q"):
+			self.assertTrue(np.isfinite(swept[key][0]).all(), key)
+			self.assertTrue(np.isnan(swept[key][1]).all(), key)
+
+		estimated = capacitance.estimate(specs)
+		np.testing.assert_array_equal(estimated["feasible"], feasible)
+		self.assertTrue(np.isfinite(estimated["srf"][0]))
+		self.assertTrue(np.isnan(estimated["srf"][1]))
+
+		np.testing.assert_array_equal(spice.get_models(specs)["feasible"], feasible)
+
+	def test_variants_that_do_not_fit_are_nan(self):
+		# some variants of a spec at its limit do not fit
+		spec = coilspec.normalize({"layer_count": 2, "turns_count": 20, "outer_diameter": 10.0, "trace_width": 0.127, "trace_spacing": 0.127})
+		result = tolerance.analyze(spec, {"etch": 0.0, "outer_diameter": 0.1}, count = 2000, seed = 1)
+
+		fits = result["checks"]["turns"]
+		self.assertTrue(fits.any() and not fits.all())
+		self.assertTrue(np.isfinite(result["inductance"][fits]).all())
+		self.assertTrue(np.isnan(result["inductance"][~fits]).all())
+		self.assertTrue(np.isfinite(tolerance.get_summary(result)["inductance"]["mean"]))
+
+	def test_feasible_design_is_finite(self):
+		spec = coilspec.normalize({"layer_count": 4, "turns_count": 12})
+
+		self.assertTrue(np.isfinite(inductance.estimate_inductance(spec, [0, -0.5, -1.1, -1.6])))
+
+
+if __name__ == "__main__":
+	unittest.main()
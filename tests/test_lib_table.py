@@ -0,0 +1,52 @@
+"""
+Round trip of fp-lib-table entries through library.add_to_lib_table(). Run from the repository root:
+	python -m pytest tests
+"""
+
+import os
+import tempfile
+import unittest
+
+from plugins.lib import library
+from plugins.lib import sexpr
+
+TABLE = r'''(fp_lib_table
+  (version 7)
+  (lib (name "Other")(type "KiCad")(uri "${KIPRJMOD}/other.pretty")(options "")(descr "line1\nline2\tcolumn \"quoted\" C:\\path"))
+)
+'''
+
+
+class LibTableTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.folder.name, library.LIB_TABLE_FILE)
+
+		with open(self.path, "w", encoding = "utf-8") as file:
+			file.write(TABLE)
+
+	def tearDown(self):
+		self.folder.cleanup()
+
+	def test_other_entries_keep_their_text(self):
+		self.assertTrue(library.add_to_lib_table(self.path))
+
+		with open(self.path, "r", encoding = "utf-8") as file:
+			text = file.read()
+
+		self.assertIn(r'(descr "line1\nline2\tcolumn \"quoted\" C:\\path")', text)
+		self.assertFalse(library.add_to_lib_table(self.path))
+
+		entries = sexpr.find_all(sexpr.parse(text), "lib")
+		self.assertEqual(sexpr.get_value(entries[0], "descr"), 'line1\nline2\tcolumn "quoted" C:\\path')
+		self.assertEqual(sexpr.get_value(entries[1], "name"), library.LIBRARY_NAME)
+
+	def test_escapes_are_inverse(self):
+		value = 'a\nb\tc\r"d"\\e'
+
+		self.assertEqual(sexpr.parse("(x " + sexpr.quote(sexpr.String(value)) + ")")[1], value)
+
+
+if __name__ == "__main__":
+	unittest.main()
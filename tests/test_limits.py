@@ -0,0 +1,66 @@
+"""
+Closed form limits against coilgenerator.estimate_is_coil_generatable() for random designs. Run from the repository
+root:
+	python -m pytest tests
+"""
+
+import random
+import unittest
+
+from plugins.lib import coilgenerator
+from plugins.lib import limits
+
+SAMPLES = 2000
+EPSILON = 1e-6
+
+
+class LimitsTest(unittest.TestCase):
+
+	def get_designs(self):
+		rng = random.Random(39)
+
+		for _ in range(SAMPLES):
+			yield {
+				"layer_count": rng.randint(1, 8),
+				"turns_count": rng.randint(1, 40),
+				"trace_width": rng.uniform(0.1, 0.5),
+				"trace_spacing": rng.uniform(0.1, 0.5),
+				"via_outer": rng.uniform(0.3, 1.0),
+				"outer_diameter": rng.uniform(5, 50)
+			}
+
+	def is_generatable(self, design, **changes):
+		design = dict(design, **changes)
+
+		return coilgenerator.estimate_is_coil_generatable(design["outer_diameter"], design["turns_count"], design["trace_width"], design["trace_spacing"], design["via_outer"], design["layer_count"])
+
+	def check_max(self, design, key, limit, step):
+		if limit - step > 0:
+			self.assertTrue(self.is_generatable(design, **{key: limit - step}), (key, design))
+		self.assertFalse(self.is_generatable(design, **{key: limit + step}), (key, design))
+
+	def test_limits_agree_with_estimate(self):
+		for design in self.get_designs():
+			result = limits.get_limits(design["layer_count"], design["turns_count"], design["trace_width"], design["trace_spacing"], design["via_outer"], design["outer_diameter"])
+
+			# whole numbers are checked at the limit itself, the first value beyond must fail
+			turns = result["turns_count"][1]
+			if turns >= 1:
+				self.assertTrue(self.is_generatable(design, turns_count = turns), design)
+			self.assertFalse(self.is_generatable(design, turns_count = max(turns + 1, 1)), design)
+
+			layers = result["layer_count"][1]
+			if layers >= 1:
+				self.assertTrue(self.is_generatable(design, layer_count = layers), design)
+			self.assertFalse(self.is_generatable(design, layer_count = max(layers + 1, 1)), design)
+
+			diameter = result["outer_diameter"][1]
+			self.assertTrue(self.is_generatable(design, outer_diameter = diameter + EPSILON), design)
+			self.assertFalse(self.is_generatable(design, outer_diameter = diameter - EPSILON), design)
+
+			for key in ("trace_width", "trace_spacing", "via_outer"):
+				self.check_max(design, key, result[key][1], EPSILON)
+
+
+if __name__ == "__main__":
+	unittest.main()
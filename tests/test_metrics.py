@@ -0,0 +1,47 @@
+"""
+Metrics of the dry run against the full geometry of the same coils. Run from the repository root:
+	python -m pytest tests
+"""
+
+import math
+import unittest
+
+from plugins.lib import primitives
+from plugins.lib import spec as coilspec
+
+
+class MetricsTest(unittest.TestCase):
+
+	def check(self, data):
+		spec = coilspec.normalize(data)
+		layer_names = coilspec.get_default_layer_names(spec)
+
+		metrics = coilspec.generate_metrics(spec, layer_names)
+		geometry = coilspec.generate_geometry(spec, layer_names)
+
+		lengths = dict((name, 0.0) for name in metrics.layer_names)
+		for line in geometry.lines:
+			lengths[line.layer] += math.hypot(line.end.x - line.start.x, line.end.y - line.start.y)
+		for arc in geometry.arcs:
+			(_, _, radius, _, sweep) = primitives.get_arc_sweep(arc)
+			lengths[arc.layer] += radius * abs(sweep)
+
+		# relabeled layers count their turns like the layers they are copied from
+		for (name, length) in zip(metrics.layer_names, metrics.trace_length):
+			self.assertAlmostEqual(length, lengths[name], places = 6, msg = name)
+
+		self.assertEqual(metrics.line_count, len(geometry.lines))
+		self.assertEqual(metrics.arc_count, len(geometry.arcs))
+		self.assertNotIn("turn_to_turn", metrics.clearances)
+
+	def test_circular_coils(self):
+		for layer_count in (1, 2, 3, 4, 6):
+			self.check({"layer_count": layer_count, "turns_count": 12, "outer_diameter": 20})
+
+	def test_shaped_coils(self):
+		for shape in ("rectangle", "polygon"):
+			self.check({"layer_count": 4, "turns_count": 6, "outer_diameter": 20, "shape": shape})
+
+
+if __name__ == "__main__":
+	unittest.main()
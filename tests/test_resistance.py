@@ -0,0 +1,43 @@
+"""
+AC resistance estimates over the valid range of the proximity term. Run from the repository root:
+	python -m pytest tests
+"""
+
+import unittest
+
+import numpy as np
+
+from plugins.lib import resistance
+
+
+class AcResistanceTest(unittest.TestCase):
+
+	# 4 layers, 10 turns of 0.15 mm traces and gaps, 35 um copper
+	DESIGN = (4, 10, 0.15, 0.15, 10.0)
+
+	def get_ratio(self, frequency):
+		return resistance.get_ac_resistance(frequency, *self.DESIGN) / resistance.get_dc_resistance(*self.DESIGN)
+
+	def test_known_values(self):
+		self.assertAlmostEqual(float(self.get_ratio(1e6)), 1.3469, places = 3)
+		self.assertAlmostEqual(float(self.get_ratio(20e6)), 9.471, places = 2)
+		self.assertAlmostEqual(float(self.get_ratio(100e6)), 43.15, places = 1)
+
+	def test_low_frequencies_follow_kuhn(self):
+		critical = resistance.get_critical_frequency(0.15, 0.15)
+		frequency = 0.5 * critical
+
+		self.assertAlmostEqual(float(resistance.get_proximity_factor(frequency, 4, 0.15, 0.15)), 1 + 0.1 * 0.25 * 3)
+
+	def test_growth_is_continuous_and_bounded(self):
+		frequencies = np.geomspace(1e5, 1e9, 2000)
+		factor = resistance.get_proximity_factor(frequencies, 4, 0.15, 0.15)
+
+		# no jumps, and never faster than quadratic or, at high frequencies, faster than the square root
+		steps = np.diff(np.log(factor)) / np.diff(np.log(frequencies))
+		self.assertTrue((steps >= 0).all() and (steps <= 2).all())
+		self.assertTrue((steps[frequencies[1:] > 1e7] <= 0.5 + 1e-9).all())
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,84 @@
+"""
+Address checks and worker pool recovery of the generation service. Run from the repository root:
+	python -m pytest tests
+"""
+
+import os
+import time
+import signal
+import asyncio
+import tempfile
+import threading
+import unittest
+
+from plugins.lib import service
+
+
+class AddressTest(unittest.TestCase):
+
+	def test_loopback_hosts(self):
+		for host in ("127.0.0.1", "127.0.0.2", "::1", "localhost"):
+			self.assertTrue(service.is_loopback(host), host)
+
+		for host in ("0.0.0.0", "::", "192.168.1.10", "10.0.0.1"):
+			self.assertFalse(service.is_loopback(host), host)
+
+	def test_remote_host_is_rejected(self):
+		with self.assertRaises(ValueError):
+			asyncio.run(service.Server(1).serve(("0.0.0.0", 0)))
+
+
+class RecoveryTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.folder.name, "service.sock")
+
+		self.server = service.Server(1)
+		self.thread = threading.Thread(target = self._run)
+		self.thread.start()
+
+		deadline = time.monotonic() + 30
+		while not os.path.exists(self.path):
+			self.assertLess(time.monotonic(), deadline, "service did not start")
+			time.sleep(0.01)
+
+	def _run(self):
+		async def run():
+			(self.loop, self.task) = (asyncio.get_running_loop(), asyncio.current_task())
+			await self.server.serve(self.path)
+
+		# asyncio.run() also ends the connection handlers when the server is cancelled
+		try:
+			asyncio.run(run())
+		except asyncio.CancelledError:
+			pass
+
+	def tearDown(self):
+		self.loop.call_soon_threadsafe(self.task.cancel)
+		self.thread.join()
+		self.folder.cleanup()
+
+	def test_killed_worker_is_replaced(self):
+		with service.Client(self.path, timeout = 30) as client:
+			pid = client.call("ping")["pid"]
+			os.kill(pid, signal.SIGKILL)
+
+			# calls that meet the broken pool fail, the next ones run on the new pool
+			deadline = time.monotonic() + 30
+			while True:
+				self.assertLess(time.monotonic(), deadline, "worker pool was not replaced")
+
+				try:
+					result = client.call("ping")
+					break
+				except service.ServiceError as e:
+					self.assertEqual(e.code, service.SERVER_ERROR)
+
+			self.assertNotEqual(result["pid"], pid)
+			self.assertEqual(self.server.restart_count, 1)
+			self.assertIn("footprint", client.call("generate", spec = {"layer_count": 2, "turns_count": 3}))
+
+
+if __name__ == "__main__":
+	unittest.main()
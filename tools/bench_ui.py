@@ -0,0 +1,179 @@
+"""
+Runs the real dialog code against the headless pcbnew and wx stand-ins in tools/headless and measures
+opening and reopening the dialog, keystroke-to-validation latency, preview repaints, catalog lookups, the
+tolerance analysis and the generate/paste and save paths, including the save of a design that is already in the library.
+Exits with a non zero status if a median latency exceeds its budget.
+
+Usage:
+	python tools/bench_ui.py [--layers 4] [--turns 12] [--repeat 20]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import itertools
+import tempfile
+import statistics
+
+TOOLS_ROOT = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_ROOT = os.path.dirname(TOOLS_ROOT)
+
+sys.path.insert(0, os.path.join(TOOLS_ROOT, "headless"))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+import wx # type: ignore
+import pcbnew # type: ignore
+
+from plugins import dialog
+from plugins.lib import menu
+
+CACHE_FILE = os.path.join(REPOSITORY_ROOT, "plugins", "dynamic", "lastconfig.json")
+GENERATION_TIMEOUT = 60 # (s)
+
+def get_elem(identifier):
+	for entry in menu.structure:
+		if entry["id"] == identifier:
+			return entry["wx_elem"]
+
+def wait_for(ui):
+	"""
+	Pumps queued CallAfter() calls until a generation is finished
+	"""
+	deadline = time.perf_counter() + GENERATION_TIMEOUT
+	while ui.is_generating:
+		if time.perf_counter() > deadline:
+			raise TimeoutError("Coil generation did not finish")
+
+		wx.Yield()
+		time.sleep(0.0001)
+
+def open_dialog(layers, turns):
+	ui = dialog.show(wx.Window.FindFocus())
+	get_elem("layer_count").SetSelection(layers - 1)
+	get_elem("turns_count").SetValue(str(turns))
+	ui.Show()
+
+	return ui
+
+def timed(function, repeat):
+	samples = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		function()
+		samples.append((time.perf_counter() - start) * 1000)
+
+	return samples
+
+def report(name, samples, budget_ms):
+	median = statistics.median(samples)
+	p95 = sorted(samples)[int(0.95 * (len(samples) - 1))]
+	status = "ok" if median <= budget_ms else "FAIL"
+
+	print(f"{name:<24} median {median:8.3f} ms  p95 {p95:8.3f} ms  budget {budget_ms:8.3f} ms  {status}")
+
+	return median <= budget_ms
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Headless latency benchmark of the coil generator dialog")
+	parser.add_argument("--layers", type = int, default = 4, help = "copper layers of the board and the coil")
+	parser.add_argument("--turns", type = int, default = 12, help = "turns per layer")
+	parser.add_argument("--repeat", type = int, default = 20, help = "samples per measurement")
+	parser.add_argument("--budget-open-ms", type = float, default = 50.0)
+	parser.add_argument("--budget-keystroke-ms", type = float, default = 16.0)
+	parser.add_argument("--budget-paste-ms", type = float, default = 500.0)
+	parser.add_argument("--budget-save-ms", type = float, default = 500.0)
+	parser.add_argument("--budget-tolerance-ms", type = float, default = 1000.0)
+	args = parser.parse_args(argv)
+
+	project = tempfile.mkdtemp(prefix = "coil_bench_")
+	pcbnew.SetBoard(pcbnew.BOARD(args.layers, os.path.join(project, "bench.kicad_pcb")))
+
+	# the dialog stores every form change, the user's settings are restored afterwards
+	shutil.copyfile(CACHE_FILE, CACHE_FILE + ".bench")
+
+	try:
+		results = []
+
+		def open_new():
+			# built from scratch, like the first run in a pcbnew session
+			dialog._instance = None
+			open_dialog(args.layers, args.turns).Close(force = True)
+
+		def reopen():
+			open_dialog(args.layers, args.turns).Close()
+
+		results.append(report("open dialog", timed(open_new, args.repeat), args.budget_open_ms))
+		results.append(report("reopen dialog", timed(reopen, args.repeat), args.budget_open_ms))
+
+		ui = open_dialog(args.layers, args.turns)
+		turns = get_elem("turns_count")
+		values = itertools.cycle([str(args.turns + 1), str(args.turns)])
+		results.append(report("keystroke to validation", timed(lambda: turns.SetValue(next(values)), args.repeat), args.budget_keystroke_ms))
+		results.append(report("validation notes", timed(ui.update_coil_generation_notes, args.repeat), args.budget_keystroke_ms))
+
+		# the preview repaints from cached paths, unless the geometry changed
+		results.append(report("preview redraw", timed(lambda: ui.preview._on_paint(None), args.repeat), args.budget_keystroke_ms))
+
+		def rebuild():
+			turns.SetValue(next(values))
+			ui.preview._on_paint(None)
+
+		results.append(report("preview rebuild", timed(rebuild, args.repeat), args.budget_keystroke_ms))
+
+		if dialog.coilcatalog is not None:
+			# the first lookup builds the catalog of the board, later ones only search it
+			ui.elem_target.SetValue("2")
+			targets = itertools.cycle(["2", "2.2", "0.5", "10"])
+			results.append(report("catalog lookup", timed(lambda: ui.elem_target.SetValue(next(targets)), args.repeat), args.budget_keystroke_ms))
+
+			if not ui.catalog_matches:
+				raise RuntimeError("No catalog matches")
+
+		if dialog.tolerance is not None:
+			results.append(report("tolerance analysis", timed(ui.update_coil_tolerances, args.repeat), args.budget_tolerance_ms))
+
+			if not ui.tolerances.GetLabel():
+				raise RuntimeError("No tolerance analysis")
+
+		ui.Close()
+
+		def paste():
+			ui = open_dialog(args.layers, args.turns)
+			ui._on_generate_button_klick(None)
+			wait_for(ui)
+
+			if wx.Clipboard.Get().data is None:
+				raise RuntimeError("Nothing was pasted")
+
+		# every save stores a new design, identical designs are skipped by the library
+		saved_turns = itertools.count(args.turns)
+
+		def save():
+			turns = next(saved_turns)
+			ui = open_dialog(args.layers, turns)
+			get_elem("name").SetValue("BENCH_COIL_" + str(turns))
+			ui._on_save_button_klick(None)
+			wait_for(ui)
+
+		def save_existing():
+			ui = open_dialog(args.layers, args.turns)
+			get_elem("name").SetValue("BENCH_COIL_COPY")
+			ui._on_save_button_klick(None)
+
+			if ui.is_generating:
+				raise RuntimeError("Stored design was generated again")
+			ui.Close()
+
+		results.append(report("generate and paste", timed(paste, args.repeat), args.budget_paste_ms))
+		results.append(report("generate and save", timed(save, args.repeat), args.budget_save_ms))
+		results.append(report("save stored design", timed(save_existing, args.repeat), args.budget_open_ms))
+	finally:
+		shutil.move(CACHE_FILE + ".bench", CACHE_FILE)
+		shutil.rmtree(project)
+
+	return 0 if all(results) else 1
+
+if __name__ == "__main__":
+	sys.exit(main())
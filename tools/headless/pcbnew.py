@@ -0,0 +1,160 @@
+"""
+Headless stand-in for KiCad's pcbnew module.
+Only covers what the coil generator uses, so the plugin can be run and measured outside of KiCad.
+Put the tools/headless folder first on sys.path to use it.
+
+Not part of pcbnew, only available in this stand-in:
+	SetBoard(board): Replaces the board returned by GetBoard()
+	BOARD(copper_layer_count, file_name): Board with configurable layer count and project file
+	refresh_count: Number of Refresh() calls so far
+	GetFootprintLibraries(): Libraries of the project table, which is read once per board like KiCad does, until a
+	row is inserted into GetBoard().GetProject().PcbFootprintLibs()
+"""
+
+import os
+import re
+
+refresh_count = 0
+
+class ActionPlugin:
+	"""
+	Base class of KiCad action plugins, registration is a no-op
+	"""
+
+	def register(self):
+		pass
+
+	def defaults(self):
+		pass
+
+def ToMM(value):
+	return value / 1e6
+
+def FromMM(value):
+	return int(round(value * 1e6))
+
+class BOARD_DESIGN_SETTINGS:
+	def __init__(self, board_thickness):
+		self._board_thickness = board_thickness
+
+	def GetBoardThickness(self):
+		return self._board_thickness
+
+	def SetBoardThickness(self, thickness):
+		self._board_thickness = thickness
+
+class FP_LIB_TABLE_ROW:
+	def __init__(self, nickname):
+		self._nickname = nickname
+
+	def GetNickName(self):
+		return self._nickname
+
+	def clone(self):
+		return FP_LIB_TABLE_ROW(self._nickname)
+
+class FP_LIB_TABLE:
+	"""
+	Footprint library table, rows only keep their library name
+	"""
+
+	def __init__(self):
+		self._rows = []
+
+	def Load(self, file_name):
+		try:
+			with open(file_name, "r") as file:
+				self._rows += [FP_LIB_TABLE_ROW(name) for name in re.findall(r'\(lib\s+\(name\s+"?([^")]*)"?\)', file.read())]
+		except OSError:
+			pass
+
+	def FindRow(self, nickname):
+		return next((row for row in self._rows if row.GetNickName() == nickname), None)
+
+	def InsertRow(self, row, replace = False):
+		existing = self.FindRow(row.GetNickName())
+		if existing is not None:
+			if not replace:
+				return False
+			self._rows.remove(existing)
+
+		self._rows.append(row)
+
+		return True
+
+	def GetLogicalLibs(self):
+		return [row.GetNickName() for row in self._rows]
+
+class PROJECT:
+	"""
+	Project of a board, its footprint library table is loaded on first use
+	"""
+
+	def __init__(self, lib_table_path):
+		self._lib_table_path = lib_table_path
+		self._footprint_libraries = None
+
+	def PcbFootprintLibs(self):
+		if self._footprint_libraries is None:
+			self._footprint_libraries = FP_LIB_TABLE()
+			self._footprint_libraries.Load(self._lib_table_path)
+
+		return self._footprint_libraries
+
+class BOARD:
+	"""
+	Board with a configurable number of copper layers and a file name that defines the project folder
+	"""
+
+	def __init__(self, copper_layer_count = 2, file_name = None):
+		if file_name is None:
+			file_name = os.path.join(os.getcwd(), "headless.kicad_pcb")
+
+		self._copper_layer_count = copper_layer_count
+		self._file_name = file_name
+		self._footprints = []
+		self._design_settings = BOARD_DESIGN_SETTINGS(FromMM(1.6))
+		self._project = PROJECT(os.path.join(os.path.dirname(file_name), "fp-lib-table"))
+
+	def GetCopperLayerCount(self):
+		return self._copper_layer_count
+
+	def SetCopperLayerCount(self, count):
+		self._copper_layer_count = count
+
+	def GetDesignSettings(self):
+		return self._design_settings
+
+	def GetFileName(self):
+		return self._file_name
+
+	def GetProject(self):
+		return self._project
+
+	def Footprints(self):
+		return self._footprints
+
+	def Add(self, item):
+		self._footprints.append(item)
+
+	def Remove(self, item):
+		self._footprints.remove(item)
+
+_board = BOARD()
+
+def GetBoard():
+	return _board
+
+def SetBoard(board):
+	global _board
+	_board = board
+
+def GetFootprintLibraries():
+	"""
+	Libraries of the project's fp-lib-table as KiCad holds them in memory
+	"""
+	return _board.GetProject().PcbFootprintLibs().GetLogicalLibs()
+
+def Refresh():
+	global refresh_count
+	refresh_count += 1
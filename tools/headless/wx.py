@@ -0,0 +1,613 @@
+"""
+Headless stand-in for wxPython.
+Only covers the widgets and functions used by the coil generator dialog. Widgets keep their state in plain attributes
+and dispatch events to bound handlers synchronously, like wx does for programmatic value changes.
+Put the tools/headless folder first on sys.path to use it.
+
+Differences to wx worth knowing:
+	CallAfter() only queues, queued calls run on Yield() - there is no event loop
+	PostEvent() records events in window.posted_events instead of delivering them
+	Refresh() does not paint, call the paint handler directly. Graphics contexts only count what they draw
+	Clipboard data is kept in Clipboard.Get().data
+	MessageBox() does not block, shown messages are recorded in messages
+"""
+
+import collections
+import threading
+import time
+
+ID_ANY = -1
+DefaultPosition = (-1, -1)
+DefaultSize = (-1, -1)
+
+DEFAULT_DIALOG_STYLE = 1 << 0
+VERTICAL = 1 << 1
+HORIZONTAL = 1 << 2
+ALL = 1 << 3
+ALIGN_CENTER_VERTICAL = 1 << 4
+BOTH = 1 << 5
+SL_HORIZONTAL = 1 << 6
+SL_LABELS = 1 << 7
+PD_APP_MODAL = 1 << 8
+PD_CAN_ABORT = 1 << 9
+PD_ELAPSED_TIME = 1 << 10
+PD_AUTO_HIDE = 1 << 11
+OK = 1 << 12
+ICON_INFORMATION = 1 << 13
+BG_STYLE_PAINT = 2
+CAP_ROUND = 130
+ODDEVEN_RULE = 1
+WINDING_RULE = 2
+MOD_NONE = 0
+MOD_CONTROL = 1
+
+WXK_ESCAPE = 27
+WXK_RETURN = 13
+
+LIGHT_GREY = (192, 192, 192, 255)
+
+class PyEventBinder:
+	def __init__(self, name):
+		self.name = name
+
+	def __repr__(self):
+		return self.name
+
+EVT_CHOICE = PyEventBinder("EVT_CHOICE")
+EVT_CHECKBOX = PyEventBinder("EVT_CHECKBOX")
+EVT_SCROLL = PyEventBinder("EVT_SCROLL")
+EVT_TEXT = PyEventBinder("EVT_TEXT")
+EVT_BUTTON = PyEventBinder("EVT_BUTTON")
+EVT_CHAR_HOOK = PyEventBinder("EVT_CHAR_HOOK")
+EVT_PAINT = PyEventBinder("EVT_PAINT")
+EVT_SIZE = PyEventBinder("EVT_SIZE")
+EVT_CLOSE = PyEventBinder("EVT_CLOSE")
+EVT_TIMER = PyEventBinder("EVT_TIMER")
+
+wxEVT_CHAR_HOOK = EVT_CHAR_HOOK
+
+_pending_calls = collections.deque()
+_main_thread = threading.main_thread()
+
+class Size:
+	def __init__(self, width = -1, height = -1):
+		self.width = width
+		self.height = height
+
+	def GetWidth(self):
+		return self.width
+
+	def GetHeight(self):
+		return self.height
+
+class Event:
+	def __init__(self, eventType = None, id = 0):
+		self._event_type = eventType
+		self._event_object = None
+		self._skipped = False
+
+	def GetEventType(self):
+		return self._event_type
+
+	def GetEventObject(self):
+		return self._event_object
+
+	def SetEventObject(self, obj):
+		self._event_object = obj
+
+	def Skip(self, skip = True):
+		self._skipped = skip
+
+class CommandEvent(Event):
+	pass
+
+class KeyEvent(Event):
+	def __init__(self, eventType = None):
+		super().__init__(eventType)
+		self._key_code = 0
+		self._control_down = False
+
+	def SetKeyCode(self, code):
+		self._key_code = code
+
+	def GetKeyCode(self):
+		return self._key_code
+
+	def SetControlDown(self, down):
+		self._control_down = down
+
+	def GetModifiers(self):
+		return MOD_CONTROL if self._control_down else MOD_NONE
+
+class CloseEvent(Event):
+	def __init__(self, eventType = None, canVeto = True):
+		super().__init__(eventType)
+		self._can_veto = canVeto
+		self._veto = False
+
+	def CanVeto(self):
+		return self._can_veto
+
+	def Veto(self, veto = True):
+		self._veto = veto
+
+	def GetVeto(self):
+		return self._veto
+
+class Icon:
+	def __init__(self, name = "", *args):
+		self.name = name
+
+class Window:
+	_focus = None
+
+	def __init__(self, parent = None, id = ID_ANY, *args, **kwargs):
+		self._parent = parent
+		self._handlers = []
+		self._shown = False
+		self._enabled = True
+		self._destroyed = False
+		self._min_size = Size()
+		self._size = Size(*kwargs.get("size", DefaultSize))
+		self._sizer = None
+		self.posted_events = []
+
+	def Bind(self, event, handler, source = None, *args):
+		self._handlers.append((event, handler, source))
+
+	def Unbind(self, event, source = None, *args):
+		self._handlers = [h for h in self._handlers if not (h[0] is event and h[2] is source)]
+
+	def _dispatch(self, binder, event = None):
+		"""
+		Delivers a command event to the handlers of this window and its parents, like wx propagates command events
+		"""
+		if event is None:
+			event = CommandEvent(binder)
+		event.SetEventObject(self)
+
+		window = self
+		while window is not None:
+			for (bound_event, handler, source) in list(window._handlers):
+				if bound_event is binder and (source is None or source is self):
+					handler(event)
+
+					return True
+			window = window._parent
+
+		return False
+
+	def GetParent(self):
+		return self._parent
+
+	def Show(self, show = True):
+		self._shown = show
+
+		return True
+
+	def Hide(self):
+		return self.Show(False)
+
+	def IsShown(self):
+		return self._shown
+
+	def Raise(self):
+		pass
+
+	def SetFocus(self):
+		Window._focus = self
+
+	@staticmethod
+	def FindFocus():
+		if Window._focus is None:
+			Window._focus = Window()
+
+		return Window._focus
+
+	def Enable(self, enable = True):
+		self._enabled = enable
+
+	def Disable(self):
+		self.Enable(False)
+
+	def IsEnabled(self):
+		return self._enabled
+
+	def Destroy(self):
+		self._destroyed = True
+		self._shown = False
+
+		return True
+
+	def IsBeingDeleted(self):
+		return self._destroyed
+
+	def Close(self, force = False):
+		"""
+		Sends EVT_CLOSE to the window's own handler. Without a handler, or if the handler skips the event, the window
+		is destroyed
+		"""
+		event = CloseEvent(EVT_CLOSE, canVeto = not force)
+		event.SetEventObject(self)
+
+		for (bound_event, handler, source) in list(self._handlers):
+			if bound_event is EVT_CLOSE and source is None:
+				handler(event)
+
+				if not event._skipped:
+					return not event.GetVeto()
+				break
+
+		return self.Destroy()
+
+	def SetMinSize(self, size):
+		self._min_size = Size(*size)
+
+	def GetMinSize(self):
+		return self._min_size
+
+	def GetSize(self):
+		return self._size
+
+	def GetClientSize(self):
+		return self._size
+
+	def SetSize(self, size):
+		self._size = Size(*size)
+
+	def SetSizer(self, sizer):
+		self._sizer = sizer
+
+	def Layout(self):
+		pass
+
+	def Fit(self):
+		pass
+
+	def Centre(self, direction = BOTH):
+		pass
+
+	def Refresh(self, *args, **kwargs):
+		pass
+
+	def SetIcon(self, icon):
+		pass
+
+	def SetBackgroundColour(self, colour):
+		pass
+
+	def SetBackgroundStyle(self, style):
+		pass
+
+	def SetForegroundColour(self, colour):
+		pass
+
+	def SetTitle(self, title):
+		self._title = title
+
+class TopLevelWindow(Window):
+	def __init__(self, parent = None, id = ID_ANY, title = "", *args, **kwargs):
+		super().__init__(parent, id, **kwargs)
+		self._title = title
+
+class Frame(TopLevelWindow):
+	pass
+
+class Dialog(TopLevelWindow):
+	pass
+
+class Panel(Window):
+	pass
+
+class Colour:
+	def __init__(self, red = 0, green = 0, blue = 0, alpha = 255):
+		self.rgba = (red, green, blue, alpha)
+
+class Brush:
+	def __init__(self, colour = None, *args):
+		self.colour = colour
+
+class Pen:
+	def __init__(self, colour = None, width = 1, *args):
+		self.colour = colour
+		self.width = width
+
+TRANSPARENT_BRUSH = Brush()
+TRANSPARENT_PEN = Pen()
+
+class GraphicsPenInfo:
+	def __init__(self, colour = None, width = 1, *args):
+		self.colour = colour
+		self.width = width
+
+	def Width(self, width):
+		self.width = width
+
+		return self
+
+	def Cap(self, cap):
+		return self
+
+class GraphicsPath:
+	"""
+	Counts the elements added to it
+	"""
+
+	def __init__(self):
+		self.element_count = 0
+
+	def _add(self, *args):
+		self.element_count += 1
+
+	MoveToPoint = _add
+	AddLineToPoint = _add
+	AddArc = _add
+	AddCircle = _add
+	AddRectangle = _add
+
+	def CloseSubpath(self):
+		pass
+
+class GraphicsContext:
+	"""
+	Counts drawn elements in draw_count
+	"""
+
+	def __init__(self):
+		self.draw_count = 0
+
+	@staticmethod
+	def Create(dc = None):
+		return GraphicsContext()
+
+	def CreatePath(self):
+		return GraphicsPath()
+
+	def CreatePen(self, info):
+		return Pen(info.colour, info.width)
+
+	def Translate(self, dx, dy):
+		pass
+
+	def Scale(self, x, y):
+		pass
+
+	def SetPen(self, pen):
+		pass
+
+	def SetBrush(self, brush):
+		pass
+
+	def StrokePath(self, path):
+		self.draw_count += path.element_count
+
+	def FillPath(self, path, fillStyle = ODDEVEN_RULE):
+		self.draw_count += path.element_count
+
+	def DrawRectangle(self, x, y, w, h):
+		self.draw_count += 1
+
+	def DrawEllipse(self, x, y, w, h):
+		self.draw_count += 1
+
+class GraphicsRenderer:
+	_default = None
+
+	@staticmethod
+	def GetDefaultRenderer():
+		if GraphicsRenderer._default is None:
+			GraphicsRenderer._default = GraphicsRenderer()
+
+		return GraphicsRenderer._default
+
+	def CreatePath(self):
+		return GraphicsPath()
+
+class PaintDC:
+	def __init__(self, window):
+		self.window = window
+
+	def SetBackground(self, brush):
+		pass
+
+	def Clear(self):
+		pass
+
+AutoBufferedPaintDC = PaintDC
+
+class StaticText(Window):
+	def __init__(self, parent = None, id = ID_ANY, label = "", *args, **kwargs):
+		super().__init__(parent, id, **kwargs)
+		self._label = label
+		self._size = Size(7 * len(label), 16)
+
+	def SetLabel(self, label):
+		self._label = label
+
+	def GetLabel(self):
+		return self._label
+
+class TextCtrl(Window):
+	def __init__(self, parent = None, id = ID_ANY, value = "", *args, **kwargs):
+		super().__init__(parent, id, **kwargs)
+		self._value = value
+
+	def SetValue(self, value):
+		self._value = value
+		self._dispatch(EVT_TEXT)
+
+	def ChangeValue(self, value):
+		self._value = value
+
+	def GetValue(self):
+		return self._value
+
+class Choice(Window):
+	def __init__(self, parent = None, id = ID_ANY, choices = (), *args, **kwargs):
+		super().__init__(parent, id, **kwargs)
+		self._choices = list(choices)
+		self._selection = -1
+
+	def SetSelection(self, selection):
+		self._selection = selection
+
+	def GetSelection(self):
+		return self._selection
+
+	def Select(self, selection):
+		self._selection = selection
+		self._dispatch(EVT_CHOICE)
+
+	def SetItems(self, choices):
+		self._choices = list(choices)
+
+	def GetCount(self):
+		return len(self._choices)
+
+class CheckBox(Window):
+	def __init__(self, parent = None, id = ID_ANY, label = "", *args, **kwargs):
+		super().__init__(parent, id, **kwargs)
+		self._value = False
+
+	def SetValue(self, value):
+		self._value = bool(value)
+
+	def GetValue(self):
+		return self._value
+
+	def Click(self, value):
+		self._value = bool(value)
+		self._dispatch(EVT_CHECKBOX)
+
+class Slider(Window):
+	def __init__(self, parent = None, id = ID_ANY, value = 0, minValue = 0, maxValue = 100, *args, **kwargs):
+		super().__init__(parent, id, **kwargs)
+		self._value = value
+
+	def SetValue(self, value):
+		self._value = value
+
+	def GetValue(self):
+		return self._value
+
+class Button(Window):
+	def __init__(self, parent = None, id = ID_ANY, label = "", *args, **kwargs):
+		super().__init__(parent, id, **kwargs)
+		self._label = label
+
+	def Click(self):
+		self._dispatch(EVT_BUTTON)
+
+class ProgressDialog(Window):
+	def __init__(self, title, message, maximum = 100, parent = None, style = 0):
+		super().__init__(parent)
+		self._maximum = maximum
+		self.value = 0
+		self.message = message
+		self._shown = True
+
+	def Update(self, value, newmsg = ""):
+		self.value = value
+		if newmsg:
+			self.message = newmsg
+
+		return (True, False)
+
+	def Pulse(self, newmsg = ""):
+		return self.Update(self.value, newmsg)
+
+class Sizer:
+	def __init__(self):
+		self._items = []
+
+	def Add(self, item, *args, **kwargs):
+		self._items.append(item)
+
+	def Insert(self, index, item, *args, **kwargs):
+		self._items.insert(index, item)
+
+	def Fit(self, window):
+		pass
+
+	def Layout(self):
+		pass
+
+class BoxSizer(Sizer):
+	def __init__(self, orient = HORIZONTAL):
+		super().__init__()
+		self._orient = orient
+
+class TextDataObject:
+	def __init__(self, text = ""):
+		self._text = text
+
+	def GetText(self):
+		return self._text
+
+class Clipboard:
+	_instance = None
+
+	def __init__(self):
+		self.data = None
+		self._open = False
+
+	@staticmethod
+	def Get():
+		if Clipboard._instance is None:
+			Clipboard._instance = Clipboard()
+
+		return Clipboard._instance
+
+	def Open(self):
+		self._open = True
+
+		return True
+
+	def SetData(self, data):
+		self.data = data
+
+		return True
+
+	def Close(self):
+		self._open = False
+
+class UIActionSimulator:
+	def Char(self, keycode, modifiers = MOD_NONE):
+		return True
+
+def GetTopLevelParent(window):
+	while window is not None and not isinstance(window, TopLevelWindow):
+		window = window.GetParent()
+
+	return window
+
+def PostEvent(dest, event):
+	dest.posted_events.append(event)
+
+messages = []
+
+def MessageBox(message, caption = "Message", style = OK, parent = None):
+	messages.append((caption, message))
+
+	return OK
+
+def CallAfter(callable, *args, **kwargs):
+	_pending_calls.append((callable, args, kwargs))
+
+def Yield(onlyIfNeeded = False):
+	"""
+	Runs all calls queued with CallAfter(), in order
+	"""
+	while _pending_calls:
+		(callable, args, kwargs) = _pending_calls.popleft()
+		callable(*args, **kwargs)
+
+	return True
+
+SafeYield = Yield
+
+def IsMainThread():
+	return threading.current_thread() is _main_thread
+
+def MilliSleep(milliseconds):
+	time.sleep(milliseconds / 1000)
@@ -0,0 +1,152 @@
+"""
+Measures the import cost of the plugin, split into plugin registration (what every pcbnew start pays) and the first
+run of the plugin (what is deferred until the dialog is opened).
+Uses the interpreter's "-X importtime" report. Exits with a non zero status if the registration budget is exceeded
+or if registration pulls in modules that are supposed to be loaded lazily.
+
+Usage:
+	python tools/importtime.py [--budget-ms 5] [--verbose] [--headless]
+
+The python interpreter running this script needs to be able to import pcbnew, e.g. KiCad's bundled python. With
+--headless the stand-ins from tools/headless are used instead.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+TOOLS_ROOT = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_ROOT = os.path.dirname(TOOLS_ROOT)
+PACKAGE = "plugins"
+MARKER = "--coil-generator-importtime-marker--"
+BUDGET_MS = 5.0
+
+# modules that must not be imported by registration, only by Plugin.Run()
+DEFERRED_MODULES = [
+	"wx",
+	"json",
+	"numpy",
+	PACKAGE + ".dialog",
+	PACKAGE + ".lib",
+]
+
+# modules KiCad has already loaded before any plugin is registered, they are imported before measuring
+PRELOADED_MODULES = ["os", "sys", "logging", "pcbnew"]
+PRELOAD = "import " + ", ".join(PRELOADED_MODULES)
+
+def get_env(headless):
+	"""
+	Returns:
+		dict: Environment of the measured interpreters, with the stand-ins of tools/headless first on the path if headless
+	"""
+	env = os.environ.copy()
+	if headless:
+		env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.join(TOOLS_ROOT, "headless"), env.get("PYTHONPATH")]))
+
+	return env
+
+def measure_registration(env):
+	"""
+	Returns:
+		[(str, int, int)]: Modules imported by plugin registration, see measure()
+	"""
+	return measure("import " + PACKAGE, PRELOAD, env)
+
+def measure_first_run(env):
+	"""
+	Returns:
+		[(str, int, int)]: Modules imported by the first run of the plugin after registration, see measure()
+	"""
+	return measure("import " + PACKAGE + ".dialog", PRELOAD + "\nimport " + PACKAGE, env)
+
+def get_deferred_imports(modules):
+	"""
+	Returns:
+		[str]: Names of the measured modules that are or belong to DEFERRED_MODULES
+	"""
+	return [name for (name, _, _) in modules if any(name == deferred or name.startswith(deferred + ".") for deferred in DEFERRED_MODULES)]
+
+def get_total_us(modules):
+	"""
+	Returns:
+		int: Summed self time of the measured modules (us)
+	"""
+	return sum(self_us for (_, self_us, _) in modules)
+
+def measure(statement, preload, env):
+	"""
+	Runs statement in a fresh interpreter with "-X importtime" and collects the imports it triggered
+	Args:
+		statement: Python statement to measure
+		preload: Statement that is executed before measuring, its imports are not counted
+		env: Environment of the interpreter
+
+	Returns:
+		[(str, int, int)]: (module name, self time in us, cumulative time in us) for every newly imported module
+	"""
+	code = preload + "\nimport sys\nsys.stderr.write('" + MARKER + "\\n')\nsys.stderr.flush()\n" + statement
+
+	result = subprocess.run(
+		[sys.executable, "-X", "importtime", "-c", code],
+		cwd = REPOSITORY_ROOT,
+		env = env,
+		stderr = subprocess.PIPE,
+		stdout = subprocess.DEVNULL,
+		text = True
+	)
+
+	if result.returncode != 0:
+		raise RuntimeError("Measured statement failed:\n" + result.stderr)
+
+	(_, _, report) = result.stderr.partition(MARKER)
+
+	modules = []
+	for line in report.splitlines():
+		if not line.startswith("import time:") or "self [us]" in line:
+			continue
+
+		(self_us, cumulative_us, name) = line[len("import time:"):].split("|")
+		modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+	return modules
+
+def print_report(title, modules, verbose):
+	total_us = get_total_us(modules)
+	print(f"{title}: {len(modules)} modules, {total_us / 1000:.2f} ms")
+
+	if verbose:
+		for (name, self_us, cumulative_us) in sorted(modules, key = lambda m: -m[1]):
+			print(f"\t{self_us / 1000:8.2f} ms self {cumulative_us / 1000:8.2f} ms cumulative  {name}")
+
+	return total_us
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Import time report for plugin registration and first run")
+	parser.add_argument("--budget-ms", type = float, default = BUDGET_MS, help = "maximum import time of plugin registration")
+	parser.add_argument("--verbose", action = "store_true", help = "list every imported module")
+	parser.add_argument("--headless", action = "store_true", help = "use the pcbnew and wx stand-ins from tools/headless")
+	args = parser.parse_args(argv)
+
+	env = get_env(args.headless)
+
+	registration = measure_registration(env)
+	first_run = measure_first_run(env)
+
+	registration_us = print_report("registration", registration, args.verbose)
+	print_report("first run", first_run, args.verbose)
+
+	failed = False
+
+	for name in get_deferred_imports(registration):
+		print("FAIL: registration imports deferred module " + name)
+		failed = True
+
+	if registration_us > args.budget_ms * 1000:
+		print(f"FAIL: registration takes {registration_us / 1000:.2f} ms, budget is {args.budget_ms:.2f} ms")
+		failed = True
+
+	return 1 if failed else 0
+
+if __name__ == "__main__":
+	sys.exit(main())